@@ -1,7 +1,14 @@
 from __future__ import annotations
 
-from fastapi import HTTPException, Request
+from typing import Union
+
+from fastapi import Depends, HTTPException, Request
 from sqlalchemy.engine import Engine
+from sqlalchemy.ext.asyncio import AsyncEngine
+from starlette.concurrency import run_in_threadpool
+
+from app.domain.category_metadata import CategoryMetadata
+from app.infra.db.category_rules_repository import get_category_cache
 
 
 def get_engine(request: Request) -> Engine:
@@ -9,3 +16,15 @@ def get_engine(request: Request) -> Engine:
     if engine is None:
         raise HTTPException(status_code=500, detail="Database engine not configured")
     return engine
+
+
+def get_read_engine(request: Request, engine: Engine = Depends(get_engine)) -> Union[AsyncEngine, Engine]:
+    """Motor para lecturas en rutas async: el ``AsyncEngine`` si está configurado, si no ``engine``."""
+    async_engine = getattr(request.app.state, "async_db_engine", None)
+    return async_engine if async_engine is not None else engine
+
+
+async def get_category_rules(engine: Engine = Depends(get_engine)) -> CategoryMetadata:
+    """Reglas por categoría compiladas; solo sale del event loop si la caché tiene que consultar la BD."""
+    cache = get_category_cache(engine)
+    return cache.fresh() or await run_in_threadpool(cache.get)
@@ -0,0 +1,111 @@
+from __future__ import annotations
+
+import random
+import re
+from time import perf_counter
+from urllib.parse import parse_qs
+
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.infra.metrics import observe_request, track_request
+from app.infra.profiling import PROFILE_QUERY_FLAG, PROFILE_SAMPLE_RATE, profiling
+
+
+_PARAM = re.compile(r"{([^}:]+)(?::[^}]+)?}")
+
+
+def route_label(scope: Scope) -> str:
+    """Plantilla de la ruta (``/api/tiles/{z}/{x}/{y}``), no la URL: acota la cardinalidad de las series.
+
+    Según la versión de FastAPI, ``scope["route"]`` lleva o no el prefijo de ``include_router``;
+    el prefijo se recupera comparando la plantilla rellenada con la ruta pedida.
+    """
+    template = getattr(scope.get("route"), "path", None)
+    if not template:
+        return "unmatched"
+    params = scope.get("path_params") or {}
+    rendered = _PARAM.sub(lambda match: str(params.get(match.group(1), match.group(0))), template)
+    path = scope.get("path", "")
+    if rendered != path and path.endswith(rendered):
+        return path[: len(path) - len(rendered)] + template
+    return template
+
+
+class TimingMiddleware:
+    """Middleware ASGI que mide cada petición HTTP.
+
+    Añade ``Server-Timing`` con las etapas registradas con ``span`` y el tiempo en BD, y
+    alimenta los histogramas de ``/metrics``. Es ASGI puro para que la variable de contexto
+    de la petición llegue a la ruta sin la tarea intermedia de ``BaseHTTPMiddleware``.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        started = perf_counter()
+        status = 500
+        with track_request() as timings:
+
+            async def send_with_timing(message: Message) -> None:
+                nonlocal status
+                if message["type"] == "http.response.start":
+                    status = message["status"]
+                    timings.route = route_label(scope)
+                    headers = MutableHeaders(scope=message)
+                    headers.append("Server-Timing", timings.server_timing(perf_counter() - started))
+                await send(message)
+
+            try:
+                await self.app(scope, receive, send_with_timing)
+            finally:
+                timings.route = route_label(scope)
+                observe_request(timings, scope["method"], status, perf_counter() - started)
+
+
+class ProfilingMiddleware:
+    """Perfila una fracción de las peticiones (``PROFILE_SAMPLE_RATE``) o las que pidan ``?profile=1``.
+
+    El fichero lleva la plantilla de la ruta y un id que se devuelve en ``X-Profile-Id`` para
+    localizar el perfil de una petición lenta concreta.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        sample_rate: float = PROFILE_SAMPLE_RATE,
+        query_flag: bool = PROFILE_QUERY_FLAG,
+    ):
+        self.app = app
+        self.sample_rate = sample_rate
+        self.query_flag = query_flag
+
+    def _wanted(self, scope: Scope) -> bool:
+        if self.query_flag:
+            query = parse_qs(scope.get("query_string", b"").decode("latin-1"))
+            if query.get("profile", [""])[-1] in ("1", "true"):
+                return True
+        return self.sample_rate > 0 and random.random() < self.sample_rate
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or not self._wanted(scope):
+            await self.app(scope, receive, send)
+            return
+        with profiling("api", scope.get("path", "")) as profile:
+            if profile is None:
+                await self.app(scope, receive, send)
+                return
+
+            async def send_with_profile_id(message: Message) -> None:
+                if message["type"] == "http.response.start":
+                    MutableHeaders(scope=message).append("X-Profile-Id", profile.identifier)
+                await send(message)
+
+            try:
+                await self.app(scope, receive, send_with_profile_id)
+            finally:
+                profile.name = f"{scope['method']} {route_label(scope)}"
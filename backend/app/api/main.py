@@ -1,20 +1,45 @@
 from __future__ import annotations
 
 import os
+from contextlib import asynccontextmanager
 
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from sqlalchemy import create_engine
+from sqlalchemy.exc import SQLAlchemyError
 
-from app.api.routers import events, heatmap
+from app.api.instrumentation import ProfilingMiddleware, TimingMiddleware
+from app.api.routers import events, heatmap, metrics, tiles
+from app.infra.db.engines import create_db_engine, try_create_async_engine
+from app.infra.metrics import METRICS_ENABLED
+from app.infra.profiling import PROFILE_QUERY_FLAG, PROFILE_SAMPLE_RATE
+from app.services.scoring_pool import shutdown_scoring_pool
+from app.services.weather_cache import get_weather_cache
 
 
-def create_app(engine=None) -> FastAPI:
-    app = FastAPI(title="Hotspots API", version="0.1.0")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    engine = getattr(app.state, "db_engine", None)
+    if engine is not None and os.getenv("WEATHER_CACHE_WARM", "1") != "0":
+        try:
+            days = get_weather_cache(engine).warm()
+            print(f"[api] weather cache warmed days={days}")
+        except SQLAlchemyError as exc:
+            print(f"[api] WARNING: weather cache warm-up failed ({exc}); loading on demand")
+    yield
+    async_engine = getattr(app.state, "async_db_engine", None)
+    if async_engine is not None:
+        await async_engine.dispose()
+    shutdown_scoring_pool()
+
+
+def create_app(engine=None, async_engine=None) -> FastAPI:
+    app = FastAPI(title="Hotspots API", version="0.1.0", lifespan=lifespan)
     if engine is None:
         database_url = os.getenv("DATABASE_URL")
-        engine = create_engine(database_url, future=True) if database_url else None
+        engine = create_db_engine(database_url) if database_url else None
     app.state.db_engine = engine
+    # Lecturas de las rutas async; el motor síncrono sigue sirviendo la caché meteo y los jobs
+    app.state.async_db_engine = async_engine if async_engine is not None else try_create_async_engine(engine)
 
     app.add_middleware(
         CORSMiddleware,
@@ -22,10 +47,19 @@ def create_app(engine=None) -> FastAPI:
         allow_credentials=True,
         allow_methods=["*"],
         allow_headers=["*"],
+        expose_headers=["Server-Timing", "X-Profile-Id", "Link"],
     )
+    if PROFILE_SAMPLE_RATE > 0 or PROFILE_QUERY_FLAG:
+        app.add_middleware(ProfilingMiddleware, sample_rate=PROFILE_SAMPLE_RATE, query_flag=PROFILE_QUERY_FLAG)
+    if METRICS_ENABLED:
+        # Última en añadirse = la más externa: mide también CORS
+        app.add_middleware(TimingMiddleware)
 
     app.include_router(heatmap.router, prefix="/api")
     app.include_router(events.router, prefix="/api")
+    app.include_router(tiles.router, prefix="/api")
+    if METRICS_ENABLED:
+        app.include_router(metrics.router)
     return app
 
 
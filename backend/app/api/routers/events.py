@@ -2,69 +2,118 @@ from __future__ import annotations
 
 from datetime import date as date_type, datetime, time, timedelta, timezone
 from zoneinfo import ZoneInfo
+import json
 import math
-from typing import Optional
+import os
+from typing import AsyncIterator, Literal, Optional
 
-from fastapi import APIRouter, Depends, Query
-from sqlalchemy import select
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.responses import JSONResponse, StreamingResponse
 from sqlalchemy.engine import Engine
+from starlette.concurrency import run_in_threadpool
 
-from app.api.deps import get_engine
-from app.infra.db.events_repository import EventsRepository
-from app.infra.db.tables import events_table, venues_table
+from app.api.deps import get_engine, get_read_engine
+from app.infra.db.events_repository import AsyncEventsRepository
+from app.infra.metrics import span
+from app.services.event_interval_index import get_event_interval_index
 
 router = APIRouter(tags=["events"])
 
 
+EVENTS_PAGE_MAX = int(os.getenv("EVENTS_PAGE_MAX", "1000"))
+# Tamaño de los bloques que lee el modo NDJSON sin ``limit``: memoria acotada aunque el día tenga miles de eventos
+EVENTS_STREAM_PAGE_SIZE = int(os.getenv("EVENTS_STREAM_PAGE_SIZE", "500"))
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
+
 @router.get("/events")
-def list_events(
+async def list_events(
+    request: Request,
     date: date_type,
     from_hour: int = Query(..., ge=0, le=23),
     city: Optional[str] = Query(None, description="Ciudad/provincia para filtrar"),
-    engine: Engine = Depends(get_engine),
+    after_start_dt: Optional[datetime] = Query(None, description="start_dt del último evento de la página anterior"),
+    after_id: Optional[int] = Query(None, description="id del último evento de la página anterior"),
+    limit: Optional[int] = Query(None, ge=1, le=EVENTS_PAGE_MAX),
+    response_format: Literal["json", "ndjson"] = Query("json", alias="format"),
+    engine=Depends(get_read_engine),
 ):
+    if (after_start_dt is None) != (after_id is None):
+        raise HTTPException(status_code=400, detail="after_start_dt and after_id must be given together")
     tz = ZoneInfo("Europe/Madrid")
-    repo = EventsRepository(engine)
-    rows = repo.list_events_from_hour(date, from_hour, city=city, tzinfo=tz)
-    window_start = datetime.combine(date, time(from_hour), tzinfo=tz)
-    window_end = window_start + timedelta(hours=1)
-    response = []
-    for row in rows:
-        start_dt = _to_local(row.get("start_dt"), tz)
-        end_dt = _to_local(row.get("end_dt"), tz)
-        lat = row.get("lat") if row.get("lat") is not None else row.get("venue_lat")
-        lon = row.get("lon") if row.get("lon") is not None else row.get("venue_lon")
-        category = _normalize_category(row.get("category"))
-        if category is None:
-            category = infer_category(row.get("title"))
-        if category == "unknown":
-            category = None
-        subcategory = _normalize_category(row.get("subcategory"))
-        response.append(
-            {
-                "id": row.get("id"),
-                "title": row["title"],
-                "category": category,
-                "subcategory": subcategory,
-                "start_dt": start_dt.isoformat() if start_dt else None,
-                "end_dt": end_dt.isoformat() if end_dt else None,
-                "venue_name": row.get("venue_name"),
-                "expected_attendance": row.get("expected_attendance"),
-                "lat": lat,
-                "lon": lon,
-                "url": row.get("url") or row.get("ticket_url") or row.get("source_url"),
-                "source": row.get("source"),
-                "city": row.get("city"),
-            }
+    repo = AsyncEventsRepository(engine)
+    after = None
+    if after_start_dt is not None:
+        # Sin zona, el cursor está en hora local como el start_dt de la respuesta
+        after = (after_start_dt if after_start_dt.tzinfo else after_start_dt.replace(tzinfo=tz), after_id)
+
+    async def fetch(cursor, page_size):
+        with span("events"):
+            return await repo.list_events_from_hour(
+                date, from_hour, city=city, tzinfo=tz, after=cursor, limit=page_size
+            )
+
+    if response_format == "ndjson":
+        page_size = limit or EVENTS_STREAM_PAGE_SIZE
+        # La primera página se lee antes de responder: los errores de BD siguen siendo un 500 normal
+        first = await fetch(after, page_size)
+        return StreamingResponse(
+            _ndjson_pages(first, fetch, page_size, follow=limit is None, tz=tz), media_type=NDJSON_MEDIA_TYPE
+        )
+
+    rows = await fetch(after, limit)
+    response = JSONResponse([_event_item(row, tz) for row in rows])
+    if limit is not None and len(rows) == limit:
+        last = rows[-1]
+        next_url = request.url.include_query_params(
+            after_start_dt=_to_local(last["start_dt"], tz).isoformat(), after_id=last["id"]
         )
+        response.headers["Link"] = f'<{next_url}>; rel="next"'
     return response
 
 
+async def _ndjson_pages(rows, fetch, page_size: int, *, follow: bool, tz) -> AsyncIterator[bytes]:
+    """Una línea JSON por evento; con ``follow`` sigue leyendo páginas por keyset hasta agotar el resultado."""
+    while rows:
+        yield "".join(json.dumps(_event_item(row, tz), separators=(",", ":")) + "\n" for row in rows).encode()
+        if not follow or len(rows) < page_size:
+            return
+        rows = await fetch((rows[-1]["start_dt"], rows[-1]["id"]), page_size)
+
+
+def _event_item(row, tz) -> dict:
+    start_dt = _to_local(row.get("start_dt"), tz)
+    end_dt = _to_local(row.get("end_dt"), tz)
+    lat = row.get("lat") if row.get("lat") is not None else row.get("venue_lat")
+    lon = row.get("lon") if row.get("lon") is not None else row.get("venue_lon")
+    category = _normalize_category(row.get("category"))
+    if category is None:
+        category = infer_category(row.get("title"))
+    if category == "unknown":
+        category = None
+    subcategory = _normalize_category(row.get("subcategory"))
+    return {
+        "id": row.get("id"),
+        "title": row["title"],
+        "category": category,
+        "subcategory": subcategory,
+        "start_dt": start_dt.isoformat() if start_dt else None,
+        "end_dt": end_dt.isoformat() if end_dt else None,
+        "venue_name": row.get("venue_name"),
+        "expected_attendance": row.get("expected_attendance"),
+        "lat": lat,
+        "lon": lon,
+        "url": row.get("url") or row.get("ticket_url") or row.get("source_url"),
+        "source": row.get("source"),
+        "city": row.get("city"),
+    }
+
+
 EARTH_RADIUS_M = 6_371_000
 
 
 @router.get("/hotspot_events")
-def list_hotspot_events(
+async def list_hotspot_events(
     date: date_type,
     hour: int = Query(..., ge=0, le=23),
     lat: float = Query(...),
@@ -75,7 +124,9 @@ def list_hotspot_events(
 ):
     target_local = datetime.combine(date, time(hour=hour)).replace(tzinfo=ZoneInfo("Europe/Madrid"))
     target_utc = target_local.astimezone(timezone.utc)
-    candidates = _fetch_active_events(engine)
+    # Índice de intervalos en memoria: solo eventos cuya ventana de actividad contiene la hora
+    with span("events"):
+        candidates = await run_in_threadpool(get_event_interval_index(engine).active_at, target_utc)
     target_naive = _to_utc_naive(target_utc)
     results = []
     for row in candidates:
@@ -107,27 +158,6 @@ def list_hotspot_events(
     return results[:limit]
 
 
-def _fetch_active_events(engine: Engine):
-    join_stmt = events_table.outerjoin(venues_table, events_table.c.venue_id == venues_table.c.id)
-    with engine.begin() as conn:
-        rows = conn.execute(
-            select(
-                events_table.c.id,
-                events_table.c.title,
-                events_table.c.start_dt,
-                events_table.c.end_dt,
-                events_table.c.lat,
-                events_table.c.lon,
-                events_table.c.url,
-                events_table.c.source,
-                venues_table.c.name.label("venue_name"),
-            )
-            .select_from(join_stmt)
-            .where(events_table.c.is_active.is_(True))
-        ).mappings().all()
-    return [dict(row) for row in rows]
-
-
 def _to_iso(dt):
     return dt.isoformat() if dt else None
 
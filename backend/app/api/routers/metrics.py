@@ -0,0 +1,12 @@
+from __future__ import annotations
+
+from fastapi import APIRouter, Response
+
+from app.infra.metrics import PROMETHEUS_CONTENT_TYPE, render_metrics
+
+router = APIRouter(tags=["metrics"])
+
+
+@router.get("/metrics", include_in_schema=False)
+def get_metrics() -> Response:
+    return Response(content=render_metrics(), media_type=PROMETHEUS_CONTENT_TYPE)
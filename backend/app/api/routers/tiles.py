@@ -0,0 +1,68 @@
+from __future__ import annotations
+
+from datetime import date as date_type, datetime, time, timezone
+from typing import Optional
+
+from fastapi import APIRouter, Depends, Header, HTTPException, Path, Query, Response
+from sqlalchemy.engine import Engine
+from starlette.concurrency import run_in_threadpool
+
+from app.api.deps import get_category_rules, get_engine, get_read_engine
+from app.domain.category_metadata import CategoryMetadata
+from app.infra.db.events_repository import AsyncEventsRepository
+from app.infra.metrics import span
+from app.services.density_tiles import (
+    MAX_ZOOM,
+    TILE_MAX_AGE_SEC,
+    TILE_MEDIA_TYPE,
+    build_density_tile,
+    etag_matches,
+    tile_etag,
+    tile_in_range,
+    tile_query_bbox,
+)
+from app.services.heatmap import weather_factor_for
+from app.services.scoring_pool import run_scoring
+from app.services.weather_index import get_weather_index
+
+router = APIRouter(tags=["tiles"])
+
+
+@router.get("/tiles/{z}/{x}/{y}")
+async def get_density_tile(
+    date: date_type,
+    z: int = Path(..., ge=0, le=MAX_ZOOM),
+    x: int = Path(..., ge=0),
+    y: int = Path(..., ge=0),
+    hour: int = Query(..., ge=0, le=23),
+    lat: float = Query(40.4168, description="Latitud de referencia para la meteo"),
+    lon: float = Query(-3.7038, description="Longitud de referencia para la meteo"),
+    city: Optional[str] = Query(None, description="Ciudad/provincia para filtrar eventos"),
+    if_none_match: Optional[str] = Header(None),
+    engine: Engine = Depends(get_engine),
+    read_engine=Depends(get_read_engine),
+    rules: CategoryMetadata = Depends(get_category_rules),
+):
+    if not tile_in_range(z, x, y):
+        raise HTTPException(status_code=404, detail=f"Tile {z}/{x}/{y} out of range")
+
+    target = datetime.combine(date, time(hour=hour))
+    with span("events"):
+        # Solo los eventos que alcanzan el tile, no toda la ciudad
+        batch = await AsyncEventsRepository(read_engine).event_batch_active_at(
+            target, city=city, metadata=rules, bbox=tile_query_bbox(z, x, y)
+        )
+    with span("weather"):
+        weather = await run_in_threadpool(
+            get_weather_index(engine).observation_at, lat, lon, target.replace(tzinfo=timezone.utc)
+        )
+    with span("scoring"):
+        body = await run_scoring(
+            build_density_tile, batch, target, weather_factor_for(weather), z, x, y, metadata=rules
+        )
+
+    etag = tile_etag(body)
+    headers = {"ETag": etag, "Cache-Control": f"public, max-age={TILE_MAX_AGE_SEC}"}
+    if etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type=TILE_MEDIA_TYPE, headers=headers)
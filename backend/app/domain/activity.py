@@ -0,0 +1,32 @@
+from __future__ import annotations
+
+from datetime import datetime
+from typing import Mapping, NamedTuple, Optional
+
+from .category_metadata import DEFAULT_CATEGORY_METADATA, ActivityRule, category_key
+
+
+class ActivityWindow(NamedTuple):
+    effective_end_dt: datetime
+    activity_start: datetime
+    activity_end: datetime
+
+
+def rule_for(category: Optional[str], rules: Mapping[str, ActivityRule]) -> ActivityRule:
+    """Regla de ``category_rules`` o, si la categoría no tiene, las ventanas del scoring."""
+    rule = rules.get(category_key(category))
+    if rule is not None:
+        return rule
+    return DEFAULT_CATEGORY_METADATA.activity_rule(category)
+
+
+def activity_window(
+    start_dt: datetime,
+    end_dt: Optional[datetime],
+    category: Optional[str],
+    rules: Mapping[str, ActivityRule],
+) -> ActivityWindow:
+    """Fin efectivo (duración por defecto si no hay fin posterior al inicio) y ventana de actividad."""
+    rule = rule_for(category, rules)
+    effective_end = end_dt if end_dt is not None and end_dt > start_dt else start_dt + rule.default_duration
+    return ActivityWindow(effective_end, start_dt - rule.pre_window, effective_end + rule.post_window)
@@ -0,0 +1,207 @@
+from __future__ import annotations
+
+from array import array
+from dataclasses import dataclass
+from datetime import timedelta
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Sequence
+
+# Duraciones estimadas por categoría (horas)
+CATEGORY_DURATION_H = {
+    "concierto": 2.0,
+    "teatro": 2.5,
+    "cine": 2.0,
+    "feria": 6.0,
+    "manifestacion": 3.0,
+    "deporte": 3.0,
+}
+
+# Radios en metros por categoría
+CATEGORY_RADIUS_M = {
+    "concierto": 350.0,
+    "teatro": 250.0,
+    "cine": 200.0,
+    "feria": 500.0,
+    "manifestacion": 400.0,
+    "deporte": 450.0,
+}
+
+# Multiplicador del score por categoría
+CATEGORY_BOOST = {
+    "concierto": 1.2,
+    "teatro": 1.1,
+    "cine": 0.9,
+    "feria": 1.3,
+}
+
+DEFAULT_DURATION_H = 2.0
+DEFAULT_RADIUS_M = 300.0
+PRE_WINDOW = timedelta(minutes=60)
+POST_WINDOW = timedelta(minutes=60)
+DEFAULT_ATTENDANCE = 100
+
+# Código de las categorías sin regla (valores por defecto)
+UNKNOWN_CODE = 0
+
+
+@dataclass(frozen=True)
+class ActivityRule:
+    default_duration: timedelta
+    pre_window: timedelta
+    post_window: timedelta
+
+    @classmethod
+    def from_minutes(cls, default_duration_min: int, pre_event_min: int, post_event_min: int) -> "ActivityRule":
+        return cls(
+            default_duration=timedelta(minutes=default_duration_min),
+            pre_window=timedelta(minutes=pre_event_min),
+            post_window=timedelta(minutes=post_event_min),
+        )
+
+
+def category_key(category: Optional[str]) -> str:
+    return (category or "").strip().lower()
+
+
+class CategoryMetadata:
+    """Reglas por categoría compiladas en arrays paralelos indexados por un código entero.
+
+    Parte de los valores del scoring (``CATEGORY_*``) y los sobreescribe con las filas de
+    ``category_rules`` (duración, ventanas pre/post, llenado y aforo por defecto). El código
+    ``UNKNOWN_CODE`` guarda los valores por defecto. ``version`` cambia con cada compilación
+    para que las cachés derivadas sepan cuándo rehacerse.
+    """
+
+    __slots__ = (
+        "version",
+        "categories",
+        "duration_s",
+        "pre_s",
+        "post_s",
+        "radius_m",
+        "boost",
+        "fill_factor",
+        "fallback_attendance",
+        "_codes",
+        "_activity_rules",
+    )
+
+    def __init__(self, version: int = 0) -> None:
+        self.version = version
+        self.categories: List[str] = [""]
+        self.duration_s = array("d", [DEFAULT_DURATION_H * 3600.0])
+        self.pre_s = array("d", [PRE_WINDOW.total_seconds()])
+        self.post_s = array("d", [POST_WINDOW.total_seconds()])
+        self.radius_m = array("d", [DEFAULT_RADIUS_M])
+        self.boost = array("d", [1.0])
+        # NaN / -1: la categoría no tiene regla de asistencia
+        self.fill_factor = array("d", [float("nan")])
+        self.fallback_attendance = array("l", [-1])
+        self._codes: Dict[str, int] = {}
+        self._activity_rules: Dict[str, ActivityRule] = {}
+
+    @classmethod
+    def compile(cls, rules: Iterable[Mapping[str, Any]] = (), version: int = 0) -> "CategoryMetadata":
+        """Compila filas de ``category_rules`` (dicts con sus columnas) sobre los valores del scoring."""
+        metadata = cls(version)
+        for category, hours in CATEGORY_DURATION_H.items():
+            metadata.duration_s[metadata._code_for(category)] = hours * 3600.0
+        for category, radius in CATEGORY_RADIUS_M.items():
+            metadata.radius_m[metadata._code_for(category)] = radius
+        for category, boost in CATEGORY_BOOST.items():
+            metadata.boost[metadata._code_for(category)] = boost
+        for rule in rules:
+            code = metadata._code_for(rule["category"])
+            if rule.get("default_duration_min") is not None:
+                metadata.duration_s[code] = rule["default_duration_min"] * 60.0
+            if rule.get("pre_event_min") is not None:
+                metadata.pre_s[code] = rule["pre_event_min"] * 60.0
+            if rule.get("post_event_min") is not None:
+                metadata.post_s[code] = rule["post_event_min"] * 60.0
+            if rule.get("fill_factor") is not None:
+                metadata.fill_factor[code] = float(rule["fill_factor"])
+            if rule.get("fallback_attendance") is not None:
+                metadata.fallback_attendance[code] = int(rule["fallback_attendance"])
+        metadata._activity_rules = {
+            category: metadata.activity_rule(category) for category in metadata.categories[1:]
+        }
+        return metadata
+
+    def _code_for(self, category: str) -> int:
+        key = category_key(category)
+        code = self._codes.get(key)
+        if code is None:
+            code = self._codes[key] = len(self.categories)
+            self.categories.append(key)
+            self.duration_s.append(self.duration_s[UNKNOWN_CODE])
+            self.pre_s.append(self.pre_s[UNKNOWN_CODE])
+            self.post_s.append(self.post_s[UNKNOWN_CODE])
+            self.radius_m.append(self.radius_m[UNKNOWN_CODE])
+            self.boost.append(self.boost[UNKNOWN_CODE])
+            self.fill_factor.append(self.fill_factor[UNKNOWN_CODE])
+            self.fallback_attendance.append(self.fallback_attendance[UNKNOWN_CODE])
+        return code
+
+    def __len__(self) -> int:
+        return len(self.categories)
+
+    def code(self, category: Optional[str]) -> int:
+        """Código de la categoría (sin distinguir mayúsculas); ``UNKNOWN_CODE`` si no tiene regla."""
+        if category is None:
+            return UNKNOWN_CODE
+        code = self._codes.get(category)
+        if code is None:
+            code = self._codes.get(category_key(category), UNKNOWN_CODE)
+        return code
+
+    def codes(self, categories: Sequence[Optional[str]]) -> array:
+        """Traduce una lista de categorías (p. ej. ``EventBatch.categories``) a códigos de estas reglas."""
+        return array("H", [self.code(category) for category in categories])
+
+    def duration(self, category: Optional[str]) -> timedelta:
+        return timedelta(seconds=self.duration_s[self.code(category)])
+
+    def radius(self, category: Optional[str]) -> float:
+        return self.radius_m[self.code(category)]
+
+    def category_boost(self, category: Optional[str]) -> float:
+        return self.boost[self.code(category)]
+
+    def activity_rule(self, category: Optional[str]) -> ActivityRule:
+        code = self.code(category)
+        return ActivityRule(
+            timedelta(seconds=self.duration_s[code]),
+            timedelta(seconds=self.pre_s[code]),
+            timedelta(seconds=self.post_s[code]),
+        )
+
+    @property
+    def max_pre_window(self) -> timedelta:
+        """Ventana previa más larga: margen de las consultas que prefiltran eventos activos."""
+        return timedelta(seconds=max(self.pre_s))
+
+    @property
+    def max_post_window(self) -> timedelta:
+        return timedelta(seconds=max(self.post_s))
+
+    @property
+    def max_radius_m(self) -> float:
+        """Radio más grande: margen de las consultas que prefiltran eventos por bbox."""
+        return max(self.radius_m)
+
+    @property
+    def activity_rules(self) -> Dict[str, ActivityRule]:
+        """Reglas de actividad de las categorías conocidas (claves en minúsculas)."""
+        return self._activity_rules
+
+    def expected_attendance(self, category: Optional[str], venue_capacity: Optional[int]) -> int:
+        """Aforo x ``fill_factor`` o ``fallback_attendance`` de la regla; sin regla, el aforo."""
+        code = self.code(category)
+        fallback = self.fallback_attendance[code]
+        if fallback < 0:
+            return max(venue_capacity or DEFAULT_ATTENDANCE, 1)
+        if venue_capacity:
+            return max(int(round(venue_capacity * self.fill_factor[code])), 1)
+        return max(fallback, 1)
+
+
+DEFAULT_CATEGORY_METADATA = CategoryMetadata.compile()
@@ -0,0 +1,88 @@
+from __future__ import annotations
+
+import math
+from array import array
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+
+from .models import Event
+
+# Orden de columnas de las tuplas SQL que consume ``EventBatch.from_tuples``
+BATCH_COLUMNS = ("id", "category", "start_dt", "end_dt", "lat", "lon")
+
+NAN = float("nan")
+
+
+def to_epoch(dt: Optional[datetime]) -> float:
+    """Segundos epoch; las fechas naive se interpretan como UTC (así las guarda SQLite)."""
+    if dt is None:
+        return NAN
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return dt.timestamp()
+
+
+class EventBatch:
+    """Eventos del scoring como arrays paralelos en lugar de un objeto por evento.
+
+    ``end_s`` es NaN si el evento no trae fin (el scoring aplica la duración por categoría) y
+    ``lat``/``lon`` son NaN si no hay coordenadas ni del evento ni del venue.
+    """
+
+    __slots__ = ("ids", "start_s", "end_s", "lat", "lon", "category_codes", "categories")
+
+    def __init__(self) -> None:
+        self.ids: List[Any] = []
+        self.start_s = array("d")
+        self.end_s = array("d")
+        self.lat = array("d")
+        self.lon = array("d")
+        self.category_codes = array("H")
+        self.categories: List[Optional[str]] = []
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    @classmethod
+    def from_tuples(cls, rows: Iterable[Sequence[Any]]) -> "EventBatch":
+        """Construye el batch desde tuplas ``BATCH_COLUMNS`` tal cual salen del cursor."""
+        batch = cls()
+        codes: Dict[Optional[str], int] = {}
+        ids, start_s, end_s = batch.ids, batch.start_s, batch.end_s
+        lats, lons, category_codes = batch.lat, batch.lon, batch.category_codes
+        for event_id, category, start_dt, end_dt, lat, lon in rows:
+            code = codes.get(category)
+            if code is None:
+                code = codes[category] = len(batch.categories)
+                batch.categories.append(category)
+            ids.append(event_id)
+            start_s.append(to_epoch(start_dt))
+            end_s.append(to_epoch(end_dt))
+            lats.append(NAN if lat is None else lat)
+            lons.append(NAN if lon is None else lon)
+            category_codes.append(code)
+        return batch
+
+    @classmethod
+    def from_mappings(cls, rows: Iterable[Dict[str, Any]]) -> "EventBatch":
+        """Filas dict de los repositorios (coordenadas del venue si el evento no las trae)."""
+        return cls.from_tuples(
+            (
+                row["id"],
+                row.get("category"),
+                row.get("start_dt"),
+                row.get("end_dt"),
+                row.get("lat") if row.get("lat") is not None else row.get("venue_lat"),
+                row.get("lon") if row.get("lon") is not None else row.get("venue_lon"),
+            )
+            for row in rows
+        )
+
+    @classmethod
+    def from_events(cls, events: Iterable[Event]) -> "EventBatch":
+        return cls.from_tuples(
+            (event.id, event.category, event.start_dt, event.end_dt, event.lat, event.lon) for event in events
+        )
+
+    def has_coords(self, index: int) -> bool:
+        return not (math.isnan(self.lat[index]) or math.isnan(self.lon[index]))
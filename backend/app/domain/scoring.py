@@ -1,45 +1,34 @@
 from __future__ import annotations
 
+from array import array
 from collections import defaultdict
-from datetime import datetime, timedelta, timezone
-from typing import Iterable, List, Optional
+from datetime import datetime, timezone
+from typing import Iterable, List, Optional, Union
 import math
 
+# Los valores por categoría viven en ``category_metadata``; se reexportan aquí por compatibilidad
+from .category_metadata import (
+    CATEGORY_BOOST,
+    CATEGORY_DURATION_H,
+    CATEGORY_RADIUS_M,
+    DEFAULT_CATEGORY_METADATA,
+    DEFAULT_DURATION_H,
+    DEFAULT_RADIUS_M,
+    POST_WINDOW,
+    PRE_WINDOW,
+    CategoryMetadata,
+)
+from .event_batch import EventBatch, to_epoch
 from .models import Event, HotspotPoint
 
-# Duraciones estimadas por categoría (horas)
-CATEGORY_DURATION_H = {
-    "concierto": 2.0,
-    "teatro": 2.5,
-    "cine": 2.0,
-    "feria": 6.0,
-    "manifestacion": 3.0,
-    "deporte": 3.0,
-}
-
-# Radios en metros por categoría
-CATEGORY_RADIUS_M = {
-    "concierto": 350.0,
-    "teatro": 250.0,
-    "cine": 200.0,
-    "feria": 500.0,
-    "manifestacion": 400.0,
-    "deporte": 450.0,
-}
-
-DEFAULT_DURATION_H = 2.0
-DEFAULT_RADIUS_M = 300.0
-PRE_WINDOW = timedelta(minutes=60)
-POST_WINDOW = timedelta(minutes=60)
 # Aproximadamente 0.001 grados ~= 111 m en latitudes medias; sirve para agrupar eventos cercanos
 CELL_SIZE_DEG = 0.001
 
 
-def estimate_end_dt(event: Event) -> datetime:
+def estimate_end_dt(event: Event, metadata: CategoryMetadata = DEFAULT_CATEGORY_METADATA) -> datetime:
     if event.end_dt:
         return event.end_dt
-    hours = CATEGORY_DURATION_H.get(event.category, DEFAULT_DURATION_H)
-    return event.start_dt + timedelta(hours=hours)
+    return event.start_dt + metadata.duration(event.category)
 
 
 def _to_utc_naive(dt: datetime) -> datetime:
@@ -48,12 +37,13 @@ def _to_utc_naive(dt: datetime) -> datetime:
     return dt.astimezone(timezone.utc).replace(tzinfo=None)
 
 
-def temporal_weight(event: Event, target: datetime) -> float:
+def temporal_weight(event: Event, target: datetime, metadata: CategoryMetadata = DEFAULT_CATEGORY_METADATA) -> float:
     start = _to_utc_naive(event.start_dt)
-    end = _to_utc_naive(estimate_end_dt(event))
+    end = _to_utc_naive(estimate_end_dt(event, metadata))
     target = _to_utc_naive(target)
-    pre_start = start - PRE_WINDOW
-    post_end = end + POST_WINDOW
+    rule = metadata.activity_rule(event.category)
+    pre_start = start - rule.pre_window
+    post_end = end + rule.post_window
 
     if target < pre_start or target > post_end:
         return 0.0
@@ -69,6 +59,41 @@ def temporal_weight(event: Event, target: datetime) -> float:
     return max(0.0, min(1.0, elapsed / total))
 
 
+def batch_temporal_weights(
+    batch: EventBatch, target: datetime, metadata: CategoryMetadata = DEFAULT_CATEGORY_METADATA
+) -> array:
+    """``temporal_weight`` para todo el batch con aritmética sobre epoch (sin datetimes por evento)."""
+    t = to_epoch(target)
+    # Código de categoría del batch -> código de las reglas compiladas
+    rule_codes = metadata.codes(batch.categories)
+    durations, pres, posts = metadata.duration_s, metadata.pre_s, metadata.post_s
+    weights = array("d", bytes(8 * len(batch)))
+    for i, (start, end, code) in enumerate(zip(batch.start_s, batch.end_s, batch.category_codes)):
+        rule = rule_codes[code]
+        pre, post = pres[rule], posts[rule]
+        if end != end:  # NaN: sin fin explícito
+            end = start + durations[rule]
+        if t < start - pre or t > end + post:
+            continue
+        if start <= t <= end:
+            weights[i] = 1.0
+        elif t < start:
+            weights[i] = max(0.0, min(1.0, (t - (start - pre)) / pre))
+        else:
+            weights[i] = max(0.0, min(1.0, (end + post - t) / post))
+    return weights
+
+
+def batch_scores(batch: EventBatch, target: datetime, metadata: CategoryMetadata = DEFAULT_CATEGORY_METADATA) -> array:
+    """``event_score`` de cada evento en su propia posición (peso espacial 1)."""
+    boosts = [metadata.boost[code] for code in metadata.codes(batch.categories)]
+    weights = batch_temporal_weights(batch, target, metadata)
+    for i, code in enumerate(batch.category_codes):
+        if weights[i]:
+            weights[i] *= boosts[code]
+    return weights
+
+
 def _haversine_m(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
     r = 6371000  # Earth radius meters
     phi1, phi2 = math.radians(lat1), math.radians(lat2)
@@ -79,26 +104,29 @@ def _haversine_m(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
     return r * c
 
 
-def spatial_weight(event: Event, lat: float, lon: float) -> float:
-    radius = CATEGORY_RADIUS_M.get(event.category, DEFAULT_RADIUS_M)
+def spatial_weight(
+    event: Event, lat: float, lon: float, metadata: CategoryMetadata = DEFAULT_CATEGORY_METADATA
+) -> float:
+    radius = metadata.radius(event.category)
     distance = _haversine_m(event.lat, event.lon, lat, lon)
     if distance >= radius:
         return 0.0
     return max(0.0, 1.0 - distance / radius)
 
 
-def event_score(event: Event, target: datetime, lat: float, lon: float) -> float:
-    temporal = temporal_weight(event, target)
+def event_score(
+    event: Event,
+    target: datetime,
+    lat: float,
+    lon: float,
+    metadata: CategoryMetadata = DEFAULT_CATEGORY_METADATA,
+) -> float:
+    temporal = temporal_weight(event, target, metadata)
     if temporal == 0:
         return 0.0
-    spatial = spatial_weight(event, lat, lon)
+    spatial = spatial_weight(event, lat, lon, metadata)
     base_weight = 1.0
-    category_boost = {
-        "concierto": 1.2,
-        "teatro": 1.1,
-        "cine": 0.9,
-        "feria": 1.3,
-    }.get(event.category, 1.0)
+    category_boost = metadata.category_boost(event.category)
     return temporal * spatial * base_weight * category_boost
 
 
@@ -132,11 +160,14 @@ def weather_factor(
 
 
 def compute_hotspots(
-    events: Iterable[Event],
+    events: Union[EventBatch, Iterable[Event]],
     target: datetime,
     categories: Optional[Iterable[str]] = None,
     max_points: int = 20,
+    metadata: CategoryMetadata = DEFAULT_CATEGORY_METADATA,
 ) -> List[HotspotPoint]:
+    if isinstance(events, EventBatch):
+        return _compute_batch_hotspots(events, target, categories, max_points, metadata)
     allowed = set(categories) if categories else None
     buckets: dict[tuple[float, float], dict[str, float]] = defaultdict(
         lambda: {"score": 0.0, "lat": 0.0, "lon": 0.0, "count": 0, "radius": DEFAULT_RADIUS_M}
@@ -148,7 +179,7 @@ def compute_hotspots(
     for event in events:
         if allowed and event.category not in allowed:
             continue
-        score = event_score(event, target, event.lat, event.lon)
+        score = event_score(event, target, event.lat, event.lon, metadata)
         if score <= 0:
             continue
         key = (quantize(event.lat), quantize(event.lon))
@@ -157,7 +188,7 @@ def compute_hotspots(
         bucket["lat"] += event.lat
         bucket["lon"] += event.lon
         bucket["count"] += 1
-        bucket["radius"] = max(bucket["radius"], CATEGORY_RADIUS_M.get(event.category, DEFAULT_RADIUS_M))
+        bucket["radius"] = max(bucket["radius"], metadata.radius(event.category))
 
     hotspots: List[HotspotPoint] = []
     for key, data in buckets.items():
@@ -173,3 +204,39 @@ def compute_hotspots(
 
     hotspots.sort(key=lambda h: h.score, reverse=True)
     return hotspots[:max_points]
+
+
+def _compute_batch_hotspots(
+    batch: EventBatch,
+    target: datetime,
+    categories: Optional[Iterable[str]],
+    max_points: int,
+    metadata: CategoryMetadata,
+) -> List[HotspotPoint]:
+    allowed = set(categories) if categories else None
+    skip = [bool(allowed) and category not in allowed for category in batch.categories]
+    radii = [metadata.radius_m[code] for code in metadata.codes(batch.categories)]
+    scores = batch_scores(batch, target, metadata)
+    # Mismo agrupado que la versión por objetos: [score, lat, lon, count, radius]
+    buckets: dict[tuple[float, float], list] = {}
+    for i, score in enumerate(scores):
+        code = batch.category_codes[i]
+        if score <= 0 or skip[code] or not batch.has_coords(i):
+            continue
+        lat, lon = batch.lat[i], batch.lon[i]
+        key = (int(lat / CELL_SIZE_DEG) * CELL_SIZE_DEG, int(lon / CELL_SIZE_DEG) * CELL_SIZE_DEG)
+        bucket = buckets.get(key)
+        if bucket is None:
+            bucket = buckets[key] = [0.0, 0.0, 0.0, 0, DEFAULT_RADIUS_M]
+        bucket[0] += score
+        bucket[1] += lat
+        bucket[2] += lon
+        bucket[3] += 1
+        bucket[4] = max(bucket[4], radii[code])
+
+    hotspots = [
+        HotspotPoint(lat=lat / count, lon=lon / count, score=round(score, 4), radius_m=radius)
+        for score, lat, lon, count, radius in buckets.values()
+    ]
+    hotspots.sort(key=lambda h: h.score, reverse=True)
+    return hotspots[:max_points]
@@ -1,7 +1,7 @@
 import os
 from functools import lru_cache
 
-from sqlalchemy import create_engine
+from app.infra.db.engines import create_db_engine
 
 
 @lru_cache(maxsize=1)
@@ -9,4 +9,4 @@ def get_engine():
     database_url = os.getenv("DATABASE_URL")
     if not database_url:
         raise RuntimeError("DATABASE_URL environment variable is not set")
-    return create_engine(database_url, future=True)
+    return create_db_engine(database_url)
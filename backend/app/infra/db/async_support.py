@@ -0,0 +1,43 @@
+from __future__ import annotations
+
+from typing import Any, Dict, List, Optional, Sequence, Union
+
+from anyio import to_thread
+from sqlalchemy.engine import Engine
+from sqlalchemy.ext.asyncio import AsyncEngine
+from sqlalchemy.sql import Executable
+
+
+async def fetch_all(
+    engine: Union[AsyncEngine, Engine], stmt: Executable, params: Optional[Dict[str, Any]] = None
+) -> List[Dict[str, Any]]:
+    """``params``: valores de los ``bindparam`` de sentencias cacheadas a nivel de módulo."""
+    if isinstance(engine, AsyncEngine):
+        async with engine.connect() as conn:
+            result = await conn.execute(stmt, params)
+            return [dict(row) for row in result.mappings().all()]
+    return await to_thread.run_sync(_fetch_all_sync, engine, stmt, params)
+
+
+async def fetch_tuples(engine: Union[AsyncEngine, Engine], stmt: Executable) -> List[Sequence[Any]]:
+    """Filas como tuplas, sin pasar por ``mappings()`` (consumidores columnares como ``EventBatch``)."""
+    if isinstance(engine, AsyncEngine):
+        async with engine.connect() as conn:
+            result = await conn.execute(stmt)
+            return result.all()
+    return await to_thread.run_sync(_fetch_tuples_sync, engine, stmt)
+
+
+async def fetch_first(engine: Union[AsyncEngine, Engine], stmt: Executable) -> Optional[Dict[str, Any]]:
+    rows = await fetch_all(engine, stmt)
+    return rows[0] if rows else None
+
+
+def _fetch_all_sync(engine: Engine, stmt: Executable, params: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+    with engine.begin() as conn:
+        return [dict(row) for row in conn.execute(stmt, params).mappings().all()]
+
+
+def _fetch_tuples_sync(engine: Engine, stmt: Executable) -> List[Sequence[Any]]:
+    with engine.begin() as conn:
+        return conn.execute(stmt).all()
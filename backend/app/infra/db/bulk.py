@@ -0,0 +1,208 @@
+from __future__ import annotations
+
+import csv
+import io
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from sqlalchemy import Table, case, or_, select, tuple_
+from sqlalchemy.engine import Connection
+
+DEFAULT_CHUNK_SIZE = 1000
+# SQLite >= 3.32 acepta 32766 parámetros por sentencia y Postgres 65535; dejamos margen
+MAX_BIND_PARAMS = 30000
+
+
+def chunked(items: Sequence[Any], size: int) -> Iterator[Sequence[Any]]:
+    if size <= 0:
+        raise ValueError("chunk size must be > 0")
+    for offset in range(0, len(items), size):
+        yield items[offset : offset + size]
+
+
+def effective_chunk_size(chunk_size: int, columns_per_row: int) -> int:
+    return max(1, min(chunk_size, MAX_BIND_PARAMS // max(columns_per_row, 1)))
+
+
+def dialect_insert(conn: Connection, table: Table):
+    dialect = conn.dialect.name
+    if dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert as pg_insert
+
+        return pg_insert(table)
+    if dialect == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+        return sqlite_insert(table)
+    raise NotImplementedError(f"bulk upsert not supported for dialect '{dialect}'")
+
+
+def normalize_key(conn: Connection, key: Sequence[Any]) -> Tuple[Any, ...]:
+    # SQLite guarda los DateTime sin offset (hora de pared); Postgres devuelve timestamptz
+    sqlite = conn.dialect.name == "sqlite"
+    normalized = []
+    for value in key:
+        if isinstance(value, datetime) and value.tzinfo is not None:
+            value = value.replace(tzinfo=None) if sqlite else value.astimezone(timezone.utc)
+        normalized.append(value)
+    return tuple(normalized)
+
+
+def fetch_existing(
+    conn: Connection,
+    table: Table,
+    key_columns: Sequence[str],
+    keys: Iterable[Tuple[Any, ...]],
+    columns: Sequence[str] = ("id",),
+) -> Dict[Tuple[Any, ...], Any]:
+    """Devuelve ``{clave normalizada: fila}`` para las claves que ya existen, con un IN por bloque."""
+    key_list = list(keys)
+    if not key_list:
+        return {}
+    cols = [table.c[name] for name in key_columns]
+    extra = [table.c[name] for name in columns]
+    found: Dict[Tuple[Any, ...], Any] = {}
+    for chunk in chunked(key_list, effective_chunk_size(DEFAULT_CHUNK_SIZE, len(cols))):
+        if len(cols) == 1:
+            clause = cols[0].in_([key[0] for key in chunk])
+        else:
+            clause = tuple_(*cols).in_(chunk)
+        for row in conn.execute(select(*cols, *extra).where(clause)):
+            found[normalize_key(conn, row[: len(cols)])] = row[len(cols) :]
+    return found
+
+
+def touch_if_changed(table: Table, column: str, compared: Dict[str, Any], touched: Any):
+    """``CASE`` que solo renueva ``column`` (p. ej. ``updated_at``) si alguna columna de ``compared`` cambia."""
+    changed = or_(*(table.c[col].is_distinct_from(value) for col, value in compared.items()))
+    return case((changed, touched), else_=table.c[column])
+
+
+def upsert_rows(
+    conn: Connection,
+    table: Table,
+    rows: List[Dict[str, Any]],
+    *,
+    conflict_columns: Sequence[str],
+    update_columns: Sequence[str],
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    touch_columns: Sequence[str] = (),
+    compare_columns: Optional[Sequence[str]] = None,
+) -> int:
+    """Multi-row ``INSERT ... ON CONFLICT DO UPDATE`` en bloques.
+
+    Todas las filas deben tener las mismas claves. Si un bloque repite la clave
+    natural se conserva la última aparición, igual que haría un upsert fila a fila.
+    Las ``touch_columns`` (marcas de cambio) solo se actualizan si cambia alguna de
+    ``compare_columns`` (por defecto, el resto de ``update_columns``): reescribir la misma
+    fila no la marca como modificada.
+    """
+    if not rows:
+        return 0
+    deduped: Dict[Tuple[Any, ...], Dict[str, Any]] = {}
+    for row in rows:
+        deduped[tuple(row[col] for col in conflict_columns)] = row
+    payload = list(deduped.values())
+    size = effective_chunk_size(chunk_size, len(payload[0]))
+    written = 0
+    stmt = dialect_insert(conn, table)
+    if update_columns:
+        values = {col: stmt.excluded[col] for col in update_columns}
+        compared = {col: values[col] for col in _compared(update_columns, touch_columns, compare_columns)}
+        for col in touch_columns:
+            values[col] = touch_if_changed(table, col, compared, stmt.excluded[col])
+        stmt = stmt.on_conflict_do_update(index_elements=list(conflict_columns), set_=values)
+    else:
+        stmt = stmt.on_conflict_do_nothing(index_elements=list(conflict_columns))
+    # executemany: la sentencia se compila una vez y psycopg2 la agrupa en VALUES multi-fila
+    for chunk in chunked(payload, size):
+        conn.execute(stmt, list(chunk))
+        written += len(chunk)
+    return written
+
+
+COPY_NULL = "\\N"
+
+
+def copy_upsert_rows(
+    conn: Connection,
+    table: Table,
+    rows: List[Dict[str, Any]],
+    *,
+    conflict_columns: Sequence[str],
+    update_columns: Sequence[str],
+    touch_columns: Sequence[str] = (),
+    compare_columns: Optional[Sequence[str]] = None,
+) -> int:
+    """Postgres: ``COPY`` a una tabla temporal de staging y merge con ``INSERT ... SELECT ON CONFLICT``.
+
+    Mucho más rápido que los VALUES multi-fila para bloques grandes. Comparte la
+    transacción de ``conn``; la tabla de staging se vacía en cada bloque y se
+    elimina al hacer commit.
+    """
+    if conn.dialect.name != "postgresql":
+        raise NotImplementedError("COPY upsert requires postgresql")
+    if not rows:
+        return 0
+    deduped: Dict[Tuple[Any, ...], Dict[str, Any]] = {}
+    for row in rows:
+        deduped[tuple(row[col] for col in conflict_columns)] = row
+    quote = conn.dialect.identifier_preparer.quote
+    columns = list(rows[0])
+    column_list = ", ".join(quote(col) for col in columns)
+    staging = quote(f"_staging_{table.name}")
+    conn.exec_driver_sql(
+        f"CREATE TEMP TABLE IF NOT EXISTS {staging} ON COMMIT DROP AS "
+        f"SELECT {column_list} FROM {quote(table.name)} WITH NO DATA"
+    )
+    conn.exec_driver_sql(f"TRUNCATE {staging}")
+
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for row in deduped.values():
+        writer.writerow([COPY_NULL if row[col] is None else _copy_value(row[col]) for col in columns])
+    buffer.seek(0)
+    cursor = conn.connection.dbapi_connection.cursor()
+    try:
+        cursor.copy_expert(
+            f"COPY {staging} ({column_list}) FROM STDIN WITH (FORMAT csv, NULL '{COPY_NULL}')",
+            buffer,
+        )
+    finally:
+        cursor.close()
+
+    conflict = ", ".join(quote(col) for col in conflict_columns)
+    if update_columns:
+        target = quote(table.name)
+        changed = " OR ".join(
+            f"{target}.{quote(col)} IS DISTINCT FROM EXCLUDED.{quote(col)}"
+            for col in _compared(update_columns, touch_columns, compare_columns)
+        )
+        assignments = [
+            f"{quote(col)} = CASE WHEN {changed} THEN EXCLUDED.{quote(col)} ELSE {target}.{quote(col)} END"
+            if col in touch_columns
+            else f"{quote(col)} = EXCLUDED.{quote(col)}"
+            for col in update_columns
+        ]
+        action = "DO UPDATE SET " + ", ".join(assignments)
+    else:
+        action = "DO NOTHING"
+    conn.exec_driver_sql(
+        f"INSERT INTO {quote(table.name)} ({column_list}) "
+        f"SELECT {column_list} FROM {staging} ON CONFLICT ({conflict}) {action}"
+    )
+    return len(deduped)
+
+
+def _compared(
+    update_columns: Sequence[str], touch_columns: Sequence[str], compare_columns: Optional[Sequence[str]]
+) -> List[str]:
+    if compare_columns is not None:
+        return list(compare_columns)
+    return [col for col in update_columns if col not in touch_columns]
+
+
+def _copy_value(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
@@ -1,12 +1,180 @@
 from __future__ import annotations
 
+import os
 from datetime import datetime, timezone
-from typing import Any, Dict
+from threading import Lock
+from time import monotonic
+from typing import Any, Dict, Iterable, Optional, Tuple
+from weakref import WeakKeyDictionary
 
-from sqlalchemy import insert, select, update
-from sqlalchemy.engine import Engine
+from sqlalchemy import bindparam, func, insert, inspect, select, update
+from sqlalchemy.engine import Connection, Engine
 
-from .tables import category_rules_table
+from app.domain.activity import ActivityRule, activity_window
+from app.domain.category_metadata import CategoryMetadata, category_key
+from app.infra.metrics import record_cache
+
+from .bulk import fetch_existing, upsert_rows
+from .tables import category_rules_table, events_table
+
+# Cada cuánto se comprueba si otro proceso cambió category_rules (las escrituras propias invalidan al momento)
+CATEGORY_CACHE_TTL_SEC = float(os.getenv("CATEGORY_CACHE_TTL_SEC", "300"))
+
+RULE_COLUMNS = [
+    "category",
+    "fill_factor",
+    "fallback_attendance",
+    "default_duration_min",
+    "pre_event_min",
+    "post_event_min",
+]
+# Columnas de las que dependen las ventanas de actividad persistidas en ``events``
+WINDOW_RULE_COLUMNS = ("default_duration_min", "pre_event_min", "post_event_min")
+RECOMPUTE_CHUNK_SIZE = 1000
+
+
+def load_activity_rules(conn: Connection) -> Dict[str, ActivityRule]:
+    """Duración por defecto y ventanas pre/post por categoría (en minúsculas)."""
+    rows = conn.execute(
+        select(
+            category_rules_table.c.category,
+            category_rules_table.c.default_duration_min,
+            category_rules_table.c.pre_event_min,
+            category_rules_table.c.post_event_min,
+        )
+    ).all()
+    return {
+        category.strip().lower(): ActivityRule.from_minutes(duration, pre, post)
+        for category, duration, pre, post in rows
+    }
+
+
+def recompute_activity_windows(conn: Connection, categories: Iterable[str]) -> int:
+    """Recalcula ``effective_end_dt``/``activity_start``/``activity_end`` de los eventos de ``categories``.
+
+    Usa las reglas visibles en ``conn``: llamada tras escribir ``category_rules`` en la misma
+    transacción, las ventanas persistidas nunca quedan con las reglas anteriores.
+    Devuelve el número de eventos actualizados.
+    """
+    keys = sorted({category_key(category) for category in categories})
+    if not keys:
+        return 0
+    # Bases aún sin migrar: las ventanas las rellena después ``add_event_activity_windows``
+    inspector = inspect(conn)
+    if not inspector.has_table("events") or "activity_start" not in {
+        column["name"] for column in inspector.get_columns("events")
+    }:
+        return 0
+    rules = load_activity_rules(conn)
+    stmt = update(events_table).where(events_table.c.id == bindparam("_id"))
+    updated = 0
+    last_id = 0
+    while True:
+        rows = conn.execute(
+            select(events_table.c.id, events_table.c.category, events_table.c.start_dt, events_table.c.end_dt)
+            .where(func.lower(func.trim(events_table.c.category)).in_(keys), events_table.c.id > last_id)
+            .order_by(events_table.c.id)
+            .limit(RECOMPUTE_CHUNK_SIZE)
+        ).all()
+        if not rows:
+            return updated
+        conn.execute(
+            stmt,
+            [
+                {"_id": event_id, **activity_window(start_dt, end_dt, category, rules)._asdict()}
+                for event_id, category, start_dt, end_dt in rows
+            ],
+        )
+        updated += len(rows)
+        last_id = rows[-1][0]
+
+
+def load_category_metadata(conn: Connection, version: int = 0) -> CategoryMetadata:
+    rows = conn.execute(select(category_rules_table)).mappings().all()
+    return CategoryMetadata.compile(rows, version)
+
+
+class CategoryMetadataCache:
+    """``CategoryMetadata`` compilada una vez por motor y reutilizada hasta que cambian las reglas.
+
+    Las escrituras de ``CategoryRulesRepository`` invalidan la caché; los cambios hechos por
+    otros procesos se detectan comparando (filas, ``max(updated_at)``) cada
+    ``revalidate_after_sec``. Cada recompilación sube ``version``.
+    """
+
+    def __init__(self, engine: Engine, *, revalidate_after_sec: float = CATEGORY_CACHE_TTL_SEC):
+        if engine is None:
+            raise ValueError("engine is required")
+        self.engine = engine
+        self.revalidate_after_sec = revalidate_after_sec
+        self.version = 0
+        self._metadata: Optional[CategoryMetadata] = None
+        self._signature: Optional[Tuple[Any, ...]] = None
+        self._checked_at = monotonic()
+        self._lock = Lock()
+
+    def get(self, conn: Optional[Connection] = None) -> CategoryMetadata:
+        """Reglas compiladas; ``conn`` permite recargar dentro de la transacción del llamador."""
+        metadata = self.fresh()
+        if metadata is not None:
+            return metadata
+        with self._lock:
+            if conn is None:
+                with self.engine.begin() as active:
+                    return self._refresh(active)
+            return self._refresh(conn)
+
+    def fresh(self) -> Optional[CategoryMetadata]:
+        """Reglas compiladas si no toca revalidarlas (sin ir a la BD); ``None`` en otro caso."""
+        metadata = self._metadata
+        if metadata is not None and monotonic() - self._checked_at < self.revalidate_after_sec:
+            record_cache("category_metadata", True)
+            return metadata
+        return None
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._metadata = None
+            self._signature = None
+
+    def _refresh(self, conn: Connection) -> CategoryMetadata:
+        signature = tuple(
+            conn.execute(select(func.count(), func.max(category_rules_table.c.updated_at))).one()
+        )
+        hit = self._metadata is not None and signature == self._signature
+        if not hit:
+            self.version += 1
+            self._metadata = load_category_metadata(conn, self.version)
+            self._signature = signature
+        self._checked_at = monotonic()
+        record_cache("category_metadata", hit)
+        return self._metadata
+
+
+_CACHES: "WeakKeyDictionary[Engine, CategoryMetadataCache]" = WeakKeyDictionary()
+_CACHES_LOCK = Lock()
+
+
+def get_category_cache(engine: Engine) -> CategoryMetadataCache:
+    cache = _CACHES.get(engine)
+    if cache is not None:
+        return cache
+    with _CACHES_LOCK:
+        cache = _CACHES.get(engine)
+        if cache is None:
+            cache = CategoryMetadataCache(engine)
+            _CACHES[engine] = cache
+        return cache
+
+
+def get_category_metadata(engine: Engine, conn: Optional[Connection] = None) -> CategoryMetadata:
+    return get_category_cache(engine).get(conn)
+
+
+def invalidate_category_metadata(engine: Engine) -> None:
+    cache = _CACHES.get(engine)
+    if cache is not None:
+        cache.invalidate()
 
 
 class CategoryRulesRepository:
@@ -34,6 +202,46 @@ class CategoryRulesRepository:
                 conn.execute(
                     insert(category_rules_table).values(**payload)
                 )
+            recompute_activity_windows(conn, [category])
+        invalidate_category_metadata(self.engine)
+
+    def upsert_many(self, rules: Iterable[Dict[str, Any]], *, conn: Optional[Connection] = None) -> Dict[str, int]:
+        now = datetime.now(timezone.utc)
+        rows = [{**{col: rule.get(col) for col in RULE_COLUMNS}, "updated_at": now} for rule in rules]
+        if not rows:
+            return {"inserted": 0, "updated": 0}
+        if conn is None:
+            with self.engine.begin() as active:
+                stats = self.upsert_many(rows, conn=active)
+            invalidate_category_metadata(self.engine)
+            return stats
+        categories = {(row["category"],) for row in rows}
+        existing = fetch_existing(conn, category_rules_table, ("category",), categories, columns=WINDOW_RULE_COLUMNS)
+        upsert_rows(
+            conn,
+            category_rules_table,
+            rows,
+            conflict_columns=("category",),
+            update_columns=[*RULE_COLUMNS[1:], "updated_at"],
+            # Reimportar las mismas reglas no las marca como cambiadas (jobs incrementales, tiles)
+            touch_columns=("updated_at",),
+        )
+        # Solo las categorías nuevas o con duración/ventanas distintas cambian las ventanas de sus eventos
+        changed = [
+            row["category"]
+            for row in rows
+            if tuple(existing.get((row["category"],), ())) != tuple(row[col] for col in WINDOW_RULE_COLUMNS)
+        ]
+        recompute_activity_windows(conn, changed)
+        invalidate_category_metadata(self.engine)
+        inserted = len(categories) - len(existing)
+        return {"inserted": inserted, "updated": len(rows) - inserted}
+
+    def changed_since(self, since: datetime) -> bool:
+        """Si alguna regla se escribió después de ``since`` (p. ej. la marca de un job incremental)."""
+        with self.engine.begin() as conn:
+            stmt = select(category_rules_table.c.category).where(category_rules_table.c.updated_at > since).limit(1)
+            return conn.execute(stmt).first() is not None
 
     def get_rules_map(self) -> Dict[str, Dict[str, Any]]:
         with self.engine.begin() as conn:
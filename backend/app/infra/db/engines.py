@@ -0,0 +1,75 @@
+from __future__ import annotations
+
+import os
+from typing import Any, Dict, Optional, Union
+
+from sqlalchemy import create_engine
+from sqlalchemy.engine import URL, Engine, make_url
+from sqlalchemy.exc import ArgumentError
+from sqlalchemy.pool import NullPool
+
+# Ajustes del pool para Postgres; SQLite usa el pool por defecto de SQLAlchemy
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_TIMEOUT_SEC = float(os.getenv("DB_POOL_TIMEOUT_SEC", "30"))
+DB_POOL_RECYCLE_SEC = int(os.getenv("DB_POOL_RECYCLE_SEC", "1800"))
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "1") != "0"
+
+ASYNC_DRIVERS = {
+    "postgresql": "postgresql+asyncpg",
+    "sqlite": "sqlite+aiosqlite",
+}
+
+
+def pool_options(url: Union[str, URL]) -> Dict[str, Any]:
+    if make_url(url).get_backend_name() == "sqlite":
+        return {}
+    return {
+        "pool_size": DB_POOL_SIZE,
+        "max_overflow": DB_MAX_OVERFLOW,
+        "pool_timeout": DB_POOL_TIMEOUT_SEC,
+        "pool_recycle": DB_POOL_RECYCLE_SEC,
+        "pool_pre_ping": DB_POOL_PRE_PING,
+    }
+
+
+def create_db_engine(url: Union[str, URL], **kwargs: Any) -> Engine:
+    return create_engine(url, future=True, **{**pool_options(url), **kwargs})
+
+
+def to_async_url(url: Union[str, URL]) -> URL:
+    parsed = make_url(url)
+    backend = parsed.get_backend_name()
+    driver = ASYNC_DRIVERS.get(backend)
+    if driver is None:
+        raise ValueError(f"no async driver configured for '{backend}'")
+    query = dict(parsed.query)
+    # sslmode es una opción de psycopg2; asyncpg usa ssl
+    if backend == "postgresql" and "sslmode" in query:
+        query["ssl"] = query.pop("sslmode")
+    return parsed.set(drivername=driver, query=query)
+
+
+def create_async_db_engine(url: Union[str, URL], **kwargs: Any):
+    from sqlalchemy.ext.asyncio import create_async_engine
+
+    async_url = to_async_url(url)
+    options = pool_options(async_url)
+    if async_url.get_backend_name() == "sqlite":
+        # aiosqlite ata cada conexión a su event loop; sin pool no se comparten entre loops
+        options = {"poolclass": NullPool}
+    return create_async_engine(async_url, **{**options, **kwargs})
+
+
+def try_create_async_engine(engine: Optional[Engine]):
+    """Motor async equivalente a ``engine`` o ``None`` si falta el driver o está desactivado."""
+    if engine is None or os.getenv("API_ASYNC_DB", "1") == "0":
+        return None
+    url = engine.url
+    if url.get_backend_name() == "sqlite" and url.database in (None, "", ":memory:"):
+        return None
+    try:
+        return create_async_db_engine(url)
+    except (ImportError, ValueError, ArgumentError) as exc:
+        print(f"[api] WARNING: async database engine unavailable ({exc}); using the sync engine in threads")
+        return None
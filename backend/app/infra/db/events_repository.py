@@ -1,13 +1,22 @@
 from __future__ import annotations
 
+import os
 from datetime import date, datetime, time, timedelta, timezone
-from typing import Any, Dict, List, Optional
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple, Union
 
-from sqlalchemy import and_, insert, or_, select, update, func
-from sqlalchemy.engine import Engine
+from sqlalchemy import Integer, and_, bindparam, exists, func, insert, or_, select, union, union_all, update
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.ext.asyncio import AsyncEngine
 
-from .tables import events_table, venues_table
-from .venues_repository import VenuesRepository
+from app.domain.activity import ActivityRule, activity_window
+from app.domain.event_batch import EventBatch
+from app.domain.category_metadata import DEFAULT_CATEGORY_METADATA, CategoryMetadata
+
+from .async_support import fetch_all, fetch_tuples
+from .bulk import DEFAULT_CHUNK_SIZE, copy_upsert_rows, fetch_existing, normalize_key, touch_if_changed, upsert_rows
+from .category_rules_repository import get_category_metadata
+from .tables import event_start_changes_table, events_table, venues_table
+from .venues_repository import VenuesRepository, venue_key
 
 
 EVENT_COLUMNS = [
@@ -28,6 +37,381 @@ EVENT_COLUMNS = [
     "popularity_score",
     "is_active",
 ]
+EVENT_KEY_COLUMNS = ("source", "external_id")
+# Columnas que trae ``fetch_existing_events``: el inicio guardado detecta las reprogramaciones
+EVENT_EXISTING_COLUMNS = ("id", "start_dt")
+# Cursor de paginación de /api/events: (start_dt, id) del último evento servido
+EventCursor = Tuple[datetime, int]
+# (sur, oeste, norte, este) en grados: recorte espacial de las consultas de tiles y raster
+BBox = Tuple[float, float, float, float]
+# Duración máxima esperada de un evento: acota hacia atrás el escaneo por start_dt de las consultas de actividad
+EVENT_MAX_DURATION = timedelta(hours=float(os.getenv("EVENT_MAX_DURATION_H", "24")))
+ACTIVITY_COLUMNS = ("effective_end_dt", "activity_start", "activity_end")
+EVENT_UPDATE_COLUMNS = [col for col in EVENT_COLUMNS if col not in EVENT_KEY_COLUMNS] + [
+    *ACTIVITY_COLUMNS,
+    "updated_at",
+    "last_synced_at",
+]
+# updated_at solo avanza si cambia el contenido del evento; last_synced_at avanza en cada sincronización
+EVENT_TOUCH_COLUMNS = ("updated_at",)
+EVENT_CONTENT_COLUMNS = [col for col in EVENT_UPDATE_COLUMNS if col not in ("updated_at", "last_synced_at")]
+
+
+# Callbacks (engine, filas) tras escribir eventos; mantienen al día los índices en memoria
+_write_listeners: List[Callable[[Engine, List[Dict[str, Any]]], None]] = []
+
+
+def add_write_listener(listener: Callable[[Engine, List[Dict[str, Any]]], None]) -> None:
+    if listener not in _write_listeners:
+        _write_listeners.append(listener)
+
+
+def notify_written(engine: Engine, rows: List[Dict[str, Any]]) -> None:
+    if not rows:
+        return
+    for listener in list(_write_listeners):
+        listener(engine, rows)
+
+
+def apply_activity_windows(
+    conn: Connection, rows: Iterable[Dict[str, Any]], rules: Optional[Dict[str, ActivityRule]] = None
+) -> None:
+    """Rellena ``ACTIVITY_COLUMNS`` de cada fila con las reglas de ``category_rules``."""
+    if rules is None:
+        rules = get_category_metadata(conn.engine, conn).activity_rules
+    for row in rows:
+        row.update(activity_window(row["start_dt"], row.get("end_dt"), row.get("category"), rules)._asdict())
+
+
+def fetch_existing_events(conn: Connection, keys: Iterable[Tuple[Any, ...]]) -> Dict[Tuple[Any, ...], Any]:
+    """``fetch_existing`` de eventos con ``EVENT_EXISTING_COLUMNS`` (id e inicio guardado)."""
+    return fetch_existing(conn, events_table, EVENT_KEY_COLUMNS, keys, columns=EVENT_EXISTING_COLUMNS)
+
+
+def _start_key(conn: Connection, value: datetime) -> datetime:
+    # Misma normalización que las claves; en Postgres un inicio sin offset se toma como UTC
+    value = normalize_key(conn, (value,))[0]
+    return value.astimezone(timezone.utc).replace(tzinfo=None) if value.tzinfo else value
+
+
+def log_start_changes(
+    conn: Connection,
+    rows: Iterable[Dict[str, Any]],
+    existing: Dict[Tuple[Any, ...], Any],
+    now: Optional[datetime] = None,
+) -> int:
+    """Registra en ``event_start_changes`` el inicio anterior de los eventos que cambian de ``start_dt``.
+
+    ``existing`` es el resultado de ``fetch_existing_events`` antes de escribir.
+    """
+    now = now or datetime.now(timezone.utc)
+    changes = []
+    for row in rows:
+        found = existing.get(normalize_key(conn, tuple(row[col] for col in EVENT_KEY_COLUMNS)))
+        if found is None:
+            continue
+        old_start = found[EVENT_EXISTING_COLUMNS.index("start_dt")]
+        if _start_key(conn, old_start) == _start_key(conn, row["start_dt"]):
+            continue
+        changes.append(
+            {
+                "source": row["source"],
+                "external_id": row["external_id"],
+                "old_start_dt": old_start,
+                "new_start_dt": row["start_dt"],
+                "changed_at": now,
+            }
+        )
+    if changes:
+        conn.execute(insert(event_start_changes_table), changes)
+    return len(changes)
+
+
+def bulk_upsert_events(
+    conn: Connection,
+    rows: List[Dict[str, Any]],
+    *,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    use_copy: bool = False,
+    existing: Optional[Dict[Tuple[Any, ...], Any]] = None,
+) -> Dict[str, int]:
+    """Upsert en bloque por (source, external_id) dentro de la transacción ``conn``.
+
+    Una consulta IN por bloque decide insert/update para las estadísticas; las
+    claves repetidas cuentan como actualización, igual que en el upsert fila a fila.
+    Con ``use_copy`` en Postgres se escribe con COPY + merge en lugar de INSERT.
+    ``existing`` reutiliza un ``fetch_existing_events`` ya hecho por el llamador; los
+    cambios de ``start_dt`` quedan en ``event_start_changes``.
+    """
+    if not rows:
+        return {"inserted": 0, "updated": 0}
+    apply_activity_windows(conn, rows)
+    keys = {tuple(row[col] for col in EVENT_KEY_COLUMNS) for row in rows}
+    if existing is None:
+        existing = fetch_existing_events(conn, keys)
+    else:
+        existing = {key: value for key, value in existing.items() if key in keys}
+    log_start_changes(conn, rows, existing)
+    if use_copy and conn.dialect.name == "postgresql":
+        copy_upsert_rows(
+            conn,
+            events_table,
+            rows,
+            conflict_columns=EVENT_KEY_COLUMNS,
+            update_columns=EVENT_UPDATE_COLUMNS,
+            touch_columns=EVENT_TOUCH_COLUMNS,
+            compare_columns=EVENT_CONTENT_COLUMNS,
+        )
+    else:
+        upsert_rows(
+            conn,
+            events_table,
+            rows,
+            conflict_columns=EVENT_KEY_COLUMNS,
+            update_columns=EVENT_UPDATE_COLUMNS,
+            chunk_size=chunk_size,
+            touch_columns=EVENT_TOUCH_COLUMNS,
+            compare_columns=EVENT_CONTENT_COLUMNS,
+        )
+    notify_written(conn.engine, rows)
+    inserted = len(keys) - len(existing)
+    return {"inserted": inserted, "updated": len(rows) - inserted}
+
+
+def _day_bounds(day: date, tzinfo=timezone.utc):
+    start_local = datetime.combine(day, time.min, tzinfo=tzinfo)
+    end_local = start_local + timedelta(days=1)
+    return start_local.astimezone(timezone.utc), end_local.astimezone(timezone.utc)
+
+
+def _events_join():
+    return events_table.outerjoin(venues_table, events_table.c.venue_id == venues_table.c.id)
+
+
+def _day_filters(day: date, city: Optional[str], tzinfo) -> list:
+    start, end = _day_bounds(day, tzinfo)
+    return _with_city([(events_table.c.start_dt >= start), (events_table.c.start_dt < end)], city)
+
+
+def active_at_filter(target: datetime, metadata: CategoryMetadata = DEFAULT_CATEGORY_METADATA):
+    """Eventos que puntúan en ``target``: ``activity_start <= target <= activity_end``.
+
+    Es la misma ventana que usa el scoring, calculada en la ingesta con ``category_rules``.
+    La cota inferior de ``activity_start`` (``EVENT_MAX_DURATION`` más las ventanas pre/post
+    más largas) limita el escaneo de ``idx_events_activity_window``. Las filas anteriores a la
+    migración (sin ``activity_start``) se filtran por ``start_dt``/fin con esas ventanas. Las
+    ventanas salen de ``metadata``: las rutas pasan las reglas compiladas de la petición.
+    """
+    pre_window, post_window = metadata.max_pre_window, metadata.max_post_window
+    if target.tzinfo is None:
+        target = target.replace(tzinfo=timezone.utc)
+    target = target.astimezone(timezone.utc)
+    earliest_end = target - post_window
+    persisted = and_(
+        events_table.c.activity_start >= target - pre_window - EVENT_MAX_DURATION - post_window,
+        events_table.c.activity_start <= target,
+        events_table.c.activity_end >= target,
+    )
+    legacy = and_(
+        events_table.c.activity_start.is_(None),
+        events_table.c.start_dt >= earliest_end - EVENT_MAX_DURATION,
+        events_table.c.start_dt <= target + pre_window,
+        func.coalesce(events_table.c.effective_end_dt, events_table.c.end_dt) >= earliest_end,
+    )
+    return or_(persisted, legacy)
+
+
+def _active_filters(target: datetime, city: Optional[str], metadata: CategoryMetadata) -> list:
+    return _with_city([active_at_filter(target, metadata)], city)
+
+
+def _with_city(filters: list, city: Optional[str]) -> list:
+    if city:
+        filters.append(func.lower(venues_table.c.city) == city.lower())
+    return filters
+
+
+def _with_bbox(filters: list, bbox: Optional[BBox]) -> list:
+    if bbox is not None:
+        south, west, north, east = bbox
+        filters.append(func.coalesce(events_table.c.lat, venues_table.c.lat).between(south, north))
+        filters.append(func.coalesce(events_table.c.lon, venues_table.c.lon).between(west, east))
+    return filters
+
+
+def _event_rows_stmt(filters: list):
+    return (
+        select(
+            events_table,
+            venues_table.c.name.label("venue_name"),
+            venues_table.c.lat.label("venue_lat"),
+            venues_table.c.lon.label("venue_lon"),
+            venues_table.c.city.label("city"),
+        )
+        .select_from(_events_join())
+        .where(*filters)
+    )
+
+
+def _event_batch_stmt(filters: list):
+    """Solo las columnas ``BATCH_COLUMNS`` del scoring, con las coordenadas del venue como respaldo."""
+    return (
+        select(
+            events_table.c.id,
+            events_table.c.category,
+            events_table.c.start_dt,
+            events_table.c.end_dt,
+            func.coalesce(events_table.c.lat, venues_table.c.lat).label("lat"),
+            func.coalesce(events_table.c.lon, venues_table.c.lon).label("lon"),
+        )
+        .select_from(_events_join())
+        .where(*filters)
+    )
+
+
+def events_for_day_stmt(day: date, city: Optional[str] = None, tzinfo=timezone.utc):
+    return _event_rows_stmt(_day_filters(day, city, tzinfo))
+
+
+def event_batch_for_day_stmt(day: date, city: Optional[str] = None, tzinfo=timezone.utc):
+    return _event_batch_stmt(_day_filters(day, city, tzinfo))
+
+
+def events_active_at_stmt(
+    target: datetime, city: Optional[str] = None, metadata: CategoryMetadata = DEFAULT_CATEGORY_METADATA
+):
+    """Eventos cuya ventana de actividad del scoring contiene ``target`` (incluidos los del día anterior)."""
+    return _event_rows_stmt(_active_filters(target, city, metadata))
+
+
+def event_batch_active_at_stmt(
+    target: datetime,
+    city: Optional[str] = None,
+    metadata: CategoryMetadata = DEFAULT_CATEGORY_METADATA,
+    bbox: Optional[BBox] = None,
+):
+    return _event_batch_stmt(_with_bbox(_active_filters(target, city, metadata), bbox))
+
+
+def changed_start_times_stmt(since: datetime, start: datetime, end: datetime):
+    changes = event_start_changes_table.c
+    current = (
+        select(events_table.c.start_dt)
+        .where(events_table.c.updated_at > since)
+        .where(events_table.c.start_dt >= start, events_table.c.start_dt < end)
+    )
+    # El inicio anterior de los reprogramados: su franja antigua también queda obsoleta
+    previous = (
+        select(changes.old_start_dt.label("start_dt"))
+        .where(changes.changed_at > since)
+        .where(changes.old_start_dt >= start, changes.old_start_dt < end)
+    )
+    return union(current, previous)
+
+
+# Columnas de /api/events; con las coordenadas del venue como respaldo en la ruta
+FROM_HOUR_COLUMNS = (
+    events_table.c.id,
+    events_table.c.title,
+    events_table.c.category,
+    events_table.c.subcategory,
+    events_table.c.start_dt,
+    events_table.c.end_dt,
+    events_table.c.lat,
+    events_table.c.lon,
+    events_table.c.url,
+    events_table.c.source,
+    events_table.c.expected_attendance,
+    venues_table.c.name.label("venue_name"),
+    venues_table.c.lat.label("venue_lat"),
+    venues_table.c.lon.label("venue_lon"),
+    venues_table.c.city.label("city"),
+)
+# Sentencias de list_events_from_hour por variante (ciudad, cursor, limit): se construyen una vez con
+# bindparams y SQLAlchemy reutiliza su SQL compilado en cada petición
+_FROM_HOUR_STMTS: Dict[Tuple[bool, bool, bool], Any] = {}
+
+
+def _build_from_hour_stmt(with_city: bool, with_after: bool, with_limit: bool):
+    start_dt = events_table.c.start_dt
+    city_filter = [func.lower(venues_table.c.city) == bindparam("city")] if with_city else []
+    # effective_end_dt se calcula en la ingesta (duración por categoría si el evento no trae fin);
+    # las filas anteriores a la migración usan end_dt, como en active_at_filter
+    effective_end = func.coalesce(events_table.c.effective_end_dt, events_table.c.end_dt)
+    overlap_filters = [start_dt < bindparam("hour_end"), effective_end > bindparam("hour_start")]
+    overlap_filters += city_filter
+    fallback_filters = [start_dt >= bindparam("hour_start"), start_dt < bindparam("day_end"), *city_filter]
+    # El respaldo (eventos desde esa hora) solo aplica si ningún evento solapa la hora, con o sin cursor:
+    # así todas las páginas de un mismo listado salen del mismo conjunto
+    any_overlap = exists(select(events_table.c.id).select_from(_events_join()).where(*overlap_filters))
+    fallback_filters.append(~any_overlap)
+    if with_after:
+        # (start_dt, id) > cursor sin row values: lo resuelve el índice idx_events_start_dt_id
+        after = or_(
+            start_dt > bindparam("after_start"),
+            and_(start_dt == bindparam("after_start"), events_table.c.id > bindparam("after_id")),
+        )
+        overlap_filters = [*overlap_filters, after]
+        fallback_filters.append(after)
+    base = select(*FROM_HOUR_COLUMNS).select_from(_events_join())
+    rows = union_all(base.where(*overlap_filters), base.where(*fallback_filters)).subquery("from_hour")
+    stmt = select(rows).order_by(rows.c.start_dt, rows.c.id)
+    if with_limit:
+        stmt = stmt.limit(bindparam("limit", type_=Integer))
+    return stmt
+
+
+def events_from_hour_stmt(
+    day: date,
+    from_hour: int,
+    city: Optional[str] = None,
+    tzinfo=timezone.utc,
+    *,
+    after: Optional[EventCursor] = None,
+    limit: Optional[int] = None,
+) -> Tuple[Any, Dict[str, Any]]:
+    """Eventos que solapan la hora o, si no hay ninguno, los que empiezan desde esa hora, en una consulta.
+
+    Devuelve la sentencia cacheada y sus parámetros. Ordena por ``(start_dt, id)``; ``after``
+    (cursor del último evento servido) y ``limit`` paginan por keyset sin ``OFFSET``.
+    """
+    day_start_local = datetime.combine(day, time.min, tzinfo=tzinfo)
+    day_end = (day_start_local + timedelta(days=1)).astimezone(timezone.utc)
+    hour_start = day_start_local.replace(hour=from_hour).astimezone(timezone.utc)
+    hour_end = day_start_local.replace(hour=from_hour + 1).astimezone(timezone.utc) if from_hour < 23 else day_end
+    params: Dict[str, Any] = {"hour_start": hour_start, "hour_end": hour_end, "day_end": day_end}
+    if city:
+        params["city"] = city.lower()
+    if after is not None:
+        after_start, params["after_id"] = after
+        if after_start.tzinfo is None:
+            after_start = after_start.replace(tzinfo=timezone.utc)
+        params["after_start"] = after_start.astimezone(timezone.utc)
+    if limit is not None:
+        params["limit"] = limit
+    key = (bool(city), after is not None, limit is not None)
+    stmt = _FROM_HOUR_STMTS.get(key)
+    if stmt is None:
+        stmt = _FROM_HOUR_STMTS[key] = _build_from_hour_stmt(*key)
+    return stmt, params
+
+
+def active_events_stmt():
+    return (
+        select(
+            events_table.c.id,
+            events_table.c.title,
+            events_table.c.start_dt,
+            events_table.c.end_dt,
+            events_table.c.lat,
+            events_table.c.lon,
+            events_table.c.url,
+            events_table.c.source,
+            venues_table.c.name.label("venue_name"),
+        )
+        .select_from(_events_join())
+        .where(events_table.c.is_active.is_(True))
+    )
 
 
 class EventsRepository:
@@ -37,6 +421,67 @@ class EventsRepository:
         self.engine = engine
         self.venues_repo = venues_repo or VenuesRepository(self.engine)
 
+    def upsert_many(
+        self,
+        events: Iterable[Dict[str, Any]],
+        *,
+        chunk_size: int = DEFAULT_CHUNK_SIZE,
+        conn: Optional[Connection] = None,
+        use_copy: bool = False,
+        existing: Optional[Dict[Tuple[Any, ...], Any]] = None,
+    ) -> Dict[str, int]:
+        """Versión por lotes de ``upsert_event``: una transacción para todo el lote."""
+        events = list(events)
+        now = datetime.now(timezone.utc)
+        rows = []
+        for event_data in events:
+            resolved = {col: event_data.get(col) for col in EVENT_COLUMNS}
+            if resolved.get("is_active") is None:
+                resolved["is_active"] = True
+            resolved["created_at"] = now
+            resolved["updated_at"] = now
+            resolved["last_synced_at"] = now
+            rows.append(resolved)
+        if conn is None:
+            with self.engine.begin() as active:
+                return self._upsert_rows(active, events, rows, chunk_size, use_copy, existing)
+        return self._upsert_rows(conn, events, rows, chunk_size, use_copy, existing)
+
+    def _upsert_rows(
+        self,
+        conn: Connection,
+        events: List[Dict[str, Any]],
+        rows: List[Dict[str, Any]],
+        chunk_size: int,
+        use_copy: bool,
+        existing: Optional[Dict[Tuple[Any, ...], Any]],
+    ) -> Dict[str, int]:
+        # Los venue_id que falten se resuelven con una sola consulta para todo el lote
+        pending = {}
+        for event_data, row in zip(events, rows):
+            if row["venue_id"]:
+                continue
+            key = venue_key(
+                {
+                    "source": event_data.get("venue_source", event_data.get("source")),
+                    "external_id": event_data.get("venue_external_id"),
+                    "city": event_data.get("venue_city"),
+                    "name": event_data.get("venue_name"),
+                }
+            )
+            if key is not None:
+                pending.setdefault(key, []).append(row)
+        if pending:
+            lookups = [
+                {"source": key[1], "external_id": key[2]} if key[0] == "external" else {"city": key[1], "name": key[2]}
+                for key in pending
+            ]
+            resolved = self.venues_repo.resolve_many(lookups, create_missing=False, conn=conn).ids
+            for key, waiting in pending.items():
+                for row in waiting:
+                    row["venue_id"] = resolved.get(key)
+        return bulk_upsert_events(conn, rows, chunk_size=chunk_size, use_copy=use_copy, existing=existing)
+
     def upsert_event(self, event_data: Dict[str, Any]) -> int:
         resolved = {col: event_data.get(col) for col in EVENT_COLUMNS}
         if resolved.get("is_active") is None:
@@ -45,23 +490,45 @@ class EventsRepository:
             resolved["venue_id"] = self._resolve_venue_id(event_data)
         now = datetime.now(timezone.utc)
         with self.engine.begin() as conn:
-            existing = conn.execute(
-                select(events_table.c.id).where(
+            apply_activity_windows(conn, [resolved])
+            found = conn.execute(
+                select(events_table.c.id, events_table.c.start_dt).where(
                     (events_table.c.source == resolved["source"])
                     & (events_table.c.external_id == resolved["external_id"])
                 )
-            ).scalar_one_or_none()
+            ).first()
+            existing = found.id if found else None
             if existing:
+                key = normalize_key(conn, tuple(resolved[col] for col in EVENT_KEY_COLUMNS))
+                log_start_changes(conn, [resolved], {key: tuple(found)}, now)
+                content = {col: resolved[col] for col in EVENT_CONTENT_COLUMNS if col in resolved}
                 conn.execute(
                     update(events_table)
                     .where(events_table.c.id == existing)
-                    .values(**resolved, updated_at=now, last_synced_at=now)
+                    .values(
+                        **resolved,
+                        updated_at=touch_if_changed(events_table, "updated_at", content, now),
+                        last_synced_at=now,
+                    )
                 )
-                return existing
-            result = conn.execute(
-                insert(events_table).values(**resolved, created_at=now, updated_at=now, last_synced_at=now)
-            )
-            return result.inserted_primary_key[0]
+                event_id = existing
+            else:
+                result = conn.execute(
+                    insert(events_table).values(**resolved, created_at=now, updated_at=now, last_synced_at=now)
+                )
+                event_id = result.inserted_primary_key[0]
+        notify_written(self.engine, [resolved])
+        return event_id
+
+    def changed_start_times(self, since: datetime, start: datetime, end: datetime) -> List[datetime]:
+        """Inicios distintos en ``[start, end)`` de los eventos modificados después de ``since``.
+
+        Incluye los desactivados y el inicio anterior de los reprogramados: esos snapshots
+        también dejan de ser válidos.
+        """
+        with self.engine.begin() as conn:
+            rows = conn.execute(changed_start_times_stmt(since, start, end)).scalars().all()
+        return list(rows)
 
     def get_event_by_source_external(self, source: str, external_id: str) -> Optional[Dict[str, Any]]:
         with self.engine.begin() as conn:
@@ -78,102 +545,49 @@ class EventsRepository:
         city: Optional[str] = None,
         tzinfo=timezone.utc,
     ) -> List[Dict[str, Any]]:
-        start, end = self._day_bounds(day, tzinfo)
-        join_stmt = events_table.outerjoin(venues_table, events_table.c.venue_id == venues_table.c.id)
-        filters = [(events_table.c.start_dt >= start), (events_table.c.start_dt < end)]
-        if city:
-            filters.append(func.lower(venues_table.c.city) == city.lower())
         with self.engine.begin() as conn:
-            rows = conn.execute(
-                select(
-                    events_table,
-                    venues_table.c.name.label("venue_name"),
-                    venues_table.c.lat.label("venue_lat"),
-                    venues_table.c.lon.label("venue_lon"),
-                    venues_table.c.city.label("city"),
-                )
-                .select_from(join_stmt)
-                .where(*filters)
-            ).mappings().all()
+            rows = conn.execute(events_for_day_stmt(day, city, tzinfo)).mappings().all()
         return [dict(row) for row in rows]
 
+    def event_batch_for_day(self, day: date, city: Optional[str] = None, tzinfo=timezone.utc) -> EventBatch:
+        with self.engine.begin() as conn:
+            return EventBatch.from_tuples(conn.execute(event_batch_for_day_stmt(day, city, tzinfo)))
+
+    def list_events_active_at(
+        self, target: datetime, city: Optional[str] = None, metadata: CategoryMetadata = DEFAULT_CATEGORY_METADATA
+    ) -> List[Dict[str, Any]]:
+        with self.engine.begin() as conn:
+            rows = conn.execute(events_active_at_stmt(target, city, metadata)).mappings().all()
+        return [dict(row) for row in rows]
+
+    def event_batch_active_at(
+        self,
+        target: datetime,
+        city: Optional[str] = None,
+        metadata: CategoryMetadata = DEFAULT_CATEGORY_METADATA,
+        bbox: Optional[BBox] = None,
+    ) -> EventBatch:
+        """``bbox`` limita la consulta a los eventos de esa zona (tiles y raster la amplían con el radio máximo)."""
+        with self.engine.begin() as conn:
+            return EventBatch.from_tuples(conn.execute(event_batch_active_at_stmt(target, city, metadata, bbox)))
+
     def list_events_from_hour(
         self,
         day: date,
         from_hour: int,
         city: Optional[str] = None,
         tzinfo=timezone.utc,
+        after: Optional[EventCursor] = None,
+        limit: Optional[int] = None,
     ) -> List[Dict[str, Any]]:
-        day_start_local = datetime.combine(day, time.min, tzinfo=tzinfo)
-        hour_start_utc = day_start_local.replace(hour=from_hour).astimezone(timezone.utc)
-        if from_hour < 23:
-            hour_end_utc = day_start_local.replace(hour=from_hour + 1).astimezone(timezone.utc)
-        else:
-            hour_end_utc = (day_start_local + timedelta(days=1)).astimezone(timezone.utc)
-        default_duration = timedelta(hours=3)
-        join_stmt = events_table.outerjoin(venues_table, events_table.c.venue_id == venues_table.c.id)
-        coalesce_end = func.coalesce(events_table.c.end_dt, events_table.c.start_dt + default_duration)
-        filters = [
-            events_table.c.start_dt < hour_end_utc,
-            coalesce_end > hour_start_utc,
-        ]
-        if city:
-            filters.append(func.lower(venues_table.c.city) == city.lower())
+        stmt, params = events_from_hour_stmt(day, from_hour, city, tzinfo, after=after, limit=limit)
         with self.engine.begin() as conn:
-            rows = conn.execute(
-                select(
-                    events_table.c.id,
-                    events_table.c.title,
-                    events_table.c.category,
-                    events_table.c.subcategory,
-                    events_table.c.start_dt,
-                    events_table.c.end_dt,
-                    events_table.c.lat,
-                    events_table.c.lon,
-                    events_table.c.url,
-                    events_table.c.source,
-                    events_table.c.expected_attendance,
-                    venues_table.c.name.label("venue_name"),
-                    venues_table.c.lat.label("venue_lat"),
-                    venues_table.c.lon.label("venue_lon"),
-                    venues_table.c.city.label("city"),
-                )
-                .select_from(join_stmt)
-                .where(*filters)
-                .order_by(events_table.c.start_dt)
-            ).mappings().all()
-            results = [dict(row) for row in rows]
-            if results:
-                return results
-            # Fallback: si no hay eventos solapados, devolvemos desde la hora en adelante
-            fallback_filters = [
-                events_table.c.start_dt >= hour_start_utc,
-                events_table.c.start_dt < (day_start_local + timedelta(days=1)).astimezone(timezone.utc),
-            ]
-            if city:
-                fallback_filters.append(func.lower(venues_table.c.city) == city.lower())
-            rows = conn.execute(
-                select(
-                    events_table.c.id,
-                    events_table.c.title,
-                    events_table.c.category,
-                    events_table.c.subcategory,
-                    events_table.c.start_dt,
-                    events_table.c.end_dt,
-                    events_table.c.lat,
-                    events_table.c.lon,
-                    events_table.c.url,
-                    events_table.c.source,
-                    events_table.c.expected_attendance,
-                    venues_table.c.name.label("venue_name"),
-                    venues_table.c.lat.label("venue_lat"),
-                    venues_table.c.lon.label("venue_lon"),
-                    venues_table.c.city.label("city"),
-                )
-                .select_from(join_stmt)
-                .where(*fallback_filters)
-                .order_by(events_table.c.start_dt)
-            ).mappings().all()
+            rows = conn.execute(stmt, params).mappings().all()
+        return [dict(row) for row in rows]
+
+    def list_active_events(self) -> List[Dict[str, Any]]:
+        with self.engine.begin() as conn:
+            rows = conn.execute(active_events_stmt()).mappings().all()
         return [dict(row) for row in rows]
 
     def _resolve_venue_id(self, event_data: Dict[str, Any]) -> Optional[int]:
@@ -190,8 +604,56 @@ class EventsRepository:
                 venue_id = venue["id"]
         return venue_id
 
-    @staticmethod
-    def _day_bounds(day: date, tzinfo=timezone.utc):
-        start_local = datetime.combine(day, time.min, tzinfo=tzinfo)
-        end_local = start_local + timedelta(days=1)
-        return start_local.astimezone(timezone.utc), end_local.astimezone(timezone.utc)
+
+class AsyncEventsRepository:
+    """Lecturas de ``EventsRepository`` para las rutas async.
+
+    Con un ``AsyncEngine`` (asyncpg / aiosqlite) las consultas no ocupan hilos; con
+    un ``Engine`` síncrono se ejecutan en el threadpool como fallback.
+    """
+
+    def __init__(self, engine: Union[AsyncEngine, Engine]):
+        if engine is None:
+            raise ValueError("engine is required")
+        self.engine = engine
+
+    async def list_events_for_day(
+        self,
+        day: date,
+        city: Optional[str] = None,
+        tzinfo=timezone.utc,
+    ) -> List[Dict[str, Any]]:
+        return await fetch_all(self.engine, events_for_day_stmt(day, city, tzinfo))
+
+    async def event_batch_for_day(self, day: date, city: Optional[str] = None, tzinfo=timezone.utc) -> EventBatch:
+        return EventBatch.from_tuples(await fetch_tuples(self.engine, event_batch_for_day_stmt(day, city, tzinfo)))
+
+    async def list_events_active_at(
+        self, target: datetime, city: Optional[str] = None, metadata: CategoryMetadata = DEFAULT_CATEGORY_METADATA
+    ) -> List[Dict[str, Any]]:
+        return await fetch_all(self.engine, events_active_at_stmt(target, city, metadata))
+
+    async def event_batch_active_at(
+        self,
+        target: datetime,
+        city: Optional[str] = None,
+        metadata: CategoryMetadata = DEFAULT_CATEGORY_METADATA,
+        bbox: Optional[BBox] = None,
+    ) -> EventBatch:
+        stmt = event_batch_active_at_stmt(target, city, metadata, bbox)
+        return EventBatch.from_tuples(await fetch_tuples(self.engine, stmt))
+
+    async def list_events_from_hour(
+        self,
+        day: date,
+        from_hour: int,
+        city: Optional[str] = None,
+        tzinfo=timezone.utc,
+        after: Optional[EventCursor] = None,
+        limit: Optional[int] = None,
+    ) -> List[Dict[str, Any]]:
+        stmt, params = events_from_hour_stmt(day, from_hour, city, tzinfo, after=after, limit=limit)
+        return await fetch_all(self.engine, stmt, params)
+
+    async def list_active_events(self) -> List[Dict[str, Any]]:
+        return await fetch_all(self.engine, active_events_stmt())
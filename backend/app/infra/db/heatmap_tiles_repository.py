@@ -0,0 +1,168 @@
+from __future__ import annotations
+
+import json
+import math
+import os
+from dataclasses import dataclass
+from datetime import date, datetime, time, timedelta, timezone
+from typing import Any, Dict, Iterable, Optional, Tuple, Union
+
+from sqlalchemy import exists, or_, select
+from sqlalchemy.engine import Engine
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from app.domain.category_metadata import DEFAULT_CATEGORY_METADATA, CategoryMetadata
+
+from .async_support import fetch_first
+from .bulk import upsert_rows
+from .events_repository import EVENT_MAX_DURATION, active_at_filter
+from .tables import (
+    category_rules_table,
+    event_start_changes_table,
+    events_table,
+    heatmap_tiles_table,
+    weather_observations_table,
+)
+
+# Días ya cerrados: el tile no caduca (solo lo invalidan cambios en los eventos del día)
+HEATMAP_TILE_FINAL_AFTER_DAYS = int(os.getenv("HEATMAP_TILE_FINAL_AFTER_DAYS", "1"))
+# Hoy y días futuros: el tile se sirve como mucho durante este tiempo
+HEATMAP_TILE_TTL_SEC = int(os.getenv("HEATMAP_TILE_TTL_SEC", "900"))
+CENTER_PRECISION = 4
+# Alcance del índice meteo (mismas variables que ``weather_index``): observaciones más allá no cambian el tile
+TILE_WEATHER_RADIUS_KM = float(os.getenv("WEATHER_INDEX_MAX_DISTANCE_KM", "30"))
+TILE_WEATHER_GAP = timedelta(hours=3)
+KM_PER_DEG_LAT = 111.32
+
+TILE_KEY_COLUMNS = ("target_date", "hour", "city", "mode", "center_lat", "center_lon")
+
+
+@dataclass(frozen=True)
+class TileKey:
+    target_date: date
+    hour: int
+    city: str
+    mode: str
+    center_lat: float
+    center_lon: float
+
+    @classmethod
+    def build(cls, day: date, hour: int, lat: float, lon: float, city: Optional[str], mode: str) -> "TileKey":
+        return cls(
+            target_date=day,
+            hour=hour,
+            city=(city or "").strip().lower(),
+            mode=mode.lower(),
+            center_lat=round(lat, CENTER_PRECISION),
+            center_lon=round(lon, CENTER_PRECISION),
+        )
+
+    def as_row(self) -> Dict[str, Any]:
+        return {col: getattr(self, col) for col in TILE_KEY_COLUMNS}
+
+
+def tile_expiry(day: date, now: datetime) -> Optional[datetime]:
+    if day < now.date() - timedelta(days=HEATMAP_TILE_FINAL_AFTER_DAYS):
+        return None
+    return now + timedelta(seconds=HEATMAP_TILE_TTL_SEC)
+
+
+def fresh_tile_stmt(key: TileKey, now: datetime, metadata: CategoryMetadata = DEFAULT_CATEGORY_METADATA):
+    """Un único SELECT por la clave única: vigente y sin cambios posteriores en sus entradas.
+
+    El tile deja de servirse si después de ``computed_at`` cambió alguno de sus datos de
+    entrada: un evento cuya ventana contiene la hora, un evento reprogramado cuya ventana
+    anterior podía contenerla (``event_start_changes``), una observación meteorológica al
+    alcance del índice desde el centro o cualquier regla de ``category_rules``.
+    """
+    tiles = heatmap_tiles_table
+    target = datetime.combine(key.target_date, time(hour=key.hour), tzinfo=timezone.utc)
+    # Los mismos eventos que puntúa el tile (ventana de actividad que contiene la hora)
+    events_changed = exists().where(
+        active_at_filter(target, metadata),
+        events_table.c.updated_at > tiles.c.computed_at,
+    )
+    # Reprogramados fuera de la hora: la ventana antigua se acota con la duración máxima y las ventanas pre/post
+    changes = event_start_changes_table
+    rescheduled = exists().where(
+        changes.c.changed_at > tiles.c.computed_at,
+        changes.c.old_start_dt >= target - metadata.max_post_window - EVENT_MAX_DURATION,
+        changes.c.old_start_dt <= target + metadata.max_pre_window,
+    )
+    weather = weather_observations_table
+    lat_delta = TILE_WEATHER_RADIUS_KM / KM_PER_DEG_LAT
+    lon_delta = lat_delta / max(math.cos(math.radians(key.center_lat)), 0.01)
+    weather_changed = exists().where(
+        weather.c.updated_at > tiles.c.computed_at,
+        weather.c.observed_at.between(target - TILE_WEATHER_GAP, target + TILE_WEATHER_GAP),
+        weather.c.lat.between(key.center_lat - lat_delta, key.center_lat + lat_delta),
+        weather.c.lon.between(key.center_lon - lon_delta, key.center_lon + lon_delta),
+    )
+    # ``CategoryMetadata.version`` es local al proceso: entre procesos vale el ``updated_at`` de las reglas
+    rules_changed = exists().where(category_rules_table.c.updated_at > tiles.c.computed_at)
+    return (
+        select(tiles.c.payload)
+        .where(*(tiles.c[col] == value for col, value in key.as_row().items()))
+        .where(or_(tiles.c.expires_at.is_(None), tiles.c.expires_at > now))
+        .where(~events_changed, ~rescheduled, ~weather_changed, ~rules_changed)
+        .limit(1)
+    )
+
+
+class HeatmapTilesRepository:
+    def __init__(self, engine: Engine):
+        if engine is None:
+            raise ValueError("engine is required")
+        self.engine = engine
+
+    def get_fresh(
+        self,
+        key: TileKey,
+        now: Optional[datetime] = None,
+        metadata: CategoryMetadata = DEFAULT_CATEGORY_METADATA,
+    ) -> Optional[Dict[str, Any]]:
+        now = now or datetime.now(timezone.utc)
+        with self.engine.begin() as conn:
+            payload = conn.execute(fresh_tile_stmt(key, now, metadata)).scalar_one_or_none()
+        return json.loads(payload) if payload else None
+
+    def upsert_tiles(
+        self, tiles: Iterable[Tuple[TileKey, Dict[str, Any]]], now: Optional[datetime] = None
+    ) -> int:
+        now = now or datetime.now(timezone.utc)
+        rows = [
+            {
+                **key.as_row(),
+                "payload": json.dumps(payload),
+                "hotspots_count": len(payload.get("hotspots") or []),
+                "computed_at": now,
+                "expires_at": tile_expiry(key.target_date, now),
+            }
+            for key, payload in tiles
+        ]
+        if not rows:
+            return 0
+        with self.engine.begin() as conn:
+            return upsert_rows(
+                conn,
+                heatmap_tiles_table,
+                rows,
+                conflict_columns=TILE_KEY_COLUMNS,
+                update_columns=("payload", "hotspots_count", "computed_at", "expires_at"),
+            )
+
+
+class AsyncHeatmapTilesRepository:
+    def __init__(self, engine: Union[AsyncEngine, Engine]):
+        if engine is None:
+            raise ValueError("engine is required")
+        self.engine = engine
+
+    async def get_fresh(
+        self,
+        key: TileKey,
+        now: Optional[datetime] = None,
+        metadata: CategoryMetadata = DEFAULT_CATEGORY_METADATA,
+    ) -> Optional[Dict[str, Any]]:
+        row = await fetch_first(self.engine, fresh_tile_stmt(key, now or datetime.now(timezone.utc), metadata))
+        return json.loads(row["payload"]) if row else None
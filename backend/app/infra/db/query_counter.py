@@ -0,0 +1,135 @@
+from __future__ import annotations
+
+import os
+import re
+from collections import Counter
+from contextlib import contextmanager
+from dataclasses import dataclass
+from threading import Lock
+from typing import Iterator, List, Optional, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+# Repeticiones de la misma sentencia normalizada a partir de las cuales se señala un N+1
+N_PLUS_ONE_THRESHOLD = int(os.getenv("SQL_N_PLUS_ONE_THRESHOLD", "5"))
+
+_WHITESPACE = re.compile(r"\s+")
+_STRING_LITERALS = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_LITERALS = re.compile(r"(?<![\w.])-?\d+(?:\.\d+)?\b")
+# ? (sqlite), %(name)s / %s (psycopg), $1 (asyncpg) y :name; "::tipo" de Postgres no es parámetro
+_PARAMETERS = re.compile(r"%\(\w+\)s|%s|\$\d+|(?<!:):\w+|\?")
+_PARAMETER_LISTS = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_ROW_LISTS = re.compile(r"\(\?, \.\.\.\)(?:\s*,\s*\(\?, \.\.\.\))+")
+
+
+def normalize_sql(statement: str) -> str:
+    """Forma canónica de una sentencia: sin literales ni parámetros y con las listas colapsadas.
+
+    ``IN (?, ?, ?)`` y los ``VALUES`` multi-fila quedan como ``(?, ...)`` para que el mismo
+    upsert en bloque cuente como una sola forma sea cual sea el tamaño del lote.
+    """
+    sql = _WHITESPACE.sub(" ", statement).strip()
+    sql = _STRING_LITERALS.sub("?", sql)
+    sql = _PARAMETERS.sub("?", sql)
+    sql = _NUMBER_LITERALS.sub("?", sql)
+    sql = _PARAMETER_LISTS.sub("(?, ...)", sql)
+    return _ROW_LISTS.sub("(?, ...), ...", sql)
+
+
+@dataclass(frozen=True)
+class QueryRecord:
+    sql: str
+    normalized: str
+    operation: Optional[str]
+    executemany: bool
+
+
+class QueryCounter:
+    """Sentencias ejecutadas mientras está activo, agrupadas por SQL normalizado y por operación.
+
+    ``operation(nombre)`` etiqueta las sentencias de un tramo (una llamada a repositorio, una
+    etapa de un job) para repartir el total entre operaciones lógicas.
+    """
+
+    def __init__(self, n_plus_one_threshold: int = N_PLUS_ONE_THRESHOLD):
+        if n_plus_one_threshold < 2:
+            raise ValueError("n_plus_one_threshold must be >= 2")
+        self.n_plus_one_threshold = n_plus_one_threshold
+        self.records: List[QueryRecord] = []
+        self._operations: List[str] = []
+        self._lock = Lock()
+
+    @property
+    def count(self) -> int:
+        return len(self.records)
+
+    def record(self, statement: str, executemany: bool = False) -> None:
+        operation = self._operations[-1] if self._operations else None
+        with self._lock:
+            self.records.append(QueryRecord(statement, normalize_sql(statement), operation, executemany))
+
+    @contextmanager
+    def operation(self, name: str) -> Iterator["QueryCounter"]:
+        self._operations.append(name)
+        try:
+            yield self
+        finally:
+            self._operations.pop()
+
+    def by_statement(self, operation: Optional[str] = None) -> List[Tuple[str, int]]:
+        """(SQL normalizado, ejecuciones) de mayor a menor."""
+        return Counter(
+            record.normalized for record in self.records if operation is None or record.operation == operation
+        ).most_common()
+
+    def by_operation(self) -> List[Tuple[Optional[str], int]]:
+        return Counter(record.operation for record in self.records).most_common()
+
+    def n_plus_one(self) -> List[Tuple[str, int]]:
+        """Sentencias repetidas al menos ``n_plus_one_threshold`` veces: consultas por fila.
+
+        No cuenta los ``executemany``: son una sola llamada aunque el driver los parta en
+        varias ejecuciones (p. ej. ``INSERT ... RETURNING`` fila a fila en SQLite).
+        """
+        repeated = Counter(record.normalized for record in self.records if not record.executemany)
+        return [(sql, count) for sql, count in repeated.most_common() if count >= self.n_plus_one_threshold]
+
+    def report(self, limit: int = 10) -> str:
+        lines = [f"{self.count} statements, {len(self.by_statement())} distinct"]
+        for operation, count in self.by_operation():
+            if operation is not None:
+                lines.append(f"  operation {operation}: {count}")
+        flagged = dict(self.n_plus_one())
+        for sql, count in self.by_statement()[:limit]:
+            flag = " [N+1]" if sql in flagged else ""
+            lines.append(f"  {count:>5}x{flag} {sql[:200]}")
+        return "\n".join(lines)
+
+    def assert_budget(self, max_queries: Optional[int] = None, *, allow_n_plus_one: bool = False) -> None:
+        problems = []
+        if max_queries is not None and self.count > max_queries:
+            problems.append(f"expected at most {max_queries} statements, got {self.count}")
+        if not allow_n_plus_one and self.n_plus_one():
+            problems.append(f"N+1 pattern (a statement repeated >= {self.n_plus_one_threshold} times)")
+        if problems:
+            raise AssertionError("; ".join(problems) + "\n" + self.report())
+
+
+@contextmanager
+def count_queries(engine=None, *, n_plus_one_threshold: int = N_PLUS_ONE_THRESHOLD) -> Iterator[QueryCounter]:
+    """Cuenta las sentencias de ``engine`` (o de todos los motores si es ``None``) dentro del bloque.
+
+    Acepta también un ``AsyncEngine``: sus sentencias pasan por el ``Engine`` síncrono interno.
+    """
+    target = getattr(engine, "sync_engine", engine) if engine is not None else Engine
+    counter = QueryCounter(n_plus_one_threshold)
+
+    def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        counter.record(statement, executemany)
+
+    event.listen(target, "before_cursor_execute", _before_cursor_execute)
+    try:
+        yield counter
+    finally:
+        event.remove(target, "before_cursor_execute", _before_cursor_execute)
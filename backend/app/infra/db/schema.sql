@@ -50,14 +50,29 @@ CREATE TABLE IF NOT EXISTS events (
     updated_at TIMESTAMPTZ DEFAULT now(),
     last_synced_at TIMESTAMPTZ NOT NULL DEFAULT now(),
     is_active BOOLEAN NOT NULL DEFAULT true,
+    effective_end_dt TIMESTAMPTZ,
+    activity_start TIMESTAMPTZ,
+    activity_end TIMESTAMPTZ,
     UNIQUE (source, external_id)
 );
 
-CREATE INDEX IF NOT EXISTS idx_events_start_dt ON events (start_dt);
+CREATE INDEX IF NOT EXISTS idx_events_start_dt_id ON events (start_dt, id);
 CREATE INDEX IF NOT EXISTS idx_events_category ON events (category);
+CREATE INDEX IF NOT EXISTS idx_events_activity_window ON events (activity_start, activity_end);
 CREATE INDEX IF NOT EXISTS idx_venues_city ON venues (city);
 CREATE INDEX IF NOT EXISTS idx_venues_name ON venues (name);
 
+CREATE TABLE IF NOT EXISTS event_start_changes (
+    id SERIAL PRIMARY KEY,
+    source TEXT NOT NULL,
+    external_id TEXT NOT NULL,
+    old_start_dt TIMESTAMPTZ NOT NULL,
+    new_start_dt TIMESTAMPTZ NOT NULL,
+    changed_at TIMESTAMPTZ NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS idx_event_start_changes_changed_at ON event_start_changes (changed_at);
+
 CREATE TABLE IF NOT EXISTS weather_observations (
     id SERIAL PRIMARY KEY,
     source TEXT NOT NULL,
@@ -116,3 +131,45 @@ CREATE TABLE IF NOT EXISTS event_feature_snapshots (
 
 CREATE INDEX IF NOT EXISTS idx_event_snapshots_target ON event_feature_snapshots (target_at);
 CREATE INDEX IF NOT EXISTS idx_event_snapshots_event ON event_feature_snapshots (event_id);
+
+-- Distancia e inclusión de cada evento del snapshot respecto a cada centro de una materialización multi-centro
+CREATE TABLE IF NOT EXISTS event_snapshot_centers (
+    id SERIAL PRIMARY KEY,
+    target_at TIMESTAMPTZ NOT NULL,
+    event_id TEXT NOT NULL,
+    center_lat DOUBLE PRECISION NOT NULL,
+    center_lon DOUBLE PRECISION NOT NULL,
+    distance_km DOUBLE PRECISION NOT NULL,
+    in_radius BOOLEAN NOT NULL,
+    created_at TIMESTAMPTZ DEFAULT now(),
+    CONSTRAINT uq_event_snapshot_centers_key UNIQUE (target_at, event_id, center_lat, center_lon)
+);
+
+CREATE INDEX IF NOT EXISTS idx_event_snapshot_centers_center ON event_snapshot_centers (center_lat, center_lon, target_at);
+
+CREATE TABLE IF NOT EXISTS heatmap_tiles (
+    id SERIAL PRIMARY KEY,
+    target_date DATE NOT NULL,
+    hour INTEGER NOT NULL,
+    city TEXT NOT NULL DEFAULT '',
+    mode TEXT NOT NULL,
+    center_lat DOUBLE PRECISION NOT NULL,
+    center_lon DOUBLE PRECISION NOT NULL,
+    payload TEXT NOT NULL,
+    hotspots_count INTEGER NOT NULL DEFAULT 0,
+    computed_at TIMESTAMPTZ NOT NULL,
+    expires_at TIMESTAMPTZ,
+    CONSTRAINT uq_heatmap_tiles_key UNIQUE (target_date, hour, city, mode, center_lat, center_lon)
+);
+
+-- Última materialización correcta por job y ámbito: cambios posteriores a "watermark" y días fuera de covered_* quedan pendientes
+CREATE TABLE IF NOT EXISTS materialization_watermarks (
+    id SERIAL PRIMARY KEY,
+    job TEXT NOT NULL,
+    scope TEXT NOT NULL,
+    watermark TIMESTAMPTZ NOT NULL,
+    covered_start DATE NOT NULL,
+    covered_end DATE NOT NULL,
+    updated_at TIMESTAMPTZ NOT NULL,
+    CONSTRAINT uq_materialization_watermarks_key UNIQUE (job, scope)
+);
@@ -1,12 +1,15 @@
 from __future__ import annotations
 
 from datetime import datetime, timezone
-from typing import Any, Dict, Iterable, List
+from typing import Any, Collection, Dict, Iterable, List
 
-from sqlalchemy import insert, select, update
+from sqlalchemy import and_, delete, insert, select, update
 from sqlalchemy.engine import Engine
 
-from .tables import event_feature_snapshots_table
+from .bulk import upsert_rows
+from .tables import event_feature_snapshots_table, event_snapshot_centers_table
+
+SNAPSHOT_CENTER_KEY_COLUMNS = ("target_at", "event_id", "center_lat", "center_lon")
 
 
 class EventFeatureSnapshotsRepository:
@@ -46,6 +49,10 @@ class EventFeatureSnapshotsRepository:
                     inserted += 1
         return {"inserted": inserted, "updated": updated}
 
+    def delete_stale(self, target_at: datetime, keep_event_ids: Collection[str]) -> int:
+        """Borra los snapshots de ``target_at`` cuyos eventos ya no entran en la hora (reprogramados o desactivados)."""
+        return _delete_stale(self.engine, event_feature_snapshots_table, target_at, keep_event_ids)
+
     def list_by_range(self, start_dt: datetime, end_dt: datetime) -> List[Dict[str, Any]]:
         with self.engine.begin() as conn:
             rows = conn.execute(
@@ -55,3 +62,65 @@ class EventFeatureSnapshotsRepository:
                 .order_by(event_feature_snapshots_table.c.target_at)
             ).mappings().all()
         return [dict(row) for row in rows]
+
+
+class SnapshotCentersRepository:
+    """Filas centro-dependientes (distancia, inclusión) de las materializaciones multi-centro."""
+
+    def __init__(self, engine: Engine):
+        if engine is None:
+            raise ValueError("engine is required")
+        self.engine = engine
+
+    def upsert_many(self, rows: Iterable[Dict[str, Any]]) -> int:
+        now = datetime.now(timezone.utc)
+        payload = [{**row, "created_at": row.get("created_at") or now} for row in rows]
+        with self.engine.begin() as conn:
+            return upsert_rows(
+                conn,
+                event_snapshot_centers_table,
+                payload,
+                conflict_columns=SNAPSHOT_CENTER_KEY_COLUMNS,
+                update_columns=("distance_km", "in_radius"),
+            )
+
+    def delete_stale(self, target_at: datetime, keep_event_ids: Collection[str]) -> int:
+        return _delete_stale(self.engine, event_snapshot_centers_table, target_at, keep_event_ids)
+
+    def list_for_center(
+        self,
+        center_lat: float,
+        center_lon: float,
+        start_dt: datetime,
+        end_dt: datetime,
+        *,
+        in_radius_only: bool = True,
+    ) -> List[Dict[str, Any]]:
+        """Snapshots de un centro: las features del evento con su ``distance_km`` e ``in_radius``."""
+        centers = event_snapshot_centers_table
+        snapshots = event_feature_snapshots_table
+        stmt = (
+            select(snapshots, centers.c.center_lat, centers.c.center_lon, centers.c.distance_km, centers.c.in_radius)
+            .select_from(
+                centers.join(
+                    snapshots,
+                    and_(snapshots.c.target_at == centers.c.target_at, snapshots.c.event_id == centers.c.event_id),
+                )
+            )
+            .where(centers.c.center_lat == center_lat, centers.c.center_lon == center_lon)
+            .where(centers.c.target_at >= start_dt, centers.c.target_at <= end_dt)
+            .order_by(centers.c.target_at, centers.c.distance_km)
+        )
+        if in_radius_only:
+            stmt = stmt.where(centers.c.in_radius.is_(True))
+        with self.engine.begin() as conn:
+            rows = conn.execute(stmt).mappings().all()
+        return [dict(row) for row in rows]
+
+
+def _delete_stale(engine: Engine, table, target_at: datetime, keep_event_ids: Collection[str]) -> int:
+    with engine.begin() as conn:
+        result = conn.execute(
+            delete(table).where(table.c.target_at == target_at, table.c.event_id.notin_(list(keep_event_ids)))
+        )
+    return result.rowcount
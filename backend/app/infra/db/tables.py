@@ -1,6 +1,6 @@
 from __future__ import annotations
 
-from sqlalchemy import Boolean, Column, DateTime, Float, ForeignKey, Integer, MetaData, Table, Text, UniqueConstraint, text
+from sqlalchemy import Boolean, Column, Date, DateTime, Float, ForeignKey, Index, Integer, MetaData, Table, Text, UniqueConstraint, text
 
 metadata = MetaData()
 
@@ -59,7 +59,27 @@ events_table = Table(
     Column("updated_at", DateTime(timezone=True)),
     Column("last_synced_at", DateTime(timezone=True), nullable=False, server_default=text("CURRENT_TIMESTAMP")),
     Column("is_active", Boolean, nullable=False, server_default=text("TRUE")),
+    # Derivadas en la ingesta (app.domain.activity): fin efectivo y ventana de actividad pre/post evento
+    Column("effective_end_dt", DateTime(timezone=True)),
+    Column("activity_start", DateTime(timezone=True)),
+    Column("activity_end", DateTime(timezone=True)),
     UniqueConstraint("source", "external_id", name="uq_events_source_external_id"),
+    Index("idx_events_activity_window", "activity_start", "activity_end"),
+    # Orden y cursor de la paginación por keyset de /api/events
+    Index("idx_events_start_dt_id", "start_dt", "id"),
+)
+
+# Reprogramaciones: el inicio anterior de cada evento movido, para rematerializar su franja antigua
+event_start_changes_table = Table(
+    "event_start_changes",
+    metadata,
+    Column("id", Integer, primary_key=True, autoincrement=True),
+    Column("source", Text, nullable=False),
+    Column("external_id", Text, nullable=False),
+    Column("old_start_dt", DateTime(timezone=True), nullable=False),
+    Column("new_start_dt", DateTime(timezone=True), nullable=False),
+    Column("changed_at", DateTime(timezone=True), nullable=False),
+    Index("idx_event_start_changes_changed_at", "changed_at"),
 )
 
 
@@ -86,6 +106,7 @@ weather_observations_table = Table(
     Column("weather_code", Integer),
     Column("created_at", DateTime(timezone=True)),
     Column("updated_at", DateTime(timezone=True)),
+    UniqueConstraint("source", "lat", "lon", "observed_at", name="uq_weather_observations_natural_key"),
 )
 
 
@@ -121,3 +142,51 @@ event_feature_snapshots_table = Table(
     Column("score_final", Float),
     Column("created_at", DateTime(timezone=True)),
 )
+
+# Campos que dependen del centro de una materialización multi-centro; el resto del snapshot es único por (target_at, event_id)
+event_snapshot_centers_table = Table(
+    "event_snapshot_centers",
+    metadata,
+    Column("id", Integer, primary_key=True, autoincrement=True),
+    Column("target_at", DateTime(timezone=True), nullable=False),
+    Column("event_id", Text, nullable=False),
+    Column("center_lat", Float, nullable=False),
+    Column("center_lon", Float, nullable=False),
+    Column("distance_km", Float, nullable=False),
+    Column("in_radius", Boolean, nullable=False),
+    Column("created_at", DateTime(timezone=True)),
+    UniqueConstraint("target_at", "event_id", "center_lat", "center_lon", name="uq_event_snapshot_centers_key"),
+    Index("idx_event_snapshot_centers_center", "center_lat", "center_lon", "target_at"),
+)
+
+heatmap_tiles_table = Table(
+    "heatmap_tiles",
+    metadata,
+    Column("id", Integer, primary_key=True, autoincrement=True),
+    Column("target_date", Date, nullable=False),
+    Column("hour", Integer, nullable=False),
+    Column("city", Text, nullable=False, server_default=text("''")),
+    Column("mode", Text, nullable=False),
+    Column("center_lat", Float, nullable=False),
+    Column("center_lon", Float, nullable=False),
+    Column("payload", Text, nullable=False),
+    Column("hotspots_count", Integer, nullable=False, server_default=text("0")),
+    Column("computed_at", DateTime(timezone=True), nullable=False),
+    Column("expires_at", DateTime(timezone=True)),
+    UniqueConstraint(
+        "target_date", "hour", "city", "mode", "center_lat", "center_lon", name="uq_heatmap_tiles_key"
+    ),
+)
+
+materialization_watermarks_table = Table(
+    "materialization_watermarks",
+    metadata,
+    Column("id", Integer, primary_key=True, autoincrement=True),
+    Column("job", Text, nullable=False),
+    Column("scope", Text, nullable=False),
+    Column("watermark", DateTime(timezone=True), nullable=False),
+    Column("covered_start", Date, nullable=False),
+    Column("covered_end", Date, nullable=False),
+    Column("updated_at", DateTime(timezone=True), nullable=False),
+    UniqueConstraint("job", "scope", name="uq_materialization_watermarks_key"),
+)
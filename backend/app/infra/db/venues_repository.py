@@ -1,11 +1,14 @@
 from __future__ import annotations
 
+from contextlib import contextmanager
+from dataclasses import dataclass, field
 from datetime import datetime, timezone
-from typing import Any, Dict, Optional
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Set, Tuple
 
-from sqlalchemy import func, insert, select, update
-from sqlalchemy.engine import Engine
+from sqlalchemy import bindparam, func, insert, or_, select, tuple_, update
+from sqlalchemy.engine import Connection, Engine
 
+from .bulk import DEFAULT_CHUNK_SIZE, chunked
 from .tables import venues_table
 
 
@@ -23,6 +26,27 @@ UPSERT_COLUMNS = [
     "postal_code",
     "max_capacity",
 ]
+# La clave (source, external_id) no se reescribe al actualizar un venue existente
+UPDATE_COLUMNS = [col for col in UPSERT_COLUMNS if col not in {"source", "external_id"}]
+
+VenueKey = Tuple[str, str, str]
+
+
+def venue_key(venue: Dict[str, Any]) -> Optional[VenueKey]:
+    """Clave de resolución: (source, external_id) si existe; si no, (city, nombre normalizado)."""
+    external_id = venue.get("external_id")
+    if external_id:
+        return ("external", venue["source"], external_id)
+    name = (venue.get("name") or "").strip().lower()
+    if name and venue.get("city"):
+        return ("name", venue["city"], name)
+    return None
+
+
+@dataclass
+class VenueResolution:
+    ids: Dict[VenueKey, int] = field(default_factory=dict)
+    created: Set[VenueKey] = field(default_factory=set)
 
 
 class VenuesRepository:
@@ -52,6 +76,87 @@ class VenuesRepository:
             inserted = result.inserted_primary_key[0]
             return inserted
 
+    def resolve_many(
+        self,
+        venues: Iterable[Dict[str, Any]],
+        *,
+        create_missing: bool = True,
+        conn: Optional[Connection] = None,
+    ) -> VenueResolution:
+        """Resuelve un lote de venues a ids con una consulta IN y escrituras en bloque.
+
+        Las claves repetidas se fusionan (gana la última aparición). Con
+        ``create_missing`` los venues existentes se actualizan y los nuevos se insertan.
+        """
+        payloads: Dict[VenueKey, Dict[str, Any]] = {}
+        for venue in venues:
+            key = venue_key(venue)
+            if key is not None:
+                payloads[key] = {col: venue.get(col) for col in UPSERT_COLUMNS}
+        resolution = VenueResolution()
+        if not payloads:
+            return resolution
+        with self._connection(conn) as active:
+            resolution.ids.update(self._fetch_ids(active, list(payloads)))
+            if not create_missing:
+                return resolution
+            now = datetime.now(timezone.utc)
+            existing = [
+                {**payload, "_id": resolution.ids[key], "updated_at": now}
+                for key, payload in payloads.items()
+                if key in resolution.ids
+            ]
+            if existing:
+                active.execute(
+                    update(venues_table)
+                    .where(venues_table.c.id == bindparam("_id"))
+                    .values({col: bindparam(col) for col in (*UPDATE_COLUMNS, "updated_at")}),
+                    [{k: row[k] for k in ("_id", *UPDATE_COLUMNS, "updated_at")} for row in existing],
+                )
+            missing = [key for key in payloads if key not in resolution.ids]
+            for chunk in chunked(missing, DEFAULT_CHUNK_SIZE):
+                result = active.execute(
+                    insert(venues_table).returning(venues_table.c.id, sort_by_parameter_order=True),
+                    [{**payloads[key], "created_at": now, "updated_at": now} for key in chunk],
+                )
+                for key, row in zip(chunk, result.all()):
+                    resolution.ids[key] = row[0]
+                    resolution.created.add(key)
+        return resolution
+
+    def _fetch_ids(self, conn: Connection, keys: List[VenueKey]) -> Dict[VenueKey, int]:
+        found: Dict[VenueKey, int] = {}
+        for chunk in chunked(keys, DEFAULT_CHUNK_SIZE):
+            external = [(key[1], key[2]) for key in chunk if key[0] == "external"]
+            named = [(key[1], key[2]) for key in chunk if key[0] == "name"]
+            clauses = []
+            if external:
+                clauses.append(tuple_(venues_table.c.source, venues_table.c.external_id).in_(external))
+            if named:
+                clauses.append(tuple_(venues_table.c.city, func.lower(venues_table.c.name)).in_(named))
+            wanted = set(chunk)
+            rows = conn.execute(
+                select(venues_table.c.id, venues_table.c.source, venues_table.c.external_id, venues_table.c.city, venues_table.c.name)
+                .where(or_(*clauses))
+                .order_by(venues_table.c.id)
+            ).all()
+            for row in rows:
+                candidates = [("name", row.city, (row.name or "").strip().lower())]
+                if row.external_id:
+                    candidates.insert(0, ("external", row.source, row.external_id))
+                for key in candidates:
+                    if key in wanted and key not in found:
+                        found[key] = row.id
+        return found
+
+    @contextmanager
+    def _connection(self, conn: Optional[Connection]) -> Iterator[Connection]:
+        if conn is not None:
+            yield conn
+            return
+        with self.engine.begin() as active:
+            yield active
+
     def get_venue_id_by_external(self, source: str, external_id: str) -> Optional[int]:
         if not external_id:
             return None
@@ -0,0 +1,63 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from datetime import date, datetime, timezone
+from typing import Optional
+
+from sqlalchemy import select
+from sqlalchemy.engine import Engine
+
+from .bulk import upsert_rows
+from .tables import materialization_watermarks_table
+
+WATERMARK_KEY_COLUMNS = ("job", "scope")
+
+
+@dataclass(frozen=True)
+class Watermark:
+    """Última materialización correcta: instante de corte y rango de días ya calculado."""
+
+    watermark: datetime
+    covered_start: date
+    covered_end: date
+
+    def covers(self, day: date) -> bool:
+        return self.covered_start <= day <= self.covered_end
+
+
+class WatermarksRepository:
+    def __init__(self, engine: Engine):
+        if engine is None:
+            raise ValueError("engine is required")
+        self.engine = engine
+
+    def get(self, job: str, scope: str) -> Optional[Watermark]:
+        table = materialization_watermarks_table
+        with self.engine.begin() as conn:
+            row = conn.execute(
+                select(table.c.watermark, table.c.covered_start, table.c.covered_end).where(
+                    table.c.job == job, table.c.scope == scope
+                )
+            ).first()
+        if row is None:
+            return None
+        watermark = row.watermark if row.watermark.tzinfo else row.watermark.replace(tzinfo=timezone.utc)
+        return Watermark(watermark, row.covered_start, row.covered_end)
+
+    def save(self, job: str, scope: str, watermark: Watermark) -> None:
+        row = {
+            "job": job,
+            "scope": scope,
+            "watermark": watermark.watermark,
+            "covered_start": watermark.covered_start,
+            "covered_end": watermark.covered_end,
+            "updated_at": datetime.now(timezone.utc),
+        }
+        with self.engine.begin() as conn:
+            upsert_rows(
+                conn,
+                materialization_watermarks_table,
+                [row],
+                conflict_columns=WATERMARK_KEY_COLUMNS,
+                update_columns=("watermark", "covered_start", "covered_end", "updated_at"),
+            )
@@ -1,13 +1,88 @@
 from __future__ import annotations
 
-from datetime import datetime, timezone
-from typing import Any, Dict, Iterable, List, Optional
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Dict, Iterable, List, Optional, Union
 
-from sqlalchemy import insert, select, update, or_
-from sqlalchemy.engine import Engine
+from sqlalchemy import bindparam, select, update
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.ext.asyncio import AsyncEngine
 
+from .async_support import fetch_all, fetch_first
+from .bulk import DEFAULT_CHUNK_SIZE, fetch_existing, normalize_key, upsert_rows
 from .tables import weather_observations_table
 
+WEATHER_KEY_COLUMNS = ("source", "lat", "lon", "observed_at")
+WEATHER_POINT_COLUMNS = ("lat", "lon", "observed_at")
+WEATHER_COLUMNS = [col.name for col in weather_observations_table.columns if col.name != "id"]
+WEATHER_UPDATE_COLUMNS = [
+    col for col in WEATHER_COLUMNS if col not in WEATHER_KEY_COLUMNS and col != "created_at"
+]
+# Reescribir la misma observación no la marca como modificada (la usa la materialización incremental)
+WEATHER_TOUCH_COLUMNS = ("updated_at",)
+
+# Callbacks (engine, filas) que se ejecutan tras confirmar una escritura de observaciones
+_write_listeners: List[Callable[[Engine, List[Dict[str, Any]]], None]] = []
+
+
+def add_write_listener(listener: Callable[[Engine, List[Dict[str, Any]]], None]) -> None:
+    if listener not in _write_listeners:
+        _write_listeners.append(listener)
+
+
+def notify_written(engine: Engine, rows: List[Dict[str, Any]]) -> None:
+    if not rows:
+        return
+    for listener in list(_write_listeners):
+        listener(engine, rows)
+
+
+def bulk_upsert_observations(
+    conn: Connection,
+    rows: List[Dict[str, Any]],
+    *,
+    match_source: bool = True,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+) -> Dict[str, int]:
+    """Upsert por la clave natural (source, lat, lon, observed_at) con INSERT ... ON CONFLICT.
+
+    Con ``match_source=False`` una observación existente del mismo punto y hora se
+    reescribe aunque venga de otra fuente (un registro por punto/hora).
+    """
+    if not rows:
+        return {"inserted": 0, "updated": 0}
+    key_columns = WEATHER_KEY_COLUMNS if match_source else WEATHER_POINT_COLUMNS
+    latest: Dict[tuple, Dict[str, Any]] = {}
+    for row in rows:
+        latest[normalize_key(conn, [row[col] for col in key_columns])] = row
+    existing = fetch_existing(conn, weather_observations_table, key_columns, latest.keys(), columns=("id", "source"))
+
+    to_upsert: List[Dict[str, Any]] = []
+    to_move: List[Dict[str, Any]] = []
+    for key, row in latest.items():
+        match = existing.get(key)
+        if match is not None and match[1] != row["source"]:
+            to_move.append({**row, "_id": match[0]})
+        else:
+            to_upsert.append(row)
+    upsert_rows(
+        conn,
+        weather_observations_table,
+        to_upsert,
+        conflict_columns=WEATHER_KEY_COLUMNS,
+        update_columns=WEATHER_UPDATE_COLUMNS,
+        chunk_size=chunk_size,
+        touch_columns=WEATHER_TOUCH_COLUMNS,
+    )
+    if to_move:
+        conn.execute(
+            update(weather_observations_table)
+            .where(weather_observations_table.c.id == bindparam("_id"))
+            .values({col: bindparam(col) for col in ("source", *WEATHER_UPDATE_COLUMNS)}),
+            [{k: v for k, v in row.items() if k != "created_at"} for row in to_move],
+        )
+    inserted = len(latest) - len(existing)
+    return {"inserted": inserted, "updated": len(rows) - inserted}
+
 
 class WeatherRepository:
     def __init__(self, engine: Engine):
@@ -15,35 +90,23 @@ class WeatherRepository:
             raise ValueError("engine is required")
         self.engine = engine
 
-    def upsert_many(self, observations: Iterable[Dict[str, Any]]) -> Dict[str, int]:
+    def upsert_many(
+        self,
+        observations: Iterable[Dict[str, Any]],
+        *,
+        chunk_size: int = DEFAULT_CHUNK_SIZE,
+    ) -> Dict[str, int]:
         now = datetime.now(timezone.utc)
-        inserted = 0
-        updated = 0
+        rows = []
+        for obs in observations:
+            payload = {col: obs.get(col) for col in WEATHER_COLUMNS}
+            payload["created_at"] = obs.get("created_at") or now
+            payload["updated_at"] = now
+            rows.append(payload)
         with self.engine.begin() as conn:
-            for obs in observations:
-                key_clause = (
-                    (weather_observations_table.c.source == obs["source"])
-                    & (weather_observations_table.c.lat == obs["lat"])
-                    & (weather_observations_table.c.lon == obs["lon"])
-                    & (weather_observations_table.c.observed_at == obs["observed_at"])
-                )
-                existing_id = conn.execute(
-                    select(weather_observations_table.c.id).where(key_clause)
-                ).scalar_one_or_none()
-                payload = {col.name: obs.get(col.name) for col in weather_observations_table.columns if col.name not in {"id"}}
-                payload["updated_at"] = now
-                if existing_id:
-                    conn.execute(
-                        update(weather_observations_table)
-                        .where(weather_observations_table.c.id == existing_id)
-                        .values(**payload)
-                    )
-                    updated += 1
-                else:
-                    payload.setdefault("created_at", now)
-                    conn.execute(insert(weather_observations_table).values(**payload))
-                    inserted += 1
-        return {"inserted": inserted, "updated": updated}
+            stats = bulk_upsert_observations(conn, rows, chunk_size=chunk_size)
+        notify_written(self.engine, rows)
+        return stats
 
     def get_range(
         self,
@@ -53,35 +116,75 @@ class WeatherRepository:
         end_dt: datetime,
     ) -> List[Dict[str, Any]]:
         with self.engine.begin() as conn:
-            rows = conn.execute(
-                select(weather_observations_table)
-                .where(weather_observations_table.c.lat == lat)
-                .where(weather_observations_table.c.lon == lon)
-                .where(weather_observations_table.c.observed_at >= start_dt)
-                .where(weather_observations_table.c.observed_at <= end_dt)
-                .order_by(weather_observations_table.c.observed_at)
-            ).mappings().all()
+            rows = conn.execute(weather_range_stmt(lat, lon, start_dt, end_dt)).mappings().all()
         return [dict(row) for row in rows]
+
     def get_observation_at(self, lat: float, lon: float, observed_at: datetime):
-        target_naive = observed_at
-        if observed_at.tzinfo is not None:
-            target_naive = observed_at.astimezone(timezone.utc).replace(tzinfo=None)
-        candidates = [target_naive]
-        if observed_at.tzinfo is not None:
-            candidates.append(observed_at.astimezone(timezone.utc))
-        from datetime import timedelta
-        window_start = target_naive - timedelta(minutes=1)
-        window_end = target_naive + timedelta(minutes=1)
         with self.engine.begin() as conn:
-            stmt = (
-                select(weather_observations_table)
-                .where(weather_observations_table.c.lat == lat)
-                .where(weather_observations_table.c.lon == lon)
-                .where(weather_observations_table.c.observed_at >= window_start)
-                .where(weather_observations_table.c.observed_at <= window_end)
-                .order_by(weather_observations_table.c.observed_at)
-                .limit(1)
-            )
-            row = conn.execute(stmt).mappings().first()
+            row = conn.execute(observation_at_stmt(lat, lon, observed_at)).mappings().first()
         return dict(row) if row else None
 
+    def changed_observation_times(self, since: datetime, start: datetime, end: datetime) -> List[datetime]:
+        """Instantes distintos en ``[start, end)`` con observaciones (de cualquier estación) modificadas después de ``since``."""
+        with self.engine.begin() as conn:
+            rows = conn.execute(changed_observation_times_stmt(since, start, end)).scalars().all()
+        return list(rows)
+
+
+class AsyncWeatherRepository:
+    """Lecturas de ``WeatherRepository`` para las rutas async (ver ``AsyncEventsRepository``)."""
+
+    def __init__(self, engine: Union[AsyncEngine, Engine]):
+        if engine is None:
+            raise ValueError("engine is required")
+        self.engine = engine
+
+    async def get_range(
+        self,
+        lat: float,
+        lon: float,
+        start_dt: datetime,
+        end_dt: datetime,
+    ) -> List[Dict[str, Any]]:
+        return await fetch_all(self.engine, weather_range_stmt(lat, lon, start_dt, end_dt))
+
+    async def get_observation_at(self, lat: float, lon: float, observed_at: datetime):
+        return await fetch_first(self.engine, observation_at_stmt(lat, lon, observed_at))
+
+
+def weather_range_stmt(lat: float, lon: float, start_dt: datetime, end_dt: datetime):
+    return (
+        select(weather_observations_table)
+        .where(weather_observations_table.c.lat == lat)
+        .where(weather_observations_table.c.lon == lon)
+        .where(weather_observations_table.c.observed_at >= start_dt)
+        .where(weather_observations_table.c.observed_at <= end_dt)
+        .order_by(weather_observations_table.c.observed_at)
+    )
+
+
+def changed_observation_times_stmt(since: datetime, start: datetime, end: datetime):
+    return (
+        select(weather_observations_table.c.observed_at)
+        .where(weather_observations_table.c.updated_at > since)
+        .where(weather_observations_table.c.observed_at >= start)
+        .where(weather_observations_table.c.observed_at < end)
+        .distinct()
+    )
+
+
+def observation_at_stmt(lat: float, lon: float, observed_at: datetime):
+    target_naive = observed_at
+    if observed_at.tzinfo is not None:
+        target_naive = observed_at.astimezone(timezone.utc).replace(tzinfo=None)
+    window_start = target_naive - timedelta(minutes=1)
+    window_end = target_naive + timedelta(minutes=1)
+    return (
+        select(weather_observations_table)
+        .where(weather_observations_table.c.lat == lat)
+        .where(weather_observations_table.c.lon == lon)
+        .where(weather_observations_table.c.observed_at >= window_start)
+        .where(weather_observations_table.c.observed_at <= window_end)
+        .order_by(weather_observations_table.c.observed_at)
+        .limit(1)
+    )
@@ -0,0 +1,287 @@
+from __future__ import annotations
+
+import math
+import os
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+from threading import Lock
+from time import perf_counter
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "1") != "0"
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+# Segundos; cubren desde lecturas de caché hasta un heatmap ML lento
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 34, 55)
+
+LabelValues = Tuple[str, ...]
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(str(value))}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = Lock()
+
+    def _key(self, labels: Dict[str, str]) -> LabelValues:
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    def samples(self) -> List[str]:
+        raise NotImplementedError
+
+    def render(self) -> str:
+        header = f"# HELP {self.name} {self.documentation}\n# TYPE {self.name} {self.kind}\n"
+        return header + "".join(f"{line}\n" for line in self.samples())
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels: str) -> float:
+        return self._values.get(self._key(labels), 0.0)
+
+    def items(self) -> List[Tuple[LabelValues, float]]:
+        with self._lock:
+            return list(self._values.items())
+
+    def samples(self) -> List[str]:
+        return [
+            f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}" for key, value in self.items()
+        ]
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = LATENCY_BUCKETS,
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # Por serie: recuentos por bucket (no acumulados; el último es +Inf), suma y total
+        self._series: Dict[LabelValues, Tuple[List[int], List[float]]] = {}
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = self._key(labels)
+        slot = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = ([0] * (len(self.buckets) + 1), [0.0])
+                self._series[key] = series
+            series[0][slot] += 1
+            series[1][0] += value
+
+    def count(self, **labels: str) -> int:
+        series = self._series.get(self._key(labels))
+        return sum(series[0]) if series else 0
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            snapshot = [(key, list(counts), total[0]) for key, (counts, total) in self._series.items()]
+        lines = []
+        for key, counts, total in snapshot:
+            cumulative = 0
+            for bound, count in zip((*self.buckets, math.inf), counts):
+                cumulative += count
+                le = f'le="{_format_value(bound)}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, key)} {_format_value(total)}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, key)} {cumulative}")
+        return lines
+
+
+class CacheRatioGauge(_Metric):
+    """Ratio de aciertos derivado del contador de accesos en el momento de exportar."""
+
+    kind = "gauge"
+
+    def __init__(self, name: str, documentation: str, source: Counter):
+        super().__init__(name, documentation, ("cache",))
+        self.source = source
+
+    def samples(self) -> List[str]:
+        totals: Dict[str, List[float]] = {}
+        for (cache, result), value in self.source.items():
+            hits_total = totals.setdefault(cache, [0.0, 0.0])
+            hits_total[1] += value
+            if result == "hit":
+                hits_total[0] += value
+        return [
+            f"{self.name}{_format_labels(self.labelnames, (cache,))} {_format_value(hits / total)}"
+            for cache, (hits, total) in sorted(totals.items())
+            if total
+        ]
+
+
+class Registry:
+    def __init__(self) -> None:
+        self._metrics: Dict[str, _Metric] = {}
+
+    def register(self, metric: _Metric) -> _Metric:
+        if metric.name in self._metrics:
+            raise ValueError(f"metric '{metric.name}' already registered")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def render(self) -> str:
+        return "".join(metric.render() for metric in self._metrics.values())
+
+
+REGISTRY = Registry()
+REQUEST_LATENCY = REGISTRY.register(
+    Histogram("http_request_duration_seconds", "Latencia de las peticiones HTTP.", ("method", "route", "status"))
+)
+STAGE_LATENCY = REGISTRY.register(
+    Histogram("http_request_stage_duration_seconds", "Latencia por etapa dentro de una petición.", ("route", "stage"))
+)
+REQUEST_DB_QUERIES = REGISTRY.register(
+    Histogram(
+        "http_request_db_queries",
+        "Sentencias SQL ejecutadas por petición.",
+        ("route",),
+        buckets=QUERY_COUNT_BUCKETS,
+    )
+)
+CACHE_REQUESTS = REGISTRY.register(
+    Counter("cache_requests_total", "Accesos a cachés en memoria por resultado (hit/miss).", ("cache", "result"))
+)
+CACHE_HIT_RATIO = REGISTRY.register(
+    CacheRatioGauge("cache_hit_ratio", "Aciertos / accesos de cada caché desde el arranque.", CACHE_REQUESTS)
+)
+
+
+class RequestTimings:
+    """Tiempos acumulados de una petición: etapas (``span``) y sentencias SQL."""
+
+    def __init__(self, route: str = "unmatched"):
+        self.route = route
+        self.stages: Dict[str, float] = {}
+        self.db_queries = 0
+        self.db_seconds = 0.0
+        self._lock = Lock()
+
+    def add_stage(self, name: str, seconds: float) -> None:
+        with self._lock:
+            self.stages[name] = self.stages.get(name, 0.0) + seconds
+
+    def add_query(self, seconds: float) -> None:
+        with self._lock:
+            self.db_queries += 1
+            self.db_seconds += seconds
+
+    def server_timing(self, total: Optional[float] = None) -> str:
+        """Valor de la cabecera ``Server-Timing`` (duraciones en milisegundos)."""
+        parts = [f"{name};dur={seconds * 1000:.2f}" for name, seconds in self.stages.items()]
+        parts.append(f'db;dur={self.db_seconds * 1000:.2f};desc="{self.db_queries} queries"')
+        if total is not None:
+            parts.append(f"total;dur={total * 1000:.2f}")
+        return ", ".join(parts)
+
+
+_current: ContextVar[Optional[RequestTimings]] = ContextVar("request_timings", default=None)
+
+
+def current_timings() -> Optional[RequestTimings]:
+    return _current.get()
+
+
+@contextmanager
+def track_request(route: str = "unmatched") -> Iterator[RequestTimings]:
+    timings = RequestTimings(route)
+    token = _current.set(timings)
+    try:
+        yield timings
+    finally:
+        _current.reset(token)
+
+
+@contextmanager
+def span(stage: str) -> Iterator[None]:
+    """Cronometra una etapa de la petición en curso; fuera de una petición no hace nada.
+
+    La variable de contexto llega a ``run_in_threadpool`` y a las conexiones async, así que
+    vale igual en la ruta que dentro de un servicio síncrono.
+    """
+    timings = _current.get()
+    if timings is None:
+        yield
+        return
+    started = perf_counter()
+    try:
+        yield
+    finally:
+        timings.add_stage(stage, perf_counter() - started)
+
+
+def record_cache(cache: str, hit: bool) -> None:
+    if METRICS_ENABLED:
+        CACHE_REQUESTS.inc(cache=cache, result="hit" if hit else "miss")
+
+
+def observe_request(timings: RequestTimings, method: str, status: int, seconds: float) -> None:
+    REQUEST_LATENCY.observe(seconds, method=method, route=timings.route, status=str(status))
+    REQUEST_DB_QUERIES.observe(timings.db_queries, route=timings.route)
+    for stage, stage_seconds in timings.stages.items():
+        STAGE_LATENCY.observe(stage_seconds, route=timings.route, stage=stage)
+    if timings.db_queries:
+        STAGE_LATENCY.observe(timings.db_seconds, route=timings.route, stage="db")
+
+
+def render_metrics() -> str:
+    return REGISTRY.render()
+
+
+# Un solo listener para todos los motores (los AsyncEngine ejecutan sobre un Engine síncrono)
+_QUERY_STARTED = "_metrics_query_started"
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if _current.get() is not None:
+        conn.info[_QUERY_STARTED] = perf_counter()
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    timings = _current.get()
+    started = conn.info.pop(_QUERY_STARTED, None)
+    if timings is not None and started is not None:
+        timings.add_query(perf_counter() - started)
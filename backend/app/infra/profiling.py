@@ -0,0 +1,180 @@
+from __future__ import annotations
+
+import cProfile
+import os
+import re
+import sys
+import threading
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Iterator, Optional
+from uuid import uuid4
+
+PROFILE_DIR = os.getenv("PROFILE_DIR", "profiles")
+# sample: pilas muestreadas en formato "folded" (flamegraph.pl, speedscope); cprofile: .prof de pstats
+PROFILE_MODE = os.getenv("PROFILE_MODE", "sample")
+PROFILE_MODES = ("sample", "cprofile")
+# Fracción de peticiones HTTP perfiladas (0 = ninguna)
+PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", "0"))
+# Con 1, ``?profile=1`` fuerza el perfil de esa petición (solo en entornos de confianza)
+PROFILE_QUERY_FLAG = os.getenv("PROFILE_QUERY_FLAG", "0") == "1"
+PROFILE_INTERVAL_SEC = float(os.getenv("PROFILE_INTERVAL_SEC", "0.005"))
+
+_APP_DIR = str(Path(__file__).resolve().parents[1])
+_SOURCE_ROOT = str(Path(_APP_DIR).parent)
+_UNSAFE = re.compile(r"[^A-Za-z0-9_.-]+")
+# Un solo perfil a la vez: acota el coste y evita anidar cProfile
+_slot = threading.Lock()
+
+
+@dataclass
+class Profile:
+    kind: str
+    name: str
+    identifier: str
+    mode: str
+    path: Optional[Path] = None
+    samples: int = 0
+
+
+_current: ContextVar[Optional[Profile]] = ContextVar("profile", default=None)
+
+
+def current_profile() -> Optional[Profile]:
+    return _current.get()
+
+
+def _frame_label(code) -> str:
+    filename = code.co_filename
+    if filename.startswith(_SOURCE_ROOT):
+        location = filename[len(_SOURCE_ROOT) + 1 :]
+    elif "site-packages" in filename:
+        location = filename.split("site-packages", 1)[1].lstrip("/\\")
+    else:
+        location = os.path.basename(filename)
+    return f"{code.co_name} ({location}:{code.co_firstlineno})".replace(";", ",")
+
+
+def folded_stack(frame) -> Optional[str]:
+    """Pila de raíz a hoja separada por ``;``; ``None`` si no pasa por código de ``app``.
+
+    El filtro descarta los hilos ociosos (bucle de eventos esperando, workers sin trabajo).
+    """
+    labels = []
+    in_app = False
+    while frame is not None:
+        code = frame.f_code
+        in_app = in_app or code.co_filename.startswith(_APP_DIR)
+        labels.append(_frame_label(code))
+        frame = frame.f_back
+    if not in_app:
+        return None
+    return ";".join(reversed(labels))
+
+
+class StackSampler:
+    """Muestrea las pilas de todos los hilos cada ``interval`` segundos desde un hilo aparte.
+
+    No instrumenta llamadas como cProfile: el coste es una captura por intervalo, así que
+    puede quedarse activo para una fracción del tráfico. Los procesos hijos (pool de scoring
+    en modo proceso) no se ven.
+    """
+
+    def __init__(self, interval: float = PROFILE_INTERVAL_SEC):
+        if interval <= 0:
+            raise ValueError("interval must be > 0")
+        self.interval = interval
+        self.stacks: Counter[str] = Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self) -> None:
+        own = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own:
+                    continue
+                stack = folded_stack(frame)
+                if stack:
+                    self.stacks[stack] += 1
+            self.samples += 1
+
+    def write(self, path: Path) -> None:
+        with path.open("w", encoding="utf-8") as fp:
+            for stack, count in self.stacks.most_common():
+                fp.write(f"{stack} {count}\n")
+
+
+def profile_path(directory: str | Path, kind: str, name: str, identifier: str, mode: str) -> Path:
+    stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S")
+    label = _UNSAFE.sub("_", name).strip("_") or "root"
+    extension = "folded" if mode == "sample" else "prof"
+    return Path(directory) / f"{kind}-{label}-{stamp}-{identifier}.{extension}"
+
+
+@contextmanager
+def profiling(
+    kind: str,
+    name: str,
+    *,
+    identifier: Optional[str] = None,
+    mode: str = PROFILE_MODE,
+    directory: str | Path | None = None,
+    interval: float = PROFILE_INTERVAL_SEC,
+) -> Iterator[Optional[Profile]]:
+    """Perfila el bloque y escribe ``<kind>-<name>-<fecha>-<id>.folded|.prof`` en ``PROFILE_DIR``.
+
+    Devuelve ``None`` (sin perfilar) si ya hay otro perfil en curso. ``name`` puede cambiarse
+    dentro del bloque (p. ej. con la plantilla de la ruta, que se conoce al final).
+    """
+    if mode not in PROFILE_MODES:
+        raise ValueError(f"Unknown profile mode '{mode}'")
+    if not _slot.acquire(blocking=False):
+        yield None
+        return
+    profile = Profile(kind, name, identifier or uuid4().hex[:12], mode)
+    token = _current.set(profile)
+    try:
+        if mode == "cprofile":
+            profiler = cProfile.Profile()
+            profiler.enable()
+            try:
+                yield profile
+            finally:
+                profiler.disable()
+                _write(profile, directory, profiler.dump_stats)
+        else:
+            sampler = StackSampler(interval)
+            sampler.start()
+            try:
+                yield profile
+            finally:
+                sampler.stop()
+                profile.samples = sampler.samples
+                _write(profile, directory, lambda path: sampler.write(Path(path)))
+    finally:
+        _current.reset(token)
+        _slot.release()
+
+
+def _write(profile: Profile, directory: str | Path | None, dump) -> None:
+    path = profile_path(directory or PROFILE_DIR, profile.kind, profile.name, profile.identifier, profile.mode)
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        dump(str(path))
+    except OSError as exc:
+        print(f"[profiling] WARNING: could not write profile {path} ({exc})")
+        return
+    profile.path = path
@@ -3,7 +3,7 @@ from __future__ import annotations
 import os
 from datetime import date, datetime, timedelta
 from pathlib import Path
-from typing import Optional
+from typing import List, Optional
 
 import typer
 from sqlalchemy import create_engine
@@ -15,7 +15,9 @@ from app.hub.weather_hub import WeatherHub
 from app.hub.weather_registry import WeatherProviderRegistry
 from app.infra.db.tables import metadata
 from app.jobs.export_training_dataset import export_training_dataset
+from app.jobs.instrumentation import JOB_PROFILE, PROFILE_HELP, job_run, profiled
 from app.jobs.materialize_range import materialize_range
+from app.jobs.materialize_snapshots import CENTER_HELP, Center, parse_centers
 from app.jobs.train_baseline import train_baseline
 from app.jobs.sync_weather import _DemoWeatherProvider
 from app.providers.events.base import EventsProvider, ExternalEvent
@@ -42,6 +44,8 @@ def daily_sync(
     hours: str,
     offline_weather: bool = False,
     materialize: bool = False,
+    incremental: bool = True,
+    centers: Optional[List[Center]] = None,
     train: bool = False,
     base_date: Optional[date] = None,
     engine=None,
@@ -61,71 +65,78 @@ def daily_sync(
 
     metadata.create_all(engine)
 
-    today = (base_date or datetime.now(MADRID_TZ).date())
-    start_day = today - timedelta(days=past_days)
-    end_day = today + timedelta(days=future_days)
-
-    event_hub = _build_event_hub()
-    event_stats = event_hub.sync(city=city, past_days=past_days, future_days=future_days, session=engine)
-
-    weather_hub = _build_weather_hub(offline_weather=offline_weather)
-    weather_stats = weather_hub.sync(
-        lat=lat,
-        lon=lon,
-        start=start_day,
-        end=end_day,
-        session=engine,
-        location_name=city,
-    )
-
-    snapshot_stats = None
-    if materialize:
-        snapshot_stats = materialize_range(
-            start_day.isoformat(),
-            end_day.isoformat(),
-            hours,
-            lat=lat,
-            lon=lon,
-            engine=engine,
-        )
+    with job_run("daily_sync", city=city, base_date=base_date, past_days=past_days, future_days=future_days) as run:
+        today = (base_date or datetime.now(MADRID_TZ).date())
+        start_day = today - timedelta(days=past_days)
+        end_day = today + timedelta(days=future_days)
+
+        with run.stage("events"):
+            event_hub = _build_event_hub()
+            event_stats = event_hub.sync(city=city, past_days=past_days, future_days=future_days, session=engine)
+            run.add_rows(event_stats.get("fetched", 0))
+
+        with run.stage("weather"):
+            weather_hub = _build_weather_hub(offline_weather=offline_weather)
+            weather_stats = weather_hub.sync(
+                lat=lat,
+                lon=lon,
+                start=start_day,
+                end=end_day,
+                session=engine,
+                location_name=city,
+            )
+            run.add_rows(weather_stats.get("fetched", 0))
+
+        snapshot_stats = None
+        if materialize:
+            snapshot_stats = materialize_range(
+                start_day.isoformat(),
+                end_day.isoformat(),
+                hours,
+                lat=lat,
+                lon=lon,
+                engine=engine,
+                incremental=incremental,
+                centers=centers,
+            )
 
-    dataset_stats = None
-    trained_models: list[str] = []
-    if train:
-        dataset_path = Path(dataset_path or DEFAULT_DATASET_PATH)
-        model_dir = Path(model_dir or DEFAULT_MODEL_DIR)
-        dataset_stats = export_training_dataset(
-            dataset_path,
-            start_date=start_day.isoformat(),
-            end_date=end_day.isoformat(),
-            engine=engine,
+        dataset_stats = None
+        trained_models: list[str] = []
+        if train:
+            dataset_path = Path(dataset_path or DEFAULT_DATASET_PATH)
+            model_dir = Path(model_dir or DEFAULT_MODEL_DIR)
+            dataset_stats = export_training_dataset(
+                dataset_path,
+                start_date=start_day.isoformat(),
+                end_date=end_day.isoformat(),
+                engine=engine,
+            )
+            if dataset_stats.get("rows", 0) > 50:
+                model_dir.mkdir(parents=True, exist_ok=True)
+                lead_model = model_dir / "model_lead_time.json"
+                att_model = model_dir / "model_attendance_factor.json"
+                train_baseline(dataset_path, model_out=lead_model, target_col="label_lead_time_min")
+                train_baseline(dataset_path, model_out=att_model, target_col="label_attendance_factor")
+                trained_models = [str(lead_model), str(att_model)]
+
+        summary = {
+            "city": city,
+            "base_date": today.isoformat(),
+            "start_date": start_day.isoformat(),
+            "end_date": end_day.isoformat(),
+            "events": event_stats,
+            "weather": weather_stats,
+            "snapshots": snapshot_stats,
+            "dataset": dataset_stats,
+            "models": trained_models,
+        }
+        print(
+            f"[daily_sync] base={today} city={city} range={start_day}:{end_day} "
+            f"events={event_stats} weather={weather_stats} "
+            f"snapshots={snapshot_stats if snapshot_stats else {}} "
+            f"dataset_rows={dataset_stats.get('rows') if dataset_stats else 'N/A'}"
         )
-        if dataset_stats.get("rows", 0) > 50:
-            model_dir.mkdir(parents=True, exist_ok=True)
-            lead_model = model_dir / "model_lead_time.json"
-            att_model = model_dir / "model_attendance_factor.json"
-            train_baseline(dataset_path, model_out=lead_model, target_col="label_lead_time_min")
-            train_baseline(dataset_path, model_out=att_model, target_col="label_attendance_factor")
-            trained_models = [str(lead_model), str(att_model)]
-
-    summary = {
-        "city": city,
-        "base_date": today.isoformat(),
-        "start_date": start_day.isoformat(),
-        "end_date": end_day.isoformat(),
-        "events": event_stats,
-        "weather": weather_stats,
-        "snapshots": snapshot_stats,
-        "dataset": dataset_stats,
-        "models": trained_models,
-    }
-    print(
-        f"[daily_sync] base={today} city={city} range={start_day}:{end_day} "
-        f"events={event_stats} weather={weather_stats} "
-        f"snapshots={snapshot_stats if snapshot_stats else {}} "
-        f"dataset_rows={dataset_stats.get('rows') if dataset_stats else 'N/A'}"
-    )
-    return summary
+        return summary
 
 
 @app.command()
@@ -139,21 +150,29 @@ def cli(
     base_date: Optional[str] = typer.Option(None, help="Fecha base YYYY-MM-DD"),
     offline_weather: bool = typer.Option(False, help="Forzar proveedor meteo offline"),
     materialize: bool = typer.Option(False, help="Materializar snapshots"),
+    incremental: bool = typer.Option(
+        True, "--incremental/--full", help="Materializar solo las horas con cambios desde la última ejecución"
+    ),
+    center: Optional[List[str]] = typer.Option(None, help=CENTER_HELP),
     train: bool = typer.Option(False, help="Exportar dataset y entrenar modelos"),
+    profile: bool = typer.Option(JOB_PROFILE, "--profile/--no-profile", help=PROFILE_HELP),
 ):
-    parsed_date = datetime.fromisoformat(base_date).date() if base_date else None
-    daily_sync(
-        city=city,
-        lat=lat,
-        lon=lon,
-        past_days=past_days,
-        future_days=future_days,
-        hours=hours,
-        offline_weather=offline_weather,
-        materialize=materialize,
-        train=train,
-        base_date=parsed_date,
-    )
+    with profiled("daily_sync", profile):
+        parsed_date = datetime.fromisoformat(base_date).date() if base_date else None
+        daily_sync(
+            city=city,
+            lat=lat,
+            lon=lon,
+            past_days=past_days,
+            future_days=future_days,
+            hours=hours,
+            offline_weather=offline_weather,
+            materialize=materialize,
+            incremental=incremental,
+            centers=parse_centers(center),
+            train=train,
+            base_date=parsed_date,
+        )
 
 
 def _build_event_hub() -> EventHub:
@@ -12,6 +12,7 @@ from sqlalchemy import create_engine
 
 from app.infra.db.snapshots_repository import EventFeatureSnapshotsRepository
 from app.infra.db.tables import metadata
+from app.jobs.instrumentation import JOB_PROFILE, PROFILE_HELP, job_run, profiled
 
 
 def _parse_date(value: str, end: bool = False) -> datetime:
@@ -107,85 +108,90 @@ def export_training_dataset(
     metadata.create_all(engine)
     repo = EventFeatureSnapshotsRepository(engine)
 
-    start_dt = _parse_date(start_date, end=False)
-    end_dt = _parse_date(end_date, end=True)
-    rows = repo.list_by_range(start_dt, end_dt)
-    total_rows = len(rows)
-    if limit is not None and limit >= 0:
-        rows = rows[:limit]
-
-    header = [
-        "snapshot_id",
-        "event_external_id",
-        "target_at",
-        "hour",
-        "dow",
-        "category",
-        "lat",
-        "lon",
-        "dist_km",
-        "temperature_c",
-        "precipitation_mm",
-        "rain_mm",
-        "snowfall_mm",
-        "wind_speed_kmh",
-        "wind_gust_kmh",
-        "cloud_cover_pct",
-        "humidity_pct",
-        "pressure_hpa",
-        "visibility_m",
-        "weather_code",
-        "label",
-        "label_lead_time_min",
-        "label_attendance_factor",
-    ]
-    out_path.parent.mkdir(parents=True, exist_ok=True)
-    with out_path.open("w", newline="", encoding="utf-8") as fp:
-        writer = csv.DictWriter(fp, fieldnames=header)
-        writer.writeheader()
-        for row in rows:
-            target = row["target_at"]
-            if target.tzinfo is None:
-                target = target.replace(tzinfo=timezone.utc)
-            label = row.get("expected_attendance")
-            if label is None:
-                label = row.get("score_final")
-            lead_time = _compute_label_lead_time(row)
-            attendance_factor = _compute_label_attendance_factor(row)
-            dist = _haversine_km(center_lat, center_lon, row["lat"], row["lon"])
-            writer.writerow(
-                {
-                    "snapshot_id": row.get("id"),
-                    "event_external_id": row.get("event_id"),
-                    "target_at": target.isoformat(),
-                    "hour": target.hour,
-                    "dow": target.weekday(),
-                    "category": row.get("category") or "unknown",
-                    "lat": row.get("lat"),
-                    "lon": row.get("lon"),
-                    "dist_km": round(dist, 4),
-                    "temperature_c": row.get("temperature_c"),
-                    "precipitation_mm": row.get("precipitation_mm"),
-                    "rain_mm": row.get("rain_mm"),
-                    "snowfall_mm": row.get("snowfall_mm"),
-                    "wind_speed_kmh": row.get("wind_speed_kmh"),
-                    "wind_gust_kmh": row.get("wind_gust_kmh"),
-                    "cloud_cover_pct": row.get("cloud_cover_pct"),
-                    "humidity_pct": row.get("humidity_pct"),
-                    "pressure_hpa": row.get("pressure_hpa"),
-                    "visibility_m": row.get("visibility_m"),
-                    "weather_code": row.get("weather_code"),
-                    "label": label,
-                    "label_lead_time_min": lead_time,
-                    "label_attendance_factor": attendance_factor,
-                }
-            )
-    print(
-        "[export_training_dataset] "
-        f"rows={len(rows)} total={total_rows} start={start_date} end={end_date} "
-        f"path={out_path}"
-    )
-    return {"rows": len(rows), "total": total_rows, "path": str(out_path)}
+    with job_run("export_training_dataset", start_date=start_date, end_date=end_date, limit=limit) as run:
+        start_dt = _parse_date(start_date, end=False)
+        end_dt = _parse_date(end_date, end=True)
+        with run.stage("query"):
+            rows = repo.list_by_range(start_dt, end_dt)
+            run.add_rows(len(rows))
+        total_rows = len(rows)
+        if limit is not None and limit >= 0:
+            rows = rows[:limit]
+
+        header = [
+            "snapshot_id",
+            "event_external_id",
+            "target_at",
+            "hour",
+            "dow",
+            "category",
+            "lat",
+            "lon",
+            "dist_km",
+            "temperature_c",
+            "precipitation_mm",
+            "rain_mm",
+            "snowfall_mm",
+            "wind_speed_kmh",
+            "wind_gust_kmh",
+            "cloud_cover_pct",
+            "humidity_pct",
+            "pressure_hpa",
+            "visibility_m",
+            "weather_code",
+            "label",
+            "label_lead_time_min",
+            "label_attendance_factor",
+        ]
+        with run.stage("write"):
+            out_path.parent.mkdir(parents=True, exist_ok=True)
+            with out_path.open("w", newline="", encoding="utf-8") as fp:
+                writer = csv.DictWriter(fp, fieldnames=header)
+                writer.writeheader()
+                for row in rows:
+                    target = row["target_at"]
+                    if target.tzinfo is None:
+                        target = target.replace(tzinfo=timezone.utc)
+                    label = row.get("expected_attendance")
+                    if label is None:
+                        label = row.get("score_final")
+                    lead_time = _compute_label_lead_time(row)
+                    attendance_factor = _compute_label_attendance_factor(row)
+                    dist = _haversine_km(center_lat, center_lon, row["lat"], row["lon"])
+                    writer.writerow(
+                        {
+                            "snapshot_id": row.get("id"),
+                            "event_external_id": row.get("event_id"),
+                            "target_at": target.isoformat(),
+                            "hour": target.hour,
+                            "dow": target.weekday(),
+                            "category": row.get("category") or "unknown",
+                            "lat": row.get("lat"),
+                            "lon": row.get("lon"),
+                            "dist_km": round(dist, 4),
+                            "temperature_c": row.get("temperature_c"),
+                            "precipitation_mm": row.get("precipitation_mm"),
+                            "rain_mm": row.get("rain_mm"),
+                            "snowfall_mm": row.get("snowfall_mm"),
+                            "wind_speed_kmh": row.get("wind_speed_kmh"),
+                            "wind_gust_kmh": row.get("wind_gust_kmh"),
+                            "cloud_cover_pct": row.get("cloud_cover_pct"),
+                            "humidity_pct": row.get("humidity_pct"),
+                            "pressure_hpa": row.get("pressure_hpa"),
+                            "visibility_m": row.get("visibility_m"),
+                            "weather_code": row.get("weather_code"),
+                            "label": label,
+                            "label_lead_time_min": lead_time,
+                            "label_attendance_factor": attendance_factor,
+                        }
+                    )
+            run.add_rows(len(rows))
+        print(
+            "[export_training_dataset] "
+            f"rows={len(rows)} total={total_rows} start={start_date} end={end_date} "
+            f"path={out_path}"
+        )
+        return {"rows": len(rows), "total": total_rows, "path": str(out_path)}
 
 
 def export_cli(
@@ -196,16 +202,18 @@ def export_cli(
     center_lon: float = typer.Option(-3.7038),
     limit: Optional[int] = typer.Option(None, help="Limitar filas exportadas"),
     database_url: Optional[str] = typer.Option(None, help="DATABASE_URL override"),
+    profile: bool = typer.Option(JOB_PROFILE, "--profile/--no-profile", help=PROFILE_HELP),
 ):
-    export_training_dataset(
-        out,
-        start_date,
-        end_date,
-        center_lat=center_lat,
-        center_lon=center_lon,
-        limit=limit,
-        database_url=database_url,
-    )
+    with profiled("export_training_dataset", profile):
+        export_training_dataset(
+            out,
+            start_date,
+            end_date,
+            center_lat=center_lat,
+            center_lon=center_lon,
+            limit=limit,
+            database_url=database_url,
+        )
 
 
 if __name__ == "__main__":
@@ -11,6 +11,7 @@ from sqlalchemy import create_engine
 from app.infra.db.events_repository import EventsRepository
 from app.infra.db.tables import metadata
 from app.infra.db.venues_repository import VenuesRepository
+from app.jobs.instrumentation import JOB_PROFILE, PROFILE_HELP, profiled
 
 app = typer.Typer(help="Genera eventos demo para poblar la base de datos sin depender de APIs externas")
 DEFAULT_TZ = os.getenv("DEMO_EVENTS_TZ", "Europe/Madrid")
@@ -125,16 +126,18 @@ def cli(
     future_days: int = typer.Option(7, help="Días hacia adelante"),
     per_day: int = typer.Option(10, help="Eventos por día"),
     timezone_name: str = typer.Option(DEFAULT_TZ, help="Zona horaria"),
+    profile: bool = typer.Option(JOB_PROFILE, "--profile/--no-profile", help=PROFILE_HELP),
 ):
-    generate_demo_events(
-        city=city,
-        lat=lat,
-        lon=lon,
-        past_days=past_days,
-        future_days=future_days,
-        per_day=per_day,
-        timezone_name=timezone_name,
-    )
+    with profiled("generate_demo_events", profile):
+        generate_demo_events(
+            city=city,
+            lat=lat,
+            lon=lon,
+            past_days=past_days,
+            future_days=future_days,
+            per_day=per_day,
+            timezone_name=timezone_name,
+        )
 
 
 if __name__ == "__main__":
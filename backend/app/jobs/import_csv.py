@@ -1,20 +1,70 @@
 from __future__ import annotations
 
 import csv
+import hashlib
+import json
+import multiprocessing
 import os
+import time
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime, timezone
+from itertools import islice
 from pathlib import Path
-from typing import Dict, Optional
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
 
+import typer
 from sqlalchemy import create_engine
+from sqlalchemy.engine import Engine
 
-from app.infra.db.category_rules_repository import CategoryRulesRepository
-from app.infra.db.events_repository import EventsRepository
+from app.domain.category_metadata import CategoryMetadata
+from app.infra.db.category_rules_repository import CategoryRulesRepository, get_category_metadata
+from app.infra.db.events_repository import EVENT_KEY_COLUMNS, EventsRepository, fetch_existing_events
 from app.infra.db.tables import metadata
-from app.infra.db.venues_repository import VenuesRepository
+from app.infra.db.venues_repository import VenueKey, VenuesRepository, venue_key
+from app.jobs.instrumentation import JOB_PROFILE, PROFILE_HELP, job_run, profiled
 from app.services.attendance import estimate_expected_attendance
 
 DEFAULT_DATA_DIR = Path(os.getenv('IMPORT_DATA_DIR', '/data'))
+DEFAULT_CHUNK_SIZE = int(os.getenv("IMPORT_CSV_CHUNK_SIZE", "5000"))
+DEFAULT_REJECT_FILE = os.getenv("IMPORT_CSV_REJECT_FILE", "import_csv_rejects.csv")
+DEFAULT_WORKERS = int(os.getenv("IMPORT_CSV_WORKERS", "1"))
+# Por debajo de este tamaño no compensa arrancar procesos
+MIN_SHARD_BYTES = int(os.getenv("IMPORT_CSV_MIN_SHARD_BYTES", str(1 << 20)))
+SQLITE_WORKER_TIMEOUT_SEC = 60
+
+app = typer.Typer(help="Import seed CSV files (category rules, venues, events)")
+
+CsvRow = Tuple[int, Dict[str, Any]]
+
+
+class RejectWriter:
+    """Escribe las filas descartadas (fichero, línea, error, fila original) en un CSV.
+
+    El fichero solo se crea si hay al menos un rechazo.
+    """
+
+    def __init__(self, path: Optional[Path]):
+        self.path = path
+        self.count = 0
+        self._handle = None
+        self._writer = None
+
+    def reject(self, source: Path, line: int, error: str, row: Dict[str, Any]) -> None:
+        self.count += 1
+        print(f"[import_csv] WARNING: rejected {source.name}:{line}: {error}")
+        if self.path is None:
+            return
+        if self._writer is None:
+            self._handle = self.path.open("w", newline="", encoding="utf-8")
+            self._writer = csv.writer(self._handle)
+            self._writer.writerow(["file", "line", "error", "row"])
+        self._writer.writerow([source.name, line, error, json.dumps(row, ensure_ascii=False)])
+
+    def close(self) -> None:
+        if self._handle is not None:
+            self._handle.close()
+            self._handle = None
+            self._writer = None
 
 
 def import_events_from_csv(
@@ -22,7 +72,14 @@ def import_events_from_csv(
     *,
     engine=None,
     database_url: Optional[str] = None,
-) -> None:
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    reject_file: str | Path | None = DEFAULT_REJECT_FILE,
+    workers: int = DEFAULT_WORKERS,
+) -> Dict[str, Any]:
+    if chunk_size <= 0:
+        raise ValueError("chunk_size must be > 0")
+    if workers <= 0:
+        raise ValueError("workers must be > 0")
     base_path = _resolve_data_dir(data_dir)
     venues_path = base_path / "venues_seed.csv"
     events_path = base_path / "events_seed.csv"
@@ -39,15 +96,42 @@ def import_events_from_csv(
     events_repo = EventsRepository(engine=engine, venues_repo=venues_repo)
     rules_repo = CategoryRulesRepository(engine)
 
-    rules_count = _import_category_rules(category_rules_path, rules_repo)
-    capacity_map, venues_count = _import_venues(venues_path, venues_repo)
-    rules_map = rules_repo.get_rules_map()
-    events_count = _import_events(events_path, events_repo, capacity_map, rules_map)
-    db_url = getattr(engine, "url", database_url or os.getenv("DATABASE_URL"))
-    print(
-        f"[import_csv] Import complete database={db_url} "
-        f"rules={rules_count} venues={venues_count} events={events_count}"
-    )
+    with job_run("import_csv", data_dir=str(base_path), workers=workers, chunk_size=chunk_size) as run:
+        rejects = RejectWriter(Path(reject_file) if reject_file else None)
+        try:
+            with run.stage("rules"):
+                rules_stats = _import_category_rules(category_rules_path, rules_repo, rejects, chunk_size)
+                run.add_rows(rules_stats["rows"])
+            with run.stage("venues"):
+                capacity_map, venue_ids, venues_stats = _import_venues(venues_path, venues_repo, rejects, chunk_size)
+                run.add_rows(venues_stats["rows"])
+            with run.stage("events"):
+                rules = get_category_metadata(engine)
+                if workers > 1:
+                    events_stats = _import_events_parallel(
+                        events_path, engine, capacity_map, rules, rejects, chunk_size, venue_ids, workers
+                    )
+                else:
+                    events_stats = _import_events(
+                        events_path, events_repo, capacity_map, rules, rejects, chunk_size, venue_ids
+                    )
+                run.add_rows(events_stats["rows"])
+        finally:
+            rejects.close()
+        db_url = getattr(engine, "url", database_url or os.getenv("DATABASE_URL"))
+        print(
+            f"[import_csv] Import complete database={db_url} "
+            f"rules={rules_stats['rows']} venues={venues_stats['rows']} events={events_stats['rows']} "
+            f"rejected={rejects.count}"
+            + (f" reject_file={rejects.path}" if rejects.count and rejects.path else "")
+        )
+        return {
+            "rules": rules_stats,
+            "venues": venues_stats,
+            "events": events_stats,
+            "rejected": rejects.count,
+            "reject_file": str(rejects.path) if rejects.count and rejects.path else None,
+        }
 
 
 def _resolve_data_dir(data_dir: str | Path | None) -> Path:
@@ -62,103 +146,394 @@ def _resolve_data_dir(data_dir: str | Path | None) -> Path:
     return candidate
 
 
-def _import_category_rules(path: Path, repo: CategoryRulesRepository) -> int:
-    count = 0
-    for row in _read_csv(path):
-        repo.upsert_rule(
-            {
-                "category": row["category"].strip().lower(),
-                "fill_factor": float(row["fill_factor"]),
-                "fallback_attendance": int(row["fallback_attendance"]),
-                "default_duration_min": int(row["default_duration_min"]),
-                "pre_event_min": int(row["pre_event_min"]),
-                "post_event_min": int(row["post_event_min"]),
-            }
-        )
-        count += 1
-    return count
+def _import_category_rules(
+    path: Path, repo: CategoryRulesRepository, rejects: RejectWriter, chunk_size: int
+) -> Dict[str, Any]:
+    def write(conn, rules: List[Dict[str, Any]]) -> Dict[str, int]:
+        return repo.upsert_many(rules, conn=conn)
 
+    return _stream(path, "rules", repo.engine, _parse_rule, write, rejects, chunk_size)
 
-def _import_venues(path: Path, repo: VenuesRepository) -> tuple[Dict[str, Optional[int]], int]:
+
+def _import_venues(
+    path: Path, repo: VenuesRepository, rejects: RejectWriter, chunk_size: int
+) -> Tuple[Dict[str, Optional[int]], Dict[VenueKey, int], Dict[str, Any]]:
     capacity_by_key: Dict[str, Optional[int]] = {}
-    count = 0
-    for row in _read_csv(path):
-        payload = {
-            "source": row["source"],
-            "external_id": row["external_id"] or None,
-            "name": row["name"],
-            "lat": float(row["lat"]),
-            "lon": float(row["lon"]),
-            "city": row["city"],
-            "region": row["region"] or None,
-            "country": row["country"],
-            "address_line1": row["address_line1"] or None,
-            "address_line2": row["address_line2"] or None,
-            "postal_code": row["postal_code"] or None,
-            "max_capacity": int(row["max_capacity"]) if row["max_capacity"] else None,
-        }
-        repo.upsert_venue(payload)
-        key = _venue_key(payload["source"], payload["external_id"])
-        capacity_by_key[key] = payload["max_capacity"]
-        count += 1
-    return capacity_by_key, count
+    venue_ids: Dict[VenueKey, int] = {}
+
+    def write(conn, venues: List[Dict[str, Any]]) -> Dict[str, int]:
+        for venue in venues:
+            capacity_by_key[_venue_key(venue["source"], venue["external_id"])] = venue["max_capacity"]
+        resolution = repo.resolve_many(venues, conn=conn)
+        venue_ids.update(resolution.ids)
+        return {"inserted": len(resolution.created), "updated": len(venues) - len(resolution.created)}
+
+    stats = _stream(path, "venues", repo.engine, _parse_venue, write, rejects, chunk_size)
+    return capacity_by_key, venue_ids, stats
 
 
 def _import_events(
     path: Path,
     repo: EventsRepository,
     capacity_map: Dict[str, Optional[int]],
-    rules_map: Dict[str, dict],
-) -> int:
-    count = 0
-    for row in _read_csv(path):
-        source = row["source"]
-        external_id = row["external_id"]
-        venue_external = row.get("venue_external_id") or None
-        venue_key = _venue_key(source, venue_external)
-        venue_capacity = capacity_map.get(venue_key)
-        category = row["category"].strip().lower()
-        expected_attendance = estimate_expected_attendance(category, venue_capacity, rules_map)
-        try:
-            start_dt = _parse_dt(row["start_dt"])
-            end_dt = _parse_dt(row["end_dt"])
-        except (ValueError, TypeError) as exc:
-            print(
-                f"[import_csv] WARNING: skipping event {external_id or row.get('title')} due to invalid datetime: {exc}"
-            )
+    rules: CategoryMetadata,
+    rejects: RejectWriter,
+    chunk_size: int,
+    venue_ids: Optional[Dict[VenueKey, int]] = None,
+) -> Dict[str, Any]:
+    known_venues = dict(venue_ids or {})
+
+    def parse(row: Dict[str, Any]) -> Dict[str, Any]:
+        return _parse_event(row, capacity_map, rules)
+
+    def write(conn, events: List[Dict[str, Any]]) -> Dict[str, int]:
+        _attach_venue_ids(events, repo.venues_repo, known_venues, conn)
+        return repo.upsert_many(events, chunk_size=chunk_size, conn=conn, use_copy=True)
+
+    return _stream(path, "events", repo.engine, parse, write, rejects, chunk_size)
+
+
+def _stream(
+    path: Path,
+    label: str,
+    engine,
+    parse: Callable[[Dict[str, Any]], Dict[str, Any]],
+    write: Callable[[Any, List[Dict[str, Any]]], Dict[str, int]],
+    rejects: RejectWriter,
+    chunk_size: int,
+) -> Dict[str, Any]:
+    """Lee ``path`` por bloques, valida cada fila y escribe cada bloque en una transacción."""
+    stats: Dict[str, Any] = {"rows": 0, "inserted": 0, "updated": 0, "rejected": 0}
+    started = time.perf_counter()
+    for chunk in _chunks(_read_csv(path), chunk_size):
+        parsed: List[Dict[str, Any]] = []
+        for line, row in chunk:
+            try:
+                parsed.append(parse(row))
+            except (KeyError, ValueError, TypeError) as exc:
+                stats["rejected"] += 1
+                rejects.reject(path, line, _describe(exc), row)
+        if not parsed:
             continue
-        payload = {
-            "source": source,
-            "external_id": external_id,
-            "title": row["title"],
-            "category": category,
-            "subcategory": row.get("subcategory") or None,
-            "start_dt": start_dt,
-            "end_dt": end_dt,
-            "timezone": row["timezone"],
-            "venue_external_id": venue_external,
-            "venue_name": row.get("venue_name"),
-            "lat": float(row["lat"]),
-            "lon": float(row["lon"]),
-            "status": row.get("status"),
-            "url": row.get("url"),
-            "expected_attendance": expected_attendance,
-            "popularity_score": None,
-        }
-        repo.upsert_event(payload)
-        count += 1
-    return count
+        with engine.begin() as conn:
+            written = write(conn, parsed)
+        stats["rows"] += len(parsed)
+        stats["inserted"] += written["inserted"]
+        stats["updated"] += written["updated"]
+    elapsed = time.perf_counter() - started
+    stats["elapsed_sec"] = round(elapsed, 3)
+    stats["rows_per_sec"] = round(stats["rows"] / elapsed, 1) if elapsed > 0 else float(stats["rows"])
+    print(
+        f"[import_csv] {label} rows={stats['rows']} inserted={stats['inserted']} updated={stats['updated']} "
+        f"rejected={stats['rejected']} elapsed={stats['elapsed_sec']}s rows_per_sec={stats['rows_per_sec']}"
+    )
+    return stats
+
+
+def _import_events_parallel(
+    path: Path,
+    engine: Engine,
+    capacity_map: Dict[str, Optional[int]],
+    rules: CategoryMetadata,
+    rejects: RejectWriter,
+    chunk_size: int,
+    venue_ids: Dict[VenueKey, int],
+    workers: int,
+) -> Dict[str, Any]:
+    """Importa ``path`` en paralelo repartiendo rangos de bytes (alineados a línea) entre procesos.
+
+    Cada worker parsea, normaliza y escribe su shard. Si una misma (source,
+    external_id) aparece en varios shards, al final se reaplica su última aparición
+    en el fichero, así que el resultado es el mismo que el de la importación secuencial.
+    Requiere una fila por línea física (sin saltos de línea dentro de campos entrecomillados).
+    """
+    database_url = engine.url.render_as_string(hide_password=False)
+    if engine.url.get_backend_name() == "sqlite" and engine.url.database in (None, "", ":memory:"):
+        raise ValueError("parallel import needs a file-backed or server database")
+    started = time.perf_counter()
+    shards = _byte_shards(path, workers)
+    print(f"[import_csv] events workers={workers} shards={len(shards)}")
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=min(workers, len(shards)), mp_context=context) as pool:
+        futures = [
+            pool.submit(
+                _import_shard,
+                database_url,
+                str(path),
+                shard,
+                capacity_map,
+                rules,
+                venue_ids,
+                chunk_size,
+            )
+            for shard in shards
+        ]
+        results = [future.result() for future in futures]
+
+    stats: Dict[str, Any] = {"rows": 0, "inserted": 0, "updated": 0, "rejected": 0}
+    seen: Dict[int, List[Tuple[int, bool]]] = {}
+    lines_before = 1  # cabecera
+    for result in results:
+        for key in ("rows", "inserted", "updated"):
+            stats[key] += result[key]
+        for local_line, error, row in result["rejects"]:
+            stats["rejected"] += 1
+            rejects.reject(path, lines_before + local_line, error, row)
+        lines_before += result["lines"]
+        for digest, (offset, inserted) in result["keys"].items():
+            seen.setdefault(digest, []).append((offset, inserted))
+
+    duplicated = {digest: hits for digest, hits in seen.items() if len(hits) > 1}
+    if duplicated:
+        # Solo una de las escrituras concurrentes de una clave pudo insertar de verdad
+        for hits in duplicated.values():
+            overcounted = max(sum(1 for _, inserted in hits if inserted) - 1, 0)
+            stats["inserted"] -= overcounted
+            stats["updated"] += overcounted
+        winners = sorted(max(offset for offset, _ in hits) for hits in duplicated.values())
+        _reapply_lines(path, winners, engine, capacity_map, rules, venue_ids, chunk_size)
+    elapsed = time.perf_counter() - started
+    stats["elapsed_sec"] = round(elapsed, 3)
+    stats["rows_per_sec"] = round(stats["rows"] / elapsed, 1) if elapsed > 0 else float(stats["rows"])
+    stats["workers"] = workers
+    stats["cross_shard_duplicates"] = len(duplicated)
+    print(
+        f"[import_csv] events rows={stats['rows']} inserted={stats['inserted']} updated={stats['updated']} "
+        f"rejected={stats['rejected']} cross_shard_duplicates={len(duplicated)} "
+        f"elapsed={stats['elapsed_sec']}s rows_per_sec={stats['rows_per_sec']}"
+    )
+    return stats
+
+
+def _import_shard(
+    database_url: str,
+    path: str,
+    shard: Tuple[int, int],
+    capacity_map: Dict[str, Optional[int]],
+    rules: CategoryMetadata,
+    venue_ids: Dict[VenueKey, int],
+    chunk_size: int,
+) -> Dict[str, Any]:
+    connect_args = {"timeout": SQLITE_WORKER_TIMEOUT_SEC} if database_url.startswith("sqlite") else {}
+    engine = create_engine(database_url, future=True, connect_args=connect_args)
+    repo = EventsRepository(engine)
+    known_venues = dict(venue_ids)
+    result: Dict[str, Any] = {"rows": 0, "inserted": 0, "updated": 0, "lines": 0, "rejects": [], "keys": {}}
+    keys: Dict[int, Tuple[int, bool]] = result["keys"]
+    try:
+        lines = _read_shard(Path(path), shard)
+        for chunk in _chunks(lines, chunk_size):
+            parsed: List[Dict[str, Any]] = []
+            offsets: List[int] = []
+            for local_line, offset, row in chunk:
+                result["lines"] = local_line
+                if row is None:
+                    continue
+                try:
+                    parsed.append(_parse_event(row, capacity_map, rules))
+                    offsets.append(offset)
+                except (KeyError, ValueError, TypeError) as exc:
+                    result["rejects"].append((local_line, _describe(exc), row))
+            if not parsed:
+                continue
+            chunk_keys = [tuple(event[col] for col in EVENT_KEY_COLUMNS) for event in parsed]
+            with engine.begin() as conn:
+                existing = fetch_existing_events(conn, set(chunk_keys))
+                _attach_venue_ids(parsed, repo.venues_repo, known_venues, conn)
+                written = repo.upsert_many(parsed, chunk_size=chunk_size, conn=conn, use_copy=True, existing=existing)
+            result["rows"] += len(parsed)
+            result["inserted"] += written["inserted"]
+            result["updated"] += written["updated"]
+            for key, offset in zip(chunk_keys, offsets):
+                digest = _key_digest(key)
+                already_inserted = keys[digest][1] if digest in keys else False
+                keys[digest] = (offset, already_inserted or key not in existing)
+    finally:
+        engine.dispose()
+    return result
+
+
+def _reapply_lines(
+    path: Path,
+    offsets: List[int],
+    engine: Engine,
+    capacity_map: Dict[str, Optional[int]],
+    rules: CategoryMetadata,
+    venue_ids: Dict[VenueKey, int],
+    chunk_size: int,
+) -> None:
+    fieldnames = _header(path)
+    events: List[Dict[str, Any]] = []
+    with path.open("rb") as handle:
+        for offset in offsets:
+            handle.seek(offset)
+            events.append(_parse_event(_decode_row(fieldnames, handle.readline()), capacity_map, rules))
+    repo = EventsRepository(engine)
+    for chunk in _chunks(events, chunk_size):
+        with engine.begin() as conn:
+            _attach_venue_ids(chunk, repo.venues_repo, dict(venue_ids), conn)
+            repo.upsert_many(chunk, chunk_size=chunk_size, conn=conn, use_copy=True)
+
+
+def _byte_shards(path: Path, count: int) -> List[Tuple[int, int]]:
+    """Parte el fichero (sin cabecera) en ``count`` rangos [inicio, fin) alineados a inicio de línea."""
+    size = path.stat().st_size
+    with path.open("rb") as handle:
+        handle.readline()
+        data_start = handle.tell()
+        count = max(1, min(count, (size - data_start) // MIN_SHARD_BYTES or 1))
+        boundaries = [data_start]
+        for idx in range(1, count):
+            handle.seek(data_start + (size - data_start) * idx // count)
+            handle.readline()
+            boundaries.append(max(handle.tell(), boundaries[-1]))
+        boundaries.append(size)
+    return [(start, end) for start, end in zip(boundaries, boundaries[1:]) if end > start]
+
+
+def _read_shard(path: Path, shard: Tuple[int, int]) -> Iterator[Tuple[int, int, Optional[Dict[str, Any]]]]:
+    fieldnames = _header(path)
+    start, end = shard
+    local_line = 0
+    with path.open("rb") as handle:
+        handle.seek(start)
+        while handle.tell() < end:
+            offset = handle.tell()
+            raw = handle.readline()
+            if not raw:
+                break
+            local_line += 1
+            yield local_line, offset, (_decode_row(fieldnames, raw) if raw.strip() else None)
+
+
+def _header(path: Path) -> List[str]:
+    with path.open("rb") as handle:
+        return next(csv.reader([handle.readline().decode("utf-8")]))
+
+
+def _decode_row(fieldnames: List[str], raw: bytes) -> Dict[str, Any]:
+    values = next(csv.reader([raw.decode("utf-8")]), [])
+    row = dict(zip(fieldnames, values))
+    for name in fieldnames[len(values) :]:
+        row[name] = None
+    return {k: (v.strip() if isinstance(v, str) else v) for k, v in row.items()}
+
+
+def _key_digest(key: Tuple[Any, ...]) -> int:
+    digest = hashlib.blake2b("\x1f".join(str(part) for part in key).encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "big")
+
+
+def _parse_rule(row: Dict[str, Any]) -> Dict[str, Any]:
+    category = _required(row, "category").lower()
+    return {
+        "category": category,
+        "fill_factor": float(row["fill_factor"]),
+        "fallback_attendance": int(row["fallback_attendance"]),
+        "default_duration_min": int(row["default_duration_min"]),
+        "pre_event_min": int(row["pre_event_min"]),
+        "post_event_min": int(row["post_event_min"]),
+    }
+
+
+def _parse_venue(row: Dict[str, Any]) -> Dict[str, Any]:
+    payload = {
+        "source": _required(row, "source"),
+        "external_id": row["external_id"] or None,
+        "name": _required(row, "name"),
+        "lat": float(row["lat"]),
+        "lon": float(row["lon"]),
+        "city": row["city"],
+        "region": row["region"] or None,
+        "country": row["country"],
+        "address_line1": row["address_line1"] or None,
+        "address_line2": row["address_line2"] or None,
+        "postal_code": row["postal_code"] or None,
+        "max_capacity": int(row["max_capacity"]) if row["max_capacity"] else None,
+    }
+    if venue_key(payload) is None:
+        raise ValueError("venue needs external_id or city")
+    return payload
+
+
+def _parse_event(
+    row: Dict[str, Any],
+    capacity_map: Dict[str, Optional[int]],
+    rules: CategoryMetadata,
+) -> Dict[str, Any]:
+    source = _required(row, "source")
+    venue_external = row.get("venue_external_id") or None
+    venue_capacity = capacity_map.get(_venue_key(source, venue_external))
+    category = row["category"].strip().lower()
+    return {
+        "source": source,
+        "external_id": _required(row, "external_id"),
+        "title": _required(row, "title"),
+        "category": category,
+        "subcategory": row.get("subcategory") or None,
+        "start_dt": _parse_dt(row["start_dt"]),
+        "end_dt": _parse_dt(row["end_dt"]),
+        "timezone": row["timezone"],
+        "venue_external_id": venue_external,
+        "venue_name": row.get("venue_name"),
+        "lat": float(row["lat"]),
+        "lon": float(row["lon"]),
+        "status": row.get("status"),
+        "url": row.get("url"),
+        "expected_attendance": estimate_expected_attendance(category, venue_capacity, rules),
+        "popularity_score": None,
+    }
+
+
+def _attach_venue_ids(
+    payloads: List[Dict[str, Any]],
+    venues_repo: VenuesRepository,
+    venue_ids: Dict[VenueKey, int],
+    conn=None,
+) -> None:
+    # Los venues que no vienen en el seed se buscan de una vez con un IN, no por evento
+    keys = [venue_key({"source": p["source"], "external_id": p["venue_external_id"]}) for p in payloads]
+    missing = [{"source": key[1], "external_id": key[2]} for key in set(keys) if key and key not in venue_ids]
+    if missing:
+        venue_ids.update(venues_repo.resolve_many(missing, create_missing=False, conn=conn).ids)
+    for payload, key in zip(payloads, keys):
+        payload["venue_id"] = venue_ids.get(key) if key else None
+        # Sin venue resuelto no hace falta que upsert_event repita la búsqueda
+        payload.pop("venue_external_id", None)
+        payload.pop("venue_name", None)
 
 
 def _venue_key(source: str, external_id: Optional[str]) -> str:
     return f"{source}:{external_id or ''}"
 
 
-def _read_csv(path: Path):
+def _required(row: Dict[str, Any], column: str) -> str:
+    value = row.get(column)
+    if not value:
+        raise ValueError(f"missing {column}")
+    return value
+
+
+def _describe(exc: Exception) -> str:
+    if isinstance(exc, KeyError):
+        return f"missing column {exc.args[0]}"
+    return str(exc) or exc.__class__.__name__
+
+
+def _chunks(rows: Iterable[CsvRow], size: int) -> Iterator[List[CsvRow]]:
+    iterator = iter(rows)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def _read_csv(path: Path) -> Iterator[CsvRow]:
     with path.open(newline="", encoding="utf-8") as handle:
         reader = csv.DictReader(handle)
         for row in reader:
-            yield {k: (v.strip() if isinstance(v, str) else v) for k, v in row.items()}
+            yield reader.line_num, {k: (v.strip() if isinstance(v, str) else v) for k, v in row.items()}
 
 
 def _parse_dt(value: str) -> datetime:
@@ -167,7 +542,19 @@ def _parse_dt(value: str) -> datetime:
         dt = dt.astimezone(timezone.utc).replace(tzinfo=None)
     return dt
 
+
+@app.command()
+def run(
+    data_dir: Optional[Path] = typer.Argument(None, help="Directory with the *_seed.csv files"),
+    chunk_size: int = typer.Option(DEFAULT_CHUNK_SIZE, help="Rows written per transaction"),
+    reject_file: str = typer.Option(DEFAULT_REJECT_FILE, help="CSV file for rejected rows (empty to disable)"),
+    workers: int = typer.Option(DEFAULT_WORKERS, help="Worker processes for the events file (byte-range shards)"),
+    profile: bool = typer.Option(JOB_PROFILE, "--profile/--no-profile", help=PROFILE_HELP),
+):
+    """CLI entrypoint for importing the seed CSV files."""
+    with profiled("import_csv", profile):
+        import_events_from_csv(data_dir, chunk_size=chunk_size, reject_file=reject_file or None, workers=workers)
+
+
 if __name__ == "__main__":
-    import sys
-    data_arg = Path(sys.argv[1]) if len(sys.argv) > 1 else None
-    import_events_from_csv(data_arg)
+    app()
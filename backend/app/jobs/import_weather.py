@@ -12,6 +12,7 @@ from sqlalchemy import create_engine
 from app.infra.db.tables import metadata
 from app.infra.db.weather_repository import WeatherRepository
 from app.infra.weather.open_meteo_client import OpenMeteoClient
+from app.jobs.instrumentation import JOB_PROFILE, PROFILE_HELP, profiled
 
 app = typer.Typer(help="Importa observaciones meteorológicas horarias desde Open-Meteo o dataset offline")
 
@@ -70,9 +71,11 @@ def run(
     end_date: str = typer.Option(..., help="Fecha fin YYYY-MM-DD"),
     location_name: Optional[str] = typer.Option(None, help="Nombre descriptivo de la localización"),
     offline: bool = typer.Option(False, "--offline", "--from-file", help="Generar dataset sintético"),
+    profile: bool = typer.Option(JOB_PROFILE, "--profile/--no-profile", help=PROFILE_HELP),
 ):
     """Importa datos meteorológicos entre start_date y end_date (incluido)"""
-    import_weather(lat, lon, start_date, end_date, location_name=location_name, offline=offline)
+    with profiled("import_weather", profile):
+        import_weather(lat, lon, start_date, end_date, location_name=location_name, offline=offline)
 
 
 def _generate_offline_observations(
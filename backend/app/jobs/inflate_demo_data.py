@@ -8,6 +8,7 @@ from typing import Optional
 import typer
 from sqlalchemy import create_engine
 
+from app.jobs.instrumentation import JOB_PROFILE, PROFILE_HELP, profiled
 from app.jobs.generate_demo_events import generate_demo_events
 from app.jobs.materialize_range import materialize_range
 from app.jobs.sync_weather import sync_weather
@@ -129,18 +130,20 @@ def cli(
     hours: str = typer.Option("0-23", help="Horas a materializar"),
     dataset_path: Optional[Path] = typer.Option(None, dir_okay=False, help="Ruta dataset"),
     model_dir: Optional[Path] = typer.Option(None, help="Ruta modelos"),
+    profile: bool = typer.Option(JOB_PROFILE, "--profile/--no-profile", help=PROFILE_HELP),
 ):
-    inflate_demo_data(
-        city=city,
-        lat=lat,
-        lon=lon,
-        past_days=past_days,
-        future_days=future_days,
-        per_day=per_day,
-        hours=hours,
-        dataset_path=dataset_path,
-        model_dir=model_dir,
-    )
+    with profiled("inflate_demo_data", profile):
+        inflate_demo_data(
+            city=city,
+            lat=lat,
+            lon=lon,
+            past_days=past_days,
+            future_days=future_days,
+            per_day=per_day,
+            hours=hours,
+            dataset_path=dataset_path,
+            model_dir=model_dir,
+        )
 
 
 if __name__ == "__main__":
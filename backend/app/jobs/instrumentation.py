@@ -0,0 +1,293 @@
+from __future__ import annotations
+
+import json
+import os
+import platform
+import statistics
+import sys
+from contextlib import contextmanager, nullcontext
+from contextvars import ContextVar
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from pathlib import Path
+from time import perf_counter
+from typing import Any, Dict, Iterator, List, Optional
+
+import typer
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from app.infra.db.query_counter import count_queries
+from app.infra.profiling import current_profile, profiling
+
+try:
+    import resource
+except ImportError:  # pragma: no cover - Windows
+    resource = None
+
+# Fichero JSON Lines donde cada ejecución de un job añade su registro; vacío = solo la línea [job_run]
+JOB_RUN_LOG = os.getenv("JOB_RUN_LOG", "")
+# Con 1 el registro incluye las sentencias repetidas por fila (N+1) detectadas durante el job
+JOB_SQL_PROFILE = os.getenv("JOB_SQL_PROFILE", "0") == "1"
+# Valor por defecto de --profile en las CLIs de app/jobs (p. ej. para activarlo desde cron)
+JOB_PROFILE = os.getenv("JOB_PROFILE", "0") == "1"
+PROFILE_HELP = "Perfila la ejecución y escribe el fichero en PROFILE_DIR (PROFILE_MODE=sample|cprofile)"
+
+app = typer.Typer(help="Informe de las ejecuciones registradas en JOB_RUN_LOG")
+
+
+def peak_rss_mb() -> Optional[float]:
+    """Pico de memoria residente del proceso (y de sus hijos ya terminados, p. ej. workers de import_csv)."""
+    if resource is None:
+        return None
+    peak = max(
+        resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+        resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss,
+    )
+    # ru_maxrss va en KiB en Linux y en bytes en macOS
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+@dataclass
+class StageStats:
+    name: str
+    seconds: float = 0.0
+    calls: int = 0
+    rows: int = 0
+    db_statements: int = 0
+    peak_rss_mb: Optional[float] = None
+
+    @property
+    def rows_per_sec(self) -> Optional[float]:
+        if not self.rows or self.seconds <= 0:
+            return None
+        return round(self.rows / self.seconds, 1)
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "seconds": round(self.seconds, 4),
+            "calls": self.calls,
+            "rows": self.rows,
+            "rows_per_sec": self.rows_per_sec,
+            "db_statements": self.db_statements,
+            "peak_rss_mb": self.peak_rss_mb,
+        }
+
+
+class JobRun:
+    """Registro de una ejecución: etapas con tiempo de pared, filas, sentencias SQL y RSS pico.
+
+    Las etapas con el mismo nombre se acumulan (p. ej. una por día u hora procesada). Un job
+    lanzado dentro de otro (``materialize_range`` desde ``daily_sync``) no genera registro
+    propio: aparece como etapa del padre y sus etapas llevan su nombre como prefijo.
+    """
+
+    def __init__(self, job: str, params: Optional[Dict[str, Any]] = None):
+        self.job = job
+        self.params = params or {}
+        self.started_at = datetime.now(timezone.utc)
+        self.stages: Dict[str, StageStats] = {}
+        self.rows = 0
+        self.db_statements = 0
+        self._started = perf_counter()
+        self._open: List[StageStats] = []
+        self._prefix = ""
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[StageStats]:
+        full_name = self._prefix + name
+        stats = self.stages.get(full_name)
+        if stats is None:
+            stats = self.stages[full_name] = StageStats(full_name)
+        self._open.append(stats)
+        started = perf_counter()
+        try:
+            yield stats
+        finally:
+            stats.seconds += perf_counter() - started
+            stats.calls += 1
+            stats.peak_rss_mb = peak_rss_mb()
+            self._open.pop()
+
+    def add_rows(self, count: int) -> None:
+        """Filas procesadas por la etapa abierta más interna (o por el job si no hay ninguna)."""
+        if self._open:
+            self._open[-1].rows += count
+        else:
+            self.rows += count
+
+    def count_statement(self) -> None:
+        self.db_statements += 1
+        for stats in self._open:
+            stats.db_statements += 1
+
+    def finish(self, status: str = "ok", error: Optional[str] = None) -> Dict[str, Any]:
+        elapsed = perf_counter() - self._started
+        return {
+            "job": self.job,
+            "status": status,
+            "error": error,
+            "started_at": self.started_at.isoformat(),
+            "finished_at": datetime.now(timezone.utc).isoformat(),
+            "elapsed_sec": round(elapsed, 4),
+            "rows": self.rows,
+            "rows_per_sec": round(self.rows / elapsed, 1) if self.rows and elapsed > 0 else None,
+            "db_statements": self.db_statements,
+            "peak_rss_mb": peak_rss_mb(),
+            "host": platform.node(),
+            "pid": os.getpid(),
+            "params": self.params,
+            "stages": [stats.as_dict() for stats in self.stages.values()],
+        }
+
+
+_active: ContextVar[Optional[JobRun]] = ContextVar("job_run", default=None)
+
+
+def current_run() -> Optional[JobRun]:
+    return _active.get()
+
+
+@contextmanager
+def job_run(job: str, *, log_path: Optional[str] = None, **params: Any) -> Iterator[JobRun]:
+    """Instrumenta un job; al terminar imprime ``[job_run]`` y añade el registro a ``JOB_RUN_LOG``."""
+    parent = _active.get()
+    if parent is not None:
+        with parent.stage(job):
+            outer_prefix = parent._prefix
+            parent._prefix = f"{outer_prefix}{job}."
+            try:
+                yield parent
+            finally:
+                parent._prefix = outer_prefix
+        return
+
+    run = JobRun(job, params)
+    token = _active.set(run)
+    status, error = "ok", None
+    queries = None
+    try:
+        with count_queries() if JOB_SQL_PROFILE else nullcontext() as queries:
+            yield run
+    except BaseException as exc:
+        status, error = "error", f"{type(exc).__name__}: {exc}"
+        raise
+    finally:
+        _active.reset(token)
+        record = run.finish(status, error)
+        profile = current_profile()
+        if profile is not None:
+            record["profile_id"] = profile.identifier
+        if queries is not None:
+            record["n_plus_one"] = [{"sql": sql, "count": count} for sql, count in queries.n_plus_one()]
+        print(_summary_line(record))
+        write_run_log(record, log_path if log_path is not None else JOB_RUN_LOG)
+
+
+@contextmanager
+def profiled(job: str, enabled: bool) -> Iterator[None]:
+    """Envuelve una CLI: con ``--profile`` perfila todo el job e imprime dónde quedó el fichero."""
+    if not enabled:
+        yield
+        return
+    with profiling("job", job) as profile:
+        yield
+    if profile is not None and profile.path is not None:
+        print(f"[profiling] job={job} id={profile.identifier} path={profile.path}")
+
+
+def write_run_log(record: Dict[str, Any], path: Optional[str]) -> None:
+    if not path:
+        return
+    log_file = Path(path)
+    log_file.parent.mkdir(parents=True, exist_ok=True)
+    with log_file.open("a", encoding="utf-8") as fp:
+        fp.write(json.dumps(record, default=str, ensure_ascii=False) + "\n")
+
+
+def read_run_log(path: str | Path, job: Optional[str] = None) -> List[Dict[str, Any]]:
+    records = []
+    with Path(path).open(encoding="utf-8") as fp:
+        for line in fp:
+            line = line.strip()
+            if not line:
+                continue
+            record = json.loads(line)
+            if job is None or record.get("job") == job:
+                records.append(record)
+    return records
+
+
+def compare_runs(records: List[Dict[str, Any]], baseline_runs: int = 10) -> List[Dict[str, Any]]:
+    """Última ejecución correcta frente a la mediana de las ``baseline_runs`` anteriores, por etapa."""
+    ok = [record for record in records if record.get("status") == "ok"]
+    if not ok:
+        return []
+    latest, history = ok[-1], ok[-1 - baseline_runs : -1]
+    rows = []
+    for name, seconds in [("total", latest["elapsed_sec"])] + [
+        (stage["name"], stage["seconds"]) for stage in latest["stages"]
+    ]:
+        previous = [_stage_seconds(record, name) for record in history]
+        previous = [value for value in previous if value is not None]
+        baseline = statistics.median(previous) if previous else None
+        rows.append(
+            {
+                "stage": name,
+                "seconds": seconds,
+                "baseline": baseline,
+                "ratio": round(seconds / baseline, 2) if baseline else None,
+            }
+        )
+    return rows
+
+
+def _stage_seconds(record: Dict[str, Any], name: str) -> Optional[float]:
+    if name == "total":
+        return record.get("elapsed_sec")
+    for stage in record.get("stages", []):
+        if stage["name"] == name:
+            return stage["seconds"]
+    return None
+
+
+def _summary_line(record: Dict[str, Any]) -> str:
+    stages = " ".join(
+        f"{stage['name']}={stage['seconds']:.2f}s"
+        + (f"/{stage['rows_per_sec']}rps" if stage["rows_per_sec"] is not None else "")
+        for stage in record["stages"]
+    )
+    return (
+        f"[job_run] job={record['job']} status={record['status']} elapsed={record['elapsed_sec']:.2f}s "
+        f"db_statements={record['db_statements']} peak_rss_mb={record['peak_rss_mb']}"
+        + (f" {stages}" if stages else "")
+    )
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _count_statement(conn, cursor, statement, parameters, context, executemany):
+    run = _active.get()
+    if run is not None:
+        run.count_statement()
+
+
+@app.command()
+def report(
+    log: Path = typer.Option(Path(JOB_RUN_LOG) if JOB_RUN_LOG else ..., help="Fichero JSON Lines de ejecuciones"),
+    job: str = typer.Option(..., help="Job a comparar (p. ej. daily_sync)"),
+    baseline_runs: int = typer.Option(10, help="Ejecuciones anteriores que forman la referencia"),
+):
+    """Compara la última ejecución de ``job`` con la mediana de las anteriores, etapa a etapa."""
+    rows = compare_runs(read_run_log(log, job), baseline_runs)
+    if not rows:
+        print(f"[job_run] no successful runs for job={job} in {log}")
+        return
+    for row in rows:
+        baseline = f"{row['baseline']:.2f}s" if row["baseline"] is not None else "-"
+        ratio = f"{row['ratio']:.2f}" if row["ratio"] is not None else "-"
+        print(f"[job_run] {row['stage']} last={row['seconds']:.2f}s baseline={baseline} ratio={ratio}")
+
+
+if __name__ == "__main__":
+    app()
@@ -0,0 +1,123 @@
+from __future__ import annotations
+
+import os
+from datetime import timedelta
+from time import perf_counter
+from typing import List, Optional, Sequence
+
+import typer
+from sqlalchemy import create_engine
+
+from app.infra.db.heatmap_tiles_repository import HeatmapTilesRepository, TileKey
+from app.infra.db.tables import metadata
+from app.jobs.instrumentation import JOB_PROFILE, PROFILE_HELP, job_run, profiled
+from app.jobs.materialize_range import _parse_date, _parse_hours
+from app.services.heatmap import ModelUnavailableError, build_heatmap_payload, load_ml_models
+
+MODES = ("heuristic", "ml")
+
+
+def materialize_heatmap_tiles(
+    start_date: str,
+    end_date: str,
+    hours: str = "0-23",
+    *,
+    lat: float = 40.4168,
+    lon: float = -3.7038,
+    cities: Sequence[Optional[str]] = (None,),
+    modes: Sequence[str] = ("heuristic",),
+    engine=None,
+    database_url: Optional[str] = None,
+) -> dict:
+    """Precalcula las respuestas de ``GET /api/heatmap`` en ``heatmap_tiles`` por (día, hora, ciudad, modo)."""
+    start = _parse_date(start_date)
+    end = _parse_date(end_date)
+    if end < start:
+        start, end = end, start
+    hours_list = _parse_hours(hours)
+    if not hours_list:
+        raise typer.BadParameter("No hours provided")
+    unknown = [mode for mode in modes if mode not in MODES]
+    if unknown:
+        raise typer.BadParameter(f"Unknown mode(s): {', '.join(unknown)}")
+
+    if engine is None:
+        if database_url is None:
+            database_url = os.getenv("DATABASE_URL")
+        if not database_url:
+            raise RuntimeError("DATABASE_URL required if engine not provided")
+        engine = create_engine(database_url, future=True)
+    metadata.create_all(engine, tables=[metadata.tables["heatmap_tiles"]])
+    repo = HeatmapTilesRepository(engine)
+
+    active_modes = list(modes)
+    if "ml" in active_modes:
+        try:
+            load_ml_models()
+        except ModelUnavailableError as exc:
+            print(f"[materialize_heatmap_tiles] WARNING: skipping mode=ml: {exc.detail}")
+            active_modes.remove("ml")
+
+    with job_run("materialize_heatmap_tiles", start_date=start_date, end_date=end_date, hours=hours) as run:
+        start_time = perf_counter()
+        written = 0
+        day_count = 0
+        current = start
+        while current <= end:
+            with run.stage("build"):
+                tiles = [
+                    (
+                        TileKey.build(current, hour, lat, lon, city, mode),
+                        build_heatmap_payload(engine, current, hour, lat, lon, city=city, mode=mode),
+                    )
+                    for mode in active_modes
+                    for city in cities
+                    for hour in hours_list
+                ]
+                run.add_rows(len(tiles))
+            with run.stage("write"):
+                written += repo.upsert_tiles(tiles)
+            day_count += 1
+            current += timedelta(days=1)
+
+        elapsed = perf_counter() - start_time
+        summary = {
+            "days": day_count,
+            "hours_per_day": len(hours_list),
+            "tiles": written,
+            "modes": active_modes,
+            "elapsed_sec": elapsed,
+        }
+        print(
+            f"[materialize_heatmap_tiles] days={day_count} hours_per_day={len(hours_list)} "
+            f"tiles={written} modes={','.join(active_modes) or '-'} elapsed={elapsed:.2f}s"
+        )
+        return summary
+
+
+def cli(
+    start_date: str = typer.Option(..., help="Fecha inicio YYYY-MM-DD"),
+    end_date: str = typer.Option(..., help="Fecha fin YYYY-MM-DD"),
+    hours: str = typer.Option("0-23", help="Horas a procesar (ej. 18-23 o 18,19,20)"),
+    lat: float = typer.Option(40.4168),
+    lon: float = typer.Option(-3.7038),
+    city: List[str] = typer.Option([], help="Ciudades a precalcular (repetible; por defecto sin filtro)"),
+    mode: List[str] = typer.Option(["heuristic"], help="Modos a precalcular: heuristic y/o ml"),
+    database_url: Optional[str] = typer.Option(None, help="Override DATABASE_URL"),
+    profile: bool = typer.Option(JOB_PROFILE, "--profile/--no-profile", help=PROFILE_HELP),
+):
+    with profiled("materialize_heatmap_tiles", profile):
+        materialize_heatmap_tiles(
+            start_date=start_date,
+            end_date=end_date,
+            hours=hours,
+            lat=lat,
+            lon=lon,
+            cities=city or [None],
+            modes=mode,
+            database_url=database_url,
+        )
+
+
+if __name__ == "__main__":
+    typer.run(cli)
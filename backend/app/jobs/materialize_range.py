@@ -1,14 +1,33 @@
 from __future__ import annotations
 
 import os
-from datetime import date, datetime, timedelta
+from datetime import date, datetime, time, timedelta, timezone
 from time import perf_counter
-from typing import List, Optional
+from typing import Iterable, List, Optional, Sequence, Set, Tuple
 
 import typer
 from sqlalchemy import create_engine
 
-from app.jobs.materialize_snapshots import materialize_snapshots
+from app.infra.db.category_rules_repository import CategoryRulesRepository
+from app.infra.db.events_repository import EventsRepository
+from app.infra.db.tables import metadata
+from app.infra.db.watermarks_repository import Watermark, WatermarksRepository
+from app.infra.db.weather_repository import WeatherRepository
+from app.jobs.instrumentation import JOB_PROFILE, PROFILE_HELP, job_run, profiled
+from app.jobs.materialize_snapshots import (
+    CENTER_HELP,
+    EVENT_WINDOW,
+    Center,
+    _to_utc_naive,
+    materialize_snapshots,
+    materialize_snapshots_multi,
+    parse_centers,
+)
+from app.services.weather_index import MAX_TEMPORAL_GAP
+
+WATERMARK_JOB = "materialize_range"
+
+Target = Tuple[date, int]
 
 
 def _parse_date(value: str) -> date:
@@ -40,6 +59,68 @@ def _validate_hour(hour: int) -> int:
     return hour
 
 
+def watermark_scope(
+    lat: float,
+    lon: float,
+    radius_km: float,
+    hours: Iterable[int],
+    centers: Optional[Sequence[Center]] = None,
+) -> str:
+    if centers:
+        location = "centers=" + ";".join(f"{c_lat:.4f},{c_lon:.4f}" for c_lat, c_lon in sorted(centers))
+    else:
+        location = f"{lat:.4f},{lon:.4f}"
+    return f"{location},{radius_km:g}km,h{','.join(str(h) for h in sorted(hours))}"
+
+
+def dirty_targets(
+    days: Iterable[date],
+    hours: Iterable[int],
+    event_starts: Iterable[datetime],
+    observation_times: Iterable[datetime],
+) -> Set[Target]:
+    """(día, hora) cuyos snapshots dependen de algún evento u observación modificados.
+
+    Replica las dependencias de ``materialize_snapshots``: los eventos del día UTC que empiezan
+    a ``EVENT_WINDOW`` o menos de la hora y la meteo interpolada con muestras a
+    ``MAX_TEMPORAL_GAP`` o menos.
+    """
+    day_set = set(days)
+    hour_set = set(hours)
+    dirty: Set[Target] = set()
+    for start in event_starts:
+        start = _to_utc_naive(start)
+        for hour in hour_set:
+            if abs(start - datetime.combine(start.date(), time(hour=hour))) <= EVENT_WINDOW:
+                dirty.add((start.date(), hour))
+    for observed in observation_times:
+        observed = _to_utc_naive(observed)
+        target = (observed - MAX_TEMPORAL_GAP).replace(minute=0, second=0, microsecond=0)
+        while target <= observed + MAX_TEMPORAL_GAP:
+            if abs(target - observed) <= MAX_TEMPORAL_GAP:
+                dirty.add((target.date(), target.hour))
+            target += timedelta(hours=1)
+    return {(day, hour) for day, hour in dirty if day in day_set and hour in hour_set}
+
+
+def _pending_targets(engine, previous: Watermark, days: List[date], hours: List[int]) -> Set[Target]:
+    """Horas de días no cubiertos por ``previous`` más las afectadas por cambios posteriores a su corte.
+
+    Un cambio en ``category_rules`` (duraciones, ventanas, aforos) afecta al score de todos
+    los eventos: marca el rango entero.
+    """
+    if CategoryRulesRepository(engine).changed_since(previous.watermark):
+        return {(day, hour) for day in days for hour in hours}
+    pending = {(day, hour) for day in days if not previous.covers(day) for hour in hours}
+    window_start = datetime.combine(days[0], time.min, tzinfo=timezone.utc)
+    window_end = datetime.combine(days[-1] + timedelta(days=1), time.min, tzinfo=timezone.utc)
+    event_starts = EventsRepository(engine).changed_start_times(previous.watermark, window_start, window_end)
+    observation_times = WeatherRepository(engine).changed_observation_times(
+        previous.watermark, window_start - MAX_TEMPORAL_GAP, window_end + MAX_TEMPORAL_GAP
+    )
+    return pending | dirty_targets(days, hours, event_starts, observation_times)
+
+
 def materialize_range(
     start_date: str,
     end_date: str,
@@ -50,7 +131,20 @@ def materialize_range(
     radius_km: float = 5.0,
     engine=None,
     database_url: Optional[str] = None,
+    incremental: bool = False,
+    centers: Optional[Sequence[Center]] = None,
 ) -> dict:
+    """Materializa snapshots para cada (día, hora) del rango.
+
+    Con ``incremental`` solo recalcula las horas afectadas por eventos y observaciones cuyo
+    ``updated_at`` es posterior a la última ejecución correcta con el mismo ámbito (centro,
+    radio y horas), más los días que esa ejecución no cubría; si cambió ``category_rules``
+    recalcula el rango entero. Sin marca previa hace una
+    pasada completa. Toda ejecución correcta guarda la marca.
+
+    Con ``centers`` (varios distritos) usa ``materialize_snapshots_multi`` en lugar del
+    centro ``lat``/``lon``.
+    """
     start = _parse_date(start_date)
     end = _parse_date(end_date)
     if end < start:
@@ -67,39 +161,72 @@ def materialize_range(
         engine = create_engine(database_url, future=True)
 
     start_time = perf_counter()
-    current = start
+    days = [start + timedelta(days=offset) for offset in range((end - start).days + 1)]
+    metadata.create_all(engine)
+    watermarks = WatermarksRepository(engine)
+    scope = watermark_scope(lat, lon, radius_km, hours_list, centers)
+    # El corte se toma antes de leer: lo escrito durante la ejecución se recoge en la siguiente
+    run_started = datetime.now(timezone.utc)
     total_inserted = 0
     total_updated = 0
-    day_count = 0
-    while current <= end:
-        for hour in hours_list:
-            result = materialize_snapshots(
-                date_str=current.isoformat(),
-                hour=hour,
-                lat=lat,
-                lon=lon,
-                radius_km=radius_km,
-                engine=engine,
-            )
+    total_deleted = 0
+    with job_run(
+        "materialize_range",
+        start_date=start.isoformat(),
+        end_date=end.isoformat(),
+        hours=hours,
+        incremental=incremental,
+        centers=len(centers) if centers else None,
+    ) as run:
+        previous = watermarks.get(WATERMARK_JOB, scope) if incremental else None
+        if previous is None:
+            mode = "full"
+            targets = [(day, hour) for day in days for hour in hours_list]
+        else:
+            mode = "incremental"
+            with run.stage("changes"):
+                targets = sorted(_pending_targets(engine, previous, days, hours_list))
+        for day, hour in targets:
+            if centers:
+                result = materialize_snapshots_multi(
+                    day.isoformat(), hour, centers, radius_km=radius_km, engine=engine
+                )
+            else:
+                result = materialize_snapshots(
+                    date_str=day.isoformat(),
+                    hour=hour,
+                    lat=lat,
+                    lon=lon,
+                    radius_km=radius_km,
+                    engine=engine,
+                )
             total_inserted += result.get("inserted", 0)
             total_updated += result.get("updated", 0)
-        day_count += 1
-        current += timedelta(days=1)
-
-    total_hours = len(hours_list)
-    elapsed = perf_counter() - start_time
-    summary = {
-        "days": day_count,
-        "hours_per_day": total_hours,
-        "inserted": total_inserted,
-        "updated": total_updated,
-        "elapsed_sec": elapsed,
-    }
-    print(
-        f"[materialize_range] days={day_count} hours_per_day={total_hours} "
-        f"inserted={total_inserted} updated={total_updated} elapsed={elapsed:.2f}s"
-    )
-    return summary
+            total_deleted += result.get("deleted", 0)
+        run.add_rows(total_inserted + total_updated)
+        # Los días cubiertos antes pero fuera de este rango no se han revisado: el nuevo corte solo vale para start..end
+        watermarks.save(WATERMARK_JOB, scope, Watermark(run_started, start, end))
+
+        day_count = len(days)
+        total_hours = len(hours_list)
+        elapsed = perf_counter() - start_time
+        summary = {
+            "days": day_count,
+            "hours_per_day": total_hours,
+            "mode": mode,
+            "materialized_hours": len(targets),
+            "skipped_hours": day_count * total_hours - len(targets),
+            "inserted": total_inserted,
+            "updated": total_updated,
+            "deleted": total_deleted,
+            "elapsed_sec": elapsed,
+        }
+        print(
+            f"[materialize_range] days={day_count} hours_per_day={total_hours} mode={mode} "
+            f"materialized_hours={len(targets)} inserted={total_inserted} updated={total_updated} "
+            f"deleted={total_deleted} elapsed={elapsed:.2f}s"
+        )
+        return summary
 
 
 def cli(
@@ -110,16 +237,22 @@ def cli(
     lon: float = typer.Option(-3.7038),
     radius_km: float = typer.Option(5.0),
     database_url: Optional[str] = typer.Option(None, help="DATABASE_URL override"),
+    incremental: bool = typer.Option(False, help="Recalcular solo las horas con cambios desde la última ejecución"),
+    center: Optional[List[str]] = typer.Option(None, help=CENTER_HELP),
+    profile: bool = typer.Option(JOB_PROFILE, "--profile/--no-profile", help=PROFILE_HELP),
 ):
-    materialize_range(
-        start_date,
-        end_date,
-        hours,
-        lat=lat,
-        lon=lon,
-        radius_km=radius_km,
-        database_url=database_url,
-    )
+    with profiled("materialize_range", profile):
+        materialize_range(
+            start_date,
+            end_date,
+            hours,
+            lat=lat,
+            lon=lon,
+            radius_km=radius_km,
+            database_url=database_url,
+            incremental=incremental,
+            centers=parse_centers(center),
+        )
 
 
 if __name__ == "__main__":
@@ -2,19 +2,42 @@
 from __future__ import annotations
 
 import os
-from datetime import datetime, time, timezone
+from datetime import datetime, time, timedelta, timezone
 from math import asin, cos, radians, sin, sqrt
-from typing import List, Optional
+from typing import Dict, List, Optional, Sequence, Tuple
 
 import typer
 from sqlalchemy import create_engine
 
 from app.domain.models import Event as DomainEvent
+from app.domain.category_metadata import CategoryMetadata
 from app.domain.scoring import event_score, weather_factor
+from app.infra.db.category_rules_repository import get_category_metadata
 from app.infra.db.events_repository import EventsRepository
-from app.infra.db.snapshots_repository import EventFeatureSnapshotsRepository
+from app.infra.db.snapshots_repository import EventFeatureSnapshotsRepository, SnapshotCentersRepository
 from app.infra.db.tables import metadata
-from app.infra.db.weather_repository import WeatherRepository
+from app.jobs.instrumentation import JOB_PROFILE, PROFILE_HELP, job_run, profiled
+from app.services.weather_index import WeatherStationIndex, get_weather_index
+
+# Un evento entra en el snapshot de una hora si empieza a esta distancia o menos
+EVENT_WINDOW = timedelta(hours=6)
+# Columnas meteo copiadas al snapshot desde la observación interpolada
+WEATHER_FIELDS = (
+    "temperature_c",
+    "precipitation_mm",
+    "rain_mm",
+    "snowfall_mm",
+    "wind_speed_kmh",
+    "wind_gust_kmh",
+    "weather_code",
+    "humidity_pct",
+    "pressure_hpa",
+    "visibility_m",
+    "cloud_cover_pct",
+)
+
+Center = Tuple[float, float]
+CENTER_HELP = "Centro LAT,LON (repetible); con varios se materializan juntos y lat/lon se ignoran"
 
 
 def _to_utc_naive(dt: datetime) -> datetime:
@@ -40,6 +63,129 @@ def materialize_snapshots(
     target_naive = _to_utc_naive(target_at)
     target_at_utc = target_naive.replace(tzinfo=timezone.utc)
 
+    engine = _resolve_engine(engine, database_url)
+
+    with job_run("materialize_snapshots", date=date_str, hour=hour) as run:
+        events_repo = EventsRepository(engine)
+        weather_index = get_weather_index(engine)
+        snapshots_repo = EventFeatureSnapshotsRepository(engine)
+        centers_repo = SnapshotCentersRepository(engine)
+
+        with run.stage("events"):
+            events = events_repo.list_events_for_day(date_obj)
+            in_window = _events_in_window(events, target_naive)
+            filtered = _filter_events(in_window, target_naive, lat, lon, radius_km)
+            run.add_rows(len(events))
+        with run.stage("weather"):
+            weather = _weather_by_location(weather_index, filtered, target_naive)
+
+        with run.stage("score"):
+            rules = get_category_metadata(engine)
+            snapshots = [_snapshot_row(row, target_naive, weather, rules) for row in filtered]
+
+        with run.stage("write"):
+            result = snapshots_repo.upsert_many(snapshots)
+            result["deleted"] = _delete_stale(snapshots_repo, centers_repo, target_at_utc, in_window)
+            run.add_rows(len(snapshots))
+        db_url = getattr(engine, "url", database_url)
+        print(
+            f"[materialize_snapshots] db={db_url} target={target_at_utc} "
+            f"events={len(filtered)} inserted={result['inserted']} updated={result['updated']} "
+            f"deleted={result['deleted']}"
+        )
+        return result
+
+
+def materialize_snapshots_multi(
+    date_str: str,
+    hour: int,
+    centers: Sequence[Center],
+    *,
+    radius_km: float = 5.0,
+    engine=None,
+    database_url: Optional[str] = None,
+) -> dict:
+    """Materializa la hora para varios centros a la vez.
+
+    Las features del evento (scoring, meteo) no dependen del centro: se calculan una vez por
+    ``(target_at, evento)`` para los eventos que entran en el radio de algún centro, y la
+    distancia e inclusión por centro van a ``event_snapshot_centers``. La meteo se interpola
+    en la ubicación de cada evento, igual que en ``materialize_snapshots``, así la fila
+    compartida coincide con la de una pasada de un solo centro.
+    """
+    if not centers:
+        raise ValueError("at least one center is required")
+    date_obj = datetime.fromisoformat(date_str).date()
+    target_naive = datetime.combine(date_obj, time(hour=hour))
+    target_at_utc = target_naive.replace(tzinfo=timezone.utc)
+    engine = _resolve_engine(engine, database_url)
+
+    with job_run("materialize_snapshots", date=date_str, hour=hour, centers=len(centers)) as run:
+        events_repo = EventsRepository(engine)
+        weather_index = get_weather_index(engine)
+        snapshots_repo = EventFeatureSnapshotsRepository(engine)
+        centers_repo = SnapshotCentersRepository(engine)
+
+        with run.stage("events"):
+            events = events_repo.list_events_for_day(date_obj)
+            run.add_rows(len(events))
+            included = []
+            center_rows = []
+            in_window = _events_in_window(events, target_naive)
+            for row in in_window:
+                distances = [_haversine_km(c_lat, c_lon, row["lat"], row["lon"]) for c_lat, c_lon in centers]
+                if min(distances) > radius_km:
+                    continue
+                included.append(row)
+                center_rows.extend(
+                    {
+                        "target_at": target_at_utc,
+                        "event_id": row["external_id"],
+                        "center_lat": c_lat,
+                        "center_lon": c_lon,
+                        "distance_km": distance,
+                        "in_radius": distance <= radius_km,
+                    }
+                    for (c_lat, c_lon), distance in zip(centers, distances)
+                )
+        with run.stage("weather"):
+            weather = _weather_by_location(weather_index, included, target_naive)
+
+        with run.stage("score"):
+            rules = get_category_metadata(engine)
+            snapshots = [_snapshot_row(row, target_naive, weather, rules) for row in included]
+
+        with run.stage("write"):
+            result = snapshots_repo.upsert_many(snapshots)
+            result["center_rows"] = centers_repo.upsert_many(center_rows)
+            result["deleted"] = _delete_stale(snapshots_repo, centers_repo, target_at_utc, in_window)
+            run.add_rows(len(snapshots) + len(center_rows))
+        db_url = getattr(engine, "url", database_url)
+        print(
+            f"[materialize_snapshots] db={db_url} target={target_at_utc} centers={len(centers)} "
+            f"events={len(snapshots)} center_rows={result['center_rows']} "
+            f"inserted={result['inserted']} updated={result['updated']} deleted={result['deleted']}"
+        )
+        return result
+
+
+def parse_centers(values: Optional[Sequence[str]]) -> Optional[List[Center]]:
+    """``["40.42,-3.70", ...]`` -> ``[(40.42, -3.70), ...]``; ``None`` si no hay centros."""
+    if not values:
+        return None
+    centers = []
+    for value in values:
+        parts = value.split(",")
+        try:
+            if len(parts) != 2:
+                raise ValueError(value)
+            centers.append((float(parts[0]), float(parts[1])))
+        except ValueError:
+            raise typer.BadParameter(f"center must be LAT,LON (got '{value}')") from None
+    return centers
+
+
+def _resolve_engine(engine, database_url: Optional[str]):
     if engine is None:
         if database_url is None:
             database_url = os.getenv("DATABASE_URL")
@@ -47,89 +193,93 @@ def materialize_snapshots(
             raise RuntimeError("DATABASE_URL required if engine not provided")
         engine = create_engine(database_url, future=True)
     metadata.create_all(engine)
+    return engine
 
-    events_repo = EventsRepository(engine)
-    weather_repo = WeatherRepository(engine)
-    snapshots_repo = EventFeatureSnapshotsRepository(engine)
 
-    events = events_repo.list_events_for_day(date_obj)
-    filtered = _filter_events(events, target_naive, lat, lon, radius_km)
-    weather = weather_repo.get_observation_at(lat, lon, target_naive)
-    factor = weather_factor(
+def _weather_factor(weather: Optional[dict]) -> float:
+    return weather_factor(
         weather.get("temperature_c") if weather else None,
         weather.get("precipitation_mm") if weather else None,
         weather.get("wind_speed_kmh") if weather else None,
     )
 
-    snapshots = []
-    for row in filtered:
-        start_dt = _to_utc_naive(row["start_dt"])
-        end_dt = _to_utc_naive(row.get("end_dt"))
-        domain_event = DomainEvent(
-            id=row["external_id"],
-            title=row["title"],
-            category=row["category"],
-            start_dt=start_dt,
-            end_dt=end_dt,
-            lat=row["lat"],
-            lon=row["lon"],
-            source=row.get("source"),
-        )
-        base_score = event_score(domain_event, target_naive, domain_event.lat, domain_event.lon)
-        final_score = base_score * factor
-        hours_to_start = (start_dt - target_naive).total_seconds() / 3600.0
-        snapshots.append(
-            {
-                "target_at": target_at_utc,
-                "event_id": row["external_id"],
-                "event_start_dt": row["start_dt"],
-                "event_end_dt": row["end_dt"],
-                "lat": row["lat"],
-                "lon": row["lon"],
-                "category": row["category"],
-                "expected_attendance": row.get("expected_attendance"),
-                "hours_to_start": hours_to_start,
-                "weekday": target_at_utc.weekday(),
-                "month": target_at_utc.month,
-                "temperature_c": weather.get("temperature_c") if weather else None,
-                "precipitation_mm": weather.get("precipitation_mm") if weather else None,
-                "rain_mm": weather.get("rain_mm") if weather else None,
-                "snowfall_mm": weather.get("snowfall_mm") if weather else None,
-                "wind_speed_kmh": weather.get("wind_speed_kmh") if weather else None,
-                "wind_gust_kmh": weather.get("wind_gust_kmh") if weather else None,
-                "weather_code": weather.get("weather_code") if weather else None,
-                "humidity_pct": weather.get("humidity_pct") if weather else None,
-                "pressure_hpa": weather.get("pressure_hpa") if weather else None,
-                "visibility_m": weather.get("visibility_m") if weather else None,
-                "cloud_cover_pct": weather.get("cloud_cover_pct") if weather else None,
-                "score_base": base_score,
-                "score_weather_factor": factor,
-                "score_final": final_score,
-            }
-        )
 
-    result = snapshots_repo.upsert_many(snapshots)
-    db_url = getattr(engine, "url", database_url)
-    print(
-        f"[materialize_snapshots] db={db_url} target={target_at_utc} "
-        f"events={len(filtered)} inserted={result['inserted']} updated={result['updated']}"
+def _weather_by_location(
+    weather_index: WeatherStationIndex, rows: List[dict], target_naive: datetime
+) -> Dict[Center, Optional[dict]]:
+    """Observación interpolada en cada ubicación distinta de ``rows`` (los eventos de un venue la comparten)."""
+    weather: Dict[Center, Optional[dict]] = {}
+    for row in rows:
+        location = (row["lat"], row["lon"])
+        if location not in weather:
+            weather[location] = weather_index.observation_at(location[0], location[1], target_naive)
+    return weather
+
+
+def _snapshot_row(
+    row: dict, target_naive: datetime, weather_by_location: Dict[Center, Optional[dict]], rules: CategoryMetadata
+) -> dict:
+    """Features de un evento para la hora objetivo; no dependen del centro de la materialización."""
+    weather = weather_by_location[(row["lat"], row["lon"])]
+    factor = _weather_factor(weather)
+    target_at_utc = target_naive.replace(tzinfo=timezone.utc)
+    start_dt = _to_utc_naive(row["start_dt"])
+    end_dt = _to_utc_naive(row.get("end_dt"))
+    domain_event = DomainEvent(
+        id=row["external_id"],
+        title=row["title"],
+        category=row["category"],
+        start_dt=start_dt,
+        end_dt=end_dt,
+        lat=row["lat"],
+        lon=row["lon"],
+        source=row.get("source"),
     )
-    return result
+    base_score = event_score(domain_event, target_naive, domain_event.lat, domain_event.lon, rules)
+    snapshot = {
+        "target_at": target_at_utc,
+        "event_id": row["external_id"],
+        "event_start_dt": row["start_dt"],
+        "event_end_dt": row["end_dt"],
+        "lat": row["lat"],
+        "lon": row["lon"],
+        "category": row["category"],
+        "expected_attendance": row.get("expected_attendance"),
+        "hours_to_start": (start_dt - target_naive).total_seconds() / 3600.0,
+        "weekday": target_at_utc.weekday(),
+        "month": target_at_utc.month,
+    }
+    for field in WEATHER_FIELDS:
+        snapshot[field] = weather.get(field) if weather else None
+    snapshot["score_base"] = base_score
+    snapshot["score_weather_factor"] = factor
+    snapshot["score_final"] = base_score * factor
+    return snapshot
 
 
-def _filter_events(events: List[dict], target_at: datetime, lat: float, lon: float, radius_km: float):
-    filtered = []
+def _events_in_window(events: List[dict], target_at: datetime) -> List[dict]:
     normalized_target = _to_utc_naive(target_at)
-    for row in events:
-        start_dt = _to_utc_naive(row["start_dt"])
-        delta_hours = abs((start_dt - normalized_target).total_seconds()) / 3600.0
-        if delta_hours > 6:
-            continue
-        distance = _haversine_km(lat, lon, row["lat"], row["lon"])
-        if distance > radius_km:
-            continue
-        filtered.append(row)
-    return filtered
+    return [row for row in events if abs(_to_utc_naive(row["start_dt"]) - normalized_target) <= EVENT_WINDOW]
+
+
+def _delete_stale(
+    snapshots_repo: EventFeatureSnapshotsRepository,
+    centers_repo: SnapshotCentersRepository,
+    target_at: datetime,
+    in_window: List[dict],
+) -> int:
+    # La tabla no distingue centros: se conserva todo evento de la ventana, esté o no en el radio de esta pasada
+    keep = {row["external_id"] for row in in_window}
+    centers_repo.delete_stale(target_at, keep)
+    return snapshots_repo.delete_stale(target_at, keep)
+
+
+def _filter_events(events: List[dict], target_at: datetime, lat: float, lon: float, radius_km: float):
+    return [
+        row
+        for row in _events_in_window(events, target_at)
+        if _haversine_km(lat, lon, row["lat"], row["lon"]) <= radius_km
+    ]
 
 
 def _haversine_km(lat1, lon1, lat2, lon2):
@@ -148,8 +298,15 @@ def materialize_cli(
     lon: float = typer.Option(-3.7038),
     radius_km: float = typer.Option(5.0),
     database_url: Optional[str] = typer.Option(None, help="DATABASE_URL override"),
+    center: Optional[List[str]] = typer.Option(None, help=CENTER_HELP),
+    profile: bool = typer.Option(JOB_PROFILE, "--profile/--no-profile", help=PROFILE_HELP),
 ):
-    materialize_snapshots(date, hour, lat=lat, lon=lon, radius_km=radius_km, database_url=database_url)
+    centers = parse_centers(center)
+    with profiled("materialize_snapshots", profile):
+        if centers:
+            materialize_snapshots_multi(date, hour, centers, radius_km=radius_km, database_url=database_url)
+        else:
+            materialize_snapshots(date, hour, lat=lat, lon=lon, radius_km=radius_km, database_url=database_url)
 
 
 if __name__ == "__main__":
@@ -3,11 +3,20 @@ from __future__ import annotations
 import argparse
 import os
 
-from app.migrations import add_event_integrity
+from app.migrations import (
+    add_event_activity_windows,
+    add_event_integrity,
+    add_event_keyset_index,
+    add_weather_natural_key,
+)
 
 
 def migrate(database_url: str | None = None) -> None:
     add_event_integrity.run(database_url=database_url)
+    # Columnas que leen todas las consultas de eventos: antes que cualquier otra migración que las lea
+    add_event_activity_windows.run(database_url=database_url)
+    add_weather_natural_key.run(database_url=database_url)
+    add_event_keyset_index.run(database_url=database_url)
 
 
 def main() -> None:
@@ -10,6 +10,7 @@ from sqlalchemy import create_engine
 
 from app.infra.db.tables import metadata
 from app.jobs.export_training_dataset import export_training_dataset
+from app.jobs.instrumentation import JOB_PROFILE, PROFILE_HELP, job_run, profiled
 from app.jobs.materialize_range import materialize_range
 from app.jobs.sync_events import sync_events
 from app.jobs.sync_weather import sync_weather
@@ -60,77 +61,78 @@ def run_window_sync(
     start_day = base_date - timedelta(days=past_days)
     end_day = base_date + timedelta(days=future_days)
 
-    weather_stats = sync_weather(
-        lat=lat,
-        lon=lon,
-        past_days=past_days,
-        future_days=future_days,
-        engine=engine,
-        location_name=city,
-        reference=base_date,
-        offline=offline_weather,
-    )
-
-    event_reference = datetime.combine(base_date, datetime.min.time(), tzinfo=timezone.utc)
-    try:
-        event_stats = sync_events(
-            city=city,
-            past_days=past_days,
-            future_days=future_days,
-            engine=engine,
-            reference=event_reference,
-        )["events"]
-    except Exception as exc:
-        print(f"[run_window_sync] WARNING: sync_events failed ({exc}); continuing")
-        event_stats = {"inserted": 0, "updated": 0, "skipped": 0}
-
-    snapshot_stats = None
-    if materialize:
-        snapshot_stats = materialize_range(
-            start_day.isoformat(),
-            end_day.isoformat(),
-            hours,
+    with job_run("run_window_sync", city=city, base_date=base_date, past_days=past_days, future_days=future_days):
+        weather_stats = sync_weather(
             lat=lat,
             lon=lon,
+            past_days=past_days,
+            future_days=future_days,
             engine=engine,
+            location_name=city,
+            reference=base_date,
+            offline=offline_weather,
         )
 
-    dataset_stats = None
-    models_trained: list[str] = []
-    if export_dataset:
-        dataset_stats = export_training_dataset(
-            dataset_path,
-            start_date=start_day.isoformat(),
-            end_date=end_day.isoformat(),
-            engine=engine,
+        event_reference = datetime.combine(base_date, datetime.min.time(), tzinfo=timezone.utc)
+        try:
+            event_stats = sync_events(
+                city=city,
+                past_days=past_days,
+                future_days=future_days,
+                engine=engine,
+                reference=event_reference,
+            )["events"]
+        except Exception as exc:
+            print(f"[run_window_sync] WARNING: sync_events failed ({exc}); continuing")
+            event_stats = {"inserted": 0, "updated": 0, "skipped": 0}
+
+        snapshot_stats = None
+        if materialize:
+            snapshot_stats = materialize_range(
+                start_day.isoformat(),
+                end_day.isoformat(),
+                hours,
+                lat=lat,
+                lon=lon,
+                engine=engine,
+            )
+
+        dataset_stats = None
+        models_trained: list[str] = []
+        if export_dataset:
+            dataset_stats = export_training_dataset(
+                dataset_path,
+                start_date=start_day.isoformat(),
+                end_date=end_day.isoformat(),
+                engine=engine,
+            )
+            if train_models and dataset_stats.get("rows", 0) > 50:
+                model_dir.mkdir(parents=True, exist_ok=True)
+                lead_model = model_dir / "model_lead_time.json"
+                att_model = model_dir / "model_attendance_factor.json"
+                train_baseline(dataset_path, model_out=lead_model, target_col="label_lead_time_min")
+                train_baseline(dataset_path, model_out=att_model, target_col="label_attendance_factor")
+                models_trained = [str(lead_model), str(att_model)]
+
+        summary = {
+            "city": city,
+            "base_date": base_date.isoformat(),
+            "start_date": start_day.isoformat(),
+            "end_date": end_day.isoformat(),
+            "weather": weather_stats,
+            "events": event_stats,
+            "snapshots": snapshot_stats,
+            "dataset": dataset_stats,
+            "models": models_trained,
+        }
+        print(
+            "[run_window_sync] "
+            f"base={base_date.isoformat()} range={start_day}:{end_day} "
+            f"events={event_stats} weather={weather_stats} "
+            f"snapshots={snapshot_stats if snapshot_stats else {}} "
+            f"dataset_rows={dataset_stats.get('rows') if dataset_stats else 'N/A'}"
         )
-        if train_models and dataset_stats.get("rows", 0) > 50:
-            model_dir.mkdir(parents=True, exist_ok=True)
-            lead_model = model_dir / "model_lead_time.json"
-            att_model = model_dir / "model_attendance_factor.json"
-            train_baseline(dataset_path, model_out=lead_model, target_col="label_lead_time_min")
-            train_baseline(dataset_path, model_out=att_model, target_col="label_attendance_factor")
-            models_trained = [str(lead_model), str(att_model)]
-
-    summary = {
-        "city": city,
-        "base_date": base_date.isoformat(),
-        "start_date": start_day.isoformat(),
-        "end_date": end_day.isoformat(),
-        "weather": weather_stats,
-        "events": event_stats,
-        "snapshots": snapshot_stats,
-        "dataset": dataset_stats,
-        "models": models_trained,
-    }
-    print(
-        "[run_window_sync] "
-        f"base={base_date.isoformat()} range={start_day}:{end_day} "
-        f"events={event_stats} weather={weather_stats} "
-        f"snapshots={snapshot_stats if snapshot_stats else {}} "
-        f"dataset_rows={dataset_stats.get('rows') if dataset_stats else 'N/A'}"
-    )
-    return summary
+        return summary
 
 
 @app.command()
@@ -148,22 +150,24 @@ def cli(
     train: bool = typer.Option(False, help="Entrenar modelos si hay dataset"),
     dataset_path: Optional[Path] = typer.Option(None, help="Ruta dataset"),
     model_dir: Optional[Path] = typer.Option(None, help="Directorio modelos"),
+    profile: bool = typer.Option(JOB_PROFILE, "--profile/--no-profile", help=PROFILE_HELP),
 ):
-    run_window_sync(
-        city=city,
-        lat=lat,
-        lon=lon,
-        base_date=_parse_date(base_date),
-        past_days=past_days,
-        future_days=future_days,
-        hours=hours,
-        offline_weather=offline_weather,
-        materialize=materialize,
-        export_dataset=export_dataset,
-        train_models=train,
-        dataset_path=dataset_path,
-        model_dir=model_dir,
-    )
+    with profiled("run_window_sync", profile):
+        run_window_sync(
+            city=city,
+            lat=lat,
+            lon=lon,
+            base_date=_parse_date(base_date),
+            past_days=past_days,
+            future_days=future_days,
+            hours=hours,
+            offline_weather=offline_weather,
+            materialize=materialize,
+            export_dataset=export_dataset,
+            train_models=train,
+            dataset_path=dataset_path,
+            model_dir=model_dir,
+        )
 
 
 if __name__ == "__main__":
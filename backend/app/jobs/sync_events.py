@@ -2,20 +2,22 @@ from __future__ import annotations
 
 import os
 from datetime import datetime, timedelta, timezone
-from typing import Dict, Iterable, Optional, Tuple
+from typing import Any, Dict, Iterable, List, Optional, Set
 
 import typer
 from sqlalchemy import create_engine
 
 from app.infra.db.events_repository import EventsRepository
 from app.infra.db.tables import metadata
-from app.infra.db.venues_repository import VenuesRepository
+from app.infra.db.venues_repository import VenueKey, VenuesRepository, venue_key
+from app.jobs.instrumentation import JOB_PROFILE, PROFILE_HELP, job_run, profiled
 from app.providers.events.base import EventsProvider, ExternalEvent
 from app.providers.events.ticketmaster import TicketmasterEventsProvider
 
 app = typer.Typer(help="Sync external events into the FinMaster database")
 DEFAULT_COUNTRY = os.getenv("SYNC_EVENTS_COUNTRY", "ES")
 DEFAULT_DURATION_HOURS = int(os.getenv("SYNC_EVENTS_DEFAULT_DURATION", "2"))
+DEFAULT_CHUNK_SIZE = int(os.getenv("SYNC_EVENTS_CHUNK_SIZE", "500"))
 
 
 class SyncResults(Dict[str, Dict[str, int]]):
@@ -32,6 +34,7 @@ def sync_events(
     database_url: Optional[str] = None,
     reference: Optional[datetime] = None,
     country: Optional[str] = None,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
 ) -> Dict[str, Dict[str, int]]:
     if past_days < 0 or future_days < 0:
         raise ValueError("past_days and future_days must be >= 0")
@@ -56,23 +59,30 @@ def sync_events(
         "venues": {"inserted": 0, "updated": 0, "skipped": 0},
     }
 
-    for direction, days in (("past", past_days), ("future", future_days)):
-        if days <= 0:
-            continue
-        entries = provider.fetch_events(city=city, days=days, reference=reference, direction=direction)
-        stats = _process_events(
-            entries,
-            stats,
-            city=city,
-            country=country or DEFAULT_COUNTRY,
-            direction=direction,
-            events_repo=events_repo,
-            venues_repo=venues_repo,
-            reference=reference,
-        )
-
-    _log_summary(city, stats, past_days, future_days)
-    return stats
+    with job_run("sync_events", city=city, past_days=past_days, future_days=future_days) as run:
+        for direction, days in (("past", past_days), ("future", future_days)):
+            if days <= 0:
+                continue
+            with run.stage("fetch"):
+                entries = list(provider.fetch_events(city=city, days=days, reference=reference, direction=direction))
+                run.add_rows(len(entries))
+            with run.stage("write"):
+                written_before = stats["events"]["inserted"] + stats["events"]["updated"]
+                stats = _process_events(
+                    entries,
+                    stats,
+                    city=city,
+                    country=country or DEFAULT_COUNTRY,
+                    direction=direction,
+                    events_repo=events_repo,
+                    venues_repo=venues_repo,
+                    reference=reference,
+                    chunk_size=chunk_size,
+                )
+                run.add_rows(stats["events"]["inserted"] + stats["events"]["updated"] - written_before)
+
+        _log_summary(city, stats, past_days, future_days)
+        return stats
 
 
 @app.command()
@@ -81,9 +91,12 @@ def run(
     past_days: int = typer.Option(0, help="Days in the past to backfill"),
     future_days: int = typer.Option(7, help="Days forward to fetch"),
     country: Optional[str] = typer.Option(None, help="Country code for inferred venues"),
+    chunk_size: int = typer.Option(DEFAULT_CHUNK_SIZE, help="Events written per transaction"),
+    profile: bool = typer.Option(JOB_PROFILE, "--profile/--no-profile", help=PROFILE_HELP),
 ):
     """CLI entrypoint for syncing external events."""
-    sync_events(city, past_days=past_days, future_days=future_days, country=country)
+    with profiled("sync_events", profile):
+        sync_events(city, past_days=past_days, future_days=future_days, country=country, chunk_size=chunk_size)
 
 
 def _process_events(
@@ -96,21 +109,41 @@ def _process_events(
     events_repo: EventsRepository,
     venues_repo: VenuesRepository,
     reference: datetime,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
 ) -> Dict[str, Dict[str, int]]:
+    if chunk_size <= 0:
+        raise ValueError("chunk_size must be > 0")
+    valid: List[ExternalEvent] = []
     for event in events:
-        if not _event_has_required_fields(event):
-            stats["events"]["skipped"] += 1
-            continue
-        venue_stats, venue_id = _ensure_venue(event, venues_repo, city=city, country=country)
-        for key in ("inserted", "updated", "skipped"):
-            stats["venues"][key] += venue_stats.get(key, 0)
-        payload = _build_event_payload(event, venue_id)
-        existed = events_repo.get_event_by_source_external(payload["source"], payload["external_id"])
-        events_repo.upsert_event(payload)
-        if existed:
-            stats["events"]["updated"] += 1
+        if _event_has_required_fields(event):
+            valid.append(event)
         else:
-            stats["events"]["inserted"] += 1
+            stats["events"]["skipped"] += 1
+
+    # Un bloque = una transacción: venues resueltos con un IN y eventos con un upsert en bloque
+    counted: Set[VenueKey] = set()
+    for offset in range(0, len(valid), chunk_size):
+        chunk = valid[offset : offset + chunk_size]
+        venue_payloads = [_venue_payload(event, city=city, country=country) for event in chunk]
+        with events_repo.engine.begin() as conn:
+            resolution = venues_repo.resolve_many((payload for payload in venue_payloads if payload), conn=conn)
+            payloads = []
+            for event, venue_payload in zip(chunk, venue_payloads):
+                venue_id: Optional[int] = None
+                key = venue_key(venue_payload) if venue_payload else None
+                if key is None:
+                    stats["venues"]["skipped"] += 1
+                else:
+                    venue_id = resolution.ids.get(key)
+                    if key in resolution.created and key not in counted:
+                        stats["venues"]["inserted"] += 1
+                    else:
+                        stats["venues"]["updated"] += 1
+                    counted.add(key)
+                payloads.append(_build_event_payload(event, venue_id))
+            written = events_repo.upsert_many(payloads, chunk_size=chunk_size, conn=conn)
+        stats["events"]["inserted"] += written["inserted"]
+        stats["events"]["updated"] += written["updated"]
     return stats
 
 
@@ -118,44 +151,23 @@ def _event_has_required_fields(event: ExternalEvent) -> bool:
     return bool(event.source and event.external_id and event.title and event.start_at and event.lat is not None and event.lon is not None)
 
 
-def _ensure_venue(
-    event: ExternalEvent,
-    repo: VenuesRepository,
-    *,
-    city: str,
-    country: str,
-) -> Tuple[Dict[str, int], Optional[int]]:
-    stats = {"inserted": 0, "updated": 0, "skipped": 0}
-    venue_id: Optional[int] = None
-    if event.venue_name:
-        payload = {
-            "source": event.venue_source or event.source,
-            "external_id": event.venue_external_id,
-            "name": event.venue_name,
-            "lat": event.lat,
-            "lon": event.lon,
-            "city": event.venue_city or city,
-            "region": None,
-            "country": event.venue_country or country,
-            "address_line1": None,
-            "address_line2": None,
-            "postal_code": None,
-            "max_capacity": None,
-        }
-        existed = None
-        if payload["external_id"]:
-            existed = repo.get_venue_id_by_external(payload["source"], payload["external_id"])
-        if existed is None:
-            venue = repo.get_venue_by_name(payload["city"], payload["name"])
-            existed = venue["id"] if venue else None
-        venue_id = repo.upsert_venue(payload)
-        if existed:
-            stats["updated"] += 1
-        else:
-            stats["inserted"] += 1
-    else:
-        stats["skipped"] += 1
-    return stats, venue_id
+def _venue_payload(event: ExternalEvent, *, city: str, country: str) -> Optional[Dict[str, Any]]:
+    if not event.venue_name:
+        return None
+    return {
+        "source": event.venue_source or event.source,
+        "external_id": event.venue_external_id,
+        "name": event.venue_name,
+        "lat": event.lat,
+        "lon": event.lon,
+        "city": event.venue_city or city,
+        "region": None,
+        "country": event.venue_country or country,
+        "address_line1": None,
+        "address_line2": None,
+        "postal_code": None,
+        "max_capacity": None,
+    }
 
 
 def _build_event_payload(event: ExternalEvent, venue_id: Optional[int]) -> Dict[str, object]:
@@ -10,6 +10,7 @@ from sqlalchemy import create_engine
 
 from app.infra.db.tables import metadata
 from app.infra.db.weather_repository import WeatherRepository
+from app.jobs.instrumentation import JOB_PROFILE, PROFILE_HELP, job_run, profiled
 from app.providers.weather.base import ExternalWeatherHour, WeatherProvider
 from app.providers.weather.open_meteo import OpenMeteoWeatherProvider
 
@@ -48,29 +49,35 @@ def sync_weather(
     reference = reference or datetime.now(timezone.utc).date()
     start_day = reference - timedelta(days=past_days)
     end_day = reference + timedelta(days=future_days)
-    try:
-        observations = provider.fetch_hourly(
-            lat=lat,
-            lon=lon,
-            start=start_day,
-            end=end_day,
-            location_name=location_name,
-        )
-    except Exception as exc:
-        if not offline:
-            print(f"[sync_weather] WARNING: provider failed ({exc}); falling back to offline dataset")
-            observations = _DemoWeatherProvider().fetch_hourly(
-                lat=lat,
-                lon=lon,
-                start=start_day,
-                end=end_day,
-                location_name=location_name,
-            )
-        else:
-            raise
-    result = repo.upsert_many(_normalize_records(observations))
-    _log_summary(lat, lon, result, start_day, end_day)
-    return result
+    with job_run("sync_weather", lat=lat, lon=lon, start=start_day, end=end_day) as run:
+        with run.stage("fetch"):
+            try:
+                observations = provider.fetch_hourly(
+                    lat=lat,
+                    lon=lon,
+                    start=start_day,
+                    end=end_day,
+                    location_name=location_name,
+                )
+            except Exception as exc:
+                if not offline:
+                    print(f"[sync_weather] WARNING: provider failed ({exc}); falling back to offline dataset")
+                    observations = _DemoWeatherProvider().fetch_hourly(
+                        lat=lat,
+                        lon=lon,
+                        start=start_day,
+                        end=end_day,
+                        location_name=location_name,
+                    )
+                else:
+                    raise
+            observations = list(observations)
+            run.add_rows(len(observations))
+        with run.stage("write"):
+            result = repo.upsert_many(_normalize_records(observations))
+            run.add_rows(result["inserted"] + result["updated"])
+        _log_summary(lat, lon, result, start_day, end_day)
+        return result
 
 
 @app.command()
@@ -81,9 +88,11 @@ def run(
     future_days: int = typer.Option(1, help="Days forward"),
     location_name: Optional[str] = typer.Option(None, help="Label for stored observations"),
     offline: bool = typer.Option(False, help="Forzar dataset offline"),
+    profile: bool = typer.Option(JOB_PROFILE, "--profile/--no-profile", help=PROFILE_HELP),
 ):
     """CLI entrypoint for weather sync."""
-    sync_weather(lat=lat, lon=lon, past_days=past_days, future_days=future_days, location_name=location_name, offline=offline)
+    with profiled("sync_weather", profile):
+        sync_weather(lat=lat, lon=lon, past_days=past_days, future_days=future_days, location_name=location_name, offline=offline)
 
 
 def _normalize_records(observations: Iterable[ExternalWeatherHour]):
@@ -8,6 +8,7 @@ from typing import Dict, List, Optional
 
 import typer
 
+from app.jobs.instrumentation import JOB_PROFILE, PROFILE_HELP, job_run, profiled
 
 NUMERIC_FIELDS = [
     "hour",
@@ -33,66 +34,71 @@ def train_baseline(
     model_out: Optional[Path] = None,
     target_col: str = "label",
 ) -> Dict[str, float]:
-    rows = _load_rows(csv_path)
-    if not rows:
-        raise RuntimeError("dataset is empty; run export_training_dataset first")
-    if target_col not in rows[0]:
-        raise RuntimeError(f"target column '{target_col}' not found in dataset")
-    categories = sorted({row.get("category") or "unknown" for row in rows})
-    cat_to_idx = {cat: idx for idx, cat in enumerate(categories)}
-
-    numeric_stats = {field: 1.0 for field in NUMERIC_FIELDS}
-    for field in NUMERIC_FIELDS:
-        values = []
-        for row in rows:
-            val = _to_float(row.get(field))
-            if val is not None:
-                values.append(abs(val))
-        if values:
-            numeric_stats[field] = max(values) or 1.0
-
-    features: List[List[float]] = []
-    labels: List[float] = []
-    feature_columns: List[str] = []
-    base_names = NUMERIC_FIELDS + [f"cat_{cat}" for cat in categories]
-    feature_columns.extend(base_names)
-
-    for row in rows:
-        vector: List[float] = []
+    with job_run("train_baseline", csv_path=str(csv_path), target_col=target_col) as run:
+        with run.stage("load"):
+            rows = _load_rows(csv_path)
+            run.add_rows(len(rows))
+        if not rows:
+            raise RuntimeError("dataset is empty; run export_training_dataset first")
+        if target_col not in rows[0]:
+            raise RuntimeError(f"target column '{target_col}' not found in dataset")
+        categories = sorted({row.get("category") or "unknown" for row in rows})
+        cat_to_idx = {cat: idx for idx, cat in enumerate(categories)}
+
+        numeric_stats = {field: 1.0 for field in NUMERIC_FIELDS}
         for field in NUMERIC_FIELDS:
-            val = _to_float(row.get(field)) or 0.0
-            scale = numeric_stats.get(field, 1.0)
-            vector.append(val / scale if scale else val)
-        cat_vec = [0.0] * len(categories)
-        idx = cat_to_idx.get(row.get("category") or "unknown")
-        cat_vec[idx] = 1.0
-        vector.extend(cat_vec)
-        features.append(vector)
-        target_val = _to_float(row.get(target_col))
-        if target_val is None:
-            target_val = 0.0
-        labels.append(target_val)
-
-    weights, bias = _train_linear_regression(features, labels)
-    preds = [_predict(weights, bias, vec) for vec in features]
-    errors = [pred - y for pred, y in zip(preds, labels)]
-    mae = sum(abs(e) for e in errors) / len(errors)
-    rmse = sqrt(sum(e ** 2 for e in errors) / len(errors))
-
-    if model_out:
-        artifact = {
-            "target_col": target_col,
-            "feature_columns": feature_columns,
-            "scales": [numeric_stats[field] for field in NUMERIC_FIELDS] + [1.0] * len(categories),
-            "categories": categories,
-            "weights": weights,
-            "bias": bias,
-            "metrics": {"mae": mae, "rmse": rmse},
-        }
-        model_out.parent.mkdir(parents=True, exist_ok=True)
-        model_out.write_text(json.dumps(artifact, indent=2))
-    print(f"[train_baseline] target={target_col} samples={len(rows)} mae={mae:.2f} rmse={rmse:.2f}")
-    return {"mae": mae, "rmse": rmse}
+            values = []
+            for row in rows:
+                val = _to_float(row.get(field))
+                if val is not None:
+                    values.append(abs(val))
+            if values:
+                numeric_stats[field] = max(values) or 1.0
+
+        features: List[List[float]] = []
+        labels: List[float] = []
+        feature_columns: List[str] = []
+        base_names = NUMERIC_FIELDS + [f"cat_{cat}" for cat in categories]
+        feature_columns.extend(base_names)
+
+        for row in rows:
+            vector: List[float] = []
+            for field in NUMERIC_FIELDS:
+                val = _to_float(row.get(field)) or 0.0
+                scale = numeric_stats.get(field, 1.0)
+                vector.append(val / scale if scale else val)
+            cat_vec = [0.0] * len(categories)
+            idx = cat_to_idx.get(row.get("category") or "unknown")
+            cat_vec[idx] = 1.0
+            vector.extend(cat_vec)
+            features.append(vector)
+            target_val = _to_float(row.get(target_col))
+            if target_val is None:
+                target_val = 0.0
+            labels.append(target_val)
+
+        with run.stage("fit"):
+            weights, bias = _train_linear_regression(features, labels)
+            run.add_rows(len(features))
+        preds = [_predict(weights, bias, vec) for vec in features]
+        errors = [pred - y for pred, y in zip(preds, labels)]
+        mae = sum(abs(e) for e in errors) / len(errors)
+        rmse = sqrt(sum(e ** 2 for e in errors) / len(errors))
+
+        if model_out:
+            artifact = {
+                "target_col": target_col,
+                "feature_columns": feature_columns,
+                "scales": [numeric_stats[field] for field in NUMERIC_FIELDS] + [1.0] * len(categories),
+                "categories": categories,
+                "weights": weights,
+                "bias": bias,
+                "metrics": {"mae": mae, "rmse": rmse},
+            }
+            model_out.parent.mkdir(parents=True, exist_ok=True)
+            model_out.write_text(json.dumps(artifact, indent=2))
+        print(f"[train_baseline] target={target_col} samples={len(rows)} mae={mae:.2f} rmse={rmse:.2f}")
+        return {"mae": mae, "rmse": rmse}
 
 
 def _train_linear_regression(features: List[List[float]], labels: List[float], epochs: int = 2000, lr: float = 0.01):
@@ -140,8 +146,10 @@ def train_cli(
     csv_path: Path = typer.Option(..., exists=True, dir_okay=False),
     model_out: Optional[Path] = typer.Option(None, dir_okay=False, help="Ruta para guardar el modelo JSON"),
     target_col: str = typer.Option("label", help="Columna objetivo a predecir"),
+    profile: bool = typer.Option(JOB_PROFILE, "--profile/--no-profile", help=PROFILE_HELP),
 ):
-    train_baseline(csv_path, model_out, target_col=target_col)
+    with profiled("train_baseline", profile):
+        train_baseline(csv_path, model_out, target_col=target_col)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,80 @@
+from __future__ import annotations
+
+import os
+import sys
+from typing import Optional
+
+from sqlalchemy import bindparam, create_engine, inspect, select, update
+from sqlalchemy.engine import Engine
+
+from app.domain.activity import activity_window
+from app.infra.db.category_rules_repository import load_activity_rules
+from app.infra.db.tables import events_table
+
+ACTIVITY_COLUMNS = ("effective_end_dt", "activity_start", "activity_end")
+BACKFILL_CHUNK_SIZE = 1000
+
+
+def run(engine: Optional[Engine] = None, database_url: Optional[str] = None, *, recompute: bool = False) -> int:
+    """Añade las columnas de ventana de actividad y las rellena.
+
+    Sin ``recompute`` solo rellena filas sin calcular; con ``recompute`` recalcula todas
+    (p. ej. tras cambiar ``pre_event_min``/``post_event_min`` en ``category_rules``).
+    Devuelve el número de eventos actualizados.
+    """
+    engine = engine or _resolve_engine(database_url)
+    with engine.begin() as conn:
+        inspector = inspect(conn)
+        if not inspector.has_table("events"):
+            return 0
+        columns = {col["name"] for col in inspector.get_columns("events")}
+        column_type = "TIMESTAMP" if conn.dialect.name == "sqlite" else "TIMESTAMPTZ"
+        for column in ACTIVITY_COLUMNS:
+            if column not in columns:
+                conn.exec_driver_sql(f"ALTER TABLE events ADD COLUMN {column} {column_type}")
+        conn.exec_driver_sql(
+            "CREATE INDEX IF NOT EXISTS idx_events_activity_window ON events (activity_start, activity_end)"
+        )
+    return _backfill(engine, recompute)
+
+
+def _backfill(engine: Engine, recompute: bool) -> int:
+    stmt = update(events_table).where(events_table.c.id == bindparam("_id"))
+    updated = 0
+    last_id = 0
+    with engine.begin() as conn:
+        # Sin category_rules (bases muy antiguas) se usan las ventanas del scoring
+        rules = load_activity_rules(conn) if inspect(conn).has_table("category_rules") else {}
+        while True:
+            query = (
+                select(events_table.c.id, events_table.c.category, events_table.c.start_dt, events_table.c.end_dt)
+                .where(events_table.c.id > last_id)
+                .order_by(events_table.c.id)
+                .limit(BACKFILL_CHUNK_SIZE)
+            )
+            if not recompute:
+                query = query.where(events_table.c.activity_start.is_(None))
+            rows = conn.execute(query).all()
+            if not rows:
+                break
+            params = [
+                {"_id": event_id, **activity_window(start_dt, end_dt, category, rules)._asdict()}
+                for event_id, category, start_dt, end_dt in rows
+            ]
+            conn.execute(stmt, params)
+            updated += len(params)
+            last_id = rows[-1][0]
+    return updated
+
+
+def _resolve_engine(database_url: Optional[str]) -> Engine:
+    if not database_url:
+        database_url = os.getenv("DATABASE_URL")
+    if not database_url:
+        raise RuntimeError("DATABASE_URL is required")
+    return create_engine(database_url, future=True)
+
+
+if __name__ == "__main__":
+    count = run(recompute="--recompute" in sys.argv[1:])
+    print(f"[add_event_activity_windows] updated={count}")
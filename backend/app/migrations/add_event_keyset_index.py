@@ -0,0 +1,26 @@
+from __future__ import annotations
+
+import os
+from typing import Optional
+
+from sqlalchemy import create_engine, inspect
+from sqlalchemy.engine import Engine
+
+
+def run(engine: Optional[Engine] = None, database_url: Optional[str] = None) -> None:
+    """Sustituye el índice de ``start_dt`` por ``(start_dt, id)``, el orden de la paginación de /api/events."""
+    engine = engine or _resolve_engine(database_url)
+    with engine.begin() as conn:
+        if not inspect(conn).has_table("events"):
+            return
+        conn.exec_driver_sql("CREATE INDEX IF NOT EXISTS idx_events_start_dt_id ON events (start_dt, id)")
+        # El compuesto cubre también los filtros por rango de start_dt
+        conn.exec_driver_sql("DROP INDEX IF EXISTS idx_events_start_dt")
+
+
+def _resolve_engine(database_url: Optional[str]) -> Engine:
+    if not database_url:
+        database_url = os.getenv("DATABASE_URL")
+    if not database_url:
+        raise RuntimeError("DATABASE_URL is required")
+    return create_engine(database_url, future=True)
@@ -0,0 +1,78 @@
+from __future__ import annotations
+
+import os
+from typing import Optional
+
+from sqlalchemy import create_engine, inspect
+from sqlalchemy.engine import Engine
+
+
+def run(engine: Optional[Engine] = None, database_url: Optional[str] = None) -> None:
+    engine = engine or _resolve_engine(database_url)
+    with engine.begin() as conn:
+        inspector = inspect(conn)
+        if not inspector.has_table("weather_observations"):
+            return
+        dialect = conn.dialect.name
+
+        _drop_duplicates(conn)
+        _ensure_unique_constraint(conn, dialect)
+
+
+def _drop_duplicates(conn) -> None:
+    # Conserva la fila más reciente (id mayor) de cada (source, lat, lon, observed_at)
+    conn.exec_driver_sql(
+        """
+        DELETE FROM weather_observations
+        WHERE id NOT IN (
+            SELECT MAX(id)
+            FROM weather_observations
+            GROUP BY source, lat, lon, observed_at
+        )
+        """
+    )
+
+
+def _ensure_unique_constraint(conn, dialect: str) -> None:
+    if dialect == "sqlite":
+        conn.exec_driver_sql(
+            "CREATE UNIQUE INDEX IF NOT EXISTS uq_weather_observations_natural_key "
+            "ON weather_observations (source, lat, lon, observed_at)"
+        )
+    else:
+        conn.exec_driver_sql(
+            """
+            DO $$
+            BEGIN
+                IF NOT EXISTS (
+                    SELECT 1
+                    FROM pg_constraint
+                    WHERE contype = 'u'
+                      AND conrelid = 'weather_observations'::regclass
+                      AND conkey @> ARRAY(
+                          SELECT attnum FROM pg_attribute
+                          WHERE attrelid = 'weather_observations'::regclass
+                            AND attname IN ('source', 'lat', 'lon', 'observed_at')
+                      )
+                      AND array_length(conkey, 1) = 4
+                ) THEN
+                    ALTER TABLE weather_observations
+                        ADD CONSTRAINT uq_weather_observations_natural_key
+                        UNIQUE (source, lat, lon, observed_at);
+                END IF;
+            END;
+            $$;
+            """
+        )
+
+
+def _resolve_engine(database_url: Optional[str]) -> Engine:
+    if not database_url:
+        database_url = os.getenv("DATABASE_URL")
+    if not database_url:
+        raise RuntimeError("DATABASE_URL is required")
+    return create_engine(database_url, future=True)
+
+
+if __name__ == "__main__":
+    run()
@@ -1,7 +1,9 @@
 from __future__ import annotations
 
 from dataclasses import dataclass
-from typing import Optional
+from typing import Optional, Union
+
+from app.domain.category_metadata import DEFAULT_ATTENDANCE, CategoryMetadata
 
 
 @dataclass
@@ -11,14 +13,17 @@ class CategoryRule:
     fallback_attendance: int
 
 
-DEFAULT_FALLBACK = 100
+DEFAULT_FALLBACK = DEFAULT_ATTENDANCE
 
 
 def estimate_expected_attendance(
     category: str,
     venue_capacity: Optional[int],
-    rules_map: dict[str, dict],
+    rules_map: Union[CategoryMetadata, dict[str, dict]],
 ) -> int:
+    """Asistencia esperada; con ``CategoryMetadata`` (la caché compartida) no construye objetos por evento."""
+    if isinstance(rules_map, CategoryMetadata):
+        return rules_map.expected_attendance(category, venue_capacity)
     rule_data = rules_map.get(category.lower()) if category else None
     if not rule_data:
         return max(venue_capacity or DEFAULT_FALLBACK, 1)
@@ -0,0 +1,251 @@
+from __future__ import annotations
+
+import math
+import os
+import struct
+import sys
+import zlib
+from array import array
+from dataclasses import dataclass
+from datetime import datetime
+from hashlib import blake2b
+from typing import Dict, Iterator, List, Tuple
+
+from app.domain.event_batch import EventBatch, to_epoch
+from app.domain.scoring import DEFAULT_CATEGORY_METADATA, CategoryMetadata, batch_scores
+
+RASTER_MAX_CELLS = int(os.getenv("RASTER_MAX_CELLS", "250000"))
+RASTER_DEFAULT_CELL_M = float(os.getenv("RASTER_DEFAULT_CELL_M", "50"))
+METERS_PER_DEG_LAT = 111_320.0
+# El kernel gaussiano se trunca en el radio de la categoría (2 sigmas)
+KERNEL_SIGMAS = 2.0
+
+# Cabecera little-endian: magic, versión, filas, columnas, bbox (sur, oeste, norte, este), valor máximo
+RASTER_MAGIC = b"HSKD"
+RASTER_FORMAT_VERSION = 1
+RASTER_HEADER = struct.Struct("<4sBIIfffff")
+
+
+@dataclass(frozen=True)
+class RasterGrid:
+    south: float
+    west: float
+    north: float
+    east: float
+    rows: int
+    cols: int
+
+    @classmethod
+    def for_bbox(cls, south: float, west: float, north: float, east: float, cell_m: float) -> "RasterGrid":
+        if not (south < north and west < east):
+            raise ValueError("bbox must satisfy south < north and west < east")
+        if cell_m <= 0:
+            raise ValueError("cell_m must be positive")
+        mid_lat = math.radians((south + north) / 2)
+        height_m = (north - south) * METERS_PER_DEG_LAT
+        width_m = (east - west) * METERS_PER_DEG_LAT * math.cos(mid_lat)
+        rows = max(1, math.ceil(height_m / cell_m))
+        cols = max(1, math.ceil(width_m / cell_m))
+        if rows * cols > RASTER_MAX_CELLS:
+            raise ValueError(f"raster too large ({rows}x{cols} cells, max {RASTER_MAX_CELLS}); increase cell_m")
+        return cls(south, west, north, east, rows, cols)
+
+    @property
+    def cell_m(self) -> float:
+        return (self.north - self.south) * METERS_PER_DEG_LAT / self.rows
+
+    def cell_index(self, lat: float, lon: float) -> Tuple[int, int]:
+        # Fila 0 al norte, columna 0 al oeste (mismo orden que los tiles)
+        row = math.floor((self.north - lat) / (self.north - self.south) * self.rows)
+        col = math.floor((lon - self.west) / (self.east - self.west) * self.cols)
+        return row, col
+
+    def query_bbox(self, metadata: CategoryMetadata = DEFAULT_CATEGORY_METADATA) -> Tuple[float, float, float, float]:
+        """(sur, oeste, norte, este) ampliado con el radio más grande: los eventos que ``bin_impulses`` conserva."""
+        reach = int(metadata.max_radius_m // self.cell_m) + 1
+        dlat = (self.north - self.south) / self.rows * reach
+        dlon = (self.east - self.west) / self.cols * reach
+        return (
+            max(-90.0, self.south - dlat),
+            max(-180.0, self.west - dlon),
+            min(90.0, self.north + dlat),
+            min(180.0, self.east + dlon),
+        )
+
+
+def gaussian_kernel(radius_cells: float) -> List[float]:
+    """Kernel 1D con pico 1: su producto exterior es el kernel 2D (separable)."""
+    half = max(0, int(math.floor(radius_cells)))
+    sigma = max(radius_cells, 0.5) / KERNEL_SIGMAS
+    return [math.exp(-0.5 * (offset / sigma) ** 2) for offset in range(-half, half + 1)]
+
+
+def bin_impulses(
+    batch: EventBatch,
+    target: datetime,
+    grid: RasterGrid,
+    factor: float = 1.0,
+    metadata: CategoryMetadata = DEFAULT_CATEGORY_METADATA,
+) -> Dict[float, Dict[Tuple[int, int], float]]:
+    """Peso temporal x boost de cada evento acumulado en su celda, separado por radio de categoría.
+
+    Se conservan eventos fuera del bbox cuyo radio todavía alcanza la rejilla.
+    """
+    cell_m = grid.cell_m
+    radii = [metadata.radius_m[code] for code in metadata.codes(batch.categories)]
+    impulses: Dict[float, Dict[Tuple[int, int], float]] = {}
+    for i, score in enumerate(batch_scores(batch, target, metadata)):
+        weight = score * factor
+        if weight <= 0 or not batch.has_coords(i):
+            continue
+        radius = radii[batch.category_codes[i]]
+        reach = int(radius // cell_m)
+        r, c = grid.cell_index(batch.lat[i], batch.lon[i])
+        if r < -reach or r >= grid.rows + reach or c < -reach or c >= grid.cols + reach:
+            continue
+        cells = impulses.setdefault(radius, {})
+        cells[(r, c)] = cells.get((r, c), 0.0) + weight
+    return impulses
+
+
+def convolve(impulses: Dict[float, Dict[Tuple[int, int], float]], grid: RasterGrid) -> array:
+    """Convolución separable de los impulsos con el kernel gaussiano de cada radio.
+
+    Por radio, una pasada 1D por filas sobre las filas con impulsos y otra por columnas que
+    reparte cada fila suavizada en las filas de su huella: O(celdas x kernel) en lugar de
+    O(impulsos x kernel²). Cada fila solo recorre los tramos de columnas a los que llegan sus
+    impulsos, así que los impulsos dispersos tampoco pagan la rejilla entera. Las dos pasadas
+    suman slices (sin bucle por celda en Python).
+    """
+    rows, cols = grid.rows, grid.cols
+    out = [[0.0] * cols for _ in range(rows)]
+    cell_m = grid.cell_m
+    for radius, cells in impulses.items():
+        kernel = gaussian_kernel(radius / cell_m)
+        half = len(kernel) // 2
+        # Impulsos por fila, incluidos los de fuera de la rejilla que aún la alcanzan
+        by_row: Dict[int, List[Tuple[int, float]]] = {}
+        for (r, c), weight in cells.items():
+            if -half <= r < rows + half and -half <= c < cols + half:
+                by_row.setdefault(r, []).append((c, weight))
+        for r, entries in by_row.items():
+            rows_hit = range(max(0, r - half), min(rows, r + half + 1))
+            for lo, hi, run in _footprint_runs(sorted(entries), half, cols):
+                # Filas: convolución 1D de los impulsos del tramo [lo, hi)
+                smoothed = [0.0] * (hi - lo)
+                for c, weight in run:
+                    c0, c1 = max(lo, c - half), min(hi, c + half + 1)
+                    kx = kernel[c0 - (c - half) : c1 - (c - half)]
+                    smoothed[c0 - lo : c1 - lo] = [
+                        value + weight * k for value, k in zip(smoothed[c0 - lo : c1 - lo], kx)
+                    ]
+                # Columnas: el tramo suavizado se reparte en las filas de su huella
+                for i in rows_hit:
+                    kv = kernel[i - r + half]
+                    line = out[i]
+                    line[lo:hi] = [acc + kv * value for acc, value in zip(line[lo:hi], smoothed)]
+    flat = array("f")
+    for line in out:
+        flat.extend(line)
+    return flat
+
+
+def _footprint_runs(
+    entries: List[Tuple[int, float]], half: int, cols: int
+) -> Iterator[Tuple[int, int, List[Tuple[int, float]]]]:
+    """Agrupa los impulsos (ordenados por columna) de una fila en tramos ``[lo, hi)`` con huellas solapadas.
+
+    ``convolve`` solo pasa columnas en ``[-half, cols + half)``: todo tramo corta la rejilla.
+    """
+    run: List[Tuple[int, float]] = []
+    for entry in entries:
+        if run and entry[0] - run[-1][0] > 2 * half:
+            yield max(0, run[0][0] - half), min(cols, run[-1][0] + half + 1), run
+            run = []
+        run.append(entry)
+    if run:
+        yield max(0, run[0][0] - half), min(cols, run[-1][0] + half + 1), run
+
+
+def pack_raster(grid: RasterGrid, values: array) -> bytes:
+    header = RASTER_HEADER.pack(
+        RASTER_MAGIC,
+        RASTER_FORMAT_VERSION,
+        grid.rows,
+        grid.cols,
+        grid.south,
+        grid.west,
+        grid.north,
+        grid.east,
+        max(values, default=0.0),
+    )
+    if sys.byteorder != "little":
+        values = array("f", values)
+        values.byteswap()
+    return header + values.tobytes()
+
+
+def unpack_raster(body: bytes) -> Tuple[dict, array]:
+    magic, version, rows, cols, south, west, north, east, max_value = RASTER_HEADER.unpack_from(body)
+    if magic != RASTER_MAGIC:
+        raise ValueError("not a density raster")
+    values = array("f")
+    values.frombytes(body[RASTER_HEADER.size :])
+    if sys.byteorder != "little":
+        values.byteswap()
+    header = {
+        "version": version,
+        "rows": rows,
+        "cols": cols,
+        "bbox": (south, west, north, east),
+        "max": max_value,
+    }
+    return header, values
+
+
+def build_density_raster(
+    batch: EventBatch,
+    target: datetime,
+    factor: float,
+    grid: RasterGrid,
+    metadata: CategoryMetadata = DEFAULT_CATEGORY_METADATA,
+) -> bytes:
+    """Raster KDE comprimido (zlib) listo para servir; función de módulo para el pool de scoring."""
+    values = convolve(bin_impulses(batch, target, grid, factor, metadata), grid)
+    return zlib.compress(pack_raster(grid, values))
+
+
+def raster_etag(
+    batch: EventBatch,
+    target: datetime,
+    factor: float,
+    grid: RasterGrid,
+    metadata: CategoryMetadata = DEFAULT_CATEGORY_METADATA,
+) -> str:
+    """ETag de las entradas de ``build_density_raster``: se calcula (y se compara) antes del KDE.
+
+    Resume la rejilla, la hora, el factor meteo, los arrays del batch y las reglas
+    compiladas que usa el scoring (por contenido: ``version`` es local a cada proceso).
+    """
+    digest = blake2b(digest_size=16)
+    digest.update(
+        struct.pack(
+            "<BIIdddddd",
+            RASTER_FORMAT_VERSION,
+            grid.rows,
+            grid.cols,
+            grid.south,
+            grid.west,
+            grid.north,
+            grid.east,
+            to_epoch(target),
+            factor,
+        )
+    )
+    for values in (batch.start_s, batch.end_s, batch.lat, batch.lon, batch.category_codes):
+        digest.update(values.tobytes())
+    digest.update("\x1f".join(category or "" for category in batch.categories).encode())
+    digest.update("\x1f".join(metadata.categories).encode())
+    for values in (metadata.duration_s, metadata.pre_s, metadata.post_s, metadata.radius_m, metadata.boost):
+        digest.update(values.tobytes())
+    return f'"{digest.hexdigest()}"'
@@ -0,0 +1,165 @@
+from __future__ import annotations
+
+import math
+import os
+import struct
+import sys
+from array import array
+from datetime import datetime
+from hashlib import blake2b
+from typing import Dict, List, Tuple
+
+from app.domain.event_batch import EventBatch
+from app.domain.scoring import CELL_SIZE_DEG, DEFAULT_CATEGORY_METADATA, CategoryMetadata, batch_scores
+
+# Rejilla float32 de TILE_GRID_SIZE x TILE_GRID_SIZE por tile (64 x 64 = 16 KiB)
+TILE_GRID_SIZE = int(os.getenv("TILE_GRID_SIZE", "64"))
+TILE_MAX_AGE_SEC = int(os.getenv("TILE_MAX_AGE_SEC", "60"))
+MAX_ZOOM = 22
+MAX_LEVEL = 24
+MAX_LAT = 85.05112878
+TILE_MEDIA_TYPE = "application/octet-stream"
+
+# Cabecera little-endian: magic, versión, z, tamaño de rejilla, x, y, valor máximo
+TILE_MAGIC = b"HSDT"
+TILE_FORMAT_VERSION = 1
+TILE_HEADER = struct.Struct("<4sBBHIIf")
+
+Cell = Tuple[int, int]
+
+
+def cell_of(lat: float, lon: float) -> Cell:
+    """Celda base ``CELL_SIZE_DEG`` (índices enteros con floor, consistentes entre niveles)."""
+    return math.floor(lon / CELL_SIZE_DEG), math.floor(lat / CELL_SIZE_DEG)
+
+
+class CellPyramid:
+    """Scores agregados por celdas; el nivel ``k`` suma bloques de 2^k x 2^k celdas base."""
+
+    def __init__(self, base: Dict[Cell, float]):
+        self._levels: List[Dict[Cell, float]] = [base]
+
+    @classmethod
+    def from_batch(
+        cls,
+        batch: EventBatch,
+        target: datetime,
+        factor: float = 1.0,
+        metadata: CategoryMetadata = DEFAULT_CATEGORY_METADATA,
+    ) -> "CellPyramid":
+        base: Dict[Cell, float] = {}
+        for i, score in enumerate(batch_scores(batch, target, metadata)):
+            if score <= 0 or not batch.has_coords(i):
+                continue
+            key = cell_of(batch.lat[i], batch.lon[i])
+            base[key] = base.get(key, 0.0) + score * factor
+        return cls(base)
+
+    def level(self, k: int) -> Dict[Cell, float]:
+        while len(self._levels) <= k:
+            parent: Dict[Cell, float] = {}
+            for (ix, iy), score in self._levels[-1].items():
+                key = (ix >> 1, iy >> 1)
+                parent[key] = parent.get(key, 0.0) + score
+            self._levels.append(parent)
+        return self._levels[k]
+
+
+def level_for_zoom(z: int, grid_size: int = TILE_GRID_SIZE) -> int:
+    """Nivel cuyo tamaño de celda no supera el de un píxel de la rejilla en ese zoom."""
+    pixel_deg = 360.0 / ((1 << z) * grid_size)
+    if pixel_deg <= CELL_SIZE_DEG:
+        return 0
+    return min(MAX_LEVEL, int(math.floor(math.log2(pixel_deg / CELL_SIZE_DEG))))
+
+
+def tile_in_range(z: int, x: int, y: int) -> bool:
+    return 0 <= z <= MAX_ZOOM and 0 <= x < (1 << z) and 0 <= y < (1 << z)
+
+
+def _mercator_y(lat: float) -> float:
+    lat = max(-MAX_LAT, min(MAX_LAT, lat))
+    return (1.0 - math.asinh(math.tan(math.radians(lat))) / math.pi) / 2.0
+
+
+def _tile_lat(n: int, y: float) -> float:
+    # Inversa de _mercator_y: latitud del borde a la altura ``y`` (en tiles) del zoom con ``n`` tiles
+    return math.degrees(math.atan(math.sinh(math.pi * (1.0 - 2.0 * y / n))))
+
+
+def tile_query_bbox(z: int, x: int, y: int, grid_size: int = TILE_GRID_SIZE) -> Tuple[float, float, float, float]:
+    """(sur, oeste, norte, este) de los eventos que pueden pintar algo en el tile.
+
+    ``render_tile`` pinta cada celda del nivel en el píxel de su centro y no la reparte por
+    radio: basta el tile ampliado una celda del nivel (el centro del bloque no es la
+    posición del evento).
+    """
+    n = 1 << z
+    cell_deg = CELL_SIZE_DEG * (1 << level_for_zoom(z, grid_size))
+    north = 90.0 if y == 0 else _tile_lat(n, y) + cell_deg
+    south = -90.0 if y == n - 1 else _tile_lat(n, y + 1) - cell_deg
+    west = x / n * 360.0 - 180.0 - cell_deg
+    east = (x + 1) / n * 360.0 - 180.0 + cell_deg
+    return max(-90.0, south), max(-180.0, west), min(90.0, north), min(180.0, east)
+
+
+def render_tile(pyramid: CellPyramid, z: int, x: int, y: int, grid_size: int = TILE_GRID_SIZE) -> array:
+    level = level_for_zoom(z, grid_size)
+    cell_deg = CELL_SIZE_DEG * (1 << level)
+    n = 1 << z
+    grid = array("f", bytes(4 * grid_size * grid_size))
+    for (ix, iy), score in pyramid.level(level).items():
+        lon = (ix + 0.5) * cell_deg
+        lat = (iy + 0.5) * cell_deg
+        # floor y no int(): el truncado lleva al píxel 0 las celdas de justo antes del borde y las pinta en dos tiles
+        px = math.floor(((lon + 180.0) / 360.0 * n - x) * grid_size)
+        py = math.floor((_mercator_y(lat) * n - y) * grid_size)
+        if 0 <= px < grid_size and 0 <= py < grid_size:
+            grid[py * grid_size + px] += score
+    return grid
+
+
+def pack_tile(z: int, x: int, y: int, grid: array, grid_size: int = TILE_GRID_SIZE) -> bytes:
+    header = TILE_HEADER.pack(TILE_MAGIC, TILE_FORMAT_VERSION, z, grid_size, x, y, max(grid, default=0.0))
+    if sys.byteorder != "little":
+        grid = array("f", grid)
+        grid.byteswap()
+    return header + grid.tobytes()
+
+
+def unpack_tile(body: bytes) -> Tuple[dict, array]:
+    magic, version, z, grid_size, x, y, max_value = TILE_HEADER.unpack_from(body)
+    if magic != TILE_MAGIC:
+        raise ValueError("not a density tile")
+    grid = array("f")
+    grid.frombytes(body[TILE_HEADER.size :])
+    if sys.byteorder != "little":
+        grid.byteswap()
+    header = {"version": version, "z": z, "x": x, "y": y, "grid_size": grid_size, "max": max_value}
+    return header, grid
+
+
+def build_density_tile(
+    batch: EventBatch,
+    target: datetime,
+    factor: float,
+    z: int,
+    x: int,
+    y: int,
+    grid_size: int = TILE_GRID_SIZE,
+    metadata: CategoryMetadata = DEFAULT_CATEGORY_METADATA,
+) -> bytes:
+    """Tile binario listo para servir; función de módulo para poder ejecutarse en el pool de scoring."""
+    pyramid = CellPyramid.from_batch(batch, target, factor, metadata)
+    return pack_tile(z, x, y, render_tile(pyramid, z, x, y, grid_size), grid_size)
+
+
+def tile_etag(body: bytes) -> str:
+    return f'"{blake2b(body, digest_size=16).hexdigest()}"'
+
+
+def etag_matches(if_none_match: str | None, etag: str) -> bool:
+    if not if_none_match:
+        return False
+    candidates = [value.strip() for value in if_none_match.split(",")]
+    return "*" in candidates or any(value.removeprefix("W/") == etag for value in candidates)
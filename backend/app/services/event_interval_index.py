@@ -0,0 +1,354 @@
+from __future__ import annotations
+
+import os
+from bisect import bisect_right
+from datetime import date, datetime, time, timedelta, timezone
+from threading import Lock
+from time import monotonic
+from typing import Any, Dict, Generic, List, Optional, Sequence, Set, Tuple, TypeVar
+from weakref import WeakKeyDictionary
+
+from sqlalchemy import and_, func, or_, select, tuple_
+from sqlalchemy.engine import Engine
+
+from app.domain.activity import activity_window
+from app.domain.event_batch import to_epoch
+from app.infra.db.bulk import DEFAULT_CHUNK_SIZE, chunked, effective_chunk_size
+from app.infra.db.category_rules_repository import get_category_metadata
+from app.infra.db.events_repository import _events_join, add_write_listener
+from app.infra.db.tables import events_table, venues_table
+from app.infra.metrics import record_cache
+
+# Ventana rodante de días cargados alrededor de la fecha consultada
+EVENT_INDEX_DAYS = int(os.getenv("EVENT_INDEX_DAYS", "7"))
+EVENT_INDEX_PAST_DAYS = int(os.getenv("EVENT_INDEX_PAST_DAYS", "1"))
+REVALIDATE_AFTER_SEC = float(os.getenv("EVENT_INDEX_TTL_SEC", "60"))
+# Filas sin ventana persistida (anteriores a la migración): se buscan por start_dt con este margen
+LEGACY_LOOKBACK = timedelta(days=1)
+
+T = TypeVar("T")
+Row = Dict[str, Any]
+Key = Tuple[Optional[str], Optional[str]]
+Interval = Tuple[float, float, Row]
+
+
+class IntervalTree(Generic[T]):
+    """Árbol de intervalos centrado y estático sobre intervalos cerrados ``[start, end]``.
+
+    ``stab(t)`` devuelve los intervalos que contienen ``t`` en O(log n + k) y
+    ``overlapping(lo, hi)`` los que solapan ``[lo, hi]`` con el mismo coste.
+    """
+
+    def __init__(self, intervals: Sequence[Tuple[float, float, T]]):
+        self._by_start = sorted(intervals, key=lambda item: item[0])
+        self._starts = [item[0] for item in self._by_start]
+        self._root = self._build(self._by_start)
+
+    def __len__(self) -> int:
+        return len(self._by_start)
+
+    def _build(self, intervals: List[Tuple[float, float, T]]):
+        if not intervals:
+            return None
+        center = intervals[len(intervals) // 2][0]
+        left, right, here = [], [], []
+        for item in intervals:
+            if item[1] < center:
+                left.append(item)
+            elif item[0] > center:
+                right.append(item)
+            else:
+                here.append(item)
+        # ``intervals`` viene ordenado por inicio y el reparto conserva ese orden
+        by_end = sorted(here, key=lambda item: item[1], reverse=True)
+        return (center, here, by_end, self._build(left), self._build(right))
+
+    def stab(self, t: float) -> List[T]:
+        found: List[T] = []
+        node = self._root
+        while node is not None:
+            center, by_start, by_end, left, right = node
+            if t < center:
+                for start, _, item in by_start:
+                    if start > t:
+                        break
+                    found.append(item)
+                node = left
+            elif t > center:
+                for _, end, item in by_end:
+                    if end < t:
+                        break
+                    found.append(item)
+                node = right
+            else:
+                found.extend(item for _, _, item in by_start)
+                break
+        return found
+
+    def overlapping(self, lo: float, hi: float) -> List[T]:
+        # Los que contienen ``lo`` más los que empiezan dentro de (lo, hi]
+        found = self.stab(lo)
+        first = bisect_right(self._starts, lo)
+        last = bisect_right(self._starts, hi)
+        found.extend(item for _, _, item in self._by_start[first:last])
+        return found
+
+
+class EventIntervalIndex:
+    """Eventos activos de una ventana rodante de días indexados por su ventana de actividad.
+
+    Responde "qué eventos están activos en t" sin consultas por petición. Las escrituras
+    del proceso (``notify_written`` de ``events_repository``) se aplican al índice: con la
+    ventana de actividad que pasa el escritor se decide si la fila afecta a los días
+    cargados y solo esas filas se releen por id o clave natural; el árbol estático se
+    reconstruye con las entradas en memoria. Cada ``REVALIDATE_AFTER_SEC`` se compara
+    (count, max(updated_at)) y se aplican igual las filas modificadas por otros procesos
+    (jobs). Solo se recarga la ventana entera si una notificación no trae ventana (p. ej.
+    desactivaciones), si desaparecen filas o si cambia ``category_rules`` (nueva versión
+    de las reglas compiladas: las ventanas persistidas se recalculan).
+    """
+
+    def __init__(
+        self,
+        engine: Engine,
+        *,
+        days: int = EVENT_INDEX_DAYS,
+        past_days: int = EVENT_INDEX_PAST_DAYS,
+        revalidate_after_sec: float = REVALIDATE_AFTER_SEC,
+    ):
+        if engine is None:
+            raise ValueError("engine is required")
+        self.engine = engine
+        self.days = max(1, days)
+        self.past_days = past_days
+        self.revalidate_after_sec = revalidate_after_sec
+        self._lock = Lock()
+        self._pending_lock = Lock()
+        self._tree: IntervalTree[Row] = IntervalTree([])
+        self._entries: Dict[int, Interval] = {}
+        self._ids_by_key: Dict[Key, int] = {}
+        self._pending_ids: Set[int] = set()
+        self._pending_keys: Set[Key] = set()
+        self._range: Optional[Tuple[float, float]] = None
+        self._stale = True
+        self._signature: Optional[tuple] = None
+        self._rules_version: Optional[int] = None
+        self._checked_at = 0.0
+        self.loads = 0
+        self.patches = 0
+
+    def active_at(self, at: datetime) -> List[Row]:
+        """Eventos cuya ventana ``[activity_start, activity_end]`` contiene ``at``."""
+        t = to_epoch(at)
+        return self._covering(t, t).stab(t)
+
+    def active_between(self, start: datetime, end: datetime) -> List[Row]:
+        """Eventos cuya ventana de actividad solapa ``[start, end]``."""
+        lo, hi = to_epoch(start), to_epoch(end)
+        return self._covering(lo, hi).overlapping(lo, hi)
+
+    def mark_stale(self) -> None:
+        self._stale = True
+
+    def note_written(self, rows: List[Row]) -> None:
+        loaded = self._range
+        if loaded is None:
+            return
+        ids: Set[int] = set()
+        keys: Set[Key] = set()
+        for row in rows:
+            start, end = row.get("activity_start"), row.get("activity_end")
+            key = (row.get("source"), row.get("external_id"))
+            event_id = row.get("id") or self._ids_by_key.get(key)
+            if start is None or end is None or (event_id is None and None in key):
+                self._stale = True
+                return
+            # Fuera de los días cargados y sin entrada que retirar: no cambia nada
+            if not (to_epoch(start) <= loaded[1] and to_epoch(end) >= loaded[0]) and event_id not in self._entries:
+                continue
+            if event_id is not None:
+                ids.add(event_id)
+            else:
+                keys.add(key)
+        if ids or keys:
+            with self._pending_lock:
+                self._pending_ids |= ids
+                self._pending_keys |= keys
+
+    def _covering(self, lo: float, hi: float) -> IntervalTree[Row]:
+        self._revalidate()
+        loaded = self._range
+        pending = self._pending_ids or self._pending_keys
+        if not self._stale and not pending and loaded is not None and loaded[0] <= lo and hi <= loaded[1]:
+            record_cache("event_interval_index", True)
+            return self._tree
+        with self._lock:
+            loaded = self._range
+            hit = not self._stale and loaded is not None and loaded[0] <= lo and hi <= loaded[1]
+            if not hit:
+                self._load(lo, hi)
+            else:
+                self._apply_pending()
+            record_cache("event_interval_index", hit)
+            return self._tree
+
+    def _revalidate(self) -> None:
+        if get_category_metadata(self.engine).version != self._rules_version:
+            self._stale = True
+        if self._signature is not None and monotonic() - self._checked_at < self.revalidate_after_sec:
+            return
+        with self.engine.begin() as conn:
+            signature = tuple(
+                conn.execute(select(func.count(), func.max(events_table.c.updated_at)).select_from(events_table)).one()
+            )
+            previous = self._signature
+            if previous is not None and signature != previous and not self._stale and self._range is not None:
+                self._queue_changed_since(conn, previous, signature)
+        self._signature = signature
+        self._checked_at = monotonic()
+
+    def _queue_changed_since(self, conn, previous: tuple, signature: tuple) -> None:
+        # Filas modificadas desde el último max(updated_at): si el recuento no cuadra con las altas, hubo borrados
+        count, since = previous
+        stmt = select(events_table.c.id, events_table.c.created_at).select_from(events_table)
+        if since is not None:
+            stmt = stmt.where(events_table.c.updated_at > since)
+        changed = conn.execute(stmt).all()
+        created = sum(1 for _, created_at in changed if since is None or created_at is None or created_at > since)
+        # Un lote muy grande (p. ej. un import completo) sale más barato recargando la ventana
+        if signature[0] != count + created or len(changed) > max(len(self._entries), DEFAULT_CHUNK_SIZE):
+            self._stale = True
+            return
+        with self._pending_lock:
+            self._pending_ids.update(event_id for event_id, _ in changed)
+
+    def _apply_pending(self) -> None:
+        with self._pending_lock:
+            ids, keys = self._pending_ids, self._pending_keys
+            self._pending_ids, self._pending_keys = set(), set()
+        if not ids and not keys:
+            return
+        with self.engine.begin() as conn:
+            rules = get_category_metadata(self.engine, conn).activity_rules
+            rows = []
+            for chunk in chunked(sorted(ids), DEFAULT_CHUNK_SIZE):
+                rows.extend(conn.execute(_rows_stmt().where(events_table.c.id.in_(chunk))).mappings().all())
+            for chunk in chunked(sorted(keys), effective_chunk_size(DEFAULT_CHUNK_SIZE, 2)):
+                clause = tuple_(events_table.c.source, events_table.c.external_id).in_(chunk)
+                rows.extend(conn.execute(_rows_stmt().where(clause)).mappings().all())
+        lo, hi = self._range
+        for event_id in ids:
+            self._drop(event_id)
+        for mapping in rows:
+            self._drop(mapping["id"])
+            interval = _interval(dict(mapping), rules)
+            if mapping["is_active"] and interval[0] <= hi and interval[1] >= lo:
+                self._add(interval)
+        # El árbol es estático: se reconstruye con las entradas ya en memoria, sin releer la ventana
+        self._tree = IntervalTree(list(self._entries.values()))
+        self.patches += 1
+
+    def _drop(self, event_id: int) -> None:
+        interval = self._entries.pop(event_id, None)
+        if interval is not None:
+            row = interval[2]
+            self._ids_by_key.pop((row["source"], row["external_id"]), None)
+
+    def _add(self, interval: Interval) -> None:
+        row = interval[2]
+        self._entries[row["id"]] = interval
+        self._ids_by_key[(row["source"], row["external_id"])] = row["id"]
+
+    def _load(self, lo: float, hi: float) -> None:
+        first = datetime.fromtimestamp(lo, tz=timezone.utc).date() - timedelta(days=self.past_days)
+        last = max(
+            datetime.fromtimestamp(hi, tz=timezone.utc).date() + timedelta(days=1),
+            first + timedelta(days=self.days),
+        )
+        window_start = _day_start(first)
+        window_end = _day_start(last)
+        self._stale = False
+        with self._pending_lock:
+            self._pending_ids, self._pending_keys = set(), set()
+        with self.engine.begin() as conn:
+            compiled = get_category_metadata(self.engine, conn)
+            rows = conn.execute(_window_stmt(window_start, window_end)).mappings().all()
+        self._entries, self._ids_by_key = {}, {}
+        for mapping in rows:
+            self._add(_interval(dict(mapping), compiled.activity_rules))
+        self._tree = IntervalTree(list(self._entries.values()))
+        self._rules_version = compiled.version
+        self._range = (window_start.timestamp(), window_end.timestamp())
+        self.loads += 1
+
+
+def _interval(row: Row, rules) -> Interval:
+    if row["activity_start"] is None or row["activity_end"] is None:
+        row.update(activity_window(row["start_dt"], row["end_dt"], row["category"], rules)._asdict())
+    return to_epoch(row["activity_start"]), to_epoch(row["activity_end"]), row
+
+
+def _day_start(day: date) -> datetime:
+    return datetime.combine(day, time.min, tzinfo=timezone.utc)
+
+
+def _rows_stmt():
+    return select(
+        events_table.c.id,
+        events_table.c.external_id,
+        events_table.c.title,
+        events_table.c.category,
+        events_table.c.start_dt,
+        events_table.c.end_dt,
+        events_table.c.effective_end_dt,
+        events_table.c.activity_start,
+        events_table.c.activity_end,
+        events_table.c.lat,
+        events_table.c.lon,
+        events_table.c.url,
+        events_table.c.source,
+        events_table.c.is_active,
+        venues_table.c.name.label("venue_name"),
+        venues_table.c.city.label("city"),
+    ).select_from(_events_join())
+
+
+def _window_stmt(window_start: datetime, window_end: datetime):
+    persisted = and_(events_table.c.activity_start <= window_end, events_table.c.activity_end >= window_start)
+    legacy = and_(
+        events_table.c.activity_start.is_(None),
+        events_table.c.start_dt >= window_start - LEGACY_LOOKBACK,
+        events_table.c.start_dt <= window_end,
+    )
+    return _rows_stmt().where(events_table.c.is_active.is_(True), or_(persisted, legacy))
+
+
+_INDEXES: "WeakKeyDictionary[Engine, EventIntervalIndex]" = WeakKeyDictionary()
+_INDEXES_LOCK = Lock()
+
+
+def get_event_interval_index(engine: Engine) -> EventIntervalIndex:
+    index = _INDEXES.get(engine)
+    if index is not None:
+        return index
+    with _INDEXES_LOCK:
+        index = _INDEXES.get(engine)
+        if index is None:
+            index = EventIntervalIndex(engine)
+            _INDEXES[engine] = index
+        return index
+
+
+def invalidate_event_interval_index(engine: Engine) -> None:
+    index = _INDEXES.get(engine)
+    if index is not None:
+        index.mark_stale()
+
+
+def _on_events_written(engine: Engine, rows: List[Row]) -> None:
+    index = _INDEXES.get(engine)
+    if index is not None:
+        index.note_written(rows)
+
+
+add_write_listener(_on_events_written)
@@ -1,15 +1,33 @@
 from __future__ import annotations
 
 from datetime import datetime, timedelta, timezone
-from typing import Iterable, Optional
+from typing import Iterable, NamedTuple, Optional, Union
 
-from sqlalchemy import func, insert, select, update
+from sqlalchemy import bindparam, func, insert, select, update
 from sqlalchemy.engine import Connection, Engine
 
+from app.domain.activity import activity_window
 from app.domain.canonical import CanonicalEvent
+from app.infra.db.bulk import DEFAULT_CHUNK_SIZE, chunked, normalize_key, touch_if_changed
+from app.infra.db.category_rules_repository import get_category_metadata
+from app.infra.db.events_repository import fetch_existing_events, log_start_changes, notify_written
 from app.infra.db.tables import events_table
 from app.services.venue_upsert import VenueUpsertService
 
+# Dos eventos de fuentes distintas son el mismo si coinciden título, inicio y posición dentro de estos márgenes
+SIMILAR_WINDOW = timedelta(minutes=30)
+SIMILAR_TOLERANCE_DEG = 0.01
+
+
+class _SimilarCandidate(NamedTuple):
+    # id de la fila guardada o, para los eventos nuevos del mismo lote, el dict pendiente de insertar
+    target: Union[int, dict]
+    source: str
+    title: str  # en minúsculas, como ``lower(title)`` en SQL
+    start_dt: datetime
+    lat: float
+    lon: float
+
 
 class EventUpsertService:
     def __init__(self, engine: Engine, venue_service: VenueUpsertService | None = None):
@@ -32,31 +50,60 @@ class EventUpsertService:
         if self.venue_service:
             venue_mapping = self.venue_service.ensure_for_events(event_list)
 
+        now = datetime.now(timezone.utc)
         with self.engine.begin() as conn:
+            rules = get_category_metadata(self.engine, conn).activity_rules
+            payloads = []
             for event in event_list:
-                venue_id = self._resolve_venue_id(event, venue_mapping)
-                existing_id = self._locate_event(conn, event)
-                now = datetime.now(timezone.utc)
-                if existing_id:
-                    update_values = self._build_payload(event, venue_id)
-                    conn.execute(
-                        update(events_table)
-                        .where(events_table.c.id == existing_id)
-                        .values(**update_values, updated_at=now, last_synced_at=now, is_active=True)
-                    )
-                    stats["updated"] += 1
+                payload = self._build_payload(event, self._resolve_venue_id(event, venue_mapping))
+                payload.update(
+                    activity_window(payload["start_dt"], payload["end_dt"], payload["category"], rules)._asdict()
+                )
+                payload["is_active"] = True
+                payloads.append(payload)
+            keys = [(event.source, event.external_id) for event in event_list]
+            # Una consulta IN para los ids por clave y otra para los duplicados de otros proveedores
+            existing = fetch_existing_events(conn, set(keys))
+            candidates = self._similar_candidates(
+                conn, [event for event, key in zip(event_list, keys) if normalize_key(conn, key) not in existing]
+            )
+            updates: dict[int, dict] = {}
+            inserts: dict[tuple[str, str], dict] = {}
+            matched = []
+            for event, key, payload in zip(event_list, keys, payloads):
+                found = existing.get(normalize_key(conn, key))
+                if found is not None:
+                    updates[found[0]] = payload
+                    matched.append({"source": event.source, "external_id": event.external_id, **payload})
+                elif key in inserts:
+                    inserts[key].update(payload)
                 else:
-                    insert_values = {
-                        **self._build_payload(event, venue_id),
-                        "source": event.source,
-                        "external_id": event.external_id,
-                        "created_at": now,
-                        "updated_at": now,
-                        "last_synced_at": now,
-                        "is_active": True,
-                    }
-                    conn.execute(insert(events_table).values(insert_values))
-                    stats["inserted"] += 1
+                    match = self._match_similar(event, candidates)
+                    if match is None:
+                        inserts[key] = {"source": event.source, "external_id": event.external_id, **payload}
+                        # Los siguientes eventos del lote pueden ser duplicados de este
+                        if _can_match(event):
+                            candidates.append(
+                                _SimilarCandidate(
+                                    inserts[key],
+                                    event.source,
+                                    event.title.lower(),
+                                    _utc_naive(event.start_at),
+                                    event.lat,
+                                    event.lon,
+                                )
+                            )
+                    elif isinstance(match.target, dict):
+                        match.target.update(payload)
+                    else:
+                        updates[match.target] = payload
+            log_start_changes(conn, matched, existing, now)
+            self._write(conn, updates, list(inserts.values()), now)
+            # Filas escritas con su id (o clave natural si son altas): el índice de intervalos las aplica una a una
+            written = [{"id": event_id, **payload} for event_id, payload in updates.items()]
+            written.extend(inserts.values())
+            stats["inserted"] = len(inserts)
+            stats["updated"] = len(event_list) - len(inserts)
             if deactivate_missing and source and today:
                 self.deactivate_missing_events(
                     source=source,
@@ -64,45 +111,88 @@ class EventUpsertService:
                     today=today,
                     session=conn,
                 )
+        notify_written(self.engine, written)
         return stats
 
-    def _locate_event(self, conn: Connection, event: CanonicalEvent) -> Optional[int]:
-        stmt = select(events_table.c.id).where(
-            (events_table.c.source == event.source) & (events_table.c.external_id == event.external_id)
+    @staticmethod
+    def _write(conn: Connection, updates: dict[int, dict], inserts: list[dict], now: datetime) -> None:
+        # executemany: una sentencia compilada por tipo de escritura, no una por evento
+        if updates:
+            columns = list(next(iter(updates.values())))
+            values = {col: bindparam(f"v_{col}") for col in columns}
+            stmt = (
+                update(events_table)
+                .where(events_table.c.id == bindparam("b_id"))
+                .values(
+                    **values,
+                    updated_at=touch_if_changed(events_table, "updated_at", values, bindparam("b_now")),
+                    last_synced_at=bindparam("b_now"),
+                )
+            )
+            conn.execute(
+                stmt,
+                [
+                    {"b_id": event_id, "b_now": now, **{f"v_{col}": payload[col] for col in columns}}
+                    for event_id, payload in updates.items()
+                ],
+            )
+        if inserts:
+            conn.execute(
+                insert(events_table),
+                [{**row, "created_at": now, "updated_at": now, "last_synced_at": now} for row in inserts],
+            )
+
+    def _similar_candidates(self, conn: Connection, events: list[CanonicalEvent]) -> list["_SimilarCandidate"]:
+        """Eventos guardados que pueden ser el mismo que alguno de ``events`` publicado por otra fuente."""
+        titles = {event.title.strip().lower() for event in events if _can_match(event)}
+        titles.discard("")
+        if not titles:
+            return []
+        starts = [_utc_naive(event.start_at) for event in events if _can_match(event)]
+        title_key = func.lower(events_table.c.title)
+        stmt = (
+            select(
+                events_table.c.id,
+                events_table.c.source,
+                title_key.label("title_key"),
+                events_table.c.start_dt,
+                events_table.c.lat,
+                events_table.c.lon,
+            )
+            .where(
+                title_key.in_(bindparam("titles", expanding=True)),
+                events_table.c.start_dt >= min(starts) - SIMILAR_WINDOW,
+                events_table.c.start_dt <= max(starts) + SIMILAR_WINDOW,
+            )
+            .order_by(events_table.c.id)
         )
-        existing = conn.execute(stmt).scalar_one_or_none()
-        if existing is not None:
-            return existing
-        return self._find_similar_event(conn, event)
+        candidates = []
+        for chunk in chunked(sorted(titles), DEFAULT_CHUNK_SIZE):
+            for row in conn.execute(stmt, {"titles": list(chunk)}):
+                candidates.append(
+                    _SimilarCandidate(row.id, row.source, row.title_key, _utc_naive(row.start_dt), row.lat, row.lon)
+                )
+        return candidates
 
-    def _find_similar_event(self, conn: Connection, event: CanonicalEvent) -> Optional[int]:
-        if not event.title or event.lat is None or event.lon is None:
+    @staticmethod
+    def _match_similar(event: CanonicalEvent, candidates: list["_SimilarCandidate"]) -> Optional["_SimilarCandidate"]:
+        # Mismo título (sin mayúsculas), inicio a +-30 min y coordenadas a 0.01 grados, de otra fuente
+        if not _can_match(event):
             return None
         normalized_title = event.title.strip().lower()
         if not normalized_title:
             return None
-        tolerance_deg = 0.01
-        window = timedelta(minutes=30)
-        base_start = (
-            event.start_at.astimezone(timezone.utc).replace(tzinfo=None)
-            if event.start_at.tzinfo
-            else event.start_at
-        )
-        start_lower = base_start - window
-        start_upper = base_start + window
-        stmt = (
-            select(events_table.c.id)
-            .where(
-                func.lower(events_table.c.title) == normalized_title,
-                events_table.c.start_dt >= start_lower,
-                events_table.c.start_dt <= start_upper,
-                func.abs(events_table.c.lat - event.lat) <= tolerance_deg,
-                func.abs(events_table.c.lon - event.lon) <= tolerance_deg,
-                events_table.c.source != event.source,
-            )
-            .limit(1)
-        )
-        return conn.execute(stmt).scalar_one_or_none()
+        base_start = _utc_naive(event.start_at)
+        for candidate in candidates:
+            if (
+                candidate.source != event.source
+                and candidate.title == normalized_title
+                and abs(candidate.start_dt - base_start) <= SIMILAR_WINDOW
+                and abs(candidate.lat - event.lat) <= SIMILAR_TOLERANCE_DEG
+                and abs(candidate.lon - event.lon) <= SIMILAR_TOLERANCE_DEG
+            ):
+                return candidate
+        return None
 
     def _build_payload(self, event: CanonicalEvent, venue_id: Optional[int]) -> dict:
         if event.lat is None or event.lon is None:
@@ -183,6 +273,9 @@ class EventUpsertService:
             .values(is_active=False, updated_at=datetime.now(timezone.utc))
         )
         result = conn.execute(stmt)
+        if result.rowcount:
+            # Sin ventana de actividad en la notificación: los índices en memoria se invalidan enteros
+            notify_written(conn.engine, [{"source": source, "is_active": False}])
         return result.rowcount or 0
 
     @staticmethod
@@ -203,3 +296,11 @@ def _infer_category_from_title(title: str | None) -> Optional[str]:
     if any(word in t for word in ["comedia", "comedy", "humor"]):
         return "comedy"
     return None
+
+
+def _can_match(event: CanonicalEvent) -> bool:
+    return bool(event.title) and event.lat is not None and event.lon is not None
+
+
+def _utc_naive(value: datetime) -> datetime:
+    return value.astimezone(timezone.utc).replace(tzinfo=None) if value.tzinfo else value
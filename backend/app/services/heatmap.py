@@ -0,0 +1,370 @@
+from __future__ import annotations
+
+import json
+import math
+import os
+from datetime import date, datetime, time, timezone
+from pathlib import Path
+from threading import Lock
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+from sqlalchemy.engine import Engine
+
+from app.domain.event_batch import EventBatch
+from app.domain.models import Event as DomainEvent
+from app.domain.scoring import (
+    CELL_SIZE_DEG,
+    DEFAULT_CATEGORY_METADATA,
+    DEFAULT_RADIUS_M,
+    CategoryMetadata,
+    compute_hotspots,
+    event_score,
+    weather_factor,
+)
+from app.infra.db.category_rules_repository import get_category_metadata
+from app.infra.db.events_repository import EventsRepository
+from app.infra.metrics import record_cache
+from app.services.weather_index import get_weather_index
+
+DEFAULT_MODEL_DIR = Path(__file__).resolve().parents[2]
+MODEL_FILENAMES = {
+    "lead_time": "model_lead_time.json",
+    "attendance_factor": "model_attendance_factor.json",
+}
+MODEL_CACHE: Dict[str, "LinearModel"] = {}
+MODEL_CACHE_LOCK = Lock()
+
+
+class ModelUnavailableError(RuntimeError):
+    def __init__(self, status_code: int, detail: str):
+        super().__init__(detail)
+        self.status_code = status_code
+        self.detail = detail
+
+
+def build_heatmap_payload(
+    engine: Engine,
+    day: date,
+    hour: int,
+    lat: float,
+    lon: float,
+    city: Optional[str] = None,
+    mode: str = "heuristic",
+) -> Dict[str, Any]:
+    """Versión síncrona de ``GET /api/heatmap`` (jobs de materialización)."""
+    mode = mode.lower()
+    target = datetime.combine(day, time(hour=hour))
+    repo = EventsRepository(engine)
+    metadata = get_category_metadata(engine)
+    if mode == "heuristic":
+        rows = repo.event_batch_active_at(target, city=city, metadata=metadata)
+    else:
+        rows = repo.list_events_active_at(target, city=city, metadata=metadata)
+    weather_dt = target.replace(tzinfo=timezone.utc)
+    weather = get_weather_index(engine).observation_at(lat, lon, weather_dt)
+    ml_models = load_ml_models() if mode == "ml" else None
+    factor = weather_factor_for(weather)
+    hotspots = score_hotspots(
+        mode, rows, target, lat, lon, weather, factor, ml_models, metadata=metadata
+    )
+    return heatmap_response(mode, weather_dt, weather, hotspots)
+
+
+def weather_factor_for(weather: Optional[dict]) -> float:
+    return weather_factor(
+        weather.get("temperature_c") if weather else None,
+        weather.get("precipitation_mm") if weather else None,
+        weather.get("wind_speed_kmh") if weather else None,
+    )
+
+
+def heatmap_response(
+    mode: str, target: datetime, weather: Optional[dict], hotspots: List[Dict[str, Any]]
+) -> Dict[str, Any]:
+    return {
+        "mode": mode,
+        "target": target.isoformat(),
+        "weather": serialize_weather(weather),
+        "hotspots": hotspots,
+    }
+
+
+def score_hotspots(
+    mode: str,
+    rows: Union[EventBatch, List[dict]],
+    target: datetime,
+    lat: float,
+    lon: float,
+    weather: Optional[dict],
+    factor: float,
+    ml_models: Optional[Dict[str, "LinearModel"]],
+    metadata: CategoryMetadata = DEFAULT_CATEGORY_METADATA,
+) -> List[Dict[str, float]]:
+    """Hotspots del modo pedido; el heurístico puntúa sobre ``EventBatch`` y el ML necesita las filas completas."""
+    if mode == "heuristic":
+        batch = rows if isinstance(rows, EventBatch) else EventBatch.from_mappings(rows)
+        hotspots = compute_hotspots(batch, target, metadata=metadata)
+        return [
+            {
+                "lat": hs.lat,
+                "lon": hs.lon,
+                "score": round(hs.score * factor, 4),
+                "radius_m": hs.radius_m,
+                "lead_time_min_pred": None,
+                "attendance_factor_pred": None,
+            }
+            for hs in hotspots
+        ]
+    domain_events = [_row_to_domain(row) for row in rows]
+    hotspot_payload = _compute_ml_hotspots(
+        rows,
+        domain_events,
+        target,
+        lat,
+        lon,
+        weather,
+        ml_models,
+        metadata=metadata,
+    )
+    for hs in hotspot_payload:
+        hs["score"] = round(hs["score"] * factor, 4)
+    return hotspot_payload
+
+
+def _row_to_domain(row: dict) -> DomainEvent:
+    lat = row.get("lat")
+    lon = row.get("lon")
+    if lat is None:
+        lat = row.get("venue_lat")
+    if lon is None:
+        lon = row.get("venue_lon")
+    return DomainEvent(
+        id=str(row["id"]),
+        title=row["title"],
+        category=row["category"],
+        start_dt=row["start_dt"],
+        end_dt=row["end_dt"],
+        lat=lat,
+        lon=lon,
+        source=row.get("source"),
+    )
+
+
+def serialize_weather(obs):
+    if not obs:
+        return None
+    keys = [
+        "temperature_c",
+        "precipitation_mm",
+        "rain_mm",
+        "snowfall_mm",
+        "cloud_cover_pct",
+        "wind_speed_kmh",
+        "wind_gust_kmh",
+        "wind_dir_deg",
+        "humidity_pct",
+        "pressure_hpa",
+        "visibility_m",
+        "weather_code",
+    ]
+    payload = {k: obs.get(k) for k in keys}
+    payload["observed_at"] = obs.get("observed_at").isoformat() if obs.get("observed_at") else None
+    payload["source"] = obs.get("source")
+    return payload
+
+
+def load_ml_models():
+    return {
+        "lead_time": _get_model("lead_time"),
+        "attendance_factor": _get_model("attendance_factor"),
+    }
+
+
+def _get_model(name: str) -> "LinearModel":
+    base_dir = _resolve_model_dir()
+    cache_key = f"{name}:{base_dir}"
+    if cache_key in MODEL_CACHE:
+        record_cache("ml_models", True)
+        return MODEL_CACHE[cache_key]
+    record_cache("ml_models", False)
+    filename = MODEL_FILENAMES.get(name)
+    if not filename:
+        raise ModelUnavailableError(500, f"Model '{name}' not configured")
+    path = base_dir / filename
+    if not path.exists():
+        raise ModelUnavailableError(503, f"Model file not found: {path}")
+    with MODEL_CACHE_LOCK:
+        if cache_key in MODEL_CACHE:
+            return MODEL_CACHE[cache_key]
+        artifact = json.loads(path.read_text())
+        MODEL_CACHE[cache_key] = LinearModel(artifact)
+        return MODEL_CACHE[cache_key]
+
+
+def _resolve_model_dir() -> Path:
+    env_dir = os.getenv("MODEL_DIR") or os.getenv("HEATMAP_MODEL_DIR")
+    base_dir = Path(env_dir) if env_dir else DEFAULT_MODEL_DIR
+    return base_dir
+
+
+WEATHER_FIELDS = [
+    "temperature_c",
+    "precipitation_mm",
+    "rain_mm",
+    "snowfall_mm",
+    "wind_speed_kmh",
+    "wind_gust_kmh",
+    "cloud_cover_pct",
+    "humidity_pct",
+    "pressure_hpa",
+    "visibility_m",
+]
+
+
+def _compute_ml_hotspots(
+    rows: List[dict],
+    events: List[DomainEvent],
+    target: datetime,
+    center_lat: float,
+    center_lon: float,
+    weather: Optional[dict],
+    models: Dict[str, "LinearModel"],
+    max_points: int = 20,
+    metadata: CategoryMetadata = DEFAULT_CATEGORY_METADATA,
+) -> List[Dict[str, float]]:
+    target_naive = _to_utc_naive(target)
+    buckets: Dict[Tuple[float, float], Dict[str, float]] = {}
+    for row, event in zip(rows, events):
+        score = event_score(event, target_naive, event.lat, event.lon, metadata)
+        if score <= 0:
+            continue
+        feature_row = _build_feature_row(row, target_naive, center_lat, center_lon, weather)
+        lead_pred = _clamp_lead_time(models["lead_time"].predict(feature_row))
+        attendance_pred = _clamp_attendance_factor(models["attendance_factor"].predict(feature_row))
+        minutes_to_start = _minutes_to_start(row.get("start_dt"), target_naive)
+        if minutes_to_start > lead_pred:
+            score *= 0.2
+        score *= attendance_pred
+        if score <= 0:
+            continue
+        key = _bucket_key(event.lat, event.lon)
+        bucket = buckets.setdefault(
+            key,
+            {
+                "score": 0.0,
+                "lat_sum": 0.0,
+                "lon_sum": 0.0,
+                "count": 0,
+                "radius": DEFAULT_RADIUS_M,
+                "lead_sum": 0.0,
+                "attendance_sum": 0.0,
+            },
+        )
+        bucket["score"] += score
+        bucket["lat_sum"] += event.lat
+        bucket["lon_sum"] += event.lon
+        bucket["count"] += 1
+        bucket["radius"] = max(bucket["radius"], metadata.radius(event.category))
+        bucket["lead_sum"] += lead_pred
+        bucket["attendance_sum"] += attendance_pred
+
+    hotspots: List[Dict[str, float]] = []
+    for bucket in buckets.values():
+        count = bucket["count"] or 1
+        hotspots.append(
+            {
+                "lat": bucket["lat_sum"] / count,
+                "lon": bucket["lon_sum"] / count,
+                "score": bucket["score"],
+                "radius_m": bucket["radius"],
+                "lead_time_min_pred": round(bucket["lead_sum"] / count, 2),
+                "attendance_factor_pred": round(bucket["attendance_sum"] / count, 3),
+            }
+        )
+    hotspots.sort(key=lambda item: item["score"], reverse=True)
+    return hotspots[:max_points]
+
+
+def _build_feature_row(row: dict, target: datetime, center_lat: float, center_lon: float, weather: Optional[dict]):
+    feature_row = {
+        "hour": target.hour,
+        "dow": target.weekday(),
+        "category": row.get("category") or "unknown",
+        "lat": row.get("lat"),
+        "lon": row.get("lon"),
+        "dist_km": _haversine_km(center_lat, center_lon, row.get("lat"), row.get("lon")),
+    }
+    weather = weather or {}
+    for field in WEATHER_FIELDS:
+        feature_row[field] = weather.get(field)
+    return feature_row
+
+
+def _bucket_key(lat: float, lon: float) -> Tuple[float, float]:
+    def quantize(value: float) -> float:
+        return int(value / CELL_SIZE_DEG) * CELL_SIZE_DEG
+
+    return quantize(lat), quantize(lon)
+
+
+def _minutes_to_start(start_dt: Optional[datetime], target: datetime) -> float:
+    if not start_dt:
+        return 0.0
+    start = _to_utc_naive(start_dt)
+    if start is None:
+        return 0.0
+    delta = (start - target).total_seconds() / 60.0
+    return max(0.0, delta)
+
+
+def _to_iso(dt):
+    return dt.isoformat() if dt else None
+
+
+def _to_utc_naive(dt: Optional[datetime]) -> Optional[datetime]:
+    if dt is None:
+        return None
+    if dt.tzinfo is None:
+        return dt
+    return dt.astimezone(timezone.utc).replace(tzinfo=None)
+
+
+def _haversine_km(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    if lat1 is None or lon1 is None or lat2 is None or lon2 is None:
+        return 0.0
+    r = 6371.0
+    dlat = math.radians(lat2 - lat1)
+    dlon = math.radians(lon2 - lon1)
+    a = math.sin(dlat / 2) ** 2 + math.cos(math.radians(lat1)) * math.cos(math.radians(lat2)) * math.sin(dlon / 2) ** 2
+    c = 2 * math.asin(math.sqrt(a))
+    return r * c
+
+
+def _clamp_lead_time(value: float) -> float:
+    return float(max(15.0, min(120.0, value)))
+
+
+def _clamp_attendance_factor(value: float) -> float:
+    return float(max(0.50, min(1.10, value)))
+
+
+class LinearModel:
+    def __init__(self, artifact: dict):
+        self.target_col = artifact.get("target_col", "label")
+        self.feature_columns = artifact.get("feature_columns") or []
+        self.scales = artifact.get("scales") or [1.0] * len(self.feature_columns)
+        self.weights = artifact.get("weights") or [0.0] * len(self.feature_columns)
+        self.bias = artifact.get("bias", 0.0)
+
+    def predict(self, feature_row: dict) -> float:
+        total = self.bias
+        for weight, column, scale in zip(self.weights, self.feature_columns, self.scales):
+            if column.startswith("cat_"):
+                category = column[4:]
+                value = 1.0 if (feature_row.get("category") or "unknown") == category else 0.0
+            else:
+                raw = feature_row.get(column)
+                value = 0.0 if raw in (None, "") else float(raw)
+                value = value / scale if scale else value
+            total += weight * value
+        return total
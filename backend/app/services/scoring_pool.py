@@ -0,0 +1,49 @@
+from __future__ import annotations
+
+import asyncio
+import os
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from functools import partial
+from threading import Lock
+from typing import Any, Callable, Optional, TypeVar
+
+# "thread" libera el event loop; "process" además evita el GIL en cálculos largos
+SCORING_POOL_KIND = os.getenv("SCORING_POOL", "thread").lower()
+SCORING_WORKERS = int(os.getenv("SCORING_WORKERS", str(min(4, os.cpu_count() or 1))))
+
+T = TypeVar("T")
+
+_executor: Optional[Executor] = None
+_executor_lock = Lock()
+
+
+def get_scoring_executor() -> Executor:
+    global _executor
+    if _executor is not None:
+        return _executor
+    with _executor_lock:
+        if _executor is None:
+            if SCORING_POOL_KIND == "process":
+                _executor = ProcessPoolExecutor(max_workers=SCORING_WORKERS)
+            elif SCORING_POOL_KIND == "thread":
+                _executor = ThreadPoolExecutor(max_workers=SCORING_WORKERS, thread_name_prefix="scoring")
+            else:
+                raise ValueError(f"unknown SCORING_POOL '{SCORING_POOL_KIND}' (expected thread or process)")
+        return _executor
+
+
+async def run_scoring(fn: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    """Ejecuta ``fn`` en el pool de scoring sin bloquear el event loop.
+
+    Con ``SCORING_POOL=process`` la función y sus argumentos deben poder serializarse.
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_scoring_executor(), partial(fn, *args, **kwargs))
+
+
+def shutdown_scoring_pool() -> None:
+    global _executor
+    with _executor_lock:
+        if _executor is not None:
+            _executor.shutdown(wait=True)
+            _executor = None
@@ -1,13 +1,11 @@
 from __future__ import annotations
 
-from datetime import datetime, timezone
 from typing import Dict, Iterable, Optional, Tuple
 
-from sqlalchemy import insert, select, update
-from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.engine import Engine
 
 from app.domain.canonical import CanonicalEvent
-from app.infra.db.tables import venues_table
+from app.infra.db.venues_repository import VenuesRepository
 
 
 class VenueUpsertService:
@@ -28,32 +26,9 @@ class VenueUpsertService:
         return self._upsert_payloads(payloads)
 
     def _upsert_payloads(self, payloads: Dict[Tuple[str, str], dict]) -> dict[Tuple[str, str], int]:
-        mapping: dict[Tuple[str, str], int] = {}
-        with self.engine.begin() as conn:
-            for key, payload in payloads.items():
-                existing = self._find_existing(conn, payload["source"], payload["external_id"])
-                now = datetime.now(timezone.utc)
-                if existing is not None:
-                    conn.execute(
-                        update(venues_table)
-                        .where(venues_table.c.id == existing)
-                        .values(**payload, updated_at=now)
-                    )
-                    mapping[key] = existing
-                else:
-                    result = conn.execute(
-                        insert(venues_table).values(**payload, created_at=now, updated_at=now)
-                    )
-                    mapping[key] = result.inserted_primary_key[0]
-        return mapping
-
-    def _find_existing(self, conn: Connection, source: str, external_id: str) -> Optional[int]:
-        stmt = (
-            select(venues_table.c.id)
-            .where(venues_table.c.source == source, venues_table.c.external_id == external_id)
-            .limit(1)
-        )
-        return conn.execute(stmt).scalar_one_or_none()
+        # Una consulta IN y escrituras en bloque para todo el lote (VenuesRepository.resolve_many)
+        resolved = VenuesRepository(self.engine).resolve_many(payloads.values()).ids
+        return {key: resolved[("external", *key)] for key in payloads}
 
     @staticmethod
     def _payload_from_event(event: CanonicalEvent) -> Optional[dict]:
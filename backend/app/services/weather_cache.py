@@ -0,0 +1,252 @@
+from __future__ import annotations
+
+import math
+import os
+from array import array
+from collections import OrderedDict
+from datetime import date, datetime, time, timedelta, timezone
+from threading import Lock
+from time import monotonic
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from weakref import WeakKeyDictionary
+
+from sqlalchemy import func, select
+from sqlalchemy.engine import Engine
+
+from app.infra.db.tables import weather_observations_table
+from app.infra.db.weather_repository import add_write_listener
+from app.infra.metrics import record_cache
+
+# Campos numéricos guardados por hora; el orden define el desplazamiento en el array plano
+CACHED_FIELDS = [
+    "temperature_c",
+    "precipitation_mm",
+    "rain_mm",
+    "snowfall_mm",
+    "cloud_cover_pct",
+    "wind_speed_kmh",
+    "wind_gust_kmh",
+    "wind_dir_deg",
+    "humidity_pct",
+    "pressure_hpa",
+    "visibility_m",
+    "weather_code",
+]
+HOURS_PER_DAY = 24
+WARM_PAST_DAYS = int(os.getenv("WEATHER_CACHE_PAST_DAYS", "3"))
+WARM_FUTURE_DAYS = int(os.getenv("WEATHER_CACHE_FUTURE_DAYS", "7"))
+MAX_CACHED_DAYS = int(os.getenv("WEATHER_CACHE_MAX_DAYS", "120"))
+REVALIDATE_AFTER_SEC = float(os.getenv("WEATHER_CACHE_TTL_SEC", os.getenv("WEATHER_INDEX_TTL_SEC", "300")))
+
+Station = Tuple[float, float]
+Sample = Dict[str, Any]
+
+_FIELD_COUNT = len(CACHED_FIELDS)
+_EMPTY_DAY = array("d", [math.nan]) * (HOURS_PER_DAY * _FIELD_COUNT)
+
+
+def hour_index(dt: datetime) -> int:
+    """Horas completas desde epoch (UTC); un datetime naive se interpreta como UTC."""
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return int(dt.timestamp() // 3600)
+
+
+def _day_number(day: date) -> int:
+    return (day - date(1970, 1, 1)).days
+
+
+class _StationDay:
+    __slots__ = ("values", "sources")
+
+    def __init__(self) -> None:
+        self.values = array("d", _EMPTY_DAY)
+        self.sources: List[Optional[str]] = [None] * HOURS_PER_DAY
+
+
+class WeatherCache:
+    """Series horarias en memoria como arrays compactos indexados por (estación, hora).
+
+    Cada día cargado ocupa un ``array('d')`` de 24 x campos por estación (NaN si
+    el campo no tiene valor). Se carga por días completos con una consulta, se precalienta
+    con los días recientes y próximos y se actualiza con las escrituras del proceso.
+    """
+
+    def __init__(
+        self,
+        engine: Engine,
+        *,
+        past_days: int = WARM_PAST_DAYS,
+        future_days: int = WARM_FUTURE_DAYS,
+        max_days: int = MAX_CACHED_DAYS,
+        revalidate_after_sec: float = REVALIDATE_AFTER_SEC,
+    ):
+        if engine is None:
+            raise ValueError("engine is required")
+        self.engine = engine
+        self.past_days = past_days
+        self.future_days = future_days
+        self.max_days = max_days
+        self.revalidate_after_sec = revalidate_after_sec
+        self._lock = Lock()
+        self._days: "OrderedDict[int, Dict[Station, _StationDay]]" = OrderedDict()
+        self._locations: Dict[Station, Optional[str]] = {}
+        self._stations: Dict[Station, None] = {}
+        self.stations_version = 0
+        self._signature: Optional[tuple] = None
+        self._checked_at = monotonic()
+        self._resync_signature = True
+
+    @property
+    def stations(self) -> List[Station]:
+        return list(self._stations)
+
+    def warm(self, reference: Optional[date] = None) -> int:
+        reference = reference or datetime.now(timezone.utc).date()
+        self.revalidate()
+        self.ensure_days(reference - timedelta(days=self.past_days), reference + timedelta(days=self.future_days))
+        return len(self._days)
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._reset()
+
+    def get(self, station: Station, hour: int) -> Optional[Sample]:
+        station_day = self._days.get(hour // HOURS_PER_DAY, {}).get(station)
+        if station_day is None:
+            return None
+        slot = hour % HOURS_PER_DAY
+        base = slot * _FIELD_COUNT
+        if station_day.sources[slot] is None:
+            return None
+        values = station_day.values
+        sample: Sample = {
+            field: (None if math.isnan(values[base + offset]) else values[base + offset])
+            for offset, field in enumerate(CACHED_FIELDS)
+        }
+        if sample["weather_code"] is not None:
+            sample["weather_code"] = int(sample["weather_code"])
+        sample["source"] = station_day.sources[slot]
+        sample["location_name"] = self._locations.get(station)
+        sample["lat"], sample["lon"] = station
+        sample["observed_at"] = datetime.fromtimestamp(hour * 3600, tz=timezone.utc)
+        return sample
+
+    def ensure_days(self, first: date, last: date) -> None:
+        wanted = range(_day_number(first), _day_number(last) + 1)
+        if all(day in self._days for day in wanted):
+            record_cache("weather_days", True)
+            return
+        record_cache("weather_days", False)
+        with self._lock:
+            missing = [day for day in wanted if day not in self._days]
+            if not missing:
+                return
+            epoch = date(1970, 1, 1)
+            window_start = datetime.combine(epoch + timedelta(days=missing[0]), time.min)
+            window_end = datetime.combine(epoch + timedelta(days=missing[-1] + 1), time.min)
+            with self.engine.begin() as conn:
+                rows = conn.execute(
+                    select(weather_observations_table)
+                    .where(weather_observations_table.c.observed_at >= window_start)
+                    .where(weather_observations_table.c.observed_at < window_end)
+                    .order_by(weather_observations_table.c.updated_at)
+                ).mappings().all()
+            for day in missing:
+                self._days[day] = {}
+            for row in rows:
+                self._store(row)
+            self._evict()
+
+    def add_observations(self, rows: Iterable[Sample]) -> None:
+        with self._lock:
+            for row in rows:
+                self._store(row)
+            self._resync_signature = True
+
+    def revalidate(self) -> None:
+        if self._signature is not None and not self._resync_signature:
+            if monotonic() - self._checked_at < self.revalidate_after_sec:
+                return
+        with self.engine.begin() as conn:
+            signature = tuple(
+                conn.execute(
+                    select(func.count(), func.max(weather_observations_table.c.updated_at)).select_from(
+                        weather_observations_table
+                    )
+                ).one()
+            )
+        with self._lock:
+            if not self._resync_signature and signature != self._signature:
+                self._reset()
+            self._signature = signature
+            self._checked_at = monotonic()
+            self._resync_signature = False
+
+    def _store(self, row: Sample) -> None:
+        observed = row.get("observed_at")
+        if observed is None or row.get("lat") is None or row.get("lon") is None:
+            return
+        hour = hour_index(observed)
+        day = self._days.get(hour // HOURS_PER_DAY)
+        if day is None:
+            # Los días no cargados se leerán completos cuando se pidan
+            return
+        station = (float(row["lat"]), float(row["lon"]))
+        station_day = day.get(station)
+        if station_day is None:
+            station_day = day[station] = _StationDay()
+        slot = hour % HOURS_PER_DAY
+        base = slot * _FIELD_COUNT
+        for offset, field in enumerate(CACHED_FIELDS):
+            value = row.get(field)
+            station_day.values[base + offset] = math.nan if value is None else float(value)
+        station_day.sources[slot] = row.get("source") or ""
+        if row.get("location_name") is not None:
+            self._locations[station] = row["location_name"]
+        if station not in self._stations:
+            self._stations[station] = None
+            self.stations_version += 1
+
+    def _evict(self) -> None:
+        while len(self._days) > self.max_days:
+            self._days.popitem(last=False)
+
+    def _reset(self) -> None:
+        self._days = OrderedDict()
+        self._locations = {}
+        self._stations = {}
+        self.stations_version += 1
+        self._signature = None
+        self._resync_signature = True
+
+
+_CACHES: "WeakKeyDictionary[Engine, WeatherCache]" = WeakKeyDictionary()
+_CACHES_LOCK = Lock()
+
+
+def get_weather_cache(engine: Engine) -> WeatherCache:
+    cache = _CACHES.get(engine)
+    if cache is not None:
+        return cache
+    with _CACHES_LOCK:
+        cache = _CACHES.get(engine)
+        if cache is None:
+            cache = WeatherCache(engine)
+            _CACHES[engine] = cache
+        return cache
+
+
+def invalidate_weather_cache(engine: Engine) -> None:
+    cache = _CACHES.get(engine)
+    if cache is not None:
+        cache.invalidate()
+
+
+def _on_weather_written(engine: Engine, rows: List[Sample]) -> None:
+    cache = _CACHES.get(engine)
+    if cache is not None:
+        cache.add_observations(rows)
+
+
+add_write_listener(_on_weather_written)
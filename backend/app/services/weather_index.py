@@ -0,0 +1,284 @@
+from __future__ import annotations
+
+import heapq
+import math
+import os
+from datetime import date, datetime, timedelta, timezone
+from threading import Lock
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+from weakref import WeakKeyDictionary
+
+from sqlalchemy.engine import Engine
+
+from app.services.weather_cache import WeatherCache, get_weather_cache, invalidate_weather_cache
+
+# Campos numéricos que se interpolan en espacio (IDW) y tiempo (lineal)
+INTERPOLATED_FIELDS = [
+    "temperature_c",
+    "precipitation_mm",
+    "rain_mm",
+    "snowfall_mm",
+    "cloud_cover_pct",
+    "wind_speed_kmh",
+    "wind_gust_kmh",
+    "humidity_pct",
+    "pressure_hpa",
+    "visibility_m",
+]
+
+DEFAULT_K = 3
+DEFAULT_MAX_DISTANCE_KM = float(os.getenv("WEATHER_INDEX_MAX_DISTANCE_KM", "30"))
+IDW_POWER = 2.0
+EXACT_DISTANCE_KM = 0.001
+EXACT_TOLERANCE = timedelta(minutes=1)
+ONE_SIDED_TOLERANCE = timedelta(minutes=30)
+MAX_TEMPORAL_GAP = timedelta(hours=3)
+EARTH_RADIUS_KM = 6371.0
+
+Station = Tuple[float, float]
+Sample = Dict[str, Any]
+
+
+def _to_epoch(dt: datetime) -> float:
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return dt.timestamp()
+
+
+def _utc_date(dt: datetime) -> date:
+    if dt.tzinfo is not None:
+        dt = dt.astimezone(timezone.utc)
+    return dt.date()
+
+
+def _haversine_km(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    dlat = math.radians(lat2 - lat1)
+    dlon = math.radians(lon2 - lon1)
+    a = math.sin(dlat / 2) ** 2 + math.cos(math.radians(lat1)) * math.cos(math.radians(lat2)) * math.sin(dlon / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(a))
+
+
+class _KDTree:
+    """KD-tree 2D estático sobre (lat, lon) proyectados en un plano equirectangular."""
+
+    def __init__(self, points: Sequence[Station]):
+        self.points = list(points)
+        ref_lat = sum(p[0] for p in self.points) / len(self.points) if self.points else 0.0
+        self._kx = math.cos(math.radians(ref_lat))
+        self._xy = [(lon * self._kx, lat) for lat, lon in self.points]
+        self._root = self._build(list(range(len(self.points))), 0)
+
+    def _build(self, indices: List[int], depth: int):
+        if not indices:
+            return None
+        axis = depth % 2
+        indices.sort(key=lambda i: self._xy[i][axis])
+        mid = len(indices) // 2
+        return (
+            indices[mid],
+            axis,
+            self._build(indices[:mid], depth + 1),
+            self._build(indices[mid + 1 :], depth + 1),
+        )
+
+    def nearest(self, lat: float, lon: float, k: int) -> List[int]:
+        if self._root is None or k <= 0:
+            return []
+        qx, qy = lon * self._kx, lat
+        heap: List[Tuple[float, int]] = []  # max-heap por distancia (negada)
+
+        def visit(node) -> None:
+            if node is None:
+                return
+            idx, axis, left, right = node
+            px, py = self._xy[idx]
+            d2 = (px - qx) ** 2 + (py - qy) ** 2
+            if len(heap) < k:
+                heapq.heappush(heap, (-d2, idx))
+            elif d2 < -heap[0][0]:
+                heapq.heapreplace(heap, (-d2, idx))
+            diff = (qx - px) if axis == 0 else (qy - py)
+            near, far = (left, right) if diff < 0 else (right, left)
+            visit(near)
+            if len(heap) < k or diff * diff < -heap[0][0]:
+                visit(far)
+
+        visit(self._root)
+        return [idx for _, idx in sorted(heap, key=lambda item: -item[0])]
+
+
+class WeatherStationIndex:
+    """Vecinos más cercanos e interpolación sobre los puntos meteorológicos almacenados.
+
+    Las series horarias salen de ``WeatherCache`` (sin consultas por petición); el
+    índice responde con un KD-tree sobre las estaciones cargadas e interpola en
+    espacio (IDW) y en tiempo (lineal entre observaciones horarias).
+    """
+
+    def __init__(
+        self,
+        engine: Engine,
+        *,
+        cache: Optional[WeatherCache] = None,
+        k: int = DEFAULT_K,
+        max_distance_km: float = DEFAULT_MAX_DISTANCE_KM,
+    ):
+        if engine is None:
+            raise ValueError("engine is required")
+        self.engine = engine
+        self.cache = cache or WeatherCache(engine)
+        self.k = k
+        self.max_distance_km = max_distance_km
+        self._tree: Optional[_KDTree] = None
+        self._tree_version = -1
+
+    def invalidate(self) -> None:
+        self.cache.invalidate()
+
+    def observation_at(self, lat: float, lon: float, at: datetime) -> Optional[Sample]:
+        self.cache.revalidate()
+        self.cache.ensure_days(_utc_date(at - MAX_TEMPORAL_GAP), _utc_date(at + MAX_TEMPORAL_GAP))
+        target = _to_epoch(at)
+        samples: List[Tuple[float, Sample, bool]] = []
+        for station, distance in self.nearest(lat, lon, k=self.k * 3):
+            sample, exact = self._sample_at(station, target)
+            if sample is None:
+                continue
+            samples.append((distance, sample, exact))
+            if len(samples) == self.k:
+                break
+        if not samples:
+            return None
+        distance, sample, exact = samples[0]
+        if distance <= EXACT_DISTANCE_KM:
+            if exact:
+                return dict(sample)
+            samples = samples[:1]
+        return self._blend(samples, at)
+
+    def nearest(self, lat: float, lon: float, k: Optional[int] = None) -> List[Tuple[Station, float]]:
+        tree = self._current_tree()
+        if tree is None:
+            return []
+        k = k or self.k
+        candidates = [tree.points[idx] for idx in tree.nearest(lat, lon, k)]
+        ranked = sorted(
+            ((station, _haversine_km(lat, lon, station[0], station[1])) for station in candidates),
+            key=lambda item: item[1],
+        )
+        return [item for item in ranked if item[1] <= self.max_distance_km]
+
+    def _current_tree(self) -> Optional[_KDTree]:
+        if self._tree_version != self.cache.stations_version:
+            stations = self.cache.stations
+            self._tree = _KDTree(stations) if stations else None
+            self._tree_version = self.cache.stations_version
+        return self._tree
+
+    def _sample_at(self, station: Station, target: float) -> Tuple[Optional[Sample], bool]:
+        # Acceso O(1) por hora: se miran como mucho MAX_TEMPORAL_GAP horas a cada lado
+        base = int(target // 3600)
+        offset = target - base * 3600
+        exact_tol = EXACT_TOLERANCE.total_seconds()
+        if offset <= exact_tol:
+            sample = self.cache.get(station, base)
+            if sample is not None:
+                return sample, True
+        if 3600 - offset <= exact_tol:
+            sample = self.cache.get(station, base + 1)
+            if sample is not None:
+                return sample, True
+        gap_hours = int(MAX_TEMPORAL_GAP.total_seconds() // 3600)
+        before = after = None
+        before_at = after_at = 0.0
+        for step in range(gap_hours):
+            before = self.cache.get(station, base - step)
+            if before is not None:
+                before_at = (base - step) * 3600.0
+                break
+        for step in range(1, gap_hours + 1):
+            after = self.cache.get(station, base + step)
+            if after is not None:
+                after_at = (base + step) * 3600.0
+                break
+        if before is not None and after is not None and after_at - before_at <= MAX_TEMPORAL_GAP.total_seconds():
+            return _lerp(before, after, (target - before_at) / (after_at - before_at)), False
+        one_sided = ONE_SIDED_TOLERANCE.total_seconds()
+        if after is not None and after_at - target <= one_sided:
+            return after, False
+        if before is not None and target - before_at <= one_sided:
+            return before, False
+        return None, False
+
+    def _blend(self, samples: List[Tuple[float, Sample, bool]], at: datetime) -> Sample:
+        weights = [1.0 / max(distance, EXACT_DISTANCE_KM) ** IDW_POWER for distance, _, _ in samples]
+        blended: Sample = {}
+        for field in INTERPOLATED_FIELDS:
+            total = 0.0
+            weight_sum = 0.0
+            for weight, (_, sample, _) in zip(weights, samples):
+                value = sample.get(field)
+                if value is None:
+                    continue
+                total += weight * float(value)
+                weight_sum += weight
+            blended[field] = total / weight_sum if weight_sum else None
+        blended["wind_dir_deg"] = _circular_mean(
+            [(weight, sample.get("wind_dir_deg")) for weight, (_, sample, _) in zip(weights, samples)]
+        )
+        nearest = samples[0][1]
+        blended["weather_code"] = nearest.get("weather_code")
+        blended["location_name"] = nearest.get("location_name")
+        blended["source"] = nearest.get("source") if len(samples) == 1 else "interpolated"
+        blended["observed_at"] = at if at.tzinfo else at.replace(tzinfo=timezone.utc)
+        return blended
+
+
+def _lerp(before: Sample, after: Sample, ratio: float) -> Sample:
+    merged = dict(before if ratio < 0.5 else after)
+    for field in INTERPOLATED_FIELDS:
+        a = before.get(field)
+        b = after.get(field)
+        if a is None or b is None:
+            merged[field] = a if b is None else b
+        else:
+            merged[field] = float(a) + (float(b) - float(a)) * ratio
+    merged["wind_dir_deg"] = _circular_mean(
+        [(1.0 - ratio, before.get("wind_dir_deg")), (ratio, after.get("wind_dir_deg"))]
+    )
+    return merged
+
+
+def _circular_mean(weighted: List[Tuple[float, Optional[float]]]) -> Optional[float]:
+    x = 0.0
+    y = 0.0
+    found = False
+    for weight, degrees in weighted:
+        if degrees is None:
+            continue
+        found = True
+        x += weight * math.cos(math.radians(degrees))
+        y += weight * math.sin(math.radians(degrees))
+    if not found:
+        return None
+    return math.degrees(math.atan2(y, x)) % 360.0
+
+
+_INDEXES: "WeakKeyDictionary[Engine, WeatherStationIndex]" = WeakKeyDictionary()
+_INDEXES_LOCK = Lock()
+
+
+def get_weather_index(engine: Engine) -> WeatherStationIndex:
+    index = _INDEXES.get(engine)
+    if index is not None:
+        return index
+    with _INDEXES_LOCK:
+        index = _INDEXES.get(engine)
+        if index is None:
+            index = WeatherStationIndex(engine, cache=get_weather_cache(engine))
+            _INDEXES[engine] = index
+        return index
+
+
+def invalidate_weather_index(engine: Engine) -> None:
+    invalidate_weather_cache(engine)
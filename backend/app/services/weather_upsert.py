@@ -1,13 +1,13 @@
 from __future__ import annotations
 
 from datetime import datetime, timezone
-from typing import Iterable, Optional
+from typing import Iterable
 
-from sqlalchemy import insert, select, update
-from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.engine import Engine
 
 from app.domain.canonical import CanonicalWeatherHour
-from app.infra.db.tables import weather_observations_table
+from app.infra.db.bulk import DEFAULT_CHUNK_SIZE
+from app.infra.db.weather_repository import bulk_upsert_observations, notify_written
 
 
 class WeatherUpsertService:
@@ -16,47 +16,24 @@ class WeatherUpsertService:
             raise ValueError("engine is required")
         self.engine = engine
 
-    def upsert_hours(self, hours: Iterable[CanonicalWeatherHour]) -> dict:
+    def upsert_hours(self, hours: Iterable[CanonicalWeatherHour], *, chunk_size: int = DEFAULT_CHUNK_SIZE) -> dict:
         hour_list = list(hours)
         stats = {"inserted": 0, "updated": 0, "total": len(hour_list)}
         if not hour_list:
             return stats
 
+        now = datetime.now(timezone.utc)
+        rows = [
+            {**self._build_payload(hour), "source": hour.source, "created_at": now, "updated_at": now}
+            for hour in hour_list
+        ]
         with self.engine.begin() as conn:
-            for hour in hour_list:
-                payload = self._build_payload(hour)
-                existing_id = self._find_existing(conn, hour)
-                now = datetime.now(timezone.utc)
-                if existing_id:
-                    conn.execute(
-                        update(weather_observations_table)
-                        .where(weather_observations_table.c.id == existing_id)
-                        .values(**payload, updated_at=now, source=hour.source)
-                    )
-                    stats["updated"] += 1
-                else:
-                    insert_payload = {
-                        **payload,
-                        "source": hour.source,
-                        "created_at": now,
-                        "updated_at": now,
-                    }
-                    conn.execute(insert(weather_observations_table).values(insert_payload))
-                    stats["inserted"] += 1
+            result = bulk_upsert_observations(conn, rows, match_source=False, chunk_size=chunk_size)
+        notify_written(self.engine, rows)
+        stats["inserted"] = result["inserted"]
+        stats["updated"] = result["updated"]
         return stats
 
-    def _find_existing(self, conn: Connection, hour: CanonicalWeatherHour) -> Optional[int]:
-        stmt = (
-            select(weather_observations_table.c.id)
-            .where(
-                weather_observations_table.c.lat == hour.lat,
-                weather_observations_table.c.lon == hour.lon,
-                weather_observations_table.c.observed_at == hour.observed_at,
-            )
-            .limit(1)
-        )
-        return conn.execute(stmt).scalar_one_or_none()
-
     @staticmethod
     def _build_payload(hour: CanonicalWeatherHour) -> dict:
         return {
@@ -0,0 +1,78 @@
+import math
+from datetime import datetime, timedelta, timezone
+
+from app.infra.db.category_rules_repository import get_category_metadata
+from app.infra.db.events_repository import EventsRepository
+from app.services.density_tiles import (
+    TILE_GRID_SIZE,
+    TILE_MEDIA_TYPE,
+    build_density_tile,
+    tile_query_bbox,
+    unpack_tile,
+)
+from app.services.heatmap import weather_factor_for
+from app.services.weather_index import get_weather_index
+
+
+def _tile_for(lat: float, lon: float, z: int):
+    n = 1 << z
+    x = int((lon + 180.0) / 360.0 * n)
+    y = int((1.0 - math.asinh(math.tan(math.radians(lat))) / math.pi) / 2.0 * n)
+    return x, y
+
+
+def test_density_tile_returns_packed_grid_with_etag(api_client):
+    x, y = _tile_for(40.4168, -3.7038, 11)
+    params = {"date": "2026-03-01", "hour": 22}
+    response = api_client.get(f"/api/tiles/11/{x}/{y}", params=params)
+    assert response.status_code == 200
+    assert response.headers["content-type"] == TILE_MEDIA_TYPE
+    header, grid = unpack_tile(response.content)
+    assert (header["z"], header["x"], header["y"]) == (11, x, y)
+    assert len(grid) == TILE_GRID_SIZE * TILE_GRID_SIZE
+    assert sum(grid) > 0
+    assert header["max"] == max(grid)
+
+    etag = response.headers["etag"]
+    cached = api_client.get(f"/api/tiles/11/{x}/{y}", params=params, headers={"If-None-Match": etag})
+    assert cached.status_code == 304
+    assert cached.headers["etag"] == etag
+
+
+def test_density_tile_out_of_range_returns_404(api_client):
+    response = api_client.get("/api/tiles/3/8/0", params={"date": "2026-03-01", "hour": 22})
+    assert response.status_code == 404
+
+
+def test_density_tile_reads_only_nearby_events_but_matches_a_city_wide_render(api_client):
+    engine = api_client.app.state.db_engine
+    rules = get_category_metadata(engine)
+    repo = EventsRepository(engine)
+    target = datetime(2026, 3, 1, 22)
+    repo.upsert_many(
+        [
+            {
+                "source": "demo",
+                "external_id": f"tile-{idx}",
+                "title": f"Tile {idx}",
+                "category": "concierto",
+                "start_dt": target - timedelta(hours=1),
+                "end_dt": target + timedelta(hours=1),
+                "timezone": "UTC",
+                "lat": lat,
+                "lon": lon,
+            }
+            for idx, (lat, lon) in enumerate([(40.4168, -3.7038), (40.4171, -3.7031), (40.47, -3.60), (40.38, -3.75)])
+        ]
+    )
+    x, y = _tile_for(40.4168, -3.7038, 15)
+
+    city = repo.event_batch_active_at(target, metadata=rules)
+    nearby = repo.event_batch_active_at(target, metadata=rules, bbox=tile_query_bbox(15, x, y))
+    assert len(nearby) < len(city)
+
+    response = api_client.get(f"/api/tiles/15/{x}/{y}", params={"date": "2026-03-01", "hour": 22})
+    weather = get_weather_index(engine).observation_at(40.4168, -3.7038, target.replace(tzinfo=timezone.utc))
+    expected = build_density_tile(city, target, weather_factor_for(weather), 15, x, y, metadata=rules)
+    assert response.content == expected
+    assert unpack_tile(response.content)[0]["max"] > 0
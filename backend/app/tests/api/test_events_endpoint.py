@@ -1,3 +1,13 @@
+import json
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy import update
+
+from app.infra.db.events_repository import EventsRepository
+from app.infra.db.tables import events_table
+
+
 def test_events_endpoint_returns_list(api_client):
     response = api_client.get("/api/events", params={"date": "2026-03-01", "from_hour": 12})
     assert response.status_code == 200
@@ -7,3 +17,72 @@ def test_events_endpoint_returns_list(api_client):
     first = data[0]
     assert {"title", "category", "start_dt", "venue_name", "expected_attendance"}.issubset(first.keys())
     assert first["expected_attendance"] is None or first["expected_attendance"] >= 0
+
+
+def _seed_busy_day(api_client):
+    # 2026-05-10: tres eventos a las 12:00 (mismo start_dt, desempata el id) y dos a las 14:00, hora de Madrid
+    starts = [datetime(2026, 5, 10, 10, tzinfo=timezone.utc)] * 3 + [datetime(2026, 5, 10, 12, tzinfo=timezone.utc)] * 2
+    EventsRepository(api_client.app.state.db_engine).upsert_many(
+        [
+            {
+                "source": "demo",
+                "external_id": f"busy-{index}",
+                "title": f"Evento {index}",
+                "category": "concierto",
+                "start_dt": start,
+                "end_dt": start + timedelta(hours=1),
+                "timezone": "Europe/Madrid",
+                "lat": 40.4,
+                "lon": -3.7,
+            }
+            for index, start in enumerate(starts)
+        ]
+    )
+
+
+def _pages(api_client, params, limit):
+    items, url, query = [], "/api/events", {**params, "limit": limit}
+    while url:
+        response = api_client.get(url, params=query)
+        assert response.status_code == 200
+        items.extend(response.json())
+        url, query = response.links.get("next", {}).get("url"), None
+    return items
+
+
+def _ndjson(response):
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    return [json.loads(line) for line in response.text.splitlines()]
+
+
+@pytest.mark.parametrize("from_hour,expected", [(12, 3), (10, 5)])
+def test_events_endpoint_keyset_pages_and_ndjson_match_full_list(api_client, from_hour, expected):
+    _seed_busy_day(api_client)
+    params = {"date": "2026-05-10", "from_hour": from_hour}
+    full = api_client.get("/api/events", params=params).json()
+    assert len(full) == expected
+    assert [item["id"] for item in full] == sorted(item["id"] for item in full)
+
+    # from_hour=10 no solapa nada: todas las páginas siguen en el modo de respaldo
+    assert _pages(api_client, params, limit=2) == full
+    assert _ndjson(api_client.get("/api/events", params={**params, "format": "ndjson"})) == full
+
+    cursor = {"after_start_dt": full[0]["start_dt"], "after_id": full[0]["id"]}
+    page = api_client.get("/api/events", params={**params, **cursor, "format": "ndjson", "limit": 1})
+    assert _ndjson(page) == full[1:2]
+
+
+def test_events_endpoint_rejects_partial_cursor(api_client):
+    response = api_client.get("/api/events", params={"date": "2026-03-01", "from_hour": 12, "after_id": 3})
+    assert response.status_code == 400
+
+
+def test_events_endpoint_overlap_uses_end_dt_for_rows_without_effective_end(api_client):
+    _seed_busy_day(api_client)
+    # Filas sin backfill de add_event_activity_windows
+    with api_client.app.state.db_engine.begin() as conn:
+        conn.execute(update(events_table).values(effective_end_dt=None))
+
+    data = api_client.get("/api/events", params={"date": "2026-05-10", "from_hour": 12}).json()
+    # Los tres de las 12:00 solapan por end_dt; sin coalesce saldría el respaldo con los cinco
+    assert [item["title"] for item in data] == ["Evento 0", "Evento 1", "Evento 2"]
@@ -42,3 +42,28 @@ def test_heatmap_endpoint_invalid_mode_returns_422(api_client):
         params={"date": "2026-03-01", "hour": 22, "mode": "invalid"},
     )
     assert response.status_code == 422
+
+
+def test_heatmap_raster_returns_compressed_density_grid(api_client, monkeypatch):
+    from app.services.density_raster import unpack_raster
+
+    params = {"date": "2026-03-01", "hour": 22, "south": 40.38, "west": -3.75, "north": 40.46, "east": -3.65}
+    response = api_client.get("/api/heatmap/raster", params=params)
+    assert response.status_code == 200
+    assert response.headers["content-encoding"] == "deflate"
+    header, values = unpack_raster(response.content)
+    assert len(values) == header["rows"] * header["cols"]
+    assert header["max"] > 0
+
+    # El ETag sale de las entradas: el 304 se responde sin construir el KDE
+    async def no_scoring(*args, **kwargs):
+        raise AssertionError("304 must not build the raster")
+
+    monkeypatch.setattr("app.api.routers.heatmap.run_scoring", no_scoring)
+    cached = api_client.get("/api/heatmap/raster", params=params, headers={"If-None-Match": response.headers["etag"]})
+    assert cached.status_code == 304
+
+
+def test_heatmap_raster_rejects_inverted_bbox(api_client):
+    params = {"date": "2026-03-01", "hour": 22, "south": 40.46, "west": -3.75, "north": 40.38, "east": -3.65}
+    assert api_client.get("/api/heatmap/raster", params=params).status_code == 400
@@ -0,0 +1,54 @@
+from __future__ import annotations
+
+import re
+
+from app.infra.metrics import PROMETHEUS_CONTENT_TYPE
+
+
+def _server_timing(response) -> dict:
+    entries = {}
+    for part in response.headers["server-timing"].split(","):
+        name, *params = [item.strip() for item in part.split(";")]
+        entries[name] = dict(param.split("=", 1) for param in params)
+    return entries
+
+
+def test_heatmap_reports_stage_timings(api_client):
+    response = api_client.get("/api/heatmap", params={"date": "2025-05-10", "hour": 18})
+    assert response.status_code == 200
+
+    timing = _server_timing(response)
+    for stage in ("tile_lookup", "events", "weather", "scoring", "db", "total"):
+        assert float(timing[stage]["dur"]) >= 0.0
+    assert re.fullmatch(r'"\d+ queries"', timing["db"]["desc"])
+    assert int(timing["db"]["desc"].strip('"').split()[0]) >= 1
+
+
+def test_metrics_exposes_route_histograms_queries_and_cache_ratios(api_client):
+    api_client.get("/api/heatmap", params={"date": "2025-05-10", "hour": 18, "mode": "ml"})
+    api_client.get("/api/heatmap", params={"date": "2025-05-10", "hour": 19, "mode": "ml"})
+    api_client.get("/api/tiles/10/511/387", params={"date": "2025-05-10", "hour": 18})
+
+    response = api_client.get("/metrics")
+
+    assert response.status_code == 200
+    assert response.headers["content-type"] == PROMETHEUS_CONTENT_TYPE
+    body = response.text
+    assert "# TYPE http_request_duration_seconds histogram" in body
+    # La ruta se etiqueta por plantilla, no por URL
+    assert 'http_request_duration_seconds_count{method="GET",route="/api/heatmap",status="200"}' in body
+    assert 'route="/api/tiles/{z}/{x}/{y}"' in body
+    assert 'http_request_stage_duration_seconds_count{route="/api/heatmap",stage="ml_models"}' in body
+    assert 'http_request_db_queries_bucket{route="/api/heatmap",le="+Inf"}' in body
+    ratio = re.search(r'cache_hit_ratio\{cache="ml_models"\} ([0-9.]+)', body)
+    assert ratio is not None and 0.0 < float(ratio.group(1)) <= 1.0
+
+
+def test_unmatched_paths_share_one_series(api_client):
+    api_client.get("/api/does-not-exist/1")
+    api_client.get("/api/does-not-exist/2")
+
+    body = api_client.get("/metrics").text
+
+    assert 'route="unmatched",status="404"' in body
+    assert "does-not-exist" not in body
@@ -0,0 +1,32 @@
+from __future__ import annotations
+
+import pytest
+
+from app.api import main as api_main
+from app.infra import profiling as profiling_module
+from app.tests.api.conftest import _build_api_client
+
+
+@pytest.fixture()
+def profiled_client(tmp_path, monkeypatch):
+    monkeypatch.setattr(api_main, "PROFILE_QUERY_FLAG", True)
+    monkeypatch.setattr(profiling_module, "PROFILE_DIR", str(tmp_path / "profiles"))
+    yield from _build_api_client(tmp_path, monkeypatch, create_models=True)
+
+
+def test_profile_query_flag_writes_profile_named_after_route(profiled_client, tmp_path):
+    response = profiled_client.get("/api/heatmap", params={"date": "2025-05-10", "hour": 18, "profile": 1})
+
+    assert response.status_code == 200
+    profile_id = response.headers["x-profile-id"]
+    [path] = (tmp_path / "profiles").iterdir()
+    assert path.name.startswith("api-GET_api_heatmap-")
+    assert path.name.endswith(f"-{profile_id}.folded")
+
+
+def test_requests_without_flag_are_not_profiled(profiled_client, tmp_path):
+    response = profiled_client.get("/api/heatmap", params={"date": "2025-05-10", "hour": 18})
+
+    assert response.status_code == 200
+    assert "x-profile-id" not in response.headers
+    assert not (tmp_path / "profiles").exists()
@@ -1 +1,27 @@
-# Placeholder if needed for shared fixtures
+from __future__ import annotations
+
+from contextlib import contextmanager
+from typing import Iterator, Optional
+
+import pytest
+
+from app.infra.db.query_counter import N_PLUS_ONE_THRESHOLD, QueryCounter, count_queries
+
+
+@pytest.fixture
+def query_budget():
+    """``with query_budget(engine, max_queries=3): ...`` falla si el bloque supera el presupuesto o hace N+1."""
+
+    @contextmanager
+    def _budget(
+        engine,
+        max_queries: Optional[int] = None,
+        *,
+        allow_n_plus_one: bool = False,
+        n_plus_one_threshold: int = N_PLUS_ONE_THRESHOLD,
+    ) -> Iterator[QueryCounter]:
+        with count_queries(engine, n_plus_one_threshold=n_plus_one_threshold) as counter:
+            yield counter
+        counter.assert_budget(max_queries, allow_n_plus_one=allow_n_plus_one)
+
+    return _budget
@@ -0,0 +1,69 @@
+from __future__ import annotations
+
+from datetime import datetime, timedelta
+from typing import Any, Dict, List
+
+import pytest
+
+from app.domain.canonical import CanonicalEvent
+from app.providers.events.base import EventsProvider, ExternalEvent
+from benchmarks.dataset import DatasetSpec, build_venues, canonical_events, iter_events, iter_weather
+
+# Versión reducida del dataset de benchmarks para los presupuestos de consultas
+DATASET_SPEC = DatasetSpec(events=300, venues=40, weather_days=3, stations=2)
+
+
+class SyntheticDataset:
+    """Filas del dataset de benchmarks; cada llamada devuelve listas nuevas (los repositorios las modifican)."""
+
+    def __init__(self, spec: DatasetSpec):
+        self.spec = spec
+
+    def venues(self) -> List[Dict[str, Any]]:
+        return build_venues(self.spec)
+
+    def events(self) -> List[Dict[str, Any]]:
+        return list(iter_events(self.spec, self.venues()))
+
+    def weather(self) -> List[Dict[str, Any]]:
+        return list(iter_weather(self.spec))
+
+    def canonical_events(self, count: int) -> List[CanonicalEvent]:
+        return canonical_events(self.spec, count)
+
+
+@pytest.fixture()
+def dataset() -> SyntheticDataset:
+    return SyntheticDataset(DATASET_SPEC)
+
+
+class RangeEventsProvider(EventsProvider):
+    """``count`` eventos "fake", uno por día desde la referencia (hacia atrás con ``direction="past"``)."""
+
+    def __init__(self, *, base: datetime, count: int, direction: str = "future"):
+        self.base = base
+        self.count = count
+        self.direction = direction
+
+    def fetch_events(self, *, city: str, days: int, reference: datetime | None = None, direction: str = "future"):
+        ref = reference or self.base
+        items: list[ExternalEvent] = []
+        for idx in range(self.count):
+            offset = idx if direction == "future" else -(idx + 1)
+            start = ref + timedelta(days=offset)
+            items.append(
+                ExternalEvent(
+                    source="fake",
+                    external_id=f"evt-{direction}-{idx}",
+                    title=f"Event {idx}",
+                    category="music",
+                    start_at=start,
+                    end_at=start + timedelta(hours=2),
+                    venue_name=f"Venue {idx}",
+                    venue_external_id=f"venue-{idx}",
+                    venue_city=city,
+                    lat=40.4 + 0.01 * idx,
+                    lon=-3.7 - 0.01 * idx,
+                )
+            )
+        return items
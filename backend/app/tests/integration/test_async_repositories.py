@@ -0,0 +1,85 @@
+from __future__ import annotations
+
+import asyncio
+from datetime import date, datetime, timezone
+from pathlib import Path
+from zoneinfo import ZoneInfo
+
+import pytest
+from sqlalchemy import create_engine
+
+from app.infra.db.engines import create_async_db_engine, pool_options, to_async_url
+from app.infra.db.events_repository import AsyncEventsRepository, EventsRepository
+from app.infra.db.tables import metadata
+from app.infra.db.weather_repository import AsyncWeatherRepository, WeatherRepository
+from app.jobs.import_csv import import_events_from_csv
+
+
+@pytest.fixture()
+def seeded_engine(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'async.db'}", future=True)
+    metadata.create_all(engine)
+    data_dir = Path(__file__).resolve().parents[4] / "data"
+    import_events_from_csv(data_dir, engine=engine, reject_file=None)
+    WeatherRepository(engine).upsert_many(
+        [
+            {
+                "source": "test",
+                "lat": 40.4,
+                "lon": -3.7,
+                "observed_at": datetime(2026, 2, 20, 20, tzinfo=timezone.utc),
+                "temperature_c": 12.0,
+            }
+        ]
+    )
+    yield engine
+    engine.dispose()
+
+
+def _ids(rows):
+    return sorted(row["id"] for row in rows)
+
+
+def test_async_repositories_match_sync_results(seeded_engine):
+    sync_events = EventsRepository(seeded_engine)
+    sync_weather = WeatherRepository(seeded_engine)
+    tz = ZoneInfo("Europe/Madrid")
+    day = date(2026, 2, 20)
+    observed = datetime(2026, 2, 20, 20, tzinfo=timezone.utc)
+
+    async def collect(engine):
+        events = AsyncEventsRepository(engine)
+        weather = AsyncWeatherRepository(engine)
+        return (
+            await events.list_events_for_day(day),
+            await events.list_events_from_hour(day, 20, tzinfo=tz),
+            await events.list_active_events(),
+            await weather.get_observation_at(40.4, -3.7, observed),
+        )
+
+    async_engine = create_async_db_engine(seeded_engine.url)
+    try:
+        for engine in (async_engine, seeded_engine):
+            day_rows, hour_rows, active_rows, observation = asyncio.run(collect(engine))
+            assert _ids(day_rows) == _ids(sync_events.list_events_for_day(day))
+            assert _ids(hour_rows) == _ids(sync_events.list_events_from_hour(day, 20, tzinfo=tz))
+            assert _ids(active_rows) == _ids(sync_events.list_active_events())
+            assert observation["temperature_c"] == sync_weather.get_observation_at(40.4, -3.7, observed)["temperature_c"]
+    finally:
+        asyncio.run(async_engine.dispose())
+
+
+def test_async_url_and_pool_options():
+    assert to_async_url("postgresql://u:p@db/hotspots?sslmode=require").render_as_string(hide_password=False) == (
+        "postgresql+asyncpg://u:p@db/hotspots?ssl=require"
+    )
+    assert to_async_url("postgresql+psycopg2://u@db/hotspots").drivername == "postgresql+asyncpg"
+    assert to_async_url("sqlite:///tmp/x.db").drivername == "sqlite+aiosqlite"
+    assert pool_options("sqlite:///tmp/x.db") == {}
+    assert set(pool_options("postgresql://u@db/hotspots")) == {
+        "pool_size",
+        "max_overflow",
+        "pool_timeout",
+        "pool_recycle",
+        "pool_pre_ping",
+    }
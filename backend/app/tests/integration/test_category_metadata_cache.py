@@ -0,0 +1,58 @@
+from __future__ import annotations
+
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import create_engine, update
+
+from app.infra.db.category_rules_repository import CategoryRulesRepository, get_category_cache, get_category_metadata
+from app.infra.db.query_counter import count_queries
+from app.infra.db.tables import category_rules_table, metadata
+
+
+def _rule(category, duration):
+    return {
+        "category": category,
+        "fill_factor": 0.9,
+        "fallback_attendance": 1000,
+        "default_duration_min": duration,
+        "pre_event_min": 60,
+        "post_event_min": 30,
+    }
+
+
+def test_cache_compiles_once_and_recompiles_after_writes(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'rules.db'}", future=True)
+    metadata.create_all(engine)
+    repo = CategoryRulesRepository(engine)
+    repo.upsert_many([_rule("music", 180), _rule("sports", 120)])
+
+    first = get_category_metadata(engine)
+    with count_queries(engine) as counter:
+        assert get_category_metadata(engine) is first
+    assert counter.count == 0
+    assert first.duration("music") == timedelta(minutes=180)
+
+    repo.upsert_rule(_rule("music", 200))
+    second = get_category_metadata(engine)
+    assert second.version > first.version
+    assert second.duration("music") == timedelta(minutes=200)
+
+
+def test_cache_revalidates_changes_from_other_processes(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'rules.db'}", future=True)
+    metadata.create_all(engine)
+    CategoryRulesRepository(engine).upsert_many([_rule("music", 180)])
+    cache = get_category_cache(engine)
+    before = cache.get()
+
+    # Escritura directa (otro proceso): no pasa por el repositorio ni invalida
+    with engine.begin() as conn:
+        later = datetime.now(timezone.utc) + timedelta(seconds=1)
+        conn.execute(update(category_rules_table).values(default_duration_min=90, updated_at=later))
+    assert cache.get() is before
+
+    cache.revalidate_after_sec = 0
+    after = cache.get()
+    assert after.version == before.version + 1
+    assert after.duration("music") == timedelta(minutes=90)
+    assert cache.get() is after
@@ -0,0 +1,140 @@
+from __future__ import annotations
+
+from datetime import datetime, timedelta
+
+from sqlalchemy import create_engine, select
+
+from app.infra.db.category_rules_repository import CategoryRulesRepository
+from app.infra.db.category_rules_repository import get_category_metadata as rules_metadata
+from app.infra.db.events_repository import EventsRepository
+from app.infra.db.tables import category_rules_table, events_table, metadata
+from app.jobs.migrate_db import migrate
+from app.migrations import add_event_activity_windows
+from app.services.event_interval_index import get_event_interval_index
+
+START = datetime(2026, 3, 1, 20, 0)
+
+
+def _rule(category, duration, pre, post):
+    return {
+        "category": category,
+        "fill_factor": 0.9,
+        "fallback_attendance": 1000,
+        "default_duration_min": duration,
+        "pre_event_min": pre,
+        "post_event_min": post,
+    }
+
+
+def _event(external_id, category, end_dt):
+    return {
+        "source": "demo",
+        "external_id": external_id,
+        "title": f"Evento {external_id}",
+        "category": category,
+        "start_dt": START,
+        "end_dt": end_dt,
+        "timezone": "UTC",
+        "lat": 40.4,
+        "lon": -3.7,
+    }
+
+
+def _windows(engine):
+    with engine.begin() as conn:
+        rows = conn.execute(
+            select(
+                events_table.c.external_id,
+                events_table.c.effective_end_dt,
+                events_table.c.activity_start,
+                events_table.c.activity_end,
+            )
+        ).all()
+    return {row[0]: tuple(row[1:]) for row in rows}
+
+
+def test_upserts_persist_activity_windows_from_category_rules(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'windows.db'}", future=True)
+    metadata.create_all(engine)
+    CategoryRulesRepository(engine).upsert_many([_rule("music", 180, 90, 60)])
+    repo = EventsRepository(engine)
+    repo.upsert_many([_event("a", "music", START + timedelta(hours=2)), _event("b", "music", START)])
+    repo.upsert_event(_event("c", "desconocida", START))
+
+    windows = _windows(engine)
+    assert windows["a"] == (START + timedelta(hours=2), START - timedelta(minutes=90), START + timedelta(hours=3))
+    # Sin fin posterior al inicio se usa default_duration_min de la regla
+    assert windows["b"][0] == START + timedelta(minutes=180)
+    # Categoría sin regla: ventanas del scoring (60/60) y duración por defecto (2 h)
+    assert windows["c"] == (START + timedelta(hours=2), START - timedelta(hours=1), START + timedelta(hours=3))
+
+
+def test_rule_changes_recompute_the_persisted_windows(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'recompute.db'}", future=True)
+    metadata.create_all(engine)
+    rules = CategoryRulesRepository(engine)
+    rules.upsert_many([_rule("teatro", 150, 60, 30), _rule("music", 180, 30, 60)])
+    repo = EventsRepository(engine)
+    repo.upsert_many([_event("obra", "Teatro", START + timedelta(hours=2)), _event("concierto", "music", START)])
+    early = START - timedelta(minutes=90)
+    assert repo.list_events_active_at(early, metadata=rules_metadata(engine)) == []
+    index = get_event_interval_index(engine)
+    assert index.active_at(early) == []
+
+    rules.upsert_many([_rule("teatro", 150, 120, 30)])
+
+    windows = _windows(engine)
+    assert windows["obra"][1] == START - timedelta(minutes=120)
+    # Las demás categorías conservan su ventana
+    assert windows["concierto"][1] == START - timedelta(minutes=30)
+    active = repo.list_events_active_at(early, metadata=rules_metadata(engine))
+    assert [row["external_id"] for row in active] == ["obra"]
+    assert [row["title"] for row in index.active_at(early)] == ["Evento obra"]
+
+
+def test_migration_adds_and_backfills_legacy_events(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'legacy.db'}", future=True)
+    metadata.create_all(engine, tables=[category_rules_table])
+    with engine.begin() as conn:
+        conn.exec_driver_sql(
+            """
+            CREATE TABLE events (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                external_id TEXT NOT NULL,
+                category TEXT,
+                start_dt DATETIME NOT NULL,
+                end_dt DATETIME NOT NULL
+            )
+            """
+        )
+        conn.exec_driver_sql(
+            "INSERT INTO events (external_id, category, start_dt, end_dt) "
+            "VALUES ('legacy', 'sports', '2026-03-01 20:00:00.000000', '2026-03-01 20:00:00.000000')"
+        )
+    CategoryRulesRepository(engine).upsert_many([_rule("sports", 120, 90, 60)])
+
+    assert add_event_activity_windows.run(engine=engine) == 1
+    assert add_event_activity_windows.run(engine=engine) == 0
+    assert add_event_activity_windows.run(engine=engine, recompute=True) == 1
+    assert _windows(engine)["legacy"] == (
+        START + timedelta(hours=2),
+        START - timedelta(minutes=90),
+        START + timedelta(hours=3),
+    )
+
+
+def test_migrate_db_upgrades_events_without_activity_columns(tmp_path):
+    db_path = tmp_path / "upgrade.db"
+    engine = create_engine(f"sqlite:///{db_path}", future=True)
+    metadata.create_all(engine)
+    EventsRepository(engine).upsert_many([_event("old", "sports", START)])
+    # Base anterior a user-038: sin el índice ni las columnas de ventana de actividad
+    with engine.begin() as conn:
+        conn.exec_driver_sql("DROP INDEX idx_events_activity_window")
+        for column in ("effective_end_dt", "activity_start", "activity_end"):
+            conn.exec_driver_sql(f"ALTER TABLE events DROP COLUMN {column}")
+
+    migrate(f"sqlite:///{db_path}")
+
+    assert _windows(engine)["old"] == (START + timedelta(hours=2), START - timedelta(hours=1), START + timedelta(hours=3))
+    assert [row["external_id"] for row in EventsRepository(engine).list_events_for_day(START.date())] == ["old"]
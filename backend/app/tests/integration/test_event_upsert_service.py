@@ -6,7 +6,7 @@ import pytest
 from sqlalchemy import create_engine, func, select
 
 from app.domain.canonical import CanonicalEvent
-from app.infra.db.tables import events_table, metadata
+from app.infra.db.tables import event_start_changes_table, events_table, metadata
 from app.services.event_upsert import EventUpsertService
 
 
@@ -65,3 +65,22 @@ def test_event_upsert_normalizes_timezone(engine):
         stored = conn.execute(select(events_table.c.start_dt).where(events_table.c.external_id == "evt-5")).scalar_one()
     assert stored.tzinfo is None
     assert stored.hour == 20
+
+
+def test_event_upsert_matches_stored_duplicates_and_logs_reschedules(engine):
+    service = EventUpsertService(engine)
+    start = datetime(2026, 2, 18, 20, 0, tzinfo=timezone.utc)
+    service.upsert_events([sample_event("evt-1", title="Mega Show")])
+    duplicate = CanonicalEvent("providerB", "evt-z", "mega show", start + timedelta(minutes=20), None, 40.4001, -3.7001)
+    assert service.upsert_events([duplicate]) == {"inserted": 0, "updated": 1, "total": 1}
+
+    moved = sample_event("evt-1", title="Mega Show")
+    moved.start_at += timedelta(days=1)
+    service.upsert_events([moved])
+    with engine.begin() as conn:
+        count = conn.execute(select(func.count()).select_from(events_table)).scalar()
+        changes = conn.execute(select(event_start_changes_table)).mappings().all()
+    assert count == 1
+    assert [(row["old_start_dt"], row["new_start_dt"]) for row in changes] == [
+        (datetime(2026, 2, 18, 20, 20), datetime(2026, 2, 19, 20, 0))
+    ]
@@ -0,0 +1,108 @@
+from __future__ import annotations
+
+from datetime import date, datetime, timedelta
+from pathlib import Path
+
+from sqlalchemy import create_engine, update
+
+from app.domain.event_batch import EventBatch
+from app.domain.scoring import compute_hotspots
+from app.infra.db.category_rules_repository import get_category_metadata
+from app.infra.db.events_repository import EventsRepository
+from app.infra.db.tables import events_table, metadata
+from app.jobs.import_csv import import_events_from_csv
+
+
+def _engine(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'active.db'}", future=True)
+    metadata.create_all(engine)
+    import_events_from_csv(Path(__file__).resolve().parents[4] / "data", engine=engine, reject_file=None)
+    return engine
+
+
+def test_active_window_query_scores_like_a_full_scan(tmp_path):
+    engine = _engine(tmp_path)
+    repo = EventsRepository(engine)
+    # Ventanas pre/post de category_rules (cinema: 30 min después), las mismas que guarda la ingesta
+    rules = get_category_metadata(engine)
+    everything = EventBatch.from_mappings(
+        row for day in range(1, 8) for row in repo.list_events_for_day(date(2026, 3, day))
+    )
+    shipped = 0
+    for day in range(2, 7):
+        for hour in range(24):
+            target = datetime(2026, 3, day, hour)
+            batch = repo.event_batch_active_at(target)
+            shipped += len(batch)
+            assert compute_hotspots(batch, target, metadata=rules) == compute_hotspots(everything, target, metadata=rules)
+    assert shipped < sum(len(repo.list_events_for_day(date(2026, 3, day))) for day in range(2, 7)) * 24
+
+
+def test_active_window_includes_events_from_previous_evening(tmp_path):
+    repo = EventsRepository(_engine(tmp_path))
+    start = datetime(2026, 3, 9, 23, 0)
+    repo.upsert_many(
+        [
+            {
+                "source": "demo",
+                "external_id": "late-show",
+                "title": "Late show",
+                "category": "concierto",
+                "start_dt": start,
+                "end_dt": start + timedelta(hours=3),
+                "timezone": "UTC",
+                "lat": 40.4,
+                "lon": -3.7,
+            }
+        ]
+    )
+    target = datetime(2026, 3, 10, 1, 0)
+    assert "Late show" in [row["title"] for row in repo.list_events_active_at(target)]
+    assert "Late show" not in [row["title"] for row in repo.list_events_for_day(target.date())]
+    assert compute_hotspots(repo.event_batch_active_at(target), target)
+
+
+def test_rows_without_activity_window_fall_back_to_start_and_end(tmp_path):
+    engine = _engine(tmp_path)
+    repo = EventsRepository(engine)
+    target = datetime(2026, 3, 2, 20, 0)
+    expected = {row["id"] for row in repo.list_events_active_at(target)}
+    assert expected
+    # Filas anteriores a la migración de user-038
+    with engine.begin() as conn:
+        conn.execute(update(events_table).values(effective_end_dt=None, activity_start=None, activity_end=None))
+
+    assert {row["id"] for row in repo.list_events_active_at(target)} >= expected
+
+
+def test_category_with_long_pre_window_is_prefiltered_like_it_is_scored(tmp_path):
+    engine = _engine(tmp_path)
+    repo = EventsRepository(engine)
+    rules = get_category_metadata(engine)
+    start = datetime(2026, 3, 12, 20, 0)
+    assert rules.activity_rule("music").pre_window == timedelta(minutes=90)
+    repo.upsert_many(
+        [
+            {
+                "source": "demo",
+                "external_id": "early-doors",
+                "title": "Early doors",
+                "category": "music",
+                "start_dt": start,
+                "end_dt": start + timedelta(hours=2),
+                "timezone": "UTC",
+                "lat": 40.4,
+                "lon": -3.7,
+            }
+        ]
+    )
+    # 75 min antes: fuera de los 60 min por defecto, dentro de los 90 de la regla
+    target = start - timedelta(minutes=75)
+    hotspots = compute_hotspots(repo.event_batch_active_at(target, metadata=rules), target, metadata=rules)
+    assert hotspots and hotspots[0].score > 0
+
+    # Sin ventana guardada el respaldo por start_dt usa la ventana previa más larga de las reglas
+    with engine.begin() as conn:
+        conn.execute(update(events_table).values(effective_end_dt=None, activity_start=None, activity_end=None))
+    assert "Early doors" in [row["title"] for row in repo.list_events_active_at(target, metadata=rules)]
+    assert "Early doors" not in [row["title"] for row in repo.list_events_active_at(target)]
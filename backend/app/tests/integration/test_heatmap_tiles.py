@@ -0,0 +1,128 @@
+from __future__ import annotations
+
+import json
+from datetime import date, datetime, timedelta, timezone
+from pathlib import Path
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, update
+
+from app.api.deps import get_engine
+from app.api.main import create_app
+from app.infra.db.category_rules_repository import CategoryRulesRepository
+from app.infra.db.events_repository import EventsRepository
+from app.infra.db.heatmap_tiles_repository import tile_expiry
+from app.infra.db.tables import events_table, heatmap_tiles_table, metadata
+from app.infra.db.weather_repository import WeatherRepository
+from app.jobs.import_csv import import_events_from_csv
+from app.jobs.materialize_heatmap_tiles import materialize_heatmap_tiles
+
+PARAMS = {"date": "2026-03-01", "hour": 22}
+
+
+@pytest.fixture()
+def tiles_client(tmp_path):
+    engine = create_engine(
+        f"sqlite:///{tmp_path / 'tiles.db'}", connect_args={"check_same_thread": False}, future=True
+    )
+    metadata.create_all(engine)
+    import_events_from_csv(Path(__file__).resolve().parents[4] / "data", engine=engine, reject_file=None)
+    app = create_app(engine=engine)
+    app.dependency_overrides[get_engine] = lambda: engine
+    with TestClient(app) as client:
+        yield client, engine
+    app.dependency_overrides.clear()
+
+
+def test_heatmap_served_from_materialized_tile(tiles_client):
+    client, engine = tiles_client
+    live = client.get("/api/heatmap", params=PARAMS).json()
+
+    summary = materialize_heatmap_tiles("2026-03-01", "2026-03-01", "21-22", engine=engine)
+    assert summary["tiles"] == 2
+    assert client.get("/api/heatmap", params=PARAMS).json() == live
+
+    # Marca el tile para comprobar que la respuesta sale de la tabla y no del cálculo en vivo
+    marked = {**live, "hotspots": [{"lat": 0.0, "lon": 0.0, "score": 1.0}]}
+    with engine.begin() as conn:
+        conn.execute(update(heatmap_tiles_table).values(payload=json.dumps(marked)))
+    assert client.get("/api/heatmap", params=PARAMS).json() == marked
+    assert client.get("/api/heatmap", params={**PARAMS, "mode": "ml"}).json() != marked
+
+
+def test_heatmap_tile_ignored_after_event_change(tiles_client):
+    client, engine = tiles_client
+    materialize_heatmap_tiles("2026-03-01", "2026-03-01", "22", engine=engine)
+    event_id = EventsRepository(engine).list_events_active_at(datetime(2026, 3, 1, 22))[0]["id"]
+    with engine.begin() as conn:
+        conn.execute(update(heatmap_tiles_table).values(payload=json.dumps({"stale": True})))
+        conn.execute(
+            update(events_table)
+            .where(events_table.c.id == event_id)
+            .values(updated_at=datetime.now(timezone.utc) + timedelta(seconds=5))
+        )
+    assert "stale" not in client.get("/api/heatmap", params=PARAMS).json()
+
+
+def _stale_tile(engine):
+    materialize_heatmap_tiles("2026-03-01", "2026-03-01", "22", engine=engine)
+    with engine.begin() as conn:
+        conn.execute(update(heatmap_tiles_table).values(payload=json.dumps({"stale": True})))
+
+
+def _weather(lat, lon):
+    return {
+        "source": "test",
+        "lat": lat,
+        "lon": lon,
+        "observed_at": datetime(2026, 3, 1, 22, tzinfo=timezone.utc),
+        "temperature_c": 4.0,
+        "precipitation_mm": 12.0,
+        "wind_speed_kmh": 30.0,
+        "wind_dir_deg": 90.0,
+    }
+
+
+def test_heatmap_tile_ignored_after_event_rescheduled_out_of_the_hour(tiles_client):
+    client, engine = tiles_client
+    _stale_tile(engine)
+    repo = EventsRepository(engine)
+    active = repo.list_events_active_at(datetime(2026, 3, 1, 22))[0]
+    event = repo.get_event_by_source_external(active["source"], active["external_id"])
+    moved = timedelta(days=2)
+    repo.upsert_event({**event, "start_dt": event["start_dt"] + moved, "end_dt": event["end_dt"] + moved})
+    assert "stale" not in client.get("/api/heatmap", params=PARAMS).json()
+
+
+def test_heatmap_tile_ignored_after_nearby_weather_sync(tiles_client):
+    client, engine = tiles_client
+    _stale_tile(engine)
+    # Una estación fuera del alcance del índice no cambia el tile
+    WeatherRepository(engine).upsert_many([_weather(41.3874, 2.1686)])
+    assert client.get("/api/heatmap", params=PARAMS).json() == {"stale": True}
+
+    WeatherRepository(engine).upsert_many([_weather(40.4168, -3.7038)])
+    assert "stale" not in client.get("/api/heatmap", params=PARAMS).json()
+
+
+def test_heatmap_tile_ignored_after_category_rules_change(tiles_client):
+    client, engine = tiles_client
+    _stale_tile(engine)
+    CategoryRulesRepository(engine).upsert_rule(
+        {
+            "category": "teatro",
+            "fill_factor": 0.8,
+            "fallback_attendance": 500,
+            "default_duration_min": 150,
+            "pre_event_min": 45,
+            "post_event_min": 30,
+        }
+    )
+    assert "stale" not in client.get("/api/heatmap", params=PARAMS).json()
+
+
+def test_tile_expiry_only_for_open_days():
+    now = datetime(2026, 3, 10, 12, tzinfo=timezone.utc)
+    assert tile_expiry(date(2026, 3, 1), now) is None
+    assert tile_expiry(date(2026, 3, 10), now) > now
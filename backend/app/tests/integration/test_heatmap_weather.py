@@ -11,6 +11,7 @@ from app.api.deps import get_engine
 from app.api.main import create_app
 from app.infra.db.tables import metadata, weather_observations_table
 from app.jobs.import_csv import import_events_from_csv
+from app.services.weather_index import invalidate_weather_index
 
 TARGET_DATE = "2026-03-01"
 TARGET_HOUR = 22
@@ -57,6 +58,8 @@ def insert_weather(engine, temperature, precipitation, wind):
                 weather_code=1,
             )
         )
+    # Escritura directa por SQL: el índice en memoria no recibe la notificación de upsert
+    invalidate_weather_index(engine)
 
 
 def test_heatmap_weather_influence(heatmap_client):
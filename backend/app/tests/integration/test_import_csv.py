@@ -37,6 +37,10 @@ def test_csv_import_is_idempotent(sqlite_engine):
             text("SELECT MIN(expected_attendance) FROM events")
         ).scalar_one()
         assert value is not None and value > 0
+        unlinked = conn.execute(
+            text("SELECT COUNT(*) FROM events WHERE venue_id IS NULL")
+        ).scalar_one()
+        assert unlinked == 0
 
 
 def _counts(engine):
@@ -44,3 +48,74 @@ def _counts(engine):
         venues_total = conn.execute(text("SELECT COUNT(*) FROM venues")).scalar_one()
         events_total = conn.execute(text("SELECT COUNT(*) FROM events")).scalar_one()
     return {"venues": venues_total, "events": events_total}
+
+
+def test_csv_import_streams_chunks_and_rejects_bad_rows(sqlite_engine, tmp_path):
+    data_dir = tmp_path / "seed"
+    data_dir.mkdir()
+    (data_dir / "category_rules_seed.csv").write_text(
+        "category,fill_factor,fallback_attendance,default_duration_min,pre_event_min,post_event_min\n"
+        "music,0.9,3000,180,90,60\n"
+        "sports,not-a-number,15000,120,90,60\n",
+        encoding="utf-8",
+    )
+    (data_dir / "venues_seed.csv").write_text(
+        "source,external_id,name,lat,lon,city,region,country,address_line1,address_line2,postal_code,max_capacity\n"
+        "seed,V-1,Sala Uno,40.41,-3.70,Madrid,,Spain,,,,1000\n",
+        encoding="utf-8",
+    )
+    header = "source,external_id,title,category,subcategory,start_dt,end_dt,timezone,venue_external_id,venue_name,lat,lon,status,url\n"
+    rows = [
+        f"seed,E-{idx},Evento {idx},music,,2026-03-01T20:00:00+01:00,2026-03-01T22:00:00+01:00,Europe/Madrid,V-1,Sala Uno,40.41,-3.70,,\n"
+        for idx in range(5)
+    ]
+    rows.append("seed,E-bad,Fecha rota,music,,not-a-date,2026-03-01T22:00:00,Europe/Madrid,V-1,Sala Uno,40.41,-3.70,,\n")
+    (data_dir / "events_seed.csv").write_text(header + "".join(rows), encoding="utf-8")
+    reject_file = tmp_path / "rejects.csv"
+
+    summary = import_events_from_csv(data_dir, engine=sqlite_engine, chunk_size=2, reject_file=reject_file)
+
+    assert summary["events"]["rows"] == 5
+    assert summary["events"]["inserted"] == 5
+    assert summary["events"]["rows_per_sec"] > 0
+    assert summary["rules"]["rejected"] == 1
+    assert summary["rejected"] == 2
+    rejected = reject_file.read_text(encoding="utf-8").splitlines()
+    assert rejected[0] == "file,line,error,row"
+    assert any(line.startswith("events_seed.csv,7,") for line in rejected)
+
+    again = import_events_from_csv(data_dir, engine=sqlite_engine, chunk_size=2, reject_file=None)
+    assert again["events"]["updated"] == 5
+    assert _counts(sqlite_engine) == {"venues": 1, "events": 5}
+    with sqlite_engine.begin() as conn:
+        attendance = conn.execute(text("SELECT DISTINCT expected_attendance FROM events")).scalars().all()
+    assert attendance == [900]
+
+
+def test_csv_import_parallel_shards_match_sequential(sqlite_engine, tmp_path, monkeypatch):
+    import app.jobs.import_csv as import_csv
+
+    data_dir = tmp_path / "seed"
+    data_dir.mkdir()
+    source_dir = Path(__file__).resolve().parents[4] / "data"
+    for name in ("category_rules_seed.csv", "venues_seed.csv"):
+        (data_dir / name).write_text((source_dir / name).read_text(encoding="utf-8"), encoding="utf-8")
+    header = "source,external_id,title,category,subcategory,start_dt,end_dt,timezone,venue_external_id,venue_name,lat,lon,status,url\n"
+    lines = [
+        f"seed,E-{idx % 40},Evento {idx},music,,2026-03-01T20:00:00,2026-03-01T22:00:00,Europe/Madrid,,,40.41,-3.70,,\n"
+        for idx in range(60)
+    ]
+    (data_dir / "events_seed.csv").write_text(header + "".join(lines), encoding="utf-8")
+    monkeypatch.setattr(import_csv, "MIN_SHARD_BYTES", 512)
+
+    summary = import_events_from_csv(data_dir, engine=sqlite_engine, chunk_size=7, reject_file=None, workers=3)
+
+    events = summary["events"]
+    assert events["rows"] == 60
+    assert events["inserted"] == 40
+    assert events["updated"] == 20
+    assert events["cross_shard_duplicates"] > 0
+    with sqlite_engine.begin() as conn:
+        titles = dict(conn.execute(text("SELECT external_id, title FROM events")).all())
+    # La última aparición de cada clave en el fichero gana, igual que en modo secuencial
+    assert titles == {f"E-{idx % 40}": f"Evento {idx}" for idx in range(60)}
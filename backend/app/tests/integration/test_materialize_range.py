@@ -1,12 +1,17 @@
 from __future__ import annotations
 
-from datetime import datetime, timezone
+from datetime import date, datetime, timedelta, timezone
 from pathlib import Path
 
 from sqlalchemy import create_engine, text
 
+from app.infra.db.category_rules_repository import CategoryRulesRepository
+from app.infra.db.events_repository import EventsRepository
+from app.infra.db.weather_repository import WeatherRepository
 from app.jobs.import_csv import import_events_from_csv
-from app.jobs.materialize_range import materialize_range
+from app.jobs.materialize_range import dirty_targets, materialize_range
+
+DATA_DIR = Path(__file__).resolve().parents[4] / "data"
 
 
 def insert_weather(engine, dt):
@@ -55,3 +60,98 @@ def test_materialize_range_multiple_snapshots(tmp_path):
     with engine.connect() as conn:
         count = conn.execute(text("SELECT COUNT(*) FROM event_feature_snapshots")).scalar_one()
     assert count >= 9
+
+
+def test_dirty_targets_follow_snapshot_dependencies():
+    days = [date(2026, 3, 1), date(2026, 3, 2)]
+    hours = [8, 12, 18, 22]
+
+    dirty = dirty_targets(
+        days,
+        hours,
+        event_starts=[datetime(2026, 3, 2, 17, 30)],
+        observation_times=[datetime(2026, 3, 1, 20, tzinfo=timezone.utc), datetime(2026, 3, 3, 0)],
+    )
+
+    assert dirty == {
+        (date(2026, 3, 2), 12),
+        (date(2026, 3, 2), 18),
+        (date(2026, 3, 2), 22),
+        (date(2026, 3, 1), 18),
+        (date(2026, 3, 1), 22),
+    }
+
+
+def test_incremental_materialization_only_recomputes_changed_hours(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'incremental.db'}", future=True)
+    import_events_from_csv(DATA_DIR, engine=engine)
+    window = {"start_date": "2026-03-01", "end_date": "2026-03-03", "hours": "8,12,18,22", "engine": engine}
+
+    first = materialize_range(**window, incremental=True)
+    assert first["mode"] == "full"
+    assert first["materialized_hours"] == 12
+
+    # Reimportar los mismos datos no mueve updated_at
+    import_events_from_csv(DATA_DIR, engine=engine)
+    unchanged = materialize_range(**window, incremental=True)
+    assert unchanged["mode"] == "incremental"
+    assert unchanged["materialized_hours"] == 0
+
+    repo = EventsRepository(engine)
+    event = repo.get_event_by_source_external("madrid_cultura", "EVT-0018")
+    repo.upsert_event({**event, "title": "Renamed"})
+    WeatherRepository(engine).upsert_many(
+        [{"source": "test", "lat": 40.4168, "lon": -3.7038, "observed_at": datetime(2026, 3, 3, 20), "temperature_c": 8.0}]
+    )
+    changed = materialize_range(**window, incremental=True)
+    assert changed["materialized_hours"] == 5
+
+    extended = materialize_range(**{**window, "end_date": "2026-03-04"}, incremental=True)
+    assert extended["materialized_hours"] == 4
+    assert extended["skipped_hours"] == 12
+
+
+def test_category_rule_change_rematerializes_the_whole_range(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'rules.db'}", future=True)
+    import_events_from_csv(DATA_DIR, engine=engine)
+    window = {"start_date": "2026-03-01", "end_date": "2026-03-03", "hours": "8,18", "engine": engine}
+    materialize_range(**window, incremental=True)
+
+    rules = CategoryRulesRepository(engine)
+    current = rules.get_rules_map()
+    # Reescribir las mismas reglas no cuenta como cambio
+    rules.upsert_many(current.values())
+    assert materialize_range(**window, incremental=True)["materialized_hours"] == 0
+
+    rule = next(iter(current.values()))
+    rules.upsert_many([{**rule, "fill_factor": rule["fill_factor"] / 2}])
+    changed = materialize_range(**window, incremental=True)
+    assert changed["mode"] == "incremental"
+    assert changed["materialized_hours"] == 6
+
+
+def test_rescheduled_event_is_removed_from_its_old_day(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'reschedule.db'}", future=True)
+    import_events_from_csv(DATA_DIR, engine=engine)
+    window = {"start_date": "2026-03-01", "end_date": "2026-03-03", "hours": "18", "engine": engine}
+    materialize_range(**window, incremental=True)
+
+    def snapshot_days():
+        with engine.connect() as conn:
+            rows = conn.execute(
+                text("SELECT target_at FROM event_feature_snapshots WHERE event_id = 'EVT-0018'")
+            ).scalars()
+            return {str(value)[:10] for value in rows}
+
+    assert snapshot_days() == {"2026-03-02"}
+
+    repo = EventsRepository(engine)
+    event = repo.get_event_by_source_external("madrid_cultura", "EVT-0018")
+    moved = timedelta(days=1)
+    repo.upsert_event({**event, "start_dt": event["start_dt"] + moved, "end_dt": event["end_dt"] + moved})
+    changed = materialize_range(**window, incremental=True)
+
+    # Se rematerializan el día antiguo (por el registro de reprogramaciones) y el nuevo
+    assert changed["materialized_hours"] == 2
+    assert changed["deleted"] == 1
+    assert snapshot_days() == {"2026-03-03"}
@@ -5,8 +5,10 @@ from pathlib import Path
 
 from sqlalchemy import create_engine, text
 
+from app.infra.db.snapshots_repository import SnapshotCentersRepository
+from app.infra.db.weather_repository import WeatherRepository
 from app.jobs.import_csv import import_events_from_csv
-from app.jobs.materialize_snapshots import materialize_snapshots
+from app.jobs.materialize_snapshots import materialize_snapshots, materialize_snapshots_multi
 
 
 def test_materialize_snapshots_idempotent(tmp_path, monkeypatch):
@@ -79,3 +81,57 @@ def test_materialize_snapshots_idempotent(tmp_path, monkeypatch):
         count2 = conn.execute(text("SELECT COUNT(*) FROM event_feature_snapshots")).scalar_one()
     assert count1 == count2
     assert result_again["updated"] >= result_again["inserted"]
+
+
+def test_materialize_snapshots_multi_shares_event_rows_across_centers(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'multi.db'}", future=True)
+    import_events_from_csv(Path(__file__).resolve().parents[4] / "data", engine=engine)
+    center, far_center = (40.4168, -3.7038), (41.0, -3.7038)
+    # Una sola estación en el centro: el centroide de los dos centros queda fuera de su alcance
+    WeatherRepository(engine).upsert_many(
+        [
+            {
+                "source": "test",
+                "lat": center[0],
+                "lon": center[1],
+                "observed_at": datetime(2026, 3, 2, 18, tzinfo=timezone.utc),
+                "temperature_c": 30.0,
+                "precipitation_mm": 0.0,
+                "wind_speed_kmh": 10.0,
+                "wind_dir_deg": 90.0,
+            }
+        ]
+    )
+
+    def snapshot_rows():
+        with engine.connect() as conn:
+            rows = conn.execute(
+                text(
+                    "SELECT event_id, temperature_c, precipitation_mm, wind_speed_kmh, "
+                    "score_base, score_weather_factor, score_final FROM event_feature_snapshots"
+                )
+            ).all()
+        return {row[0]: tuple(row[1:]) for row in rows}
+
+    single = materialize_snapshots(date_str="2026-03-02", hour=18, lat=center[0], lon=center[1], engine=engine)
+    single_rows = snapshot_rows()
+    single_ids = set(single_rows)
+    assert single["inserted"] > 0
+    assert all(row[0] == 30.0 for row in single_rows.values())
+
+    result = materialize_snapshots_multi("2026-03-02", 18, [center, far_center], engine=engine)
+
+    with engine.connect() as conn:
+        event_ids = list(conn.execute(text("SELECT event_id FROM event_feature_snapshots")).scalars())
+    assert len(event_ids) == len(single_ids)
+    # La fila compartida (meteo y score) es la misma que deja la pasada de un solo centro
+    assert snapshot_rows() == single_rows
+    assert result == {"inserted": 0, "updated": len(single_ids), "center_rows": 2 * len(single_ids), "deleted": 0}
+
+    target = datetime(2026, 3, 2, 18, tzinfo=timezone.utc)
+    repo = SnapshotCentersRepository(engine)
+    rows = repo.list_for_center(*center, target, target)
+    assert {row["event_id"] for row in rows} == single_ids
+    assert all(row["distance_km"] <= 5.0 and row["score_final"] is not None for row in rows)
+    assert repo.list_for_center(*far_center, target, target) == []
+    assert len(repo.list_for_center(*far_center, target, target, in_radius_only=False)) == len(single_ids)
@@ -0,0 +1,104 @@
+from __future__ import annotations
+
+import asyncio
+from datetime import date, datetime, timezone
+
+import pytest
+from sqlalchemy import create_engine
+
+from app.infra.db.engines import create_async_db_engine
+from app.infra.db.events_repository import AsyncEventsRepository, EventsRepository, events_from_hour_stmt
+from app.infra.db.tables import metadata
+from app.infra.db.venues_repository import VenuesRepository
+from app.infra.db.weather_repository import WeatherRepository
+from app.jobs.sync_events import sync_events
+from app.services.event_upsert import EventUpsertService
+from app.tests.integration.conftest import RangeEventsProvider
+
+REFERENCE = datetime(2026, 3, 1, tzinfo=timezone.utc)
+
+
+@pytest.fixture()
+def engine(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'budgets.db'}", future=True)
+    metadata.create_all(engine)
+    return engine
+
+
+def test_events_bulk_upsert_is_constant_in_batch_size(engine, query_budget, dataset):
+    VenuesRepository(engine).resolve_many(dataset.venues())
+    repo = EventsRepository(engine)
+
+    # venues por IN, reglas de categoría (firma y carga), ids existentes por IN y un INSERT ... ON CONFLICT
+    with query_budget(engine, max_queries=5):
+        repo.upsert_many(dataset.events())
+    # Las reglas ya compiladas no vuelven a la BD
+    with query_budget(engine, max_queries=3):
+        repo.upsert_many(dataset.events())
+
+
+def test_venue_resolution_and_weather_upsert_are_batched(engine, query_budget, dataset):
+    VenuesRepository(engine).resolve_many(dataset.venues())
+
+    with query_budget(engine, max_queries=2):
+        VenuesRepository(engine).resolve_many(dataset.venues())
+    with query_budget(engine, max_queries=2):
+        WeatherRepository(engine).upsert_many(dataset.weather())
+
+
+def test_sync_events_cost_does_not_grow_with_events(engine, query_budget):
+    provider = RangeEventsProvider(base=REFERENCE, count=40)
+    sync_events("Madrid", future_days=3, provider=provider, engine=engine, reference=REFERENCE)
+
+    # create_all (un PRAGMA por tabla) + venues (SELECT, UPDATE) + reglas + eventos (SELECT, INSERT)
+    with query_budget(engine, max_queries=len(metadata.tables) + 5):
+        sync_events("Madrid", future_days=3, provider=provider, engine=engine, reference=REFERENCE)
+
+
+def test_async_day_listing_is_a_single_query(engine, query_budget, tmp_path, dataset):
+    EventsRepository(engine).upsert_many(dataset.events())
+    async_engine = create_async_db_engine(f"sqlite+aiosqlite:///{tmp_path / 'budgets.db'}")
+
+    async def _list():
+        try:
+            return await AsyncEventsRepository(async_engine).list_events_for_day(dataset.spec.start)
+        finally:
+            await async_engine.dispose()
+
+    with query_budget(async_engine, max_queries=1):
+        rows = asyncio.run(_list())
+    assert rows
+
+
+
+@pytest.mark.parametrize("from_hour", [2, 20])
+def test_hour_listing_is_a_single_query_with_or_without_fallback(engine, query_budget, dataset, from_hour):
+    EventsRepository(engine).upsert_many(dataset.events())
+    repo = EventsRepository(engine)
+    day = dataset.spec.start
+
+    # 02:00 no solapa ningún evento (respaldo: los del resto del día); 20:00 sí
+    with query_budget(engine, max_queries=1):
+        rows = repo.list_events_from_hour(day, from_hour)
+    assert rows
+    last = rows[len(rows) // 2]
+    with query_budget(engine, max_queries=1):
+        page = repo.list_events_from_hour(day, from_hour, after=(last["start_dt"], last["id"]), limit=5)
+    assert page == rows[len(rows) // 2 + 1 :][:5]
+    # Misma variante, misma sentencia: SQLAlchemy reutiliza el SQL compilado
+    assert events_from_hour_stmt(day, 3)[0] is events_from_hour_stmt(day, 21)[0]
+
+
+def test_event_upsert_service_cost_does_not_grow_with_events(engine, query_budget, dataset):
+    service = EventUpsertService(engine)
+    service.upsert_events(dataset.canonical_events(10))
+
+    # 30 nuevos + 10 existentes: sin consultas por evento (los INSERT ... RETURNING van en executemany)
+    with query_budget(engine):
+        stats = service.upsert_events(dataset.canonical_events(40))
+    assert stats == {"inserted": 30, "updated": 10, "total": 40}
+
+    # Resincronizar: venues (SELECT IN, UPDATE) + eventos (SELECT IN, UPDATE), sea cual sea el lote
+    for count in (10, 40):
+        with query_budget(engine, max_queries=4):
+            service.upsert_events(dataset.canonical_events(count))
@@ -16,6 +16,7 @@ from app.jobs.generate_demo_events import generate_demo_events
 from app.jobs.inflate_demo_data import inflate_demo_data
 from app.providers.events.base import ExternalEvent, EventsProvider
 from app.providers.weather.base import ExternalWeatherHour, WeatherProvider
+from app.tests.integration.conftest import RangeEventsProvider
 
 
 
@@ -30,36 +31,6 @@ class StaticEventsProvider(EventsProvider):
         return list(self._events)
 
 
-class RangeEventsProvider(EventsProvider):
-    def __init__(self, *, base: datetime, count: int, direction: str = "future"):
-        self.base = base
-        self.count = count
-        self.direction = direction
-
-    def fetch_events(self, *, city: str, days: int, reference: datetime | None = None, direction: str = "future"):
-        ref = reference or self.base
-        items: list[ExternalEvent] = []
-        for idx in range(self.count):
-            offset = idx if direction == "future" else -(idx + 1)
-            start = ref + timedelta(days=offset)
-            items.append(
-                ExternalEvent(
-                    source="fake",
-                    external_id=f"evt-{direction}-{idx}",
-                    title=f"Event {idx}",
-                    category="music",
-                    start_at=start,
-                    end_at=start + timedelta(hours=2),
-                    venue_name=f"Venue {idx}",
-                    venue_external_id=f"venue-{idx}",
-                    venue_city=city,
-                    lat=40.4 + 0.01 * idx,
-                    lon=-3.7 - 0.01 * idx,
-                )
-            )
-        return items
-
-
 class StaticWeatherProvider(WeatherProvider):
     def __init__(self, hours: list[ExternalWeatherHour]):
         self.hours = hours
@@ -151,6 +122,21 @@ def test_sync_events_upsert_idempotent(tmp_path):
         assert _count(conn, events_table) == 3
 
 
+def test_sync_events_chunked_stats_are_accurate(tmp_path):
+    engine = _make_engine(tmp_path)
+    reference = datetime(2026, 3, 1, tzinfo=timezone.utc)
+    provider = RangeEventsProvider(base=reference, count=5)
+    stats1 = sync_events(city="Madrid", future_days=5, provider=provider, engine=engine, reference=reference, chunk_size=2)
+    assert stats1["events"] == {"inserted": 5, "updated": 0, "skipped": 0}
+    provider.count = 7
+    stats2 = sync_events(city="Madrid", future_days=7, provider=provider, engine=engine, reference=reference, chunk_size=3)
+    assert stats2["events"] == {"inserted": 2, "updated": 5, "skipped": 0}
+    assert stats2["venues"] == {"inserted": 2, "updated": 5, "skipped": 0}
+    with engine.begin() as conn:
+        assert _count(conn, events_table) == 7
+        assert conn.execute(select(func.count()).where(events_table.c.venue_id.is_(None))).scalar() == 0
+
+
 def test_sync_events_creates_venue_when_missing(tmp_path):
     engine = _make_engine(tmp_path)
     reference = datetime(2026, 3, 1, tzinfo=timezone.utc)
@@ -177,6 +163,38 @@ def test_sync_events_creates_venue_when_missing(tmp_path):
         assert event_row["venue_id"] == venue_rows[0]["id"]
 
 
+def test_sync_events_resolves_shared_venues_once(tmp_path):
+    engine = _make_engine(tmp_path)
+    reference = datetime(2026, 3, 1, tzinfo=timezone.utc)
+    events = [
+        ExternalEvent(
+            source="fake",
+            external_id=f"evt-shared-{idx}",
+            title=f"Shared {idx}",
+            category="music",
+            start_at=reference + timedelta(hours=idx),
+            venue_name="Sala Compartida" if idx < 3 else "Sala Sin Id",
+            venue_external_id="venue-shared" if idx < 3 else None,
+            venue_city="Madrid",
+            lat=40.4,
+            lon=-3.7,
+        )
+        for idx in range(5)
+    ]
+    provider = StaticEventsProvider(events)
+    stats = sync_events(city="Madrid", future_days=1, provider=provider, engine=engine, reference=reference)
+    assert stats["venues"] == {"inserted": 2, "updated": 3, "skipped": 0}
+    stats = sync_events(city="Madrid", future_days=1, provider=provider, engine=engine, reference=reference)
+    assert stats["venues"] == {"inserted": 0, "updated": 5, "skipped": 0}
+    with engine.begin() as conn:
+        venue_ids = {row.name: row.id for row in conn.execute(select(venues_table.c.id, venues_table.c.name))}
+        assert set(venue_ids) == {"Sala Compartida", "Sala Sin Id"}
+        linked = conn.execute(select(events_table.c.external_id, events_table.c.venue_id)).all()
+    for external_id, venue_id in linked:
+        idx = int(external_id.rsplit("-", 1)[1])
+        assert venue_id == venue_ids["Sala Compartida" if idx < 3 else "Sala Sin Id"]
+
+
 def test_sync_weather_upsert_idempotent(tmp_path):
     engine = _make_engine(tmp_path)
     base = datetime(2026, 3, 1, tzinfo=timezone.utc)
@@ -0,0 +1,42 @@
+from __future__ import annotations
+
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import IntegrityError
+
+from app.migrations import add_weather_natural_key
+
+
+def test_migration_dedupes_and_adds_unique_key(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'legacy.db'}", future=True)
+    with engine.begin() as conn:
+        conn.exec_driver_sql(
+            """
+            CREATE TABLE weather_observations (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                source TEXT NOT NULL,
+                lat FLOAT NOT NULL,
+                lon FLOAT NOT NULL,
+                observed_at DATETIME NOT NULL,
+                temperature_c FLOAT
+            )
+            """
+        )
+        for temp in (10.0, 12.0):
+            conn.exec_driver_sql(
+                "INSERT INTO weather_observations (source, lat, lon, observed_at, temperature_c) "
+                f"VALUES ('demo', 40.4, -3.7, '2026-03-01 10:00:00', {temp})"
+            )
+
+    add_weather_natural_key.run(engine=engine)
+    add_weather_natural_key.run(engine=engine)
+
+    with engine.begin() as conn:
+        rows = conn.execute(text("SELECT temperature_c FROM weather_observations")).all()
+    assert [row[0] for row in rows] == [12.0]
+    with pytest.raises(IntegrityError):
+        with engine.begin() as conn:
+            conn.exec_driver_sql(
+                "INSERT INTO weather_observations (source, lat, lon, observed_at, temperature_c) "
+                "VALUES ('demo', 40.4, -3.7, '2026-03-01 10:00:00', 1.0)"
+            )
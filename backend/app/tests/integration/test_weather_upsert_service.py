@@ -54,3 +54,30 @@ def test_weather_upsert_handles_large_window(engine):
     hours = [sample_hour(i) for i in range(24 * 3)]
     result = service.upsert_hours(hours)
     assert result["inserted"] == len(hours)
+
+
+def test_weather_upsert_rewrites_point_from_other_source(engine):
+    service = WeatherUpsertService(engine)
+    service.upsert_hours([sample_hour(0)])
+    replacement = sample_hour(0)
+    replacement.source = "providerB"
+    replacement.temperature_c = 30.0
+    stats = service.upsert_hours([replacement])
+    assert stats == {"inserted": 0, "updated": 1, "total": 1}
+    with engine.begin() as conn:
+        rows = conn.execute(
+            select(weather_observations_table.c.source, weather_observations_table.c.temperature_c)
+        ).all()
+    assert [tuple(row) for row in rows] == [("providerB", 30.0)]
+
+
+def test_weather_upsert_chunks_and_counts_duplicates(engine):
+    service = WeatherUpsertService(engine)
+    hours = [sample_hour(i) for i in range(10)] + [sample_hour(0)]
+    stats = service.upsert_hours(hours, chunk_size=3)
+    assert stats == {"inserted": 10, "updated": 1, "total": 11}
+    stats = service.upsert_hours(hours[:5], chunk_size=2)
+    assert stats == {"inserted": 0, "updated": 5, "total": 5}
+    with engine.begin() as conn:
+        count = conn.execute(select(func.count()).select_from(weather_observations_table)).scalar()
+    assert count == 10
@@ -0,0 +1,96 @@
+from __future__ import annotations
+
+import json
+from pathlib import Path
+
+import pytest
+from sqlalchemy import create_engine, text
+
+from app.jobs import instrumentation
+from app.jobs.import_csv import import_events_from_csv
+from app.jobs.instrumentation import compare_runs, job_run, read_run_log
+from app.jobs.materialize_range import materialize_range
+
+
+def _record(elapsed, stages, status="ok"):
+    return {
+        "job": "daily_sync",
+        "status": status,
+        "elapsed_sec": elapsed,
+        "stages": [{"name": name, "seconds": seconds} for name, seconds in stages.items()],
+    }
+
+
+def test_job_run_records_stages_rows_and_statements(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'runs.db'}", future=True)
+    log_path = tmp_path / "runs.jsonl"
+
+    with job_run("outer", log_path=str(log_path), city="Madrid") as run:
+        with run.stage("query"):
+            with engine.connect() as conn:
+                conn.execute(text("SELECT 1"))
+                conn.execute(text("SELECT 2"))
+            run.add_rows(10)
+        with job_run("inner") as inner:
+            assert inner is run
+            with inner.stage("write"):
+                inner.add_rows(4)
+        with run.stage("query"):
+            run.add_rows(5)
+
+    [record] = read_run_log(log_path)
+    assert record["job"] == "outer"
+    assert record["status"] == "ok"
+    assert record["params"] == {"city": "Madrid"}
+    assert record["db_statements"] >= 2
+    stages = {stage["name"]: stage for stage in record["stages"]}
+    assert set(stages) == {"query", "inner", "inner.write"}
+    assert stages["query"]["calls"] == 2
+    assert stages["query"]["rows"] == 15
+    assert stages["query"]["db_statements"] >= 2
+    assert stages["inner.write"]["rows"] == 4
+    assert instrumentation.current_run() is None
+
+
+def test_job_run_logs_failed_runs(tmp_path):
+    log_path = tmp_path / "runs.jsonl"
+    with pytest.raises(RuntimeError):
+        with job_run("broken", log_path=str(log_path)):
+            raise RuntimeError("boom")
+
+    record = json.loads(log_path.read_text().strip())
+    assert record["status"] == "error"
+    assert record["error"] == "RuntimeError: boom"
+
+
+def test_compare_runs_uses_median_of_previous_ok_runs():
+    records = [
+        _record(10.0, {"events": 2.0}),
+        _record(12.0, {"events": 4.0}),
+        _record(99.0, {"events": 50.0}, status="error"),
+        _record(11.0, {"events": 3.0}),
+        _record(22.0, {"events": 9.0}),
+    ]
+
+    rows = {row["stage"]: row for row in compare_runs(records, baseline_runs=3)}
+
+    assert rows["total"]["baseline"] == 11.0
+    assert rows["total"]["ratio"] == 2.0
+    assert rows["events"]["baseline"] == 3.0
+    assert rows["events"]["ratio"] == 3.0
+
+
+def test_materialize_range_reports_nested_snapshot_stages(tmp_path, monkeypatch):
+    engine = create_engine(f"sqlite:///{tmp_path / 'range.db'}", future=True)
+    import_events_from_csv(Path(__file__).resolve().parents[4] / "data", engine=engine)
+    log_path = tmp_path / "runs.jsonl"
+    monkeypatch.setattr(instrumentation, "JOB_RUN_LOG", str(log_path))
+
+    materialize_range(start_date="2026-03-01", end_date="2026-03-01", hours="18,20", engine=engine)
+
+    [record] = read_run_log(log_path, job="materialize_range")
+    stages = {stage["name"]: stage for stage in record["stages"]}
+    assert stages["materialize_snapshots"]["calls"] == 2
+    assert stages["materialize_snapshots.events"]["calls"] == 2
+    assert stages["materialize_snapshots.write"]["db_statements"] > 0
+    assert record["rows"] == stages["materialize_snapshots.write"]["rows"]
@@ -0,0 +1,116 @@
+from __future__ import annotations
+
+import random
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy import create_engine, delete, update
+
+from app.infra.db.events_repository import EventsRepository, notify_written
+from app.infra.db.tables import events_table, metadata
+from app.services.event_interval_index import IntervalTree, get_event_interval_index
+
+START = datetime(2026, 3, 1, 20, 0, tzinfo=timezone.utc)
+
+
+@pytest.fixture()
+def engine(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'intervals.db'}", future=True)
+    metadata.create_all(engine)
+    yield engine
+    metadata.drop_all(engine)
+
+
+def _event(external_id, start, hours=2):
+    return {
+        "source": "demo",
+        "external_id": external_id,
+        "title": f"Evento {external_id}",
+        "category": "concierto",
+        "start_dt": start,
+        "end_dt": start + timedelta(hours=hours),
+        "timezone": "UTC",
+        "lat": 40.4,
+        "lon": -3.7,
+    }
+
+
+def _ids(rows):
+    return sorted(row["title"] for row in rows)
+
+
+def test_interval_tree_matches_brute_force():
+    rng = random.Random(7)
+    intervals = []
+    for i in range(400):
+        start = rng.uniform(0, 1000)
+        intervals.append((start, start + rng.uniform(0, 50), i))
+    tree = IntervalTree(intervals)
+    for _ in range(200):
+        t = rng.uniform(-10, 1060)
+        assert sorted(tree.stab(t)) == sorted(i for s, e, i in intervals if s <= t <= e)
+        lo, hi = sorted((t, rng.uniform(-10, 1060)))
+        assert sorted(tree.overlapping(lo, hi)) == sorted(i for s, e, i in intervals if s <= hi and e >= lo)
+
+
+def test_index_answers_active_events_and_follows_upserts(engine):
+    repo = EventsRepository(engine)
+    repo.upsert_many([_event("a", START), _event("b", START + timedelta(hours=5)), _event("c", START + timedelta(days=3))])
+    index = get_event_interval_index(engine)
+
+    # Ventana de actividad del scoring: 60 min antes y después
+    assert _ids(index.active_at(START - timedelta(minutes=30))) == ["Evento a"]
+    assert _ids(index.active_at(START + timedelta(hours=4, minutes=30))) == ["Evento b"]
+    assert _ids(index.active_between(START, START + timedelta(days=4))) == ["Evento a", "Evento b", "Evento c"]
+    loads = index.loads
+
+    assert index.active_at(START + timedelta(hours=12)) == []
+    assert index.loads == loads
+
+    repo.upsert_many([_event("d", START + timedelta(hours=12))])
+    assert _ids(index.active_at(START + timedelta(hours=12))) == ["Evento d"]
+    # Reprogramado: sale de su hora antigua y entra en la nueva
+    repo.upsert_event(_event("a", START + timedelta(hours=12)))
+    assert index.active_at(START - timedelta(minutes=30)) == []
+    assert _ids(index.active_at(START + timedelta(hours=12))) == ["Evento a", "Evento d"]
+    # Las escrituras se aplican al índice sin releer la ventana
+    assert index.loads == loads
+    assert index.patches == 2
+
+
+def test_index_reloads_only_for_writes_without_window(engine):
+    repo = EventsRepository(engine)
+    repo.upsert_many([_event("a", START)])
+    index = get_event_interval_index(engine)
+    assert _ids(index.active_at(START)) == ["Evento a"]
+    loads = index.loads
+
+    # Fuera de los días cargados: ni recarga ni parche
+    repo.upsert_many([_event("lejos", START + timedelta(days=30))])
+    assert _ids(index.active_at(START)) == ["Evento a"]
+    assert (index.loads, index.patches) == (loads, 0)
+
+    notify_written(engine, [{"source": "demo", "is_active": False}])
+    assert _ids(index.active_at(START)) == ["Evento a"]
+    assert index.loads == loads + 1
+
+
+def test_index_detects_writes_from_other_processes(engine):
+    EventsRepository(engine).upsert_many([_event("a", START)])
+    index = get_event_interval_index(engine)
+    index.revalidate_after_sec = 0
+    assert _ids(index.active_at(START)) == ["Evento a"]
+
+    loads = index.loads
+
+    with engine.begin() as conn:
+        conn.execute(
+            update(events_table).values(is_active=False, updated_at=datetime.now(timezone.utc) + timedelta(seconds=1))
+        )
+    assert index.active_at(START) == []
+    # Las filas modificadas se releen por id; un borrado (el recuento no cuadra) recarga la ventana
+    assert index.loads == loads
+    with engine.begin() as conn:
+        conn.execute(delete(events_table))
+    assert index.active_at(START) == []
+    assert index.loads == loads + 1
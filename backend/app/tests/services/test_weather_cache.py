@@ -0,0 +1,67 @@
+from __future__ import annotations
+
+from datetime import date, datetime, timezone
+
+import pytest
+from sqlalchemy import create_engine
+
+from app.hub.weather_hub import WeatherHub
+from app.hub.weather_registry import WeatherProviderRegistry
+from app.infra.db.tables import metadata, weather_observations_table
+from app.infra.db.weather_repository import WeatherRepository
+from app.providers.weather.base import ExternalWeatherHour
+from app.services.weather_cache import get_weather_cache, hour_index
+
+LAT = 40.4168
+LON = -3.7038
+
+
+class _StaticWeatherProvider:
+    def __init__(self, hours: list[ExternalWeatherHour]) -> None:
+        self._hours = hours
+
+    def fetch_hourly(self, *, lat: float, lon: float, start: date, end: date, location_name=None):
+        return list(self._hours)
+
+
+@pytest.fixture()
+def engine(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'weather_cache.db'}", future=True)
+    metadata.create_all(engine)
+    yield engine
+    metadata.drop_all(engine)
+
+
+def test_warm_cache_serves_hours_without_db(engine):
+    observed = datetime(2026, 3, 1, 22, tzinfo=timezone.utc)
+    WeatherRepository(engine).upsert_many(
+        [{"source": "test", "lat": LAT, "lon": LON, "observed_at": observed, "temperature_c": 14.0, "weather_code": 3}]
+    )
+    cache = get_weather_cache(engine)
+    cache.warm(reference=date(2026, 3, 1))
+    with engine.begin() as conn:
+        conn.execute(weather_observations_table.delete())
+
+    sample = cache.get((LAT, LON), hour_index(observed))
+    assert sample["temperature_c"] == 14.0
+    assert sample["weather_code"] == 3
+    assert sample["observed_at"] == observed
+    assert cache.get((LAT, LON), hour_index(observed) + 1) is None
+
+
+def test_cache_refreshes_when_weather_hub_syncs(engine):
+    cache = get_weather_cache(engine)
+    cache.warm(reference=date(2026, 2, 18))
+    observed = datetime(2026, 2, 18, 10, tzinfo=timezone.utc)
+    assert cache.get((LAT, LON), hour_index(observed)) is None
+
+    registry = WeatherProviderRegistry()
+    registry.register(
+        "main",
+        _StaticWeatherProvider(
+            [ExternalWeatherHour(source="Wx", lat=LAT, lon=LON, observed_at=observed, temperature_c=21.0)]
+        ),
+    )
+    WeatherHub(registry).sync(lat=LAT, lon=LON, start=date(2026, 2, 18), end=date(2026, 2, 18), session=engine)
+
+    assert cache.get((LAT, LON), hour_index(observed))["temperature_c"] == 21.0
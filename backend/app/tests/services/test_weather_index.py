@@ -0,0 +1,75 @@
+from __future__ import annotations
+
+from datetime import datetime, timezone
+
+import pytest
+from sqlalchemy import create_engine
+
+from app.infra.db.tables import metadata
+from app.infra.db.weather_repository import WeatherRepository
+from app.services.weather_index import WeatherStationIndex, get_weather_index
+
+
+@pytest.fixture()
+def engine(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'weather_index.db'}", future=True)
+    metadata.create_all(engine)
+    yield engine
+    metadata.drop_all(engine)
+
+
+def obs(lat: float, lon: float, hour: int, temp: float, source: str = "test") -> dict:
+    return {
+        "source": source,
+        "lat": lat,
+        "lon": lon,
+        "observed_at": datetime(2026, 3, 1, hour, tzinfo=timezone.utc),
+        "temperature_c": temp,
+        "precipitation_mm": 0.0,
+        "wind_speed_kmh": 10.0,
+        "wind_dir_deg": 90.0,
+    }
+
+
+def test_nearest_orders_stations_by_distance(engine):
+    WeatherRepository(engine).upsert_many(
+        [obs(40.40, -3.70, 10, 10.0), obs(40.50, -3.70, 10, 10.0), obs(40.42, -3.70, 10, 10.0)]
+    )
+    index = WeatherStationIndex(engine)
+    index.observation_at(40.41, -3.70, datetime(2026, 3, 1, 10))
+    nearest = index.nearest(40.405, -3.70, k=2)
+    assert [station for station, _ in nearest] == [(40.40, -3.70), (40.42, -3.70)]
+
+
+def test_exact_station_and_hour_returns_stored_row(engine):
+    WeatherRepository(engine).upsert_many([obs(40.40, -3.70, 10, 12.5)])
+    weather = WeatherStationIndex(engine).observation_at(40.40, -3.70, datetime(2026, 3, 1, 10))
+    assert weather["temperature_c"] == 12.5
+    assert weather["source"] == "test"
+
+
+def test_interpolates_between_stations_and_hours(engine):
+    WeatherRepository(engine).upsert_many(
+        [
+            obs(40.40, -3.70, 10, 10.0),
+            obs(40.40, -3.70, 11, 20.0),
+            obs(40.40, -3.60, 10, 20.0),
+            obs(40.40, -3.60, 11, 30.0),
+        ]
+    )
+    index = WeatherStationIndex(engine)
+    halfway_in_time = index.observation_at(40.40, -3.70, datetime(2026, 3, 1, 10, 30))
+    assert halfway_in_time["temperature_c"] == pytest.approx(15.0)
+    midpoint = index.observation_at(40.40, -3.65, datetime(2026, 3, 1, 10))
+    assert midpoint["temperature_c"] == pytest.approx(15.0, abs=0.01)
+    assert midpoint["source"] == "interpolated"
+    assert index.observation_at(40.40, -3.70, datetime(2026, 3, 1, 18)) is None
+
+
+def test_index_refreshes_on_upsert(engine):
+    repo = WeatherRepository(engine)
+    repo.upsert_many([obs(40.40, -3.70, 10, 10.0)])
+    index = get_weather_index(engine)
+    assert index.observation_at(40.40, -3.70, datetime(2026, 3, 1, 10))["temperature_c"] == 10.0
+    repo.upsert_many([obs(40.40, -3.70, 10, 25.0)])
+    assert index.observation_at(40.40, -3.70, datetime(2026, 3, 1, 10))["temperature_c"] == 25.0
@@ -0,0 +1,44 @@
+from __future__ import annotations
+
+from dataclasses import replace
+
+from benchmarks.dataset import DatasetSpec, build_venues, iter_events, iter_weather
+from benchmarks.run import compare_results, measure
+
+
+def test_dataset_is_reproducible_for_a_seed():
+    spec = DatasetSpec(events=50, venues=5, weather_days=3, stations=2)
+    venues = build_venues(spec)
+
+    assert list(iter_events(spec, venues)) == list(iter_events(spec, build_venues(spec)))
+    assert list(iter_weather(spec)) == list(iter_weather(spec))
+    assert list(iter_events(replace(spec, seed=7), venues)) != list(iter_events(spec, venues))
+    assert sum(1 for _ in iter_weather(spec)) == 2 * 3 * 24
+
+
+def test_events_span_the_weather_range():
+    spec = DatasetSpec(events=100, venues=5, weather_days=10)
+    days = {row["start_dt"].date() for row in iter_events(spec, build_venues(spec))}
+
+    assert min(days) == spec.start
+    assert max(days) == spec.end
+
+
+def test_compare_flags_regressions_over_threshold():
+    old = {"results": {"a": {"median": 1.0}, "b": {"median": 1.0}, "gone": {"median": 1.0}}}
+    new = {"results": {"a": {"median": 1.05}, "b": {"median": 1.5}, "added": {"median": 1.0}}}
+
+    rows = {row["name"]: row for row in compare_results(old, new, threshold=0.10)}
+
+    assert set(rows) == {"a", "b"}
+    assert not rows["a"]["regression"]
+    assert rows["b"]["regression"]
+
+
+def test_measure_reports_requested_runs():
+    calls = []
+    stats = measure(lambda: calls.append(1), repeat=3, warmup=1)
+
+    assert stats["runs"] == 3
+    assert len(calls) == 4
+    assert stats["min"] <= stats["median"] <= stats["max"]
@@ -0,0 +1,70 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.domain import scoring
+from app.domain.category_metadata import UNKNOWN_CODE, CategoryMetadata
+from app.domain.event_batch import EventBatch
+from app.domain.models import Event
+from app.services.attendance import estimate_expected_attendance
+
+
+def _rule(category, fill_factor, fallback, duration, pre, post):
+    return {
+        "category": category,
+        "fill_factor": fill_factor,
+        "fallback_attendance": fallback,
+        "default_duration_min": duration,
+        "pre_event_min": pre,
+        "post_event_min": post,
+    }
+
+
+RULES = [_rule("music", 0.9, 3000, 180, 90, 60), _rule("Teatro", 0.75, 800, 150, 30, 45)]
+START = datetime(2026, 3, 1, 20, 0, 0)
+
+
+def test_rules_override_scoring_defaults_and_keep_radius_and_boost():
+    metadata = CategoryMetadata.compile(RULES, version=3)
+
+    assert metadata.version == 3
+    assert metadata.code(None) == UNKNOWN_CODE
+    assert metadata.code("MUSIC") == metadata.code("music") != UNKNOWN_CODE
+    assert metadata.duration("music") == timedelta(minutes=180)
+    # teatro: duración y ventanas de la tabla, radio y boost del scoring
+    assert metadata.duration("teatro") == timedelta(minutes=150)
+    assert metadata.activity_rule("teatro").pre_window == timedelta(minutes=30)
+    assert metadata.radius("teatro") == scoring.CATEGORY_RADIUS_M["teatro"]
+    assert metadata.category_boost("teatro") == scoring.CATEGORY_BOOST["teatro"]
+    assert metadata.duration("otra") == timedelta(hours=scoring.DEFAULT_DURATION_H)
+    assert list(metadata.codes(["music", "otra", None])) == [metadata.code("music"), UNKNOWN_CODE, UNKNOWN_CODE]
+
+
+@pytest.mark.parametrize(
+    "category,capacity", [("music", 1000), ("music", None), ("teatro", None), ("otra", 50), ("otra", None)]
+)
+def test_expected_attendance_matches_rules_map(category, capacity):
+    rules_map = {rule["category"].lower(): rule for rule in RULES}
+    metadata = CategoryMetadata.compile(RULES)
+
+    assert estimate_expected_attendance(category, capacity, metadata) == estimate_expected_attendance(
+        category, capacity, rules_map
+    )
+
+
+@pytest.mark.parametrize("offset_min", [-100, -80, -20, 90, 200, 230, 260])
+def test_batch_weights_use_compiled_windows(offset_min):
+    metadata = CategoryMetadata.compile(RULES)
+    events = [
+        Event("1", "Orquesta", "music", START, None, 40.4, -3.7),
+        Event("2", "Obra", "teatro", START, START + timedelta(hours=2), 40.41, -3.71),
+        Event("3", "Otro", "otro", START, None, 40.42, -3.72),
+    ]
+    target = START + timedelta(minutes=offset_min)
+
+    weights = scoring.batch_temporal_weights(EventBatch.from_events(events), target, metadata)
+
+    assert list(weights) == pytest.approx([scoring.temporal_weight(event, target, metadata) for event in events])
+    # music: 90 min de ventana previa en la tabla frente a los 60 por defecto
+    assert scoring.temporal_weight(events[0], START - timedelta(minutes=80), metadata) > 0
+    assert scoring.temporal_weight(events[0], START - timedelta(minutes=80)) == 0
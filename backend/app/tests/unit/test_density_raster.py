@@ -0,0 +1,118 @@
+import zlib
+from datetime import datetime
+
+import pytest
+
+from app.domain.category_metadata import CategoryMetadata
+from app.domain.event_batch import EventBatch
+
+from app.services.density_raster import (
+    RasterGrid,
+    bin_impulses,
+    build_density_raster,
+    convolve,
+    gaussian_kernel,
+    raster_etag,
+    unpack_raster,
+)
+
+TARGET = datetime(2026, 3, 1, 21, 0)
+BBOX = (40.40, -3.72, 40.43, -3.68)
+
+
+def _row(event_id, lat, lon, category="concierto"):
+    return {
+        "id": event_id,
+        "title": f"Evento {event_id}",
+        "category": category,
+        "start_dt": datetime(2026, 3, 1, 20, 0),
+        "end_dt": datetime(2026, 3, 1, 23, 0),
+        "lat": lat,
+        "lon": lon,
+    }
+
+
+def test_gaussian_kernel_is_symmetric_with_unit_peak():
+    kernel = gaussian_kernel(7.0)
+    assert len(kernel) == 15
+    assert kernel[7] == 1.0
+    assert kernel == kernel[::-1]
+
+
+def test_event_peak_equals_temporal_weight_times_boost():
+    grid = RasterGrid.for_bbox(*BBOX, cell_m=50)
+    values = convolve(bin_impulses(EventBatch.from_mappings([_row(1, 40.415, -3.70)]), TARGET, grid), grid)
+    r, c = grid.cell_index(40.415, -3.70)
+    assert values[r * grid.cols + c] == pytest.approx(1.2)
+    assert max(values) == values[r * grid.cols + c]
+    # La huella no pasa del radio de la categoría (350 m = 7 celdas)
+    assert values[r * grid.cols + c + 8] == 0.0
+    assert values[r * grid.cols + c + 3] > 0.0
+
+
+def test_event_outside_bbox_spreads_into_edge():
+    grid = RasterGrid.for_bbox(*BBOX, cell_m=50)
+    values = convolve(bin_impulses(EventBatch.from_mappings([_row(1, 40.4305, -3.70, "feria")]), TARGET, grid), grid)
+    assert max(values) > 0
+
+
+def test_raster_roundtrip_and_size_limit():
+    grid = RasterGrid.for_bbox(*BBOX, cell_m=100)
+    header, values = unpack_raster(zlib.decompress(build_density_raster(EventBatch.from_mappings([_row(1, 40.415, -3.70)]), TARGET, 1.0, grid)))
+    assert (header["rows"], header["cols"]) == (grid.rows, grid.cols)
+    assert len(values) == grid.rows * grid.cols
+    with pytest.raises(ValueError):
+        RasterGrid.for_bbox(40.0, -4.0, 41.0, -3.0, cell_m=1)
+
+
+def test_query_bbox_keeps_every_event_that_reaches_the_grid():
+    grid = RasterGrid.for_bbox(*BBOX, cell_m=50)
+    rows = [_row(i, 40.38 + 0.0007 * i, -3.74 + 0.0011 * i, "feria") for i in range(100)]
+    south, west, north, east = grid.query_bbox()
+    inside = [row for row in rows if south <= row["lat"] <= north and west <= row["lon"] <= east]
+    assert len(inside) < len(rows)
+    assert bin_impulses(EventBatch.from_mappings(inside), TARGET, grid) == bin_impulses(
+        EventBatch.from_mappings(rows), TARGET, grid
+    )
+
+
+def test_separable_convolution_matches_the_direct_sum():
+    grid = RasterGrid.for_bbox(*BBOX, cell_m=100)
+    impulses = {
+        350.0: {(0, 0): 1.0, (5, 7): 2.5, (5, 9): 0.5, (-2, 10): 1.5},
+        500.0: {(grid.rows + 3, grid.cols // 2): 2.0, (12, grid.cols - 1): 1.0, (12, 3): 0.25},
+    }
+    values = convolve(impulses, grid)
+
+    direct = [0.0] * (grid.rows * grid.cols)
+    for radius, cells in impulses.items():
+        kernel = gaussian_kernel(radius / grid.cell_m)
+        half = len(kernel) // 2
+        for (r, c), weight in cells.items():
+            for i in range(grid.rows):
+                for j in range(grid.cols):
+                    if abs(i - r) <= half and abs(j - c) <= half:
+                        direct[i * grid.cols + j] += weight * kernel[i - r + half] * kernel[j - c + half]
+    assert list(values) == pytest.approx(direct, rel=1e-5, abs=1e-6)
+    assert max(direct) > 0
+
+
+def test_raster_etag_changes_with_every_input():
+    grid = RasterGrid.for_bbox(*BBOX, 50.0)
+    rows = [_row(1, 40.4168, -3.7038), _row(2, 40.42, -3.70, "deporte")]
+    batch = EventBatch.from_mappings(rows)
+    etag = raster_etag(batch, TARGET, 1.0, grid)
+    assert raster_etag(EventBatch.from_mappings(rows), TARGET, 1.0, grid) == etag
+
+    moved = EventBatch.from_mappings([_row(1, 40.4168, -3.7038), _row(2, 40.421, -3.70, "deporte")])
+    rules = CategoryMetadata.compile([{"category": "deporte", "pre_event_min": 90}])
+    assert len(
+        {
+            etag,
+            raster_etag(moved, TARGET, 1.0, grid),
+            raster_etag(batch, TARGET.replace(hour=22), 1.0, grid),
+            raster_etag(batch, TARGET, 0.8, grid),
+            raster_etag(batch, TARGET, 1.0, RasterGrid.for_bbox(*BBOX, 40.0)),
+            raster_etag(batch, TARGET, 1.0, grid, rules),
+        }
+    ) == 6
@@ -0,0 +1,91 @@
+import math
+import random
+from datetime import datetime
+
+import pytest
+
+from app.domain.event_batch import EventBatch
+
+from app.services.density_tiles import (
+    CellPyramid,
+    build_density_tile,
+    cell_of,
+    level_for_zoom,
+    tile_query_bbox,
+    unpack_tile,
+)
+
+TARGET = datetime(2026, 3, 1, 21, 0)
+
+
+def _row(event_id, lat, lon, category="concierto"):
+    return {
+        "id": event_id,
+        "title": f"Evento {event_id}",
+        "category": category,
+        "start_dt": datetime(2026, 3, 1, 20, 0),
+        "end_dt": datetime(2026, 3, 1, 23, 0),
+        "lat": lat,
+        "lon": lon,
+    }
+
+
+ROWS = [_row(1, 40.4168, -3.7038), _row(2, 40.4170, -3.7036), _row(3, 40.4531, -3.6883, "deporte")]
+
+
+def test_pyramid_levels_preserve_total_score():
+    pyramid = CellPyramid.from_batch(EventBatch.from_mappings(ROWS), TARGET)
+    base_total = sum(pyramid.level(0).values())
+    assert base_total > 0
+    for k in (1, 4, 10):
+        assert sum(pyramid.level(k).values()) == pytest.approx(base_total)
+    # Celdas vecinas en longitudes negativas se agrupan en el mismo padre (floor, no truncado)
+    assert cell_of(40.4168, -3.7038)[0] >> 1 == cell_of(40.4168, -3.7025)[0] >> 1
+
+
+def test_level_for_zoom_is_coarser_at_low_zoom():
+    assert level_for_zoom(0) > level_for_zoom(10) >= level_for_zoom(16) == 0
+
+
+def test_world_tile_contains_all_scored_events():
+    pyramid = CellPyramid.from_batch(EventBatch.from_mappings(ROWS), TARGET)
+    header, grid = unpack_tile(build_density_tile(EventBatch.from_mappings(ROWS), TARGET, 1.0, 0, 0, 0))
+    assert sum(grid) == pytest.approx(sum(pyramid.level(0).values()), rel=1e-5)
+    assert header["max"] == max(grid)
+
+
+def test_adjacent_tiles_paint_each_cell_once():
+    rng = random.Random(7)
+    # Longitudes negativas: con truncado las celdas de justo antes del borde se pintaban también en el tile vecino
+    rows = [_row(i, 40.4168 + rng.uniform(-0.05, 0.05), -3.7038 + rng.uniform(-0.05, 0.05)) for i in range(300)]
+    batch = EventBatch.from_mappings(rows)
+    z = 13
+    n = 1 << z
+    x = int((-3.7038 + 180.0) / 360.0 * n)
+    y = int((1.0 - math.asinh(math.tan(math.radians(40.4168))) / math.pi) / 2.0 * n)
+    painted = 0.0
+    for tx in range(x - 3, x + 4):
+        for ty in range(y - 3, y + 4):
+            painted += sum(unpack_tile(build_density_tile(batch, TARGET, 1.0, z, tx, ty))[1])
+    pyramid = CellPyramid.from_batch(batch, TARGET)
+    assert painted == pytest.approx(sum(pyramid.level(0).values()), rel=1e-5)
+
+
+@pytest.mark.parametrize("z", [9, 12, 14, 16])
+def test_tile_query_bbox_keeps_every_event_that_reaches_the_tile(z):
+    rng = random.Random(z)
+    rows = [
+        _row(i, 40.4168 + rng.uniform(-0.03, 0.03), -3.7038 + rng.uniform(-0.03, 0.03), rng.choice(["concierto", "feria"]))
+        for i in range(400)
+    ]
+    n = 1 << z
+    x = int((-3.7038 + 180.0) / 360.0 * n)
+    y = int((1.0 - math.asinh(math.tan(math.radians(40.4168))) / math.pi) / 2.0 * n)
+    for tx in (x - 1, x, x + 1):
+        for ty in (y - 1, y, y + 1):
+            south, west, north, east = tile_query_bbox(z, tx, ty)
+            inside = [row for row in rows if south <= row["lat"] <= north and west <= row["lon"] <= east]
+            full = build_density_tile(EventBatch.from_mappings(rows), TARGET, 1.0, z, tx, ty)
+            assert build_density_tile(EventBatch.from_mappings(inside), TARGET, 1.0, z, tx, ty) == full
+            if z >= 14:
+                assert len(inside) < len(rows)
@@ -0,0 +1,47 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from app.domain import scoring
+from app.domain.event_batch import EventBatch
+from app.domain.models import Event
+
+START = datetime(2026, 2, 10, 19, 0, 0)
+
+
+def _events():
+    return [
+        Event("1", "Concierto", "concierto", START, START + timedelta(hours=2), 40.4, -3.7),
+        Event("2", "Teatro", "teatro", START + timedelta(minutes=30), None, 40.4005, -3.7005),
+        Event("3", "Feria", "feria", START - timedelta(hours=5), None, 40.45, -3.68),
+        Event("4", "Cine", "cine", START.replace(tzinfo=timezone.utc) + timedelta(hours=3), None, 40.41, -3.71),
+        Event("5", "Otro", "otro", START - timedelta(hours=1), START, 40.42, -3.69),
+    ]
+
+
+def test_batch_stores_parallel_arrays_with_category_codes():
+    batch = EventBatch.from_events(_events())
+    assert len(batch) == 5
+    assert batch.categories == ["concierto", "teatro", "feria", "cine", "otro"]
+    assert list(batch.category_codes) == [0, 1, 2, 3, 4]
+    assert batch.end_s[1] != batch.end_s[1]  # NaN: fin estimado en el scoring
+
+
+@pytest.mark.parametrize("offset_min", [-90, -30, 0, 45, 150, 200, 400])
+def test_batch_temporal_weights_match_per_event_scoring(offset_min):
+    events = _events()
+    target = START + timedelta(minutes=offset_min)
+    weights = scoring.batch_temporal_weights(EventBatch.from_events(events), target)
+    assert list(weights) == pytest.approx([scoring.temporal_weight(event, target) for event in events])
+
+
+def test_compute_hotspots_same_result_for_batch_and_events():
+    events = _events()
+    for offset_min in (-30, 60, 180):
+        target = START + timedelta(minutes=offset_min)
+        assert scoring.compute_hotspots(EventBatch.from_events(events), target) == scoring.compute_hotspots(
+            events, target
+        )
+    filtered = scoring.compute_hotspots(EventBatch.from_events(events), START, categories=["teatro"])
+    assert len(filtered) == 1
+    assert filtered == scoring.compute_hotspots(events, START, categories=["teatro"])
@@ -0,0 +1,60 @@
+from __future__ import annotations
+
+from sqlalchemy import create_engine, text
+
+from app.infra.metrics import CacheRatioGauge, Counter, Histogram, current_timings, span, track_request
+
+
+def test_histogram_renders_cumulative_buckets():
+    histogram = Histogram("demo_seconds", "Demo.", ("route",), buckets=(0.1, 1.0))
+    for value in (0.05, 0.5, 0.7, 3.0):
+        histogram.observe(value, route="/a")
+
+    lines = histogram.render().splitlines()
+
+    assert lines[:2] == ["# HELP demo_seconds Demo.", "# TYPE demo_seconds histogram"]
+    assert 'demo_seconds_bucket{route="/a",le="0.1"} 1' in lines
+    assert 'demo_seconds_bucket{route="/a",le="1"} 3' in lines
+    assert 'demo_seconds_bucket{route="/a",le="+Inf"} 4' in lines
+    assert 'demo_seconds_count{route="/a"} 4' in lines
+    assert 'demo_seconds_sum{route="/a"} 4.25' in lines
+
+
+def test_cache_ratio_is_derived_from_counter():
+    counter = Counter("demo_cache_total", "Demo.", ("cache", "result"))
+    counter.inc(cache="weather", result="hit")
+    counter.inc(3, cache="weather", result="miss")
+    counter.inc(cache="models", result="hit")
+
+    body = CacheRatioGauge("demo_cache_ratio", "Demo.", counter).render()
+
+    assert 'demo_cache_ratio{cache="weather"} 0.25' in body
+    assert 'demo_cache_ratio{cache="models"} 1' in body
+
+
+def test_label_values_are_escaped():
+    counter = Counter("demo_total", "Demo.", ("route",))
+    counter.inc(route='/a"b\\c')
+
+    assert 'demo_total{route="/a\\"b\\\\c"} 1' in counter.render()
+
+
+def test_spans_and_queries_are_recorded_only_inside_a_request():
+    engine = create_engine("sqlite://", future=True)
+    with span("outside"), engine.connect() as conn:
+        conn.execute(text("select 1"))
+    assert current_timings() is None
+
+    with track_request("/demo") as timings:
+        with span("stage"), engine.connect() as conn:
+            conn.execute(text("select 1"))
+            conn.execute(text("select 2"))
+        with span("stage"):
+            pass
+
+    assert set(timings.stages) == {"stage"}
+    assert timings.db_queries == 2
+    header = timings.server_timing(total=0.01)
+    assert header.startswith("stage;dur=")
+    assert 'db;dur=' in header and 'desc="2 queries"' in header
+    assert header.endswith("total;dur=10.00")
@@ -0,0 +1,60 @@
+from __future__ import annotations
+
+import pstats
+import time
+
+import pytest
+from typer.testing import CliRunner
+
+from app.infra import profiling as profiling_module
+from app.infra.profiling import current_profile, profiling
+from app.jobs import sync_weather as sync_weather_module
+
+
+def _busy(seconds: float) -> int:
+    deadline = time.perf_counter() + seconds
+    total = 0
+    while time.perf_counter() < deadline:
+        total += sum(range(200))
+    return total
+
+
+def test_sampling_profile_writes_folded_stacks_of_app_code(tmp_path):
+    with profiling("job", "busy job", identifier="abc123", directory=tmp_path, interval=0.001) as profile:
+        assert current_profile() is profile
+        _busy(0.1)
+
+    assert current_profile() is None
+    assert profile.path.parent == tmp_path
+    assert profile.path.name.startswith("job-busy_job-") and profile.path.name.endswith("-abc123.folded")
+    lines = profile.path.read_text().splitlines()
+    assert lines and profile.samples > 0
+    stack, count = lines[0].rsplit(" ", 1)
+    assert int(count) > 0
+    assert "_busy (app/tests/unit/test_profiling.py:" in stack
+
+
+def test_cprofile_mode_writes_pstats_and_only_one_profile_runs_at_a_time(tmp_path):
+    with profiling("api", "GET /api/heatmap", mode="cprofile", directory=tmp_path) as profile:
+        with profiling("api", "nested", directory=tmp_path) as nested:
+            assert nested is None
+        _busy(0.01)
+
+    assert profile.path.suffix == ".prof"
+    stats = pstats.Stats(str(profile.path))
+    assert any(func[2] == "_busy" for func in stats.stats)
+    with pytest.raises(ValueError):
+        with profiling("job", "x", mode="perf"):
+            pass
+
+
+def test_job_cli_profile_flag_writes_profile(tmp_path, monkeypatch):
+    monkeypatch.setattr(profiling_module, "PROFILE_DIR", str(tmp_path / "profiles"))
+    monkeypatch.setenv("DATABASE_URL", f"sqlite:///{tmp_path / 'cli.db'}")
+
+    result = CliRunner().invoke(sync_weather_module.app, ["--future-days", "1", "--offline", "--profile"])
+
+    assert result.exit_code == 0, result.output
+    [path] = (tmp_path / "profiles").iterdir()
+    assert path.name.startswith("job-sync_weather-")
+    assert f"path={path}" in result.output
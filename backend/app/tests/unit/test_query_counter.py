@@ -0,0 +1,62 @@
+from __future__ import annotations
+
+import pytest
+from sqlalchemy import create_engine, text
+
+from app.infra.db.query_counter import QueryCounter, count_queries, normalize_sql
+
+
+def test_normalize_sql_strips_parameters_and_collapses_lists():
+    assert normalize_sql("SELECT id FROM events\n  WHERE source = ? AND external_id = 'x-1' LIMIT 10") == (
+        "SELECT id FROM events WHERE source = ? AND external_id = ? LIMIT ?"
+    )
+    assert normalize_sql("SELECT id FROM venues WHERE id IN (%(id_1)s, %(id_2)s, %(id_3)s)") == (
+        "SELECT id FROM venues WHERE id IN (?, ...)"
+    )
+    assert normalize_sql("INSERT INTO t (a, b) VALUES ($1, $2), ($3, $4), ($5, $6)") == (
+        "INSERT INTO t (a, b) VALUES (?, ...), ..."
+    )
+    assert normalize_sql("SELECT CAST(:value AS TEXT)::varchar FROM t1") == "SELECT CAST(? AS TEXT)::varchar FROM t1"
+
+
+def test_counter_groups_by_operation_and_flags_repeated_statements():
+    counter = QueryCounter(n_plus_one_threshold=3)
+    with counter.operation("load"):
+        counter.record("SELECT * FROM rules")
+        for idx in range(3):
+            counter.record(f"SELECT id FROM events WHERE external_id = 'evt-{idx}'")
+    for _ in range(4):
+        counter.record("INSERT INTO venues (name) VALUES (?) RETURNING id", executemany=True)
+
+    assert counter.count == 8
+    assert dict(counter.by_operation()) == {"load": 4, None: 4}
+    assert counter.by_statement("load")[0] == ("SELECT id FROM events WHERE external_id = ?", 3)
+    # Las ejecuciones de un mismo executemany no son un N+1
+    assert counter.n_plus_one() == [("SELECT id FROM events WHERE external_id = ?", 3)]
+    with pytest.raises(AssertionError, match="N\\+1"):
+        counter.assert_budget()
+    with pytest.raises(AssertionError, match="at most 5 statements, got 8"):
+        counter.assert_budget(5, allow_n_plus_one=True)
+    counter.assert_budget(8, allow_n_plus_one=True)
+
+
+def test_count_queries_only_listens_inside_the_block():
+    engine = create_engine("sqlite://", future=True)
+    with count_queries(engine) as counter:
+        with engine.connect() as conn:
+            conn.execute(text("SELECT 1"))
+    with engine.connect() as conn:
+        conn.execute(text("SELECT 2"))
+
+    assert [record.normalized for record in counter.records] == ["SELECT ?"]
+
+
+def test_count_queries_flags_a_lookup_per_row_on_a_real_engine():
+    engine = create_engine("sqlite://", future=True)
+    with count_queries(engine, n_plus_one_threshold=3) as counter:
+        with engine.connect() as conn:
+            for idx in range(4):
+                conn.execute(text("SELECT :external_id AS external_id"), {"external_id": f"evt-{idx}"})
+            conn.execute(text("SELECT 1"))
+
+    assert counter.n_plus_one() == [("SELECT ? AS external_id", 4)]
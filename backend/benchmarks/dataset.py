@@ -0,0 +1,237 @@
+from __future__ import annotations
+
+import math
+import random
+from dataclasses import asdict, dataclass
+from datetime import date, datetime, time, timedelta, timezone
+from typing import Any, Dict, Iterator, List
+
+from sqlalchemy.engine import Engine
+
+from app.domain.canonical import CanonicalEvent, CanonicalWeatherHour
+from app.infra.db.category_rules_repository import CategoryRulesRepository
+from app.infra.db.events_repository import EventsRepository
+from app.infra.db.tables import metadata
+from app.infra.db.venues_repository import VenuesRepository
+from app.infra.db.weather_repository import WeatherRepository
+
+SOURCE = "bench"
+WEATHER_SOURCE = "bench-weather"
+WRITE_CHUNK = 5000
+# Categorías del scoring más algunas sin regla para cubrir los valores por defecto
+CATEGORIES = ["concierto", "teatro", "cine", "feria", "manifestacion", "deporte", "music", "expo", "community"]
+CATEGORY_WEIGHTS = [20, 12, 15, 4, 2, 10, 20, 8, 9]
+# Horas de inicio ponderadas hacia la tarde/noche, como en los datos reales
+START_HOURS = [10, 12, 17, 18, 19, 20, 21, 22]
+START_HOUR_WEIGHTS = [5, 6, 8, 12, 14, 20, 18, 10]
+RULES = [
+    {"category": "concierto", "fill_factor": 0.8, "fallback_attendance": 800, "default_duration_min": 150,
+     "pre_event_min": 60, "post_event_min": 45},
+    {"category": "deporte", "fill_factor": 0.7, "fallback_attendance": 5000, "default_duration_min": 120,
+     "pre_event_min": 90, "post_event_min": 60},
+    {"category": "feria", "fill_factor": 0.5, "fallback_attendance": 3000, "default_duration_min": 480,
+     "pre_event_min": 30, "post_event_min": 30},
+]
+
+
+@dataclass(frozen=True)
+class DatasetSpec:
+    """Parámetros del dataset sintético; la misma especificación genera siempre las mismas filas."""
+
+    events: int = 10_000
+    venues: int = 500
+    weather_days: int = 730
+    stations: int = 4
+    seed: int = 42
+    start: date = date(2024, 1, 1)
+    city: str = "Madrid"
+    lat: float = 40.4168
+    lon: float = -3.7038
+    spread_km: float = 12.0
+
+    @property
+    def end(self) -> date:
+        return self.start + timedelta(days=self.weather_days - 1)
+
+    def as_dict(self) -> Dict[str, Any]:
+        data = asdict(self)
+        data["start"] = self.start.isoformat()
+        return data
+
+
+def _offset(rng: random.Random, spec: DatasetSpec) -> tuple[float, float]:
+    # Distribución normal alrededor del centro: densidad alta en el centro, cola hacia la periferia
+    dlat = rng.gauss(0.0, spec.spread_km / 3.0) / 111.0
+    dlon = rng.gauss(0.0, spec.spread_km / 3.0) / (111.0 * math.cos(math.radians(spec.lat)))
+    return spec.lat + dlat, spec.lon + dlon
+
+
+def build_venues(spec: DatasetSpec) -> List[Dict[str, Any]]:
+    rng = random.Random(f"{spec.seed}:venues")
+    venues = []
+    for idx in range(spec.venues):
+        lat, lon = _offset(rng, spec)
+        venues.append(
+            {
+                "source": SOURCE,
+                "external_id": f"bench-venue-{idx}",
+                "name": f"Bench Venue {idx}",
+                "lat": round(lat, 6),
+                "lon": round(lon, 6),
+                "city": spec.city,
+                "country": "ES",
+                "max_capacity": rng.choice([150, 400, 1200, 5000, 20000]),
+            }
+        )
+    return venues
+
+
+def iter_events(spec: DatasetSpec, venues: List[Dict[str, Any]]) -> Iterator[Dict[str, Any]]:
+    """Filas de ``events``; el venue va por clave externa y lo resuelve ``EventsRepository.upsert_many``."""
+    rng = random.Random(f"{spec.seed}:events")
+    for idx in range(spec.events):
+        day = spec.start + timedelta(days=idx * spec.weather_days // max(1, spec.events))
+        hour = rng.choices(START_HOURS, START_HOUR_WEIGHTS)[0]
+        start_dt = datetime.combine(day, time(hour=hour, minute=rng.choice([0, 15, 30, 45])), tzinfo=timezone.utc)
+        # Una parte sin hora de fin (end_dt = start_dt, como los conectores) para ejercitar las duraciones por defecto
+        end_dt = start_dt + timedelta(minutes=rng.choice([90, 120, 150, 180, 240])) if rng.random() < 0.7 else start_dt
+        venue = venues[rng.randrange(len(venues))]
+        category = rng.choices(CATEGORIES, CATEGORY_WEIGHTS)[0]
+        yield {
+            "source": SOURCE,
+            "external_id": f"bench-{idx}",
+            "title": f"Bench {category} {idx}",
+            "category": category,
+            "start_dt": start_dt,
+            "end_dt": end_dt,
+            "timezone": "Europe/Madrid",
+            "lat": venue["lat"],
+            "lon": venue["lon"],
+            "status": "scheduled",
+            "expected_attendance": rng.randint(50, 20000) if rng.random() < 0.6 else None,
+            "popularity_score": round(rng.random(), 3),
+            "is_active": True,
+            "venue_source": SOURCE,
+            "venue_external_id": venue["external_id"],
+            "venue_name": venue["name"],
+            "venue_city": spec.city,
+        }
+
+
+def station_points(spec: DatasetSpec) -> List[tuple[float, float]]:
+    side = max(1, math.ceil(math.sqrt(spec.stations)))
+    step = 0.05
+    points = []
+    for idx in range(spec.stations):
+        row, col = divmod(idx, side)
+        points.append((round(spec.lat + (row - side / 2) * step, 4), round(spec.lon + (col - side / 2) * step, 4)))
+    return points
+
+
+def iter_weather(spec: DatasetSpec) -> Iterator[Dict[str, Any]]:
+    rng = random.Random(f"{spec.seed}:weather")
+    origin = datetime.combine(spec.start, time.min, tzinfo=timezone.utc)
+    for lat, lon in station_points(spec):
+        for offset in range(spec.weather_days * 24):
+            observed_at = origin + timedelta(hours=offset)
+            seasonal = 15.0 - 10.0 * math.cos(2 * math.pi * observed_at.timetuple().tm_yday / 365.0)
+            daily = 5.0 * math.sin(2 * math.pi * (observed_at.hour - 9) / 24.0)
+            raining = rng.random() < 0.08
+            yield {
+                "source": WEATHER_SOURCE,
+                "lat": lat,
+                "lon": lon,
+                "observed_at": observed_at,
+                "temperature_c": round(seasonal + daily + rng.gauss(0.0, 1.5), 1),
+                "precipitation_mm": round(rng.expovariate(1.0), 1) if raining else 0.0,
+                "rain_mm": None,
+                "wind_speed_kmh": round(abs(rng.gauss(12.0, 6.0)), 1),
+                "cloud_cover_pct": round(rng.uniform(0, 100), 0),
+                "humidity_pct": round(rng.uniform(20, 95), 0),
+            }
+
+
+def generate_dataset(engine: Engine, spec: DatasetSpec) -> Dict[str, int]:
+    """Escribe venues, reglas, eventos y meteo horaria con los repositorios de la app.
+
+    Usa las mismas rutas de escritura en bloque que los jobs, así que vale igual para
+    SQLite que para Postgres. Es idempotente: relanzarlo actualiza las mismas claves.
+    """
+    if engine is None:
+        raise ValueError("engine is required")
+    metadata.create_all(engine)
+    CategoryRulesRepository(engine).upsert_many(RULES)
+
+    venues = build_venues(spec)
+    venues_repo = VenuesRepository(engine)
+    venues_repo.resolve_many(venues)
+
+    events_repo = EventsRepository(engine, venues_repo=venues_repo)
+    written_events = 0
+    for chunk in _chunks(iter_events(spec, venues), WRITE_CHUNK):
+        events_repo.upsert_many(chunk)
+        written_events += len(chunk)
+
+    weather_repo = WeatherRepository(engine)
+    written_weather = 0
+    for chunk in _chunks(iter_weather(spec), WRITE_CHUNK):
+        weather_repo.upsert_many(chunk)
+        written_weather += len(chunk)
+    return {"venues": len(venues), "events": written_events, "weather_hours": written_weather}
+
+
+def canonical_events(spec: DatasetSpec, count: int) -> List[CanonicalEvent]:
+    """Eventos canónicos (como los de los conectores) con las primeras ``count`` claves del dataset."""
+    return [
+        CanonicalEvent(
+            source=row["source"],
+            external_id=row["external_id"],
+            title=row["title"],
+            start_at=row["start_dt"],
+            end_at=row["end_dt"],
+            lat=row["lat"],
+            lon=row["lon"],
+            venue_name=row["venue_name"],
+            venue_external_id=row["venue_external_id"],
+            venue_source=row["venue_source"],
+            venue_city=row["venue_city"],
+            venue_country="ES",
+            raw={"category": row["category"], "expected_attendance": row["expected_attendance"]},
+        )
+        for row in _first(iter_events(spec, build_venues(spec)), count)
+    ]
+
+
+def canonical_weather(spec: DatasetSpec, hours: int) -> List[CanonicalWeatherHour]:
+    """Las primeras ``hours`` observaciones del dataset (estación a estación) como las da el conector."""
+    return [
+        CanonicalWeatherHour(
+            source=row["source"],
+            lat=row["lat"],
+            lon=row["lon"],
+            observed_at=row["observed_at"],
+            temperature_c=row["temperature_c"],
+            precipitation_mm=row["precipitation_mm"],
+            wind_speed_kmh=row["wind_speed_kmh"],
+            cloud_cover_pct=row["cloud_cover_pct"],
+        )
+        for row in _first(iter_weather(spec), hours)
+    ]
+
+
+def _first(items: Iterator[Dict[str, Any]], count: int) -> Iterator[Dict[str, Any]]:
+    for idx, item in enumerate(items):
+        if idx >= count:
+            return
+        yield item
+
+
+def _chunks(items: Iterator[Dict[str, Any]], size: int) -> Iterator[List[Dict[str, Any]]]:
+    chunk: List[Dict[str, Any]] = []
+    for item in items:
+        chunk.append(item)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
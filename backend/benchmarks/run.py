@@ -0,0 +1,369 @@
+from __future__ import annotations
+
+import contextlib
+import io
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+from dataclasses import dataclass
+from datetime import datetime, time, timedelta, timezone
+from pathlib import Path
+from time import perf_counter
+from typing import Any, Callable, Dict, List, Optional
+
+import typer
+from sqlalchemy.engine import Engine, make_url
+
+from app.domain.scoring import compute_hotspots
+from app.infra.db.engines import create_db_engine
+from app.infra.db.events_repository import EventsRepository
+from app.jobs.export_training_dataset import export_training_dataset
+from app.jobs.materialize_range import materialize_range
+from app.jobs.train_baseline import train_baseline
+from app.services.event_upsert import EventUpsertService
+from app.services.heatmap import MODEL_CACHE, _row_to_domain
+from app.services.weather_upsert import WeatherUpsertService
+
+from .dataset import DatasetSpec, build_venues, canonical_events, canonical_weather, generate_dataset, iter_events
+
+app = typer.Typer(help="Benchmarks de scoring, API y jobs sobre un dataset sintético reproducible")
+RESULTS_VERSION = 1
+BACKEND_DIR = Path(__file__).resolve().parents[1]
+# Horas consultadas por los casos de scoring/API: pico de tarde y una hora valle
+SAMPLE_HOURS = (20, 12)
+# Días de snapshots que alimentan export_training_dataset/train_baseline
+TRAINING_DAYS = 7
+# train_baseline es descenso por gradiente en Python puro: tamaño fijo para que sea comparable entre datasets
+TRAINING_ROWS = int(os.getenv("BENCH_TRAINING_ROWS", "500"))
+UPSERT_BATCH = int(os.getenv("BENCH_UPSERT_BATCH", "500"))
+
+
+@dataclass
+class BenchContext:
+    engine: Engine
+    spec: DatasetSpec
+    workdir: Path
+    _client: Any = None
+
+    @property
+    def sample_day(self):
+        # Un día intermedio del rango: con eventos que empiezan el día anterior y meteo completa
+        return self.spec.start + timedelta(days=self.spec.weather_days // 2)
+
+    def targets(self) -> List[datetime]:
+        return [datetime.combine(self.sample_day, time(hour=hour)) for hour in SAMPLE_HOURS]
+
+    @property
+    def client(self):
+        if self._client is None:
+            from fastapi.testclient import TestClient
+
+            from app.api.deps import get_engine
+            from app.api.main import create_app
+
+            api = create_app(engine=self.engine)
+            api.dependency_overrides[get_engine] = lambda: self.engine
+            self._client = TestClient(api)
+            self._client.__enter__()
+        return self._client
+
+    def dataset_csv(self) -> Path:
+        path = self.workdir / "dataset.csv"
+        if not path.exists():
+            _quiet(self._materialize_sample)
+            _quiet(
+                export_training_dataset,
+                path,
+                self.spec.start.isoformat(),
+                self.spec.end.isoformat(),
+                limit=TRAINING_ROWS,
+                engine=self.engine,
+            )
+        return path
+
+    def model_dir(self) -> Path:
+        model_dir = self.workdir / "models"
+        if not (model_dir / "model_attendance_factor.json").exists():
+            csv_path = self.dataset_csv()
+            _quiet(train_baseline, csv_path, model_dir / "model_lead_time.json", "label_lead_time_min")
+            _quiet(train_baseline, csv_path, model_dir / "model_attendance_factor.json", "label_attendance_factor")
+        return model_dir
+
+    def _materialize_sample(self) -> None:
+        first = self.sample_day - timedelta(days=TRAINING_DAYS - 1)
+        materialize_range(first.isoformat(), self.sample_day.isoformat(), "0-23", engine=self.engine)
+
+    def close(self) -> None:
+        if self._client is not None:
+            self._client.__exit__(None, None, None)
+            self._client = None
+
+
+@dataclass(frozen=True)
+class BenchCase:
+    """``setup(ctx)`` prepara fuera de la medición y devuelve la función a cronometrar."""
+
+    name: str
+    setup: Callable[[BenchContext], Callable[[], Any]]
+    job: bool = False
+
+
+def _quiet(fn: Callable[..., Any], *args, **kwargs) -> Any:
+    # Los jobs imprimen su línea [job] en cada llamada; no queremos medir ni ver la salida
+    with contextlib.redirect_stdout(io.StringIO()):
+        return fn(*args, **kwargs)
+
+
+def _scoring_batch(ctx: BenchContext):
+    repo = EventsRepository(ctx.engine)
+    batches = [(repo.event_batch_active_at(target), target) for target in ctx.targets()]
+    return lambda: [compute_hotspots(batch, target) for batch, target in batches]
+
+
+def _scoring_objects(ctx: BenchContext):
+    repo = EventsRepository(ctx.engine)
+    events = [([_row_to_domain(row) for row in repo.list_events_active_at(t)], t) for t in ctx.targets()]
+    return lambda: [compute_hotspots(items, target) for items, target in events]
+
+
+def _api_get(ctx: BenchContext, path: str, **extra):
+    client = ctx.client
+    requests = [
+        {"date": target.date().isoformat(), "hour": target.hour, "lat": ctx.spec.lat, "lon": ctx.spec.lon, **extra}
+        for target in ctx.targets()
+    ]
+
+    def call():
+        for params in requests:
+            response = client.get(path, params=params)
+            if response.status_code != 200:
+                raise RuntimeError(f"{path} returned {response.status_code}: {response.text[:200]}")
+
+    return call
+
+
+def _api_heatmap_heuristic(ctx: BenchContext):
+    return _api_get(ctx, "/api/heatmap", mode="heuristic")
+
+
+def _api_heatmap_ml(ctx: BenchContext):
+    os.environ["HEATMAP_MODEL_DIR"] = str(ctx.model_dir())
+    MODEL_CACHE.clear()
+    return _api_get(ctx, "/api/heatmap", mode="ml")
+
+
+def _api_hotspot_events(ctx: BenchContext):
+    return _api_get(ctx, "/api/hotspot_events", radius_m=2000)
+
+
+def _materialize_range(ctx: BenchContext):
+    day = ctx.sample_day.isoformat()
+    return lambda: _quiet(materialize_range, day, day, "0-23", engine=ctx.engine)
+
+
+def _export_training_dataset(ctx: BenchContext):
+    ctx.dataset_csv()
+    out = ctx.workdir / "export.csv"
+    start, end = ctx.spec.start.isoformat(), ctx.spec.end.isoformat()
+    return lambda: _quiet(export_training_dataset, out, start, end, engine=ctx.engine)
+
+
+def _train_baseline(ctx: BenchContext):
+    csv_path = ctx.dataset_csv()
+    out = ctx.workdir / "bench_model.json"
+    return lambda: _quiet(train_baseline, csv_path, out, "label_attendance_factor")
+
+
+def _event_upsert_service(ctx: BenchContext):
+    service = EventUpsertService(ctx.engine)
+    events = canonical_events(ctx.spec, UPSERT_BATCH)
+    return lambda: service.upsert_events(events)
+
+
+def _events_bulk_upsert(ctx: BenchContext):
+    repo = EventsRepository(ctx.engine)
+    rows = list(iter_events(ctx.spec, build_venues(ctx.spec)))[: UPSERT_BATCH * 10]
+    return lambda: repo.upsert_many(rows)
+
+
+def _weather_upsert_service(ctx: BenchContext):
+    service = WeatherUpsertService(ctx.engine)
+    hours = canonical_weather(ctx.spec, UPSERT_BATCH * 10)
+    return lambda: service.upsert_hours(hours)
+
+
+CASES = [
+    BenchCase("scoring.compute_hotspots.batch", _scoring_batch),
+    BenchCase("scoring.compute_hotspots.objects", _scoring_objects),
+    BenchCase("api.heatmap.heuristic", _api_heatmap_heuristic),
+    BenchCase("api.heatmap.ml", _api_heatmap_ml),
+    BenchCase("api.hotspot_events", _api_hotspot_events),
+    BenchCase("jobs.materialize_range", _materialize_range, job=True),
+    BenchCase("jobs.export_training_dataset", _export_training_dataset, job=True),
+    BenchCase("jobs.train_baseline", _train_baseline, job=True),
+    BenchCase("services.event_upsert", _event_upsert_service, job=True),
+    BenchCase("services.events_bulk_upsert", _events_bulk_upsert, job=True),
+    BenchCase("services.weather_upsert", _weather_upsert_service, job=True),
+]
+
+
+def measure(fn: Callable[[], Any], repeat: int, warmup: int = 1) -> Dict[str, Any]:
+    """Tiempos de pared en segundos; la mediana es la cifra a comparar entre commits."""
+    for _ in range(warmup):
+        fn()
+    samples = []
+    for _ in range(max(1, repeat)):
+        started = perf_counter()
+        fn()
+        samples.append(perf_counter() - started)
+    return {
+        "runs": len(samples),
+        "median": statistics.median(samples),
+        "mean": statistics.fmean(samples),
+        "min": min(samples),
+        "max": max(samples),
+        "stdev": statistics.stdev(samples) if len(samples) > 1 else 0.0,
+    }
+
+
+def run_benchmarks(
+    engine: Engine,
+    spec: DatasetSpec,
+    *,
+    workdir: Path,
+    repeat: int = 5,
+    job_repeat: int = 1,
+    only: Optional[List[str]] = None,
+    generate: bool = True,
+) -> Dict[str, Any]:
+    selected = [case for case in CASES if not only or any(case.name.startswith(prefix) for prefix in only)]
+    if not selected:
+        raise ValueError(f"no benchmark matches {only}")
+    meta: Dict[str, Any] = {
+        "version": RESULTS_VERSION,
+        "commit": _git_commit(),
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "dialect": engine.dialect.name,
+        "dataset": spec.as_dict(),
+    }
+    if generate:
+        started = perf_counter()
+        meta["rows"] = _quiet(generate_dataset, engine, spec)
+        meta["generate_sec"] = perf_counter() - started
+        print(f"[bench] dataset rows={meta['rows']} elapsed={meta['generate_sec']:.2f}s")
+
+    ctx = BenchContext(engine=engine, spec=spec, workdir=workdir)
+    results: Dict[str, Any] = {}
+    try:
+        for case in selected:
+            fn = case.setup(ctx)
+            stats = measure(fn, job_repeat if case.job else repeat, warmup=0 if case.job else 1)
+            results[case.name] = stats
+            print(f"[bench] {case.name} median={stats['median'] * 1000:.2f}ms runs={stats['runs']}")
+    finally:
+        ctx.close()
+    return {"meta": meta, "results": results}
+
+
+def compare_results(old: Dict[str, Any], new: Dict[str, Any], threshold: float = 0.10) -> List[Dict[str, Any]]:
+    """Filas (caso, mediana anterior, mediana nueva, ratio, regresión) de los casos comunes."""
+    rows = []
+    for name, stats in new["results"].items():
+        previous = old.get("results", {}).get(name)
+        if previous is None:
+            continue
+        ratio = stats["median"] / previous["median"] if previous["median"] else float("inf")
+        rows.append(
+            {
+                "name": name,
+                "old": previous["median"],
+                "new": stats["median"],
+                "ratio": ratio,
+                "regression": ratio > 1.0 + threshold,
+            }
+        )
+    return rows
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        out = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=BACKEND_DIR, capture_output=True, text=True, check=True
+        )
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return out.stdout.strip() or None
+
+
+def _print_comparison(rows: List[Dict[str, Any]], old_commit: Optional[str]) -> None:
+    print(f"[bench] compare base={old_commit or 'unknown'}")
+    for row in rows:
+        flag = " REGRESSION" if row["regression"] else ""
+        print(
+            f"[bench] {row['name']} old={row['old'] * 1000:.2f}ms new={row['new'] * 1000:.2f}ms "
+            f"ratio={row['ratio']:.2f}{flag}"
+        )
+
+
+@app.command()
+def cli(
+    events: int = typer.Option(10_000, help="Eventos sintéticos (10k-1M)"),
+    venues: int = typer.Option(500, help="Venues sintéticos"),
+    weather_days: int = typer.Option(730, help="Días de meteo horaria (y rango de fechas de los eventos)"),
+    stations: int = typer.Option(4, help="Puntos de meteo alrededor del centro"),
+    seed: int = typer.Option(42),
+    repeat: int = typer.Option(5, help="Repeticiones de los casos de scoring/API"),
+    job_repeat: int = typer.Option(1, help="Repeticiones de los jobs y servicios de escritura"),
+    only: Optional[List[str]] = typer.Option(None, help="Prefijos de caso (p. ej. api. o jobs.train)"),
+    database_url: Optional[str] = typer.Option(None, help="BD de benchmark (por defecto, SQLite temporal)"),
+    skip_generate: bool = typer.Option(False, help="Reutilizar el dataset ya cargado en --database-url"),
+    out: Optional[Path] = typer.Option(None, help="Fichero JSON de resultados"),
+    compare: Optional[Path] = typer.Option(None, help="Resultados previos con los que comparar"),
+    threshold: float = typer.Option(0.10, help="Ratio de empeoramiento que cuenta como regresión"),
+):
+    spec = DatasetSpec(events=events, venues=venues, weather_days=weather_days, stations=stations, seed=seed)
+    with tempfile.TemporaryDirectory(prefix="hotspots-bench-") as tmp:
+        workdir = Path(tmp)
+        url = database_url or f"sqlite:///{workdir / 'bench.db'}"
+        # El TestClient sirve desde otro hilo: la conexión SQLite no puede quedar atada al hilo que la abre
+        connect_args = {"check_same_thread": False} if make_url(url).get_backend_name() == "sqlite" else {}
+        engine = create_db_engine(url, connect_args=connect_args)
+        try:
+            payload = run_benchmarks(
+                engine,
+                spec,
+                workdir=workdir,
+                repeat=repeat,
+                job_repeat=job_repeat,
+                only=only,
+                generate=not (skip_generate and database_url),
+            )
+        finally:
+            engine.dispose()
+
+    text = json.dumps(payload, indent=2)
+    if out:
+        out.parent.mkdir(parents=True, exist_ok=True)
+        out.write_text(text)
+        print(f"[bench] results={out}")
+    else:
+        print(text)
+
+    if compare:
+        previous = json.loads(compare.read_text())
+        if previous.get("meta", {}).get("dataset") != payload["meta"]["dataset"]:
+            print("[bench] warning: dataset spec differs from the compared run; ratios are not comparable")
+        rows = compare_results(previous, payload, threshold)
+        _print_comparison(rows, previous.get("meta", {}).get("commit"))
+        if any(row["regression"] for row in rows):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    app()
@@ -9,6 +9,7 @@ Variables soportadas:
   PAST_DAYS (default: 1)
   FUTURE_DAYS (default: 3)
   DATABASE_URL (default: sqlite://../tmp_dev.db)
+  JOB_RUN_LOG (default: logs/job_runs.jsonl)
 USAGE
   exit 0
 fi
@@ -24,6 +25,7 @@ fi
 
 DEFAULT_DB_PATH="$(cd "$BACKEND_DIR/.." && pwd)/tmp_dev.db"
 export DATABASE_URL="${DATABASE_URL:-sqlite:///${DEFAULT_DB_PATH}}"
+export JOB_RUN_LOG="${JOB_RUN_LOG:-${BACKEND_DIR}/logs/job_runs.jsonl}"
 CITY="${CITY:-Madrid}"
 PAST_DAYS="${PAST_DAYS:-1}"
 FUTURE_DAYS="${FUTURE_DAYS:-3}"
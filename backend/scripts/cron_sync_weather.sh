@@ -11,6 +11,7 @@ Variables:
   FUTURE_DAYS (default: 1)
   LOCATION_NAME (default: Madrid)
   DATABASE_URL (default: sqlite://../tmp_dev.db)
+  JOB_RUN_LOG (default: logs/job_runs.jsonl)
 USAGE
   exit 0
 fi
@@ -26,6 +27,7 @@ fi
 
 DEFAULT_DB_PATH="$(cd "$BACKEND_DIR/.." && pwd)/tmp_dev.db"
 export DATABASE_URL="${DATABASE_URL:-sqlite:///${DEFAULT_DB_PATH}}"
+export JOB_RUN_LOG="${JOB_RUN_LOG:-${BACKEND_DIR}/logs/job_runs.jsonl}"
 LAT="${LAT:-40.4168}"
 LON="${LON:--3.7038}"
 PAST_DAYS="${PAST_DAYS:-1}"
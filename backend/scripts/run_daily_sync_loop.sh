@@ -38,6 +38,8 @@ fi
 LOG_DIR="$(cd "$(dirname "$0")/.." && pwd)/logs"
 mkdir -p "$LOG_DIR"
 BACKEND_DIR="$(cd "$(dirname "$0")/.." && pwd)"
+# Un registro JSON por ejecución (etapas, filas/s, sentencias SQL, RSS pico); comparar con app.jobs.instrumentation
+export JOB_RUN_LOG="${JOB_RUN_LOG:-$LOG_DIR/job_runs.jsonl}"
 
 if ! start_ts=$(date -jf "%Y-%m-%d" "$START" +%s 2>/dev/null); then
   echo "Invalid start date" >&2